@@ -0,0 +1,348 @@
+"""Throughput benchmark for the evaluation and review pipeline.
+
+Runs ``DiffEvaluator.evaluate_commits``, ``CodeReviewChain`` and ``PRSummaryChain``
+against a deterministic fake chat model and synthetic diff corpora, and reports
+files/sec, p50/p99 latency and peak Python memory for each stage.
+
+Usage:
+    python benchmarks/benchmark_pipeline.py --corpus small --latency 0.05
+    python benchmarks/benchmark_pipeline.py --corpus large --rate-limit-rate 0.05 --json results.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from codedog.chains import CodeReviewChain, PRSummaryChain
+from codedog.models import ChangeFile, ChangeStatus, DiffContent, PullRequest
+from codedog.utils.code_evaluator import DiffEvaluator
+from codedog.utils.fake_llm import FakeChatModel
+from codedog.utils.git_log_analyzer import CommitInfo
+
+# (提交数/PR 数, 每个提交的文件数, 每个文件的变更行数)
+CORPORA = {
+    "small": (5, 3, 20),
+    "medium": (20, 5, 80),
+    "large": (40, 8, 400),
+}
+
+STAGES = ["evaluator", "code_review", "pr_summary"]
+
+_SUFFIXES = ["py", "js", "go", "java", "ts"]
+
+
+def _code_line(rng: random.Random, suffix: str, index: int) -> str:
+    name = f"value_{rng.randint(0, 9999)}"
+    if suffix == "py":
+        return f"    {name} = compute({index}, {rng.randint(0, 100)})"
+    if suffix == "go":
+        return f"\t{name} := compute({index}, {rng.randint(0, 100)})"
+    return f"    const {name} = compute({index}, {rng.randint(0, 100)});"
+
+
+def synthetic_diff(rng: random.Random, path: str, lines: int) -> Tuple[str, int, int]:
+    """生成一个包含若干 hunk 的 unified diff，返回 (diff, 新增行数, 删除行数)"""
+    suffix = path.rsplit(".", 1)[-1]
+    parts = [f"diff --git a/{path} b/{path}", f"--- a/{path}", f"+++ b/{path}"]
+    additions = deletions = 0
+    line_no = 1
+    remaining = lines
+    while remaining > 0:
+        size = min(remaining, rng.randint(5, 40))
+        removed = rng.randint(0, size // 2)
+        added = size - removed
+        parts.append(f"@@ -{line_no},{removed + 2} +{line_no},{added + 2} @@")
+        parts.append(" " + _code_line(rng, suffix, line_no))
+        parts.extend("-" + _code_line(rng, suffix, line_no + i) for i in range(removed))
+        parts.extend("+" + _code_line(rng, suffix, line_no + i) for i in range(added))
+        parts.append(" " + _code_line(rng, suffix, line_no + size))
+        additions += added
+        deletions += removed
+        line_no += size + 10
+        remaining -= size
+    return "\n".join(parts), additions, deletions
+
+
+def build_commit_corpus(
+    commits: int, files_per_commit: int, lines_per_file: int, seed: int = 0
+) -> Tuple[List[CommitInfo], Dict[str, Dict[str, str]]]:
+    """生成 ``DiffEvaluator.evaluate_commits`` 使用的合成提交和文件 diff"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    commit_infos = []
+    commit_file_diffs = {}
+    for i in range(commits):
+        commit_hash = f"{rng.getrandbits(160):040x}"
+        diffs = {}
+        added_total = deleted_total = 0
+        for j in range(files_per_commit):
+            path = f"src/module_{i}/file_{j}.{rng.choice(_SUFFIXES)}"
+            diff, added, deleted = synthetic_diff(rng, path, rng.randint(lines_per_file // 2, lines_per_file))
+            diffs[path] = diff
+            added_total += added
+            deleted_total += deleted
+        commit_file_diffs[commit_hash] = diffs
+        commit_infos.append(CommitInfo(
+            hash=commit_hash,
+            author="Benchmark Author",
+            date=start + timedelta(hours=i),
+            message=f"Synthetic commit {i}",
+            files=list(diffs),
+            diff="\n".join(diffs.values()),
+            added_lines=added_total,
+            deleted_lines=deleted_total,
+            effective_lines=added_total - deleted_total,
+        ))
+    return commit_infos, commit_file_diffs
+
+
+def build_pull_request_corpus(
+    pull_requests: int, files_per_pr: int, lines_per_file: int, seed: int = 0
+) -> List[PullRequest]:
+    """生成供审查链使用的合成 PR"""
+    rng = random.Random(seed)
+    prs = []
+    for i in range(pull_requests):
+        change_files = []
+        for j in range(files_per_pr):
+            suffix = rng.choice(_SUFFIXES)
+            path = f"src/module_{i}/file_{j}.{suffix}"
+            diff, added, deleted = synthetic_diff(rng, path, rng.randint(lines_per_file // 2, lines_per_file))
+            # 与检索器一致，diff_content 中不含 diff --git 文件头
+            patch = diff.split("\n", 3)[3]
+            change_files.append(ChangeFile(
+                blob_id=j,
+                sha=f"{rng.getrandbits(160):040x}",
+                full_name=path,
+                source_full_name=path,
+                status=ChangeStatus.modified,
+                pull_request_id=i,
+                start_commit_id=0,
+                end_commit_id=1,
+                name=path.rsplit("/", 1)[-1],
+                suffix=suffix,
+                diff_content=DiffContent(add_count=added, remove_count=deleted, content=patch),
+            ))
+        prs.append(PullRequest(
+            pull_request_id=i,
+            repository_id=1,
+            pull_request_number=i,
+            title=f"Synthetic pull request {i}",
+            body="Generated by the benchmark harness.",
+            change_files=change_files,
+        ))
+    return prs
+
+
+def percentile(values: List[float], q: int) -> float:
+    """返回第 q 百分位数（q 取 1-99），数据不足时退化为最大值"""
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+class _TimedDiffEvaluator(DiffEvaluator):
+    """记录每个文件从开始评价到得到结果的耗时（包含令牌桶等待、重试和解析）以及失败次数"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.file_latencies: List[float] = []
+        self.failures = 0
+
+    def _generate_default_scores(self, error_message: str) -> Dict[str, Any]:
+        self.failures += 1
+        return super()._generate_default_scores(error_message)
+
+    async def _evaluate_single_diff(self, diff_content: str, file_path: Optional[str] = None) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            return await super()._evaluate_single_diff(diff_content, file_path)
+        finally:
+            self.file_latencies.append(time.perf_counter() - started)
+
+
+async def bench_evaluator(model: FakeChatModel, args) -> Dict[str, Any]:
+    commits, commit_file_diffs = build_commit_corpus(*CORPORA[args.corpus], seed=args.seed)
+    evaluator = _TimedDiffEvaluator(
+        model,
+        tokens_per_minute=args.tokens_per_minute,
+        max_concurrent_requests=args.concurrency,
+    )
+    try:
+        results = await evaluator.evaluate_commits(commits, commit_file_diffs)
+    finally:
+        await evaluator.aclose()
+    return {"files": len(results), "failed": evaluator.failures, "latencies": evaluator.file_latencies}
+
+
+async def _bench_chain(chain, prs: List[PullRequest], concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failed = 0
+
+    async def run(pr: PullRequest):
+        nonlocal failed
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await chain.ainvoke({"pull_request": pr})
+            except Exception as e:
+                failed += 1
+                logging.debug(f"Benchmark chain call failed: {e}")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(run(pr) for pr in prs))
+    files = sum(len(pr.change_files) for pr in prs)
+    return {"files": files, "failed": failed, "latencies": latencies}
+
+
+async def bench_code_review(model: FakeChatModel, args) -> Dict[str, Any]:
+    prs = build_pull_request_corpus(*CORPORA[args.corpus], seed=args.seed)
+    chain = CodeReviewChain.from_llm(llm=model)
+    return await _bench_chain(chain, prs, args.concurrency)
+
+
+async def bench_pr_summary(model: FakeChatModel, args) -> Dict[str, Any]:
+    prs = build_pull_request_corpus(*CORPORA[args.corpus], seed=args.seed)
+    chain = PRSummaryChain.from_llm(code_summary_llm=model, pr_summary_llm=model)
+    return await _bench_chain(chain, prs, args.concurrency)
+
+
+BENCHMARKS = {
+    "evaluator": bench_evaluator,
+    "code_review": bench_code_review,
+    "pr_summary": bench_pr_summary,
+}
+
+
+def build_model(args) -> FakeChatModel:
+    return FakeChatModel(
+        latency=args.latency,
+        latency_per_token=args.latency_per_token,
+        jitter=args.jitter,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def run_stage(stage: str, args) -> Dict[str, Any]:
+    """运行一个阶段并统计吞吐、延迟和峰值内存"""
+    model = build_model(args)
+    output = io.StringIO()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    # 评价器会向标准输出打印进度，基准测试时默认屏蔽
+    with contextlib.redirect_stdout(output) if not args.verbose else contextlib.nullcontext():
+        result = asyncio.run(BENCHMARKS[stage](model, args))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    model_stats = model.get_stats()
+    latencies = result["latencies"]
+    return {
+        "stage": stage,
+        "corpus": args.corpus,
+        "files": result["files"],
+        "failed": result["failed"],
+        "elapsed_s": round(elapsed, 3),
+        "files_per_s": round(result["files"] / elapsed, 2) if elapsed > 0 else 0.0,
+        "p50_s": round(percentile(latencies, 50), 4),
+        "p99_s": round(percentile(latencies, 99), 4),
+        "peak_memory_mb": round(peak / (1024 * 1024), 2),
+        "model_calls": model_stats["calls"],
+        "model_errors": model_stats["errors"],
+        "model_rate_limited": model_stats["rate_limited"],
+        "prompt_tokens": model_stats["prompt_tokens"],
+        "completion_tokens": model_stats["completion_tokens"],
+    }
+
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    columns = [
+        "stage", "corpus", "files", "failed", "elapsed_s", "files_per_s", "p50_s", "p99_s",
+        "peak_memory_mb", "model_calls", "model_errors", "model_rate_limited", "prompt_tokens",
+    ]
+    widths = {c: max(len(c), *(len(str(row[c])) for row in rows)) for c in columns}
+    lines = [
+        " | ".join(c.ljust(widths[c]) for c in columns),
+        "-+-".join("-" * widths[c] for c in columns),
+    ]
+    for row in rows:
+        lines.append(" | ".join(str(row[c]).ljust(widths[c]) for c in columns))
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the CodeDog evaluation pipeline with a fake LLM")
+    parser.add_argument("--corpus", choices=list(CORPORA), default="small", help="Synthetic corpus size")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"Comma separated stages to run ({', '.join(STAGES)})")
+    parser.add_argument("--concurrency", type=int, default=3,
+                        help="Max concurrent requests for the evaluator / concurrent PRs for the chains")
+    parser.add_argument("--tokens-per-minute", type=int, default=1000000, help="Evaluator token bucket rate")
+    parser.add_argument("--latency", type=float, default=0.05, help="Base fake model latency per call (s)")
+    parser.add_argument("--latency-per-token", type=float, default=0.0, help="Extra latency per completion token (s)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Relative latency jitter (0.1 = ±10%%)")
+    parser.add_argument("--completion-tokens", type=int, default=None, help="Pad responses to about N tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a fake server error")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probability of a fake 429 error")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of injected 429 errors (s)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the corpus and the fake model")
+    parser.add_argument("--allow-failures", action="store_true",
+                        help="Exit with status 0 even if files failed without injected errors")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline progress output and logs")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.ERROR)
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(unknown)}")
+
+    rows = []
+    for stage in stages:
+        print(f"Running {stage} on {args.corpus} corpus...")
+        rows.append(run_stage(stage, args))
+
+    print()
+    print(format_table(rows))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    # 失败的文件不会调用模型，吞吐量会虚高：提醒并在没有注入故障时以非零状态退出
+    failed_stages = [row for row in rows if row["failed"]]
+    if failed_stages:
+        for row in failed_stages:
+            print(f"WARNING: {row['stage']} failed on {row['failed']}/{row['files']} files, "
+                  f"its throughput is not meaningful", file=sys.stderr)
+        if not (args.error_rate or args.rate_limit_rate or args.allow_failures):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from itertools import zip_longest
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.callbacks.manager import (
@@ -11,12 +11,17 @@ from langchain_core.callbacks.manager import (
 from langchain.chains import LLMChain
 from langchain.chains.base import Chain
 from langchain_core.prompts import BasePromptTemplate
+from langchain_core.rate_limiters import BaseRateLimiter
 from pydantic import Field
 
 from codedog.chains.code_review.prompts import CODE_REVIEW_PROMPT
 from codedog.models import ChangeFile, CodeReview, PullRequest
 from codedog.processors import PullRequestProcessor
 from codedog.processors.pull_request_processor import SUFFIX_LANGUAGE_MAPPING
+from codedog.utils.diff_chunker import chunk_diff_content
+from codedog.utils.rate_limiter import with_rate_limiter
+from codedog.utils.review_state import ReviewStateStore
+from codedog.utils.tokenizer import get_tokenizer
 
 
 class CodeReviewChain(Chain):
@@ -26,6 +31,13 @@ class CodeReviewChain(Chain):
         exclude=True, default_factory=PullRequestProcessor.build
     )
     """PR data process."""
+    max_tokens_per_chunk: int = 4000
+    """Token budget of one file diff chunk; larger diffs are reviewed hunk by hunk."""
+    max_chunks_per_file: Optional[int] = 8
+    """Most chunks reviewed per file (one LLM call each); the rest of a larger diff is skipped.
+    None reviews every chunk."""
+    review_state: Optional[ReviewStateStore] = Field(exclude=True, default=None)
+    """Previous review results; files unchanged since the last reviewed head are not re-reviewed."""
     _input_keys: List[str] = ["pull_request"]
     _output_keys: List[str] = ["code_reviews"]
 
@@ -60,7 +72,9 @@ class CodeReviewChain(Chain):
         pr: PullRequest = inputs["pull_request"]
         code_files: List[ChangeFile] = self.processor.get_diff_code_files(pr)
 
-        code_review_inputs = self._process_code_review_inputs(code_files)
+        pending_files, reused_reviews = self._split_reviewed_files(pr, code_files)
+
+        code_review_inputs = self._process_code_review_inputs(pending_files)
         code_review_outputs = (
             self.chain.apply(
                 code_review_inputs, callbacks=_run_manager.get_child(tag="CodeReview")
@@ -68,6 +82,12 @@ class CodeReviewChain(Chain):
             if code_review_inputs
             else []
         )
+        code_review_outputs = self._merge_chunk_outputs(
+            pending_files, code_review_inputs, code_review_outputs
+        )
+        code_review_outputs = self._merge_reused_outputs(
+            pr, code_files, pending_files, code_review_outputs, reused_reviews
+        )
 
         return self._process_result(code_files, code_review_outputs)
 
@@ -82,7 +102,9 @@ class CodeReviewChain(Chain):
         pr: PullRequest = inputs["pull_request"]
         code_files: List[ChangeFile] = self.processor.get_diff_code_files(pr)
 
-        code_review_inputs = self._process_code_review_inputs(code_files)
+        pending_files, reused_reviews = self._split_reviewed_files(pr, code_files)
+
+        code_review_inputs = self._process_code_review_inputs(pending_files)
         code_review_outputs = (
             await self.chain.aapply(
                 code_review_inputs, callbacks=_run_manager.get_child(tag="CodeReview")
@@ -90,26 +112,103 @@ class CodeReviewChain(Chain):
             if code_review_inputs
             else []
         )
+        code_review_outputs = self._merge_chunk_outputs(
+            pending_files, code_review_inputs, code_review_outputs
+        )
+        code_review_outputs = self._merge_reused_outputs(
+            pr, code_files, pending_files, code_review_outputs, reused_reviews
+        )
 
         return await self._aprocess_result(code_files, code_review_outputs)
 
+    def _split_reviewed_files(
+        self, pr: PullRequest, code_files: List[ChangeFile]
+    ) -> Tuple[List[ChangeFile], Dict[str, str]]:
+        """Split files into those needing review and stored reviews of unchanged files."""
+        if self.review_state is None:
+            return code_files, {}
+
+        reused_reviews = self.review_state.get_results(pr, code_files, "review")
+        pending_files = [f for f in code_files if f.full_name not in reused_reviews]
+        return pending_files, reused_reviews
+
+    def _merge_reused_outputs(
+        self,
+        pr: PullRequest,
+        code_files: List[ChangeFile],
+        pending_files: List[ChangeFile],
+        pending_outputs: List[Dict[str, str]],
+        reused_reviews: Dict[str, str],
+    ) -> List[Dict[str, str]]:
+        """Store new reviews and return outputs for all files in ``code_files`` order."""
+        if self.review_state is None:
+            return pending_outputs
+
+        new_reviews = {
+            f.full_name: o["text"] for f, o in zip(pending_files, pending_outputs)
+        }
+        self.review_state.save_results(pr, code_files, "review", new_reviews)
+        reviews = {**reused_reviews, **new_reviews}
+        return [{"text": reviews[f.full_name]} for f in code_files]
+
     def _process_code_review_inputs(
         self,
         code_files: List[ChangeFile],
     ) -> List[Dict[str, str]]:
+        """Build one review input per diff chunk.
+
+        Diffs larger than ``max_tokens_per_chunk`` are split on hunk boundaries
+        with the file header repeated; ``file_index`` maps each input back to
+        its file in ``code_files``. Only the first ``max_chunks_per_file``
+        chunks of a file are reviewed, the last one records how many were
+        skipped in ``skipped_chunks``.
+        """
+        tokenizer = self._get_tokenizer()
         input_data = []
-        for code_file in code_files:
-            input_item = {
-                "content": code_file.diff_content.content[
-                    :4000
-                ],  # TODO: handle long diff with summarize chain
-                "name": code_file.full_name,
-                "language": SUFFIX_LANGUAGE_MAPPING.get(code_file.suffix, ""),
-            }
-            input_data.append(input_item)
+        for file_index, code_file in enumerate(code_files):
+            chunks = chunk_diff_content(
+                code_file.diff_content,
+                code_file.full_name,
+                self.max_tokens_per_chunk,
+                tokenizer,
+            )
+            skipped = 0
+            if self.max_chunks_per_file is not None and len(chunks) > self.max_chunks_per_file:
+                skipped = len(chunks) - self.max_chunks_per_file
+                chunks = chunks[: self.max_chunks_per_file]
+            for content in chunks:
+                input_item = {
+                    "content": content,
+                    "name": code_file.full_name,
+                    "language": SUFFIX_LANGUAGE_MAPPING.get(code_file.suffix, ""),
+                    "file_index": file_index,
+                }
+                input_data.append(input_item)
+            if skipped:
+                input_data[-1]["skipped_chunks"] = skipped
 
         return input_data
 
+    def _merge_chunk_outputs(
+        self,
+        code_files: List[ChangeFile],
+        code_review_inputs: List[Dict[str, Any]],
+        code_review_outputs: List[Dict[str, Any]],
+    ) -> List[Dict[str, str]]:
+        """Join chunk reviews back into one output per file."""
+        reviews: List[List[str]] = [[] for _ in code_files]
+        for input_item, output in zip(code_review_inputs, code_review_outputs):
+            reviews[input_item["file_index"]].append(output["text"])
+            if input_item.get("skipped_chunks"):
+                reviews[input_item["file_index"]].append(
+                    f"_The rest of this diff ({input_item['skipped_chunks']} more chunks) was too large to review._"
+                )
+        return [{"text": "\n\n".join(texts)} for texts in reviews]
+
+    def _get_tokenizer(self):
+        model_name = getattr(self.chain.llm, "model_name", None)
+        return get_tokenizer(model_name if isinstance(model_name, str) else "gpt-3.5-turbo")
+
     def _process_result(self, code_files: List[ChangeFile], code_review_outputs: List):
         code_reviews = []
         for i, o in zip_longest(code_files, code_review_outputs):
@@ -130,9 +229,12 @@ class CodeReviewChain(Chain):
         *,
         llm: BaseLanguageModel,
         prompt: BasePromptTemplate = CODE_REVIEW_PROMPT,
+        review_state: Optional[ReviewStateStore] = None,
+        rate_limiter: Optional[BaseRateLimiter] = None,
         **kwargs,
     ) -> CodeReviewChain:
         return cls(
-            chain=LLMChain(llm=llm, prompt=prompt, **kwargs),
+            chain=LLMChain(llm=with_rate_limiter(llm, rate_limiter), prompt=prompt, **kwargs),
             processor=PullRequestProcessor(),
+            review_state=review_state,
         )
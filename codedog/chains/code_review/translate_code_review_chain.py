@@ -1,18 +1,21 @@
 from __future__ import annotations
 
 from itertools import zip_longest
-from typing import List
+from typing import List, Optional
 
 from langchain_core.language_models import BaseLanguageModel
 from langchain.chains import LLMChain
 from langchain_core.prompts import BasePromptTemplate
+from langchain_core.rate_limiters import BaseRateLimiter
 from pydantic import Field
 
 from codedog.chains.code_review.base import CodeReviewChain
 from codedog.chains.code_review.prompts import CODE_REVIEW_PROMPT
-from codedog.chains.prompts import TRANSLATE_PROMPT
+from codedog.chains.prompts import TRANSLATE_BATCH_PROMPT, TRANSLATE_PROMPT
 from codedog.models import ChangeFile, CodeReview
 from codedog.processors.pull_request_processor import PullRequestProcessor
+from codedog.utils.rate_limiter import with_rate_limiter
+from codedog.utils.translation import TranslationCache, Translator
 
 
 class TranslateCodeReviewChain(CodeReviewChain):
@@ -25,6 +28,12 @@ class TranslateCodeReviewChain(CodeReviewChain):
     """
     translate_chain: LLMChain = Field(exclude=True)
     """Chain to use to translate code review result."""
+    translation_cache: Optional[TranslationCache] = Field(exclude=True, default_factory=TranslationCache)
+    """Translations keyed by source text hash and language; repeated reviews are not translated again."""
+    translate_concurrency: int = 4
+    """Maximum number of translation requests in flight."""
+    translate_batch_chars: int = 2000
+    """Reviews up to this length are translated several at a time in one prompt, 0 disables batching."""
 
     @classmethod
     def from_llm(
@@ -35,15 +44,22 @@ class TranslateCodeReviewChain(CodeReviewChain):
         translate_llm: BaseLanguageModel,
         prompt: BasePromptTemplate = CODE_REVIEW_PROMPT,
         translate_prompt: BasePromptTemplate = TRANSLATE_PROMPT,
+        rate_limiter: Optional[BaseRateLimiter] = None,
+        translation_cache: Optional[TranslationCache] = None,
+        translate_concurrency: int = 4,
+        translate_batch_chars: int = 2000,
         **kwargs,
     ) -> CodeReviewChain:
         return cls(
             language=language,
-            chain=LLMChain(llm=llm, prompt=prompt, **kwargs),
+            chain=LLMChain(llm=with_rate_limiter(llm, rate_limiter), prompt=prompt, **kwargs),
             translate_chain=LLMChain(
-                llm=translate_llm, prompt=translate_prompt, **kwargs
+                llm=with_rate_limiter(translate_llm, rate_limiter), prompt=translate_prompt, **kwargs
             ),
             processor=PullRequestProcessor(),
+            translation_cache=translation_cache if translation_cache is not None else TranslationCache(),
+            translate_concurrency=translate_concurrency,
+            translate_batch_chars=translate_batch_chars,
         )
 
     def _process_result(self, code_files: List[ChangeFile], code_review_outputs: List):
@@ -64,40 +80,28 @@ class TranslateCodeReviewChain(CodeReviewChain):
         code_reviews = await self._atranslate(code_reviews)
         return {"code_reviews": code_reviews}
 
-    def _translate(self, code_reviews: List[CodeReview]) -> List[CodeReview]:
-        data = [
-            {
-                "language": self.language,
-                "description": "Suggestion for a changed file",
-                "content": cr.review,
-            }
-            for cr in code_reviews
-            if cr.review != ""
-        ]
-        response = self.translate_chain.apply(data) if data else []
-
-        for cr, r in zip_longest(code_reviews, response):
-            if not cr or not r:
-                break
+    def _translator(self) -> Translator:
+        return Translator(
+            self.translate_chain,
+            self.language,
+            cache=self.translation_cache,
+            batch_prompt=TRANSLATE_BATCH_PROMPT if self.translate_batch_chars > 0 else None,
+            max_concurrency=self.translate_concurrency,
+            batch_chars=self.translate_batch_chars,
+        )
 
-            cr.review = r["text"]
+    def _translate(self, code_reviews: List[CodeReview]) -> List[CodeReview]:
+        translations = self._translator().translate(
+            [cr.review for cr in code_reviews], "Suggestion for a changed file"
+        )
+        for cr, translation in zip(code_reviews, translations):
+            cr.review = translation
         return code_reviews
 
     async def _atranslate(self, code_reviews: List[CodeReview]) -> List[CodeReview]:
-        data = [
-            {
-                "language": self.language,
-                "description": "Suggestion for a changed file",
-                "content": cr.review,
-            }
-            for cr in code_reviews
-            if cr.review != ""
-        ]
-        response = await self.translate_chain.aapply(data) if data else []
-
-        for cr, r in zip_longest(code_reviews, response):
-            if not cr or not r:
-                break
-
-            cr.review = r["text"]
+        translations = await self._translator().atranslate(
+            [cr.review for cr in code_reviews], "Suggestion for a changed file"
+        )
+        for cr, translation in zip(code_reviews, translations):
+            cr.review = translation
         return code_reviews
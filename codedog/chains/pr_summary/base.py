@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import logging
 
 from langchain_core.language_models import BaseLanguageModel
@@ -13,14 +13,17 @@ from langchain.chains.base import Chain
 from langchain.output_parsers import OutputFixingParser, PydanticOutputParser
 from langchain_core.output_parsers import BaseOutputParser
 from langchain_core.prompts import BasePromptTemplate
+from langchain_core.rate_limiters import BaseRateLimiter
 from pydantic import Field, BaseModel, ConfigDict
 
 from codedog.chains.pr_summary.prompts import CODE_SUMMARY_PROMPT, PR_SUMMARY_PROMPT
-from codedog.models import ChangeSummary, PRSummary, PullRequest
+from codedog.models import ChangeFile, ChangeSummary, PRSummary, PullRequest
 from codedog.processors.pull_request_processor import (
     SUFFIX_LANGUAGE_MAPPING,
     PullRequestProcessor,
 )
+from codedog.utils.rate_limiter import with_rate_limiter
+from codedog.utils.review_state import ReviewStateStore
 
 processor = PullRequestProcessor.build()
 
@@ -44,6 +47,9 @@ class PRSummaryChain(Chain):
     parser: BaseOutputParser = Field(exclude=True)
     """Parse pr summarized result to PRSummary object."""
 
+    review_state: Optional[ReviewStateStore] = Field(exclude=True, default=None)
+    """Previous code summaries; files unchanged since the last reviewed head are not re-summarized."""
+
     _input_keys: List[str] = ["pull_request"]
     _output_keys: List[str] = ["pr_summary", "code_summaries"]
 
@@ -72,7 +78,10 @@ class PRSummaryChain(Chain):
     def review(self, inputs, _run_manager) -> Dict[str, Any]:
         pr: PullRequest = inputs["pull_request"]
 
-        code_summary_inputs = self._process_code_summary_inputs(pr)
+        code_files = processor.get_diff_code_files(pr)
+        pending_files, reused_summaries = self._split_summarized_files(pr, code_files)
+
+        code_summary_inputs = self._process_code_summary_inputs(pr, pending_files)
         code_summary_outputs = (
             self.code_summary_chain.apply(
                 code_summary_inputs, callbacks=_run_manager.get_child(tag="CodeSummary")
@@ -84,6 +93,9 @@ class PRSummaryChain(Chain):
         code_summaries = processor.build_change_summaries(
             code_summary_inputs, code_summary_outputs
         )
+        code_summaries = self._merge_reused_summaries(
+            pr, code_files, code_summaries, reused_summaries
+        )
 
         pr_summary_input = self._process_pr_summary_input(pr, code_summaries)
         pr_summary_output = self.pr_summary_chain(
@@ -95,7 +107,10 @@ class PRSummaryChain(Chain):
     async def areview(self, inputs, _run_manager) -> Dict[str, Any]:
         pr: PullRequest = inputs["pull_request"]
 
-        code_summary_inputs = self._process_code_summary_inputs(pr)
+        code_files = processor.get_diff_code_files(pr)
+        pending_files, reused_summaries = self._split_summarized_files(pr, code_files)
+
+        code_summary_inputs = self._process_code_summary_inputs(pr, pending_files)
         code_summary_outputs = (
             await self.code_summary_chain.aapply(
                 code_summary_inputs, callbacks=_run_manager.get_child()
@@ -107,6 +122,9 @@ class PRSummaryChain(Chain):
         code_summaries = processor.build_change_summaries(
             code_summary_inputs, code_summary_outputs
         )
+        code_summaries = self._merge_reused_summaries(
+            pr, code_files, code_summaries, reused_summaries
+        )
 
         pr_summary_input = self._process_pr_summary_input(pr, code_summaries)
         pr_summary_output = await self.pr_summary_chain.ainvoke(
@@ -135,9 +153,42 @@ class PRSummaryChain(Chain):
 
         return await self.areview(inputs, _run_manager)
 
-    def _process_code_summary_inputs(self, pr: PullRequest) -> List[Dict[str, str]]:
+    def _split_summarized_files(
+        self, pr: PullRequest, code_files: List[ChangeFile]
+    ) -> Tuple[List[ChangeFile], Dict[str, str]]:
+        """Split files into those needing a summary and stored summaries of unchanged files."""
+        if self.review_state is None:
+            return code_files, {}
+
+        reused_summaries = self.review_state.get_results(pr, code_files, "summary")
+        pending_files = [f for f in code_files if f.full_name not in reused_summaries]
+        return pending_files, reused_summaries
+
+    def _merge_reused_summaries(
+        self,
+        pr: PullRequest,
+        code_files: List[ChangeFile],
+        new_summaries: List[ChangeSummary],
+        reused_summaries: Dict[str, str],
+    ) -> List[ChangeSummary]:
+        """Store new summaries and return summaries for all files in ``code_files`` order."""
+        if self.review_state is None:
+            return new_summaries
+
+        summaries = {s.full_name: s.summary for s in new_summaries}
+        self.review_state.save_results(pr, code_files, "summary", summaries)
+        summaries.update(reused_summaries)
+        return [
+            ChangeSummary(full_name=f.full_name, summary=summaries[f.full_name])
+            for f in code_files
+        ]
+
+    def _process_code_summary_inputs(
+        self, pr: PullRequest, code_files: Optional[List[ChangeFile]] = None
+    ) -> List[Dict[str, str]]:
         input_data = []
-        code_files = processor.get_diff_code_files(pr)
+        if code_files is None:
+            code_files = processor.get_diff_code_files(pr)
         for code_file in code_files:
             input_item = {
                 "content": code_file.diff_content.content[
@@ -189,8 +240,11 @@ class PRSummaryChain(Chain):
         pr_summary_llm: BaseLanguageModel,
         code_summary_prompt: BasePromptTemplate = CODE_SUMMARY_PROMPT,
         pr_summary_prompt: BasePromptTemplate = PR_SUMMARY_PROMPT,
+        rate_limiter: Optional[BaseRateLimiter] = None,
         **kwargs,
     ) -> PRSummaryChain:
+        code_summary_llm = with_rate_limiter(code_summary_llm, rate_limiter)
+        pr_summary_llm = with_rate_limiter(pr_summary_llm, rate_limiter)
         parser = OutputFixingParser.from_llm(
             llm=pr_summary_llm, parser=PydanticOutputParser(pydantic_object=PRSummary)
         )
@@ -1,18 +1,22 @@
 from __future__ import annotations
 
-from itertools import zip_longest
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from langchain_core.language_models import BaseLanguageModel
 from langchain.chains import LLMChain
 from langchain.output_parsers import OutputFixingParser, PydanticOutputParser
 from langchain_core.prompts import BasePromptTemplate
+from langchain_core.rate_limiters import BaseRateLimiter
 from pydantic import Field
 
 from codedog.chains.pr_summary.base import PRSummaryChain
 from codedog.chains.pr_summary.prompts import CODE_SUMMARY_PROMPT, PR_SUMMARY_PROMPT
-from codedog.chains.prompts import TRANSLATE_PROMPT
+from codedog.chains.prompts import TRANSLATE_BATCH_PROMPT, TRANSLATE_PROMPT
 from codedog.models import ChangeSummary, PRSummary
+from codedog.utils.rate_limiter import with_rate_limiter
+from codedog.utils.translation import TranslationCache, Translator
+
+_CODE_SUMMARY_DESCRIPTION = "Changed file brief summary (must in single line!)."
 
 
 class TranslatePRSummaryChain(PRSummaryChain):
@@ -24,6 +28,12 @@ class TranslatePRSummaryChain(PRSummaryChain):
 
     translate_chain: LLMChain = Field(exclude=True)
     """Chain to use to translate summary result."""
+    translation_cache: Optional[TranslationCache] = Field(exclude=True, default_factory=TranslationCache)
+    """Translations keyed by source text hash and language; repeated summaries are not translated again."""
+    translate_concurrency: int = 4
+    """Maximum number of translation requests in flight."""
+    translate_batch_chars: int = 2000
+    """Summaries up to this length are translated several at a time in one prompt, 0 disables batching."""
 
     @classmethod
     def from_llm(
@@ -35,8 +45,15 @@ class TranslatePRSummaryChain(PRSummaryChain):
         code_summary_prompt: BasePromptTemplate = CODE_SUMMARY_PROMPT,
         pr_summary_prompt: BasePromptTemplate = PR_SUMMARY_PROMPT,
         translate_prompt: BasePromptTemplate = TRANSLATE_PROMPT,
+        rate_limiter: Optional[BaseRateLimiter] = None,
+        translation_cache: Optional[TranslationCache] = None,
+        translate_concurrency: int = 4,
+        translate_batch_chars: int = 2000,
         **kwargs,
     ) -> PRSummaryChain:
+        code_summary_llm = with_rate_limiter(code_summary_llm, rate_limiter)
+        pr_summary_llm = with_rate_limiter(pr_summary_llm, rate_limiter)
+        translate_llm = with_rate_limiter(translate_llm, rate_limiter)
         parser = OutputFixingParser.from_llm(
             llm=pr_summary_llm, parser=PydanticOutputParser(pydantic_object=PRSummary)
         )
@@ -52,19 +69,34 @@ class TranslatePRSummaryChain(PRSummaryChain):
             pr_summary_chain=pr_summary_chain,
             translate_chain=translate_chain,
             parser=parser,
+            translation_cache=translation_cache if translation_cache is not None else TranslationCache(),
+            translate_concurrency=translate_concurrency,
+            translate_batch_chars=translate_batch_chars,
             **kwargs,
         )
 
+    def _translator(self) -> Translator:
+        return Translator(
+            self.translate_chain,
+            self.language,
+            cache=self.translation_cache,
+            batch_prompt=TRANSLATE_BATCH_PROMPT if self.translate_batch_chars > 0 else None,
+            max_concurrency=self.translate_concurrency,
+            batch_chars=self.translate_batch_chars,
+        )
+
     def _process_result(
         self, pr_summary_output: Dict[str, Any], code_summaries: List[ChangeSummary]
     ) -> Dict[str, Any]:
         summary: PRSummary = pr_summary_output["text"]
 
         if self.language:
-            summary = self._translate_summary(summary=summary)
-            code_summaries = self._translate_code_summaries(
-                code_summaries=code_summaries
+            # overview and file summaries are translated in one concurrent stage
+            translations = self._translator().translate(
+                [summary.overview] + [cs.summary for cs in code_summaries],
+                [""] + [_CODE_SUMMARY_DESCRIPTION] * len(code_summaries),
             )
+            summary, code_summaries = self._apply_translations(summary, code_summaries, translations)
 
         return {
             "pr_summary": summary,
@@ -77,75 +109,21 @@ class TranslatePRSummaryChain(PRSummaryChain):
         summary: PRSummary = pr_summary_output["text"]
 
         if self.language:
-            summary = await self._atranslate_summary(summary=summary)
-            code_summaries = await self._atranslate_code_summaries(
-                code_summaries=code_summaries
+            translations = await self._translator().atranslate(
+                [summary.overview] + [cs.summary for cs in code_summaries],
+                [""] + [_CODE_SUMMARY_DESCRIPTION] * len(code_summaries),
             )
+            summary, code_summaries = self._apply_translations(summary, code_summaries, translations)
 
         return {
             "pr_summary": summary,
             "code_summaries": code_summaries,
         }
 
-    def _translate_summary(self, summary: PRSummary) -> PRSummary:
-        response = self.translate_chain(
-            {"language": self.language, "description": "", "content": summary.overview}
-        )
-        summary.overview = response["text"]
-
-        return summary
-
-    def _translate_code_summaries(
-        self, code_summaries: List[ChangeSummary]
-    ) -> List[ChangeSummary]:
-        data = [
-            {
-                "language": self.language,
-                "description": "Changed file brief summary (must in single line!).",
-                "content": cs.summary,
-            }
-            for cs in code_summaries
-            if cs.summary != ""
-        ]
-        response = self.translate_chain.apply(data) if data else []
-
-        for cs, r in zip_longest(code_summaries, response):
-            if not cs or not r:
-                break
-
-            cs.summary = r["text"]
-        return code_summaries
-
-    async def _atranslate_summary(self, summary: PRSummary) -> PRSummary:
-        response = await self.translate_chain.ainvoke(
-            {
-                "language": self.language,
-                "description": "Changed file brief summary (must in single line!).",
-                "content": summary.overview,
-            }
-        )
-
-        summary.overview = response["text"]
-
-        return summary
-
-    async def _atranslate_code_summaries(
-        self, code_summaries: List[ChangeSummary]
-    ) -> List[ChangeSummary]:
-        data = [
-            {
-                "language": self.language,
-                "description": "Changed file brief summary.",
-                "content": cs.summary,
-            }
-            for cs in code_summaries
-            if cs.summary != ""
-        ]
-        response = await self.translate_chain.aapply(data) if data else []
-
-        for cs, r in zip_longest(code_summaries, response):
-            if not cs or not r:
-                break
-
-            cs.summary = r["text"]
-        return code_summaries
+    def _apply_translations(
+        self, summary: PRSummary, code_summaries: List[ChangeSummary], translations: List[str]
+    ) -> Tuple[PRSummary, List[ChangeSummary]]:
+        summary.overview = translations[0]
+        for cs, translation in zip(code_summaries, translations[1:]):
+            cs.summary = translation
+        return summary, code_summaries
@@ -6,3 +6,8 @@ TRANSLATE_PROMPT = PromptTemplate(
     template=grimoire_en.TRANSLATE_PR_REVIEW,
     input_variables=["language", "description", "content"],
 )
+
+TRANSLATE_BATCH_PROMPT = PromptTemplate(
+    template=grimoire_en.TRANSLATE_PR_REVIEW_BATCH,
+    input_variables=["language", "description", "count", "content"],
+)
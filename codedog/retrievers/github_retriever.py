@@ -25,6 +25,7 @@ from codedog.models import (
 from codedog.models.diff import DiffSegment
 from codedog.retrievers.base import Retriever
 from codedog.utils.diff_utils import parse_patch_file
+from codedog.utils.http_cache import HTTPResponseCache, install_github_cache
 
 
 class GithubRetriever(Retriever):
@@ -46,6 +47,7 @@ class GithubRetriever(Retriever):
         client: Github,
         repository_name_or_id: str | int,
         pull_request_number: int,
+        http_cache: HTTPResponseCache | None = None,
     ):
         """Connect to github remote server and retrieve pull request data.
 
@@ -53,7 +55,11 @@ class GithubRetriever(Retriever):
             client (github.Github): github client from pyGithub
             repository_name_or_id (str | int): repository name or id
             pull_request_number (int): pull request number (not global id)
+            http_cache (HTTPResponseCache | None): conditional request cache, unchanged
+                resources are revalidated with ETag/Last-Modified instead of re-downloaded
         """
+        if http_cache is not None:
+            install_github_cache(client, http_cache)
 
         # --- github model ---
         self._git_repository: GHRepo = client.get_repo(repository_name_or_id)
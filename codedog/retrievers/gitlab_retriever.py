@@ -20,6 +20,7 @@ from codedog.models import (
 from codedog.models.diff import DiffSegment
 from codedog.retrievers.base import Retriever
 from codedog.utils.diff_utils import parse_patch_file
+from codedog.utils.http_cache import HTTPResponseCache, install_gitlab_cache
 
 
 class GitlabRetriever(Retriever):
@@ -28,7 +29,11 @@ class GitlabRetriever(Retriever):
     LIST_DIFF_LIMIT = 200
 
     def __init__(
-        self, client: Gitlab, project_name_or_id: str | int, merge_request_iid: int
+        self,
+        client: Gitlab,
+        project_name_or_id: str | int,
+        merge_request_iid: int,
+        http_cache: HTTPResponseCache | None = None,
     ) -> None:
         """
         Connect to gitlab remote server and retrieve merge request data.
@@ -37,7 +42,11 @@ class GitlabRetriever(Retriever):
             client (gitlab.Gitlab): gitlab client from python-gitlab
             project_name_or_id (str | int): project name (with full namespace) or id
             merge_request_iid (int): merge request iid (not global id)
+            http_cache (HTTPResponseCache | None): conditional request cache, unchanged
+                resources are revalidated with ETag/Last-Modified instead of re-downloaded
         """
+        if http_cache is not None:
+            install_gitlab_cache(client, http_cache)
 
         # --- gitlab model ---
         self._git_repository: Project = client.projects.get(project_name_or_id)
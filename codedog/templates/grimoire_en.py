@@ -280,6 +280,21 @@ Note that the content might be used in markdown or other formatted text,
 so don't change the paragraph layout of the content or add symbols.
 Your translation:"""
 
+TRANSLATE_PR_REVIEW_BATCH = """Help me translate some content into {language}.
+It belongs to a pull request review and is about {description}.
+
+The content has {count} segments, each starts with a marker line like <<<1>>>.
+Translate every segment on its own, and keep every marker line unchanged on its own line and in the same order.
+
+Content:
+---
+{content}
+---
+
+Note that the content might be used in markdown or other formatted text,
+so don't change the paragraph layout of the content or add symbols.
+Your translation:"""
+
 # Template for the summary score table at the end of PR review
 PR_REVIEW_SUMMARY_TABLE = """
 ## PR Review Summary
@@ -3,7 +3,7 @@ import json
 import hashlib
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple, Any
 import re
 import logging  # Add logging import
 import os
@@ -12,7 +12,6 @@ import time
 import tenacity
 from tenacity import retry, stop_after_attempt, wait_exponential
 import math
-import tiktoken  # 用于精确计算token数量
 
 # 导入 grimoire 模板
 from codedog.templates.grimoire_en import CODE_SUGGESTION
@@ -34,7 +33,14 @@ from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
 
+from codedog.utils.diff_chunker import chunk_diff
+from codedog.utils.evaluation_cache import EvaluationCache
 from codedog.utils.git_log_analyzer import CommitInfo
+from codedog.utils.json_extractor import JSONExtractor, StreamingJSONDetector
+from codedog.utils.near_duplicate import NearDuplicateIndex
+from codedog.utils.rate_limiter import TokenBucket
+from codedog.utils.result_store import columns_from_results, summarize_columns
+from codedog.utils.tokenizer import get_tokenizer
 
 
 class CodeEvaluation(BaseModel):
@@ -73,159 +79,7 @@ class FileEvaluationResult:
     date: datetime
     author: str
     evaluation: CodeEvaluation
-
-
-class TokenBucket:
-    """Token bucket for rate limiting with improved algorithm and better concurrency handling"""
-    def __init__(self, tokens_per_minute: int = 10000, update_interval: float = 1.0):
-        self.tokens_per_minute = tokens_per_minute
-        self.update_interval = update_interval
-        self.tokens = tokens_per_minute
-        self.last_update = time.time()
-        self.lock = asyncio.Lock()
-        self.total_tokens_used = 0  # 统计总共使用的令牌数
-        self.total_wait_time = 0.0  # 统计总共等待的时间
-        self.pending_requests = []  # 待处理的请求队列
-        self.request_count = 0  # 请求计数器
-
-    async def get_tokens(self, requested_tokens: int) -> float:
-        """Get tokens from the bucket. Returns the wait time needed."""
-        # 生成唯一的请求ID
-        request_id = self.request_count
-        self.request_count += 1
-
-        # 创建一个事件，用于通知请求何时可以继续
-        event = asyncio.Event()
-        wait_time = 0.0
-
-        async with self.lock:
-            now = time.time()
-            time_passed = now - self.last_update
-
-            # Replenish tokens
-            self.tokens = min(
-                self.tokens_per_minute,
-                self.tokens + (time_passed * self.tokens_per_minute / 60.0)
-            )
-            self.last_update = now
-
-            # 检查是否有足够的令牌
-            if self.tokens >= requested_tokens:
-                # 有足够的令牌，直接处理
-                self.tokens -= requested_tokens
-                self.total_tokens_used += requested_tokens
-                return 0.0
-            else:
-                # 没有足够的令牌，需要等待
-                # 先消耗掉当前所有可用的令牌
-                available_tokens = self.tokens
-                self.tokens = 0
-                self.total_tokens_used += available_tokens
-
-                # 计算还需要多少令牌
-                tokens_still_needed = requested_tokens - available_tokens
-
-                # 计算需要等待的时间
-                wait_time = (tokens_still_needed * 60.0 / self.tokens_per_minute)
-
-                # 添加一些随机性，避免雇佯效应
-                wait_time *= (1 + random.uniform(0, 0.1))
-
-                # 更新统计信息
-                self.total_wait_time += wait_time
-
-                # 将请求添加到队列中，包含请求ID、所需令牌数、事件和计算出的等待时间
-                self.pending_requests.append((request_id, tokens_still_needed, event, wait_time))
-
-                # 按等待时间排序，使小请求先处理
-                self.pending_requests.sort(key=lambda x: x[3])
-
-                # 启动令牌补充任务
-                asyncio.create_task(self._replenish_tokens())
-
-        # 等待事件触发
-        await event.wait()
-        return wait_time
-
-    async def _replenish_tokens(self):
-        """Continuously replenish tokens and process pending requests"""
-        while True:
-            # 等待一小段时间
-            await asyncio.sleep(0.1)
-
-            async with self.lock:
-                # 如果没有待处理的请求，则退出
-                if not self.pending_requests:
-                    break
-
-                # 计算经过的时间和新生成的令牌
-                now = time.time()
-                time_passed = now - self.last_update
-                new_tokens = time_passed * self.tokens_per_minute / 60.0
-
-                # 更新令牌数量和时间
-                self.tokens += new_tokens
-                self.last_update = now
-
-                # 处理待处理的请求
-                i = 0
-                while i < len(self.pending_requests):
-                    _, tokens_needed, event, _ = self.pending_requests[i]
-
-                    # 如果有足够的令牌，则处理这个请求
-                    if self.tokens >= tokens_needed:
-                        self.tokens -= tokens_needed
-                        # 触发事件，通知请求可以继续
-                        event.set()
-                        # 从待处理列表中移除这个请求
-                        self.pending_requests.pop(i)
-                    else:
-                        # 没有足够的令牌，移动到下一个请求
-                        i += 1
-
-                # 如果所有请求都处理完毕，则退出
-                if not self.pending_requests:
-                    break
-
-    def get_stats(self) -> Dict[str, float]:
-        """获取令牌桶的使用统计信息"""
-        now = time.time()
-        time_passed = now - self.last_update
-
-        # 计算当前可用令牌，考虑从上次更新到现在的时间内生成的令牌
-        current_tokens = min(
-            self.tokens_per_minute,
-            self.tokens + (time_passed * self.tokens_per_minute / 60.0)
-        )
-
-        # 计算当前使用率
-        usage_rate = 0
-        if self.total_tokens_used > 0:
-            elapsed_time = now - self.last_update + self.total_wait_time
-            if elapsed_time > 0:
-                usage_rate = self.total_tokens_used / (elapsed_time / 60.0)
-
-        # 计算当前并发请求数
-        pending_requests = len(self.pending_requests)
-
-        # 计算估计的恢复时间
-        recovery_time = 0
-        if pending_requests > 0 and self.tokens_per_minute > 0:
-            # 获取所有待处理请求的总令牌数
-            total_pending_tokens = sum(tokens for _, tokens, _, _ in self.pending_requests)
-            # 计算恢复时间
-            recovery_time = max(0, (total_pending_tokens - current_tokens) * 60.0 / self.tokens_per_minute)
-
-        return {
-            "tokens_per_minute": self.tokens_per_minute,
-            "current_tokens": current_tokens,
-            "total_tokens_used": self.total_tokens_used,
-            "total_wait_time": self.total_wait_time,
-            "average_wait_time": self.total_wait_time / max(1, self.total_tokens_used / 1000),  # 每1000个令牌的平均等待时间
-            "pending_requests": pending_requests,
-            "usage_rate": usage_rate,  # 实际使用率（令牌/分钟）
-            "recovery_time": recovery_time  # 估计的恢复时间（秒）
-        }
+    evaluation_failed: bool = False  # 评价失败时为默认分数，续跑时重新评价
 
 
 def count_tokens(text: str, model_name: str = "gpt-3.5-turbo") -> int:
@@ -238,15 +92,7 @@ def count_tokens(text: str, model_name: str = "gpt-3.5-turbo") -> int:
     Returns:
         int: token数量
     """
-    try:
-        encoding = tiktoken.encoding_for_model(model_name)
-    except KeyError:
-        # 如果模型不在tiktoken的列表中，使用默认编码
-        encoding = tiktoken.get_encoding("cl100k_base")
-
-    # 计算token数量
-    tokens = encoding.encode(text)
-    return len(tokens)
+    return get_tokenizer(model_name).count(text)
 
 
 def save_diff_content(file_path: str, diff_content: str, estimated_tokens: int, actual_tokens: int = None):
@@ -289,11 +135,153 @@ def save_diff_content(file_path: str, diff_content: str, estimated_tokens: int,
         logger.warning(f"Warning: Actual token count ({actual_tokens}) significantly exceeds estimated value ({estimated_tokens})")
 
 
+# 评价失败（出错或速率限制）时用默认分数代替的结果带有该标记，这类结果不写入缓存
+EVALUATION_FAILED = "evaluation_failed"
+
+SCORE_FIELDS = ["readability", "efficiency", "security", "structure", "error_handling", "documentation", "code_style"]
+
+# 整体评价 prompt 要求的响应格式
+_WHOLE_COMMIT_RESPONSE_FORMAT = """Please format your response as JSON with the following fields:
+- readability: (score 1-10)
+- efficiency: (score 1-10)
+- security: (score 1-10)
+- structure: (score 1-10)
+- error_handling: (score 1-10)
+- documentation: (score 1-10)
+- code_style: (score 1-10)
+- overall_score: (score 1-10)
+- estimated_hours: (number of hours)
+- comments: (your detailed analysis)
+"""
+
+# map-reduce 整体评价中每个部分评价保留的评语长度
+_ASSESSMENT_COMMENT_CHARS = 300
+
+# 大文件分块评价时每个块使用的 prompt
+_CHUNK_REVIEW_PROMPT = """请评价以下代码：
+
+文件名：{file_name}
+语言：{language}
+
+```
+{code_content}
+```
+
+请对这段代码进行全面评价，并给出1-10分的评分（10分为最高）。评价应包括以下几个方面：
+1. 可读性 (readability)：代码是否易于阅读和理解
+2. 效率 (efficiency)：代码是否高效，是否有性能问题
+3. 安全性 (security)：代码是否存在安全隐患
+4. 结构 (structure)：代码结构是否合理，是否遵循良好的设计原则
+5. 错误处理 (error_handling)：是否有适当的错误处理机制
+6. 文档和注释 (documentation)：注释是否充分，是否有必要的文档
+7. 代码风格 (code_style)：是否遵循一致的代码风格和最佳实践
+8. 总体评分 (overall_score)：综合以上各项的总体评价
+
+请以JSON格式返回结果，格式如下：
+```json
+{{
+  "readability": 评分,
+  "efficiency": 评分,
+  "security": 评分,
+  "structure": 评分,
+  "error_handling": 评分,
+  "documentation": 评分,
+  "code_style": 评分,
+  "overall_score": 总评分,
+  "comments": "详细评价意见和改进建议"
+}}
+```
+
+总评分应该是所有评分的加权平均值，保留一位小数。如果代码很小或者只是配置文件的修改，请根据实际情况给出合理的评分。
+
+重要提示：请确保返回有效的JSON格式。如果无法评估代码（例如代码不完整或无法理解），请仍然返回JSON格式，但在comments中说明原因，并给出默认评分5分。"""
+
+# 文本评分中各维度的别名（含 CODE_SUGGESTION 模板 "### SCORES:" 部分使用的名称）
+_SCORE_ALIASES = {
+    "readability": "readability",
+    "efficiency": "efficiency",
+    "efficiency & performance": "efficiency",
+    "security": "security",
+    "structure": "structure",
+    "structure & design": "structure",
+    "error handling": "error_handling",
+    "documentation": "documentation",
+    "documentation & comments": "documentation",
+    "code style": "code_style",
+    "overall": "overall_score",
+    "overall score": "overall_score",
+    "final overall score": "overall_score",
+    "总分": "overall_score",
+}
+_SCORE_ALIAS_PATTERN = "|".join(
+    re.escape(alias).replace("\\ ", "[ _]") for alias in sorted(_SCORE_ALIASES, key=len, reverse=True)
+)
+_TEXT_SCORE_RE = re.compile(
+    r"(" + _SCORE_ALIAS_PATTERN + r")(?:\s+score)?\**\s*[:：=]\s*(\d+(?:\.\d+)?)(?:\s*/\s*10)?",
+    re.IGNORECASE,
+)
+_TEXT_COMMENT_RES = [
+    re.compile(r"## Detailed Code Analysis\s*\n([\s\S]*?)(?:\n##|\Z)"),
+    re.compile(r"## Improvement Recommendations\s*\n([\s\S]*?)(?:\n##|\Z)"),
+    re.compile(
+        r"(?:comments|summary|analysis|evaluation|评价|建议)\s*[:：](.*?)(?=\n\w+\s*[:：]|\Z)", re.IGNORECASE | re.DOTALL
+    ),
+]
+
+# 模型表示无法评估代码或拒绝评审时的常见措辞
+_UNEVALUABLE_RE = re.compile(
+    "|".join([
+        r"Base64编码", r"无法解码的字符串", r"ICAgIA==", r"无法评估", r"无法对这段代码进行评审", r"无法进行评价",
+        r"无法对代码进行评估", r"代码内容太短", r"代码为空", r"没有提供实际的代码", r"无法理解", r"无法解析",
+        r"无法分析", r"无法读取", r"无法识别", r"无法处理", r"无效的代码", r"不是有效的代码", r"不是代码",
+        r"不包含代码", r"I'm sorry", r"there is no code", r"please provide", r"cannot review", r"unable to",
+    ]),
+    re.IGNORECASE,
+)
+
+
+def _scores_from_text(text: str) -> Optional[Dict[str, Any]]:
+    """从 "Readability: 8/10" 之类的纯文本评分中提取结果，至少找到4个维度才认为有效"""
+    scores: Dict[str, Any] = {}
+    for match in _TEXT_SCORE_RE.finditer(text):
+        field = _SCORE_ALIASES[re.sub(r"[ _]+", " ", match.group(1).lower())]
+        scores.setdefault(field, float(match.group(2)))
+    if len([field for field in SCORE_FIELDS if field in scores]) < 4:
+        return None
+
+    for field in SCORE_FIELDS:
+        scores.setdefault(field, 5)
+    if "overall_score" not in scores:
+        scores["overall_score"] = round(sum(scores[field] for field in SCORE_FIELDS) / len(SCORE_FIELDS), 1)
+
+    for pattern in _TEXT_COMMENT_RES:
+        match = pattern.search(text)
+        if match and match.group(1).strip():
+            scores["comments"] = match.group(1).strip()
+            break
+    else:
+        scores["comments"] = text[:500] + "..." if len(text) > 500 else text
+    return scores
+
+
+def _unevaluable_response(text: str) -> Optional[Dict[str, Any]]:
+    """模型说明无法评估或拒绝评审时返回默认评分，并在评论中保留模型的说明"""
+    if not _UNEVALUABLE_RE.search(text):
+        return None
+    result: Dict[str, Any] = {field: 5 for field in SCORE_FIELDS}
+    result["overall_score"] = 5.0
+    result["comments"] = f"无法评估代码: {text[:200]}"
+    return result
+
+
 class DiffEvaluator:
     """代码差异评价器"""
 
     def __init__(self, model: BaseChatModel, tokens_per_minute: int = 9000, max_concurrent_requests: int = 3,
-                 save_diffs: bool = False):
+                 save_diffs: bool = False, persistent_cache: Optional[EvaluationCache] = None,
+                 requests_per_minute: Optional[int] = None, token_bucket: Optional[TokenBucket] = None,
+                 json_mode: bool = False, whole_commit_max_tokens: int = 12000,
+                 near_duplicate_threshold: Optional[float] = 0.9, stream_responses: bool = False):
         """
         初始化评价器
 
@@ -302,22 +290,46 @@ class DiffEvaluator:
             tokens_per_minute: 每分钟令牌数量限制，默认为9000
             max_concurrent_requests: 最大并发请求数，默认为3
             save_diffs: 是否保存diff内容到中间文件，默认为False
+            persistent_cache: 跨进程共享的持久化评价缓存，默认为None（仅使用内存缓存）
+            requests_per_minute: 每分钟请求数限制，默认为None（不限制）
+            token_bucket: 与其他评价器或审查链共享的令牌桶，指定后忽略上面两个速率参数
+            json_mode: 是否请求模型使用 JSON 输出模式（response_format=json_object），模型不支持时自动关闭
+            whole_commit_max_tokens: 整体评价单个 prompt 的 diff 令牌上限，超出时改为按文件 map-reduce 评价
+            near_duplicate_threshold: 复用近似重复 diff 评价结果所需的最小相似度，None 表示只复用完全相同的 diff
+            stream_responses: 是否流式接收评分响应，收到完整的评分 JSON 后立即停止生成
         """
         self.model = model
         self.parser = PydanticOutputParser(pydantic_object=CodeEvaluation)
         self.save_diffs = save_diffs  # 新增参数，控制是否保存diff内容
+        self.json_mode = json_mode
+        self.stream_responses = stream_responses
+        self.early_stops = 0  # 流式响应中提前结束生成的次数
+        self.whole_commit_max_tokens = whole_commit_max_tokens
+        self.json_extractor = JSONExtractor(
+            required_keys=SCORE_FIELDS,
+            fallbacks=[("scores_text", _scores_from_text), ("unevaluable", _unevaluable_response)],
+        )
 
         # 获取模型名称，用于计算token
         self.model_name = getattr(model, "model_name", "gpt-3.5-turbo")
+        self.tokenizer = get_tokenizer(self.model_name if isinstance(self.model_name, str) else "gpt-3.5-turbo")
 
         # Rate limiting settings - 自适应速率控制
-        self.initial_tokens_per_minute = tokens_per_minute  # 初始令牌生成速率
-        self.token_bucket = TokenBucket(tokens_per_minute=self.initial_tokens_per_minute)  # 留出缓冲
+        self.token_bucket = token_bucket or TokenBucket(
+            tokens_per_minute=tokens_per_minute,
+            requests_per_minute=requests_per_minute,
+        )
+        self.initial_tokens_per_minute = self.token_bucket.tokens_per_minute  # 初始令牌生成速率
         self.MIN_REQUEST_INTERVAL = 1.0  # 请求之间的最小间隔
         self.MAX_CONCURRENT_REQUESTS = max_concurrent_requests  # 最大并发请求数
         self.request_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
         self._last_request_time = 0
 
+        # 连接池需容纳全部并发请求（自适应控制最多会把并发数恢复到3）
+        configure_connection_pool = getattr(model, "configure_connection_pool", None)
+        if callable(configure_connection_pool):
+            configure_connection_pool(max(self.MAX_CONCURRENT_REQUESTS, 3))
+
         # 自适应控制参数
         self.rate_limit_backoff_factor = 1.5  # 遇到速率限制时的退避因子
         self.rate_limit_recovery_factor = 1.2  # 成功一段时间后的恢复因子
@@ -330,6 +342,11 @@ class DiffEvaluator:
         # 缓存设置
         self.cache = {}  # 简单的内存缓存 {file_hash: evaluation_result}
         self.cache_hits = 0  # 缓存命中次数
+        self.persistent_cache = persistent_cache  # 持久化缓存 {(file_hash, model_name, prompt_version): evaluation_result}
+        # 近似重复索引：cherry-pick、rebase 和 codemod 产生的相似 diff 复用同一次评价
+        self.near_duplicates = (
+            NearDuplicateIndex(threshold=near_duplicate_threshold) if near_duplicate_threshold is not None else None
+        )
 
         # 创建diffs目录，如果需要保存diff内容
         if self.save_diffs:
@@ -376,6 +393,17 @@ class DiffEvaluator:
 总评分计算方式：所有7个指标的加权平均值（取一位小数）。
 """
 
+        # prompt版本：评价所用模板的哈希，模板变化后持久化缓存自动失效
+        self.prompt_version = hashlib.md5(
+            "\n".join([
+                self.system_prompt,
+                CODE_REVIEW_PROMPT,
+                json.dumps(LANGUAGE_SPECIFIC_CONSIDERATIONS, sort_keys=True),
+                self.json_output_instruction,
+                _CHUNK_REVIEW_PROMPT,
+            ]).encode('utf-8')
+        ).hexdigest()[:12]
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=2, min=4, max=10),
@@ -385,6 +413,109 @@ class DiffEvaluator:
         """计算文件差异内容的哈希值，用于缓存"""
         return hashlib.md5(diff_content.encode('utf-8')).hexdigest()
 
+    def _get_cached_result(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """依次查询内存缓存和持久化缓存"""
+        if file_hash in self.cache:
+            return self.cache[file_hash]
+
+        if self.persistent_cache is not None:
+            result = self.persistent_cache.get(file_hash, self.model_name, self.prompt_version)
+            if result is not None:
+                # 回填内存缓存，避免重复读取数据库
+                self.cache[file_hash] = result
+                return result
+
+        return None
+
+    def _find_near_duplicate(self, diff_content: str, file_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """查询近似重复索引（按 file_path 的扩展名分区），命中时按改动行数调整工时估计后返回已有结果"""
+        if self.near_duplicates is None:
+            return None
+        match = self.near_duplicates.find(diff_content, file_path)
+        if match is None:
+            return None
+
+        result, similarity, size_ratio = match
+        adapted = dict(result)
+        if adapted.get("estimated_hours"):
+            adapted["estimated_hours"] = round(max(0.1, adapted["estimated_hours"] * size_ratio), 1)
+        if similarity < 1.0:
+            note = f"（复用相似度 {similarity:.0%} 的近似重复 diff 的评价）"
+            adapted["comments"] = f"{adapted.get('comments', '')}\n\n{note}".strip()
+        return adapted
+
+    def _store_cached_result(self, file_hash: str, result: Dict[str, Any]):
+        """将评价结果写入内存缓存和持久化缓存"""
+        self.cache[file_hash] = result
+        if self.persistent_cache is not None:
+            try:
+                self.persistent_cache.set(file_hash, self.model_name, self.prompt_version, result)
+            except Exception as e:
+                logger.warning(f"Failed to write evaluation to persistent cache: {e}")
+
+    async def aclose(self):
+        """释放模型在当前事件循环中持有的 HTTP 连接"""
+        aclose = getattr(self.model, "aclose", None)
+        if callable(aclose):
+            await aclose()
+
+    async def _astream_scores(self, messages: List[Any], **kwargs: Any) -> str:
+        """流式调用模型，收到包含全部评分字段的完整 JSON 对象后停止生成，返回已收到的文本"""
+        detector = StreamingJSONDetector(required_keys=SCORE_FIELDS)
+        stream = self.model.astream(messages, **kwargs)
+        try:
+            async for chunk in stream:
+                if detector.feed(chunk.content if isinstance(chunk.content, str) else str(chunk.content)):
+                    self.early_stops += 1
+                    break
+        finally:
+            # 关闭生成器，模型随之断开连接，不再为剩余输出计费
+            await stream.aclose()
+        return detector.text
+
+    async def _agenerate_json(self, messages: List[Any]) -> str:
+        """调用模型生成评价，开启 json_mode 时请求 JSON 输出模式，返回响应文本
+
+        开启 stream_responses 时流式接收响应，评分 JSON 完整后提前结束。
+        """
+        generate = self._astream_scores if self.stream_responses else self._agenerate_text
+        if self.json_mode:
+            try:
+                return await generate(messages, response_format={"type": "json_object"})
+            except Exception as e:
+                if "response_format" not in str(e) and "json_object" not in str(e):
+                    raise
+                logger.warning(f"Model does not support JSON output mode, disabling it: {e}")
+                self.json_mode = False
+        return await generate(messages)
+
+    async def _agenerate_text(self, messages: List[Any], **kwargs: Any) -> str:
+        response = await self.model.agenerate(messages=[messages], **kwargs)
+        return response.generations[0][0].text
+
+    async def _agenerate_limited(self, messages: List[Any], json_output: bool = False) -> str:
+        """在令牌桶和并发上限的约束下调用模型，返回响应文本
+
+        供 ``evaluate_commit`` 中并发执行的文件评价、整体评价和总结请求使用，
+        保证并发调度时仍受评价器的速率限制。
+        """
+        estimated_tokens = sum(self.tokenizer.count_batch(message.content for message in messages))
+        await self.token_bucket.get_tokens(estimated_tokens)
+        try:
+            async with self.request_semaphore:
+                if json_output:
+                    text = await self._agenerate_json(messages)
+                else:
+                    response = await self.model.agenerate(messages=[messages])
+                    text = response.generations[0][0].text
+        except Exception as e:
+            error_message = str(e).lower()
+            if "rate limit" in error_message or "too many requests" in error_message:
+                self._adjust_rate_limits(is_rate_limited=True)
+            raise
+        self._adjust_rate_limits(is_rate_limited=False)
+        return text
+
     def _adjust_rate_limits(self, is_rate_limited: bool = False):
         """根据API响应动态调整速率限制
 
@@ -446,102 +577,103 @@ class DiffEvaluator:
 
         Args:
             diff_content: 差异内容
-            file_path: 文件路径，用于保存diff内容
+            file_path: 文件路径，用于保存diff内容，并为没有文件头的diff补充文件头
             max_tokens_per_chunk: 每个块的最大令牌数，默认为8000
 
         Returns:
             List[str]: 分割后的差异内容块列表
         """
-        # 粗略估计令牌数
-        words = diff_content.split()
-        estimated_tokens = len(words) * 1.2
+        estimated_tokens = self.tokenizer.count(diff_content)
 
-        # 如果启用了保存diff内容，则计算实际token数量
+        # 如果启用了保存diff内容，则保存原始diff
         if self.save_diffs and file_path:
-            actual_tokens = count_tokens(diff_content, self.model_name)
-            save_diff_content(file_path, diff_content, estimated_tokens, actual_tokens)
+            save_diff_content(file_path, diff_content, estimated_tokens, estimated_tokens)
 
-        # 如果估计的令牌数小于最大限制，直接返回原始内容
+        # 如果令牌数小于最大限制，直接返回原始内容
         if estimated_tokens <= max_tokens_per_chunk:
             return [diff_content]
 
-        # 分割差异内容
-        chunks = []
-        lines = diff_content.split('\n')
-        current_chunk = []
-        current_tokens = 0
-
-        for line in lines:
-            line_tokens = len(line.split()) * 1.2
-
-            # 如果当前块加上这一行会超过限制，则创建新块
-            if current_tokens + line_tokens > max_tokens_per_chunk and current_chunk:
-                chunks.append('\n'.join(current_chunk))
-                current_chunk = []
-                current_tokens = 0
-
-            # 如果单行就超过限制，则将其分割
-            if line_tokens > max_tokens_per_chunk:
-                # 将长行分割成多个小块
-                words = line.split()
-                sub_chunks = []
-                sub_chunk = []
-                sub_tokens = 0
-
-                for word in words:
-                    word_tokens = len(word) * 0.2  # 粗略估计
-                    if sub_tokens + word_tokens > max_tokens_per_chunk and sub_chunk:
-                        sub_chunks.append(' '.join(sub_chunk))
-                        sub_chunk = []
-                        sub_tokens = 0
-
-                    sub_chunk.append(word)
-                    sub_tokens += word_tokens
-
-                if sub_chunk:
-                    sub_chunks.append(' '.join(sub_chunk))
-
-                # 将分割后的小块添加到结果中
-                for sub in sub_chunks:
-                    chunks.append(sub)
-            else:
-                # 正常添加行
-                current_chunk.append(line)
-                current_tokens += line_tokens
-
-        # 添加最后一个块
-        if current_chunk:
-            chunks.append('\n'.join(current_chunk))
+        # 按hunk分割差异内容：完整的hunk打包进同一块，每块重复文件头
+        chunks = chunk_diff(diff_content, max_tokens_per_chunk, self.tokenizer, file_path=file_path)
 
         logger.info(f"Content too large, split into {len(chunks)} chunks for evaluation")
         print(f"ℹ️ File too large, will be processed in {len(chunks)} chunks")
 
         # 如果启用了保存diff内容，则保存每个分割后的块
         if self.save_diffs and file_path:
-            for i, chunk in enumerate(chunks):
+            for i, (chunk, chunk_tokens) in enumerate(zip(chunks, self.tokenizer.count_batch(chunks))):
                 chunk_path = f"{file_path}.chunk{i+1}"
-                chunk_tokens = count_tokens(chunk, self.model_name)
-                save_diff_content(chunk_path, chunk, len(chunk.split()) * 1.2, chunk_tokens)
+                save_diff_content(chunk_path, chunk, chunk_tokens, chunk_tokens)
 
         return chunks
 
-    async def _evaluate_single_diff(self, diff_content: str) -> Dict[str, Any]:
-        """Evaluate a single diff with improved rate limiting."""
+    def _build_review_messages(self, diff_content: str) -> List[Any]:
+        """构建单个diff的评审消息（使用优化的prompt）"""
+        # 创建消息 - 使用优化的prompt
+        # 获取文件名和语言
+        file_name = "unknown"
+        language = "unknown"
+
+        # 尝试从diff内容中提取文件名
+        file_name_match = re.search(r'diff --git a/(.*?) b/', diff_content)
+        if file_name_match:
+            file_name = file_name_match.group(1)
+            # 猜测语言
+            language = self._guess_language(file_name)
+
+        # 清理代码内容，移除异常字符
+        sanitized_diff = self._sanitize_content(diff_content)
+
+        # 使用优化的代码评审prompt
+        review_prompt = CODE_REVIEW_PROMPT.format(
+            file_name=file_name,
+            language=language.lower(),
+            code_content=sanitized_diff
+        )
+
+        # 添加语言特定的考虑因素
+        language_key = language.lower()
+        if language_key in LANGUAGE_SPECIFIC_CONSIDERATIONS:
+            review_prompt += "\n\n" + LANGUAGE_SPECIFIC_CONSIDERATIONS[language_key]
+
+        # 添加工作时间估计请求
+        review_prompt += "\n\nIn addition to the code evaluation, please also estimate how many effective working hours an experienced programmer (5-10+ years) would need to complete these code changes. Include this estimate in your JSON response as 'estimated_hours'."
+
+        # 添加JSON输出指令
+        review_prompt += "\n\n" + self.json_output_instruction
+
+        messages = [
+            SystemMessage(content=self.system_prompt),
+            HumanMessage(content=review_prompt)
+        ]
+
+        return messages
+
+    async def _evaluate_single_diff(self, diff_content: str, file_path: Optional[str] = None) -> Dict[str, Any]:
+        """Evaluate a single diff with improved rate limiting.
+
+        file_path partitions near-duplicate reuse by extension; without it the extension is read
+        from the diff's ``diff --git`` line, if any.
+        """
         # 计算文件哈希值用于缓存
         file_hash = self._calculate_file_hash(diff_content)
 
         # 检查缓存
-        if file_hash in self.cache:
+        cached_result = self._get_cached_result(file_hash)
+        if cached_result is not None:
             self.cache_hits += 1
             logger.info(f"Cache hit! Retrieved evaluation result from cache (hit rate: {self.cache_hits}/{len(self.cache) + self.cache_hits})")
-            return self.cache[file_hash]
+            return cached_result
 
-        # 检查文件大小，如果过大则分块处理
-        words = diff_content.split()
-        estimated_tokens = len(words) * 1.2
+        # 检查近似重复的diff（cherry-pick、rebase、codemod）
+        near_duplicate = self._find_near_duplicate(diff_content, file_path)
+        if near_duplicate is not None:
+            logger.info("Near-duplicate hit! Reusing evaluation of a similar diff")
+            self.cache[file_hash] = near_duplicate
+            return near_duplicate
 
         # 如果文件可能超过模型的上下文限制，则分块处理
-        if estimated_tokens > 12000:  # 留出一些空间给系统提示和其他内容
+        if not self.tokenizer.fits(diff_content, 12000):  # 留出一些空间给系统提示和其他内容
             chunks = self._split_diff_content(diff_content)
 
             # 分别评估每个块
@@ -554,21 +686,17 @@ class DiffEvaluator:
             # 合并结果
             merged_result = self._merge_chunk_results(chunk_results)
 
-            # 缓存合并后的结果
-            self.cache[file_hash] = merged_result
+            # 只有所有块都评价成功时才缓存合并后的结果，失败的块留给下次运行重试
+            if not merged_result.get(EVALUATION_FAILED):
+                self._store_cached_result(file_hash, merged_result)
+                if self.near_duplicates is not None:
+                    self.near_duplicates.add(diff_content, merged_result, file_path)
             return merged_result
 
         # 对于正常大小的文件，直接评估
-        # 更智能地估算令牌数量 - 根据文件大小和复杂度调整系数
-        complexity_factor = 1.2  # 基础系数
-
-        # 如果文件很大，降低系数以避免过度估计
-        if len(words) > 1000:
-            complexity_factor = 1.0
-        elif len(words) > 500:
-            complexity_factor = 1.1
-
-        estimated_tokens = len(words) * complexity_factor
+        # 先构建完整的prompt，按实际发送的令牌数向令牌桶申请额度
+        messages = self._build_review_messages(diff_content)
+        estimated_tokens = sum(self.tokenizer.count_batch(message.content for message in messages))
 
         # 使用指数退避重试策略
         max_retries = 5
@@ -593,83 +721,28 @@ class DiffEvaluator:
 
                 # 发送请求到模型
                 async with self.request_semaphore:
-                    # 创建消息 - 使用优化的prompt
-                    # 获取文件名和语言
-                    file_name = "unknown"
-                    language = "unknown"
-
-                    # 尝试从diff内容中提取文件名
-                    file_name_match = re.search(r'diff --git a/(.*?) b/', diff_content)
-                    if file_name_match:
-                        file_name = file_name_match.group(1)
-                        # 猜测语言
-                        language = self._guess_language(file_name)
-
-                    # 清理代码内容，移除异常字符
-                    sanitized_diff = self._sanitize_content(diff_content)
-
-                    # 使用优化的代码评审prompt
-                    review_prompt = CODE_REVIEW_PROMPT.format(
-                        file_name=file_name,
-                        language=language.lower(),
-                        code_content=sanitized_diff
-                    )
-
-                    # 添加语言特定的考虑因素
-                    language_key = language.lower()
-                    if language_key in LANGUAGE_SPECIFIC_CONSIDERATIONS:
-                        review_prompt += "\n\n" + LANGUAGE_SPECIFIC_CONSIDERATIONS[language_key]
-
-                    # 添加工作时间估计请求
-                    review_prompt += "\n\nIn addition to the code evaluation, please also estimate how many effective working hours an experienced programmer (5-10+ years) would need to complete these code changes. Include this estimate in your JSON response as 'estimated_hours'."
-
-                    # 添加JSON输出指令
-                    review_prompt += "\n\n" + self.json_output_instruction
-
-                    messages = [
-                        SystemMessage(content=self.system_prompt),
-                        HumanMessage(content=review_prompt)
-                    ]
-
                     # 调用模型
-                    response = await self.model.agenerate(messages=[messages])
+                    generated_text = await self._agenerate_json(messages)
                     self._last_request_time = time.time()
 
-                    # 获取响应文本
-                    generated_text = response.generations[0][0].text
-
                 # 解析响应
-                try:
-                    # 提取JSON
-                    json_str = self._extract_json(generated_text)
-                    if not json_str:
-                        logger.warning("Failed to extract JSON from response, attempting to fix")
-                        json_str = self._fix_malformed_json(generated_text)
-
-                    if not json_str:
-                        logger.error("Could not extract valid JSON from the response")
-                        return self._generate_default_scores("JSON解析错误。原始响应: " + str(generated_text)[:500])
+                result = self._parse_json_response(generated_text)
+                if result is None:
+                    return self._generate_default_scores("JSON解析错误。原始响应: " + str(generated_text)[:500])
 
-                    result = json.loads(json_str)
+                # 验证分数
+                scores = self._validate_scores(result)
 
-                    # 验证分数
-                    scores = self._validate_scores(result)
+                # 请求成功，调整速率限制
+                self._adjust_rate_limits(is_rate_limited=False)
 
-                    # 请求成功，调整速率限制
-                    self._adjust_rate_limits(is_rate_limited=False)
+                # 缓存结果
+                if not scores.get(EVALUATION_FAILED):
+                    self._store_cached_result(file_hash, scores)
+                    if self.near_duplicates is not None:
+                        self.near_duplicates.add(diff_content, scores, file_path)
 
-                    # 缓存结果
-                    self.cache[file_hash] = scores
-
-                    return scores
-
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON parse error: {e}")
-                    logger.error(f"Raw response: {generated_text}")
-                    retry_count += 1
-                    if retry_count >= max_retries:
-                        return self._generate_default_scores("JSON解析错误。原始响应: " + str(generated_text)[:500])
-                    await asyncio.sleep(base_wait_time * (2 ** retry_count))  # 指数退避
+                return scores
 
             except Exception as e:
                 error_message = str(e)
@@ -821,6 +894,9 @@ class DiffEvaluator:
                                 comments_str = str(comments_dict)
 
                     normalized_result["comments"] = comments_str
+                elif field in normalized_result:
+                    # 模型已返回该字段，保留原值
+                    continue
                 elif field == "overall_score":
                     # 如果缺少总分，计算其他分数的平均值
                     score_fields = ["readability", "efficiency", "security", "structure",
@@ -937,7 +1013,8 @@ class DiffEvaluator:
             "code_style": 5,
             "overall_score": 5.0,
             "estimated_hours": 0.0,
-            "comments": error_message
+            "comments": error_message,
+            EVALUATION_FAILED: True,
         }
 
         logger.info(f"Default scores generated: {default_scores}")
@@ -1124,170 +1201,77 @@ class DiffEvaluator:
             # 如果清理过程出错，返回一个安全的默认字符串
             return "内容清理过程中出错，无法处理。"
 
-    def _extract_json(self, text: str) -> str:
-        """从文本中提取JSON部分。
-
-        Args:
-            text: 原始文本
-
-        Returns:
-            str: 提取的JSON字符串，如果没有找到则返回空字符串
-        """
-        # 检查输入是否为空或None
+    def _parse_json_response(self, text: str) -> Optional[Dict[str, Any]]:
+        """解析模型返回的评价结果，依次尝试直接解析、扫描、修复和文本回退，失败时返回 None"""
         if not text:
             logger.warning("Empty response received from API")
-            print("DEBUG: Empty response received from API")
-            return ""
-
-        # 打印原始文本的类型和长度
-        logger.info(f"Response type: {type(text)}, length: {len(text)}")
-        print(f"DEBUG: Response type: {type(text)}, length: {len(text)}")
-        print(f"DEBUG: First 100 chars: '{text[:100]}'")
-
-        # 记录完整响应用于调试
-        logger.debug(f"Complete model response: {text}")
-
-        # 检查是否包含无法评估的提示（如Base64编码内容）
-        unevaluable_patterns = [
-            r'Base64编码',
-            r'无法解码的字符串',
-            r'ICAgIA==',
-            r'无法评估',
-            r'无法对这段代码进行评审',
-            r'无法进行评价',
-            r'无法对代码进行评估',
-            r'代码内容太短',
-            r'代码为空',
-            r'没有提供实际的代码',
-            r'无法理解',
-            r'无法解析',
-            r'无法分析',
-            r'无法读取',
-            r'无法识别',
-            r'无法处理',
-            r'无效的代码',
-            r'不是有效的代码',
-            r'不是代码',
-            r'不包含代码',
-            r'只包含了一个无法解码的字符串'
-        ]
-
-        for pattern in unevaluable_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                print(f"DEBUG: Detected response indicating unevaluable content: '{pattern}'")
-                # 提取评论，如果有的话
-                comment = text[:200] if len(text) > 200 else text
-                # 创建一个默认的JSON响应
-                default_json = {
-                    "readability": 5,
-                    "efficiency": 5,
-                    "security": 5,
-                    "structure": 5,
-                    "error_handling": 5,
-                    "documentation": 5,
-                    "code_style": 5,
-                    "overall_score": 5.0,
-                    "comments": f"无法评估代码: {comment}"
-                }
-                return json.dumps(default_json)
-
-        # 尝试查找JSON代码块
-        json_match = re.search(r'```(?:json)?\s*({[\s\S]*?})\s*```', text)
-        if json_match:
-            return json_match.group(1)
-
-        # 尝试直接查找JSON对象
-        json_pattern = r'({[\s\S]*?"readability"[\s\S]*?"efficiency"[\s\S]*?"security"[\s\S]*?"structure"[\s\S]*?"error_handling"[\s\S]*?"documentation"[\s\S]*?"code_style"[\s\S]*?"overall_score"[\s\S]*?"comments"[\s\S]*?})'
-        json_match = re.search(json_pattern, text)
-        if json_match:
-            return json_match.group(1)
-
-        # 尝试提取 CODE_SUGGESTION 模板生成的评分部分
-        scores_section = re.search(r'### SCORES:\s*\n([\s\S]*?)(?:\n\n|\Z)', text)
-        if scores_section:
-            scores_text = scores_section.group(1)
-            scores_dict = {}
-
-            # 提取各个评分
-            for line in scores_text.split('\n'):
-                match = re.search(r'- ([\w\s&]+):\s*(\d+(\.\d+)?)\s*/10', line)
-                if match:
-                    key = match.group(1).strip().lower().replace(' & ', '_').replace(' ', '_')
-                    value = float(match.group(2))
-                    scores_dict[key] = value
-
-            # 提取评论部分
-            analysis_match = re.search(r'## Detailed Code Analysis\s*\n([\s\S]*?)(?:\n##|\Z)', text)
-            if analysis_match:
-                scores_dict['comments'] = analysis_match.group(1).strip()
-            else:
-                # 尝试提取改进建议部分
-                improvement_match = re.search(r'## Improvement Recommendations\s*\n([\s\S]*?)(?:\n##|\Z)', text)
-                if improvement_match:
-                    scores_dict['comments'] = improvement_match.group(1).strip()
-                else:
-                    scores_dict['comments'] = "No detailed analysis provided."
-
-            # 转换为 JSON 字符串
-            if scores_dict and len(scores_dict) >= 8:  # 至少包含7个评分项和评论
-                return json.dumps(scores_dict)
+            return None
+        result = self.json_extractor.extract(text)
+        if result is None:
+            logger.error(f"Could not extract valid JSON from the response: {text[:200]}")
+        return result
 
-        # 尝试查找任何可能的JSON对象
-        start_idx = text.find("{")
-        end_idx = text.rfind("}")
-        if start_idx != -1 and end_idx != -1 and start_idx < end_idx:
-            return text[start_idx:end_idx+1]
+    def _build_chunk_messages(self, chunk: str) -> List[Any]:
+        """构建单个差异块的评审消息"""
+        # 创建消息 - 使用优化的prompt
+        # 获取文件名和语言
+        file_name = "unknown"
+        language = "unknown"
+
+        # 尝试从diff内容中提取文件名
+        file_name_match = re.search(r'diff --git a/(.*?) b/', chunk)
+        if file_name_match:
+            file_name = file_name_match.group(1)
+            # 猜测语言
+            language = self._guess_language(file_name)
+
+        # 使用更详细的代码评审prompt，确保模型理解任务
+        # 清理代码内容，移除异常字符
+        sanitized_chunk = self._sanitize_content(chunk)
 
-        # 尝试提取评分信息，即使没有完整的JSON结构
-        scores_dict = {}
+        review_prompt = _CHUNK_REVIEW_PROMPT.format(
+            file_name=file_name, language=language, code_content=sanitized_chunk
+        )
 
-        # 查找评分模式，如 "Readability: 8/10" 或 "Readability score: 8"
-        score_patterns = [
-            r'(readability|efficiency|security|structure|error handling|documentation|code style):\s*(\d+)(?:/10)?',
-            r'(readability|efficiency|security|structure|error handling|documentation|code style) score:\s*(\d+)',
+        # 打印完整的代码块用于调试
+        print(f"DEBUG: File name: {file_name}")
+        print(f"DEBUG: Language: {language}")
+        print(f"DEBUG: Code chunk length: {len(chunk)}")
+        print(f"DEBUG: Code chunk first 100 chars: '{chunk[:100]}'")
+        if len(chunk) < 10:
+            print(f"DEBUG: EMPTY CODE CHUNK: '{chunk}'")
+        elif len(chunk) < 100:
+            print(f"DEBUG: FULL CODE CHUNK: '{chunk}'")
+
+        messages = [
+            SystemMessage(content=self.system_prompt),
+            HumanMessage(content=review_prompt)
         ]
 
-        for pattern in score_patterns:
-            for match in re.finditer(pattern, text.lower()):
-                key = match.group(1).replace(' ', '_')
-                value = int(match.group(2))
-                scores_dict[key] = value
-
-        # 如果找到了至少4个评分，认为是有效的评分信息
-        if len(scores_dict) >= 4:
-            # 填充缺失的评分
-            for field in ["readability", "efficiency", "security", "structure", "error_handling", "documentation", "code_style"]:
-                if field not in scores_dict:
-                    scores_dict[field] = 5  # 默认分数
-
-            # 计算总分
-            scores_dict["overall_score"] = round(sum(scores_dict.values()) / len(scores_dict), 1)
-
-            # 提取评论
-            comment_match = re.search(r'(comments|summary|analysis|evaluation):(.*?)(?=\n\w+:|$)', text.lower(), re.DOTALL)
-            if comment_match:
-                scores_dict["comments"] = comment_match.group(2).strip()
-            else:
-                # 使用整个文本作为评论，但限制长度
-                scores_dict["comments"] = text[:500] + "..." if len(text) > 500 else text
-
-            return json.dumps(scores_dict)
+        # 打印用户输入内容的前100个字符用于调试
+        user_message = messages[1].content if len(messages) > 1 else "No user message"
+        print(f"DEBUG: User input first 100 chars: '{user_message[:100]}...'")
+        print(f"DEBUG: User input length: {len(user_message)}")
 
-        return ""
+        return messages
 
-    def _fix_malformed_json(self, json_str: str) -> str:
-        """尝试修复格式不正确的JSON字符串。
+    async def _evaluate_diff_chunk(self, chunk: str) -> Dict[str, Any]:
+        """评估单个差异块
 
         Args:
-            json_str: 可能格式不正确的JSON字符串
+            chunk: 差异内容块
 
         Returns:
-            str: 修复后的JSON字符串，如果无法修复则返回空字符串
+            Dict[str, Any]: 评估结果
         """
-        # 检查输入是否为空或None
-        if not json_str:
-            logger.warning("Empty string passed to _fix_malformed_json")
-            # 创建一个默认的JSON
+        # 使用指数退避重试策略
+        max_retries = 5
+        retry_count = 0
+        base_wait_time = 2  # 基础等待时间（秒）
+
+        # 如果代码块为空或太短，使用默认评分
+        if len(chunk.strip()) < 10:
+            print("DEBUG: Code chunk is too short, using default scores")
             default_scores = {
                 "readability": 5,
                 "efficiency": 5,
@@ -1297,204 +1281,31 @@ class DiffEvaluator:
                 "documentation": 5,
                 "code_style": 5,
                 "overall_score": 5.0,
-                "estimated_hours": 0.0,
-                "comments": "API返回空响应，显示默认分数。"
+                "estimated_hours": 0.25,  # Minimum 15 minutes for any change
+                "comments": f"无法评估代码，因为代码块为空或太短: '{chunk}'"
             }
-            logger.warning("Returning default scores due to empty response")
-            return json.dumps(default_scores)
-
-        # 检查是否是错误消息而不是JSON
-        error_patterns = [
-            "I'm sorry",
-            "there is no code",
-            "please provide",
-            "cannot review",
-            "unable to"
-        ]
-
-        for pattern in error_patterns:
-            if pattern.lower() in json_str.lower():
-                logger.warning(f"API returned an error message: {json_str[:100]}...")
-                print(f"DEBUG: API returned an error message: {json_str[:100]}...")
-                # 创建一个默认的JSON，包含错误消息
-                default_scores = {
-                    "readability": 5,
-                    "efficiency": 5,
-                    "security": 5,
-                    "structure": 5,
-                    "error_handling": 5,
-                    "documentation": 5,
-                    "code_style": 5,
-                    "overall_score": 5.0,
-                    "estimated_hours": 0.0,
-                    "comments": f"API返回错误消息: {json_str[:200]}..."
-                }
-                return json.dumps(default_scores)
-
-        original_json = json_str  # 保存原始字符串以便比较
-
-        try:
-            # 基本清理
-            json_str = json_str.replace("'", '"')  # 单引号替换为双引号
-            json_str = re.sub(r',\s*}', '}', json_str)  # 移除结尾的逗号
-            json_str = re.sub(r',\s*]', ']', json_str)  # 移除数组结尾的逗号
-
-            # 添加缺失的引号
-            json_str = re.sub(r'([{,])\s*(\w+)\s*:', r'\1"\2":', json_str)  # 给键添加引号
-
-            # 修复缺失的逗号
-            json_str = re.sub(r'("\w+":\s*\d+|"\w+":\s*"[^"]*"|"\w+":\s*true|"\w+":\s*false|"\w+":\s*null)\s*("\w+")', r'\1,\2', json_str)
-
-            # 尝试解析清理后的JSON
-            json.loads(json_str)
-            return json_str
-        except json.JSONDecodeError as e:
-            error_msg = str(e)
-            logger.warning(f"第一次尝试修复JSON失败: {error_msg}")
-
-            # 如果错误与分隔符相关，尝试修复
-            if "delimiter" in error_msg or "Expecting ',' delimiter" in error_msg:
-                try:
-                    # 获取错误位置
-                    pos = e.pos
-                    # 在错误位置插入逗号
-                    json_str = json_str[:pos] + "," + json_str[pos:]
-
-                    # 再次尝试
-                    json.loads(json_str)
-                    return json_str
-                except (json.JSONDecodeError, IndexError):
-                    pass
-
-            # 尝试查找任何可能的JSON对象
-            json_pattern = r'{[\s\S]*?}'
-            json_matches = re.findall(json_pattern, original_json)
-
-            if json_matches:
-                # 尝试每个匹配的JSON对象
-                for potential_json in json_matches:
-                    try:
-                        # 尝试解析
-                        json.loads(potential_json)
-                        return potential_json
-                    except json.JSONDecodeError:
-                        # 尝试基本清理
-                        cleaned_json = potential_json.replace("'", '"')
-                        cleaned_json = re.sub(r',\s*}', '}', cleaned_json)
-                        cleaned_json = re.sub(r'([{,])\s*(\w+)\s*:', r'\1"\2":', cleaned_json)
-
-                        try:
-                            json.loads(cleaned_json)
-                            return cleaned_json
-                        except json.JSONDecodeError:
-                            continue
-
-            # 尝试提取分数并创建最小可用的JSON
-            try:
-                # 提取分数
-                scores = {}
-                for field in ["readability", "efficiency", "security", "structure", "error_handling", "documentation", "code_style"]:
-                    # 尝试多种模式匹配
-                    patterns = [
-                        f'"{field}"\\s*:\\s*(\\d+)',  # "field": 8
-                        f'{field}\\s*:\\s*(\\d+)',    # field: 8
-                        f'{field.replace("_", " ")}\\s*:\\s*(\\d+)',  # field name: 8
-                        f'{field.capitalize()}\\s*:\\s*(\\d+)',  # Field: 8
-                        f'{field.replace("_", " ").title()}\\s*:\\s*(\\d+)'  # Field Name: 8
-                    ]
-
-                    for pattern in patterns:
-                        match = re.search(pattern, original_json, re.IGNORECASE)
-                        if match:
-                            scores[field] = int(match.group(1))
-                            break
-
-                    if field not in scores:
-                        scores[field] = 5  # 默认分数
-
-                # 尝试提取总分
-                overall_patterns = [
-                    r'"overall_score"\s*:\s*(\d+(?:\.\d+)?)',
-                    r'overall_score\s*:\s*(\d+(?:\.\d+)?)',
-                    r'overall\s*:\s*(\d+(?:\.\d+)?)',
-                    r'总分\s*:\s*(\d+(?:\.\d+)?)'
-                ]
-
-                for pattern in overall_patterns:
-                    overall_match = re.search(pattern, original_json, re.IGNORECASE)
-                    if overall_match:
-                        scores["overall_score"] = float(overall_match.group(1))
-                        break
-
-                if "overall_score" not in scores:
-                    # 计算总分为其他分数的平均值
-                    scores["overall_score"] = round(sum(scores.values()) / len(scores), 1)
-
-                # 尝试提取评论
-                comment_patterns = [
-                    r'"comments"\s*:\s*"(.*?)"',
-                    r'comments\s*:\s*(.*?)(?=\n\w+:|$)',
-                    r'评价\s*:\s*(.*?)(?=\n\w+:|$)',
-                    r'建议\s*:\s*(.*?)(?=\n\w+:|$)'
-                ]
-
-                for pattern in comment_patterns:
-                    comment_match = re.search(pattern, original_json, re.DOTALL | re.IGNORECASE)
-                    if comment_match:
-                        scores["comments"] = comment_match.group(1).strip()
-                        break
-
-                if "comments" not in scores:
-                    # 使用原始文本的一部分作为评论
-                    scores["comments"] = "JSON解析错误，显示提取的分数。原始响应: " + original_json[:200] + "..."
-
-                # 转换为JSON字符串
-                return json.dumps(scores)
-            except Exception as final_e:
-                logger.error(f"所有JSON修复尝试失败: {final_e}")
-                logger.error(f"原始响应: {original_json[:500]}")
-                print(f"无法修复JSON: {e} -> {final_e}")
-
-                # 最后尝试：创建一个默认的JSON
-                default_scores = {
-                    "readability": 5,
-                    "efficiency": 5,
-                    "security": 5,
-                    "structure": 5,
-                    "error_handling": 5,
-                    "documentation": 5,
-                    "code_style": 5,
-                    "overall_score": 5.0,
-                    "estimated_hours": 0.0,
-                    "comments": f"JSON解析错误，显示默认分数。错误: {str(e)}"
-                }
-                return json.dumps(default_scores)
-
-            return ""
-
-    async def _evaluate_diff_chunk(self, chunk: str) -> Dict[str, Any]:
-        """评估单个差异块
-
-        Args:
-            chunk: 差异内容块
+            return default_scores
 
-        Returns:
-            Dict[str, Any]: 评估结果
-        """
-        # 使用指数退避重试策略
-        max_retries = 5
-        retry_count = 0
-        base_wait_time = 2  # 基础等待时间（秒）
-
-        # 更智能地估算令牌数量
-        words = chunk.split()
-        complexity_factor = 1.2
-        if len(words) > 1000:
-            complexity_factor = 1.0
-        elif len(words) > 500:
-            complexity_factor = 1.1
+        # 检查是否包含Base64编码的内容
+        if chunk.strip().endswith('==') and all(c in 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=' for c in chunk.strip()):
+            print(f"DEBUG: Detected possible Base64 encoded content in chunk")
+            default_scores = {
+                "readability": 5,
+                "efficiency": 5,
+                "security": 5,
+                "structure": 5,
+                "error_handling": 5,
+                "documentation": 5,
+                "code_style": 5,
+                "overall_score": 5.0,
+                "estimated_hours": 0.25,  # Minimum 15 minutes for any change
+                "comments": f"无法评估代码，因为内容可能是Base64编码: '{chunk[:50]}...'"
+            }
+            return default_scores
 
-        estimated_tokens = len(words) * complexity_factor
+        # 先构建完整的prompt，按实际发送的令牌数向令牌桶申请额度
+        messages = self._build_chunk_messages(chunk)
+        estimated_tokens = sum(self.tokenizer.count_batch(message.content for message in messages))
 
         while retry_count < max_retries:
             try:
@@ -1512,153 +1323,23 @@ class DiffEvaluator:
 
                 # 发送请求到模型
                 async with self.request_semaphore:
-                    # 创建消息 - 使用优化的prompt
-                    # 获取文件名和语言
-                    file_name = "unknown"
-                    language = "unknown"
-
-                    # 尝试从diff内容中提取文件名
-                    file_name_match = re.search(r'diff --git a/(.*?) b/', chunk)
-                    if file_name_match:
-                        file_name = file_name_match.group(1)
-                        # 猜测语言
-                        language = self._guess_language(file_name)
-
-                    # 使用更详细的代码评审prompt，确保模型理解任务
-                    # 清理代码内容，移除异常字符
-                    sanitized_chunk = self._sanitize_content(chunk)
-
-                    review_prompt = f"""请评价以下代码：
-
-文件名：{file_name}
-语言：{language}
-
-```
-{sanitized_chunk}
-```
-
-请对这段代码进行全面评价，并给出1-10分的评分（10分为最高）。评价应包括以下几个方面：
-1. 可读性 (readability)：代码是否易于阅读和理解
-2. 效率 (efficiency)：代码是否高效，是否有性能问题
-3. 安全性 (security)：代码是否存在安全隐患
-4. 结构 (structure)：代码结构是否合理，是否遵循良好的设计原则
-5. 错误处理 (error_handling)：是否有适当的错误处理机制
-6. 文档和注释 (documentation)：注释是否充分，是否有必要的文档
-7. 代码风格 (code_style)：是否遵循一致的代码风格和最佳实践
-8. 总体评分 (overall_score)：综合以上各项的总体评价
-
-请以JSON格式返回结果，格式如下：
-```json
-{{
-  "readability": 评分,
-  "efficiency": 评分,
-  "security": 评分,
-  "structure": 评分,
-  "error_handling": 评分,
-  "documentation": 评分,
-  "code_style": 评分,
-  "overall_score": 总评分,
-  "comments": "详细评价意见和改进建议"
-}}
-```
-
-总评分应该是所有评分的加权平均值，保留一位小数。如果代码很小或者只是配置文件的修改，请根据实际情况给出合理的评分。
-
-重要提示：请确保返回有效的JSON格式。如果无法评估代码（例如代码不完整或无法理解），请仍然返回JSON格式，但在comments中说明原因，并给出默认评分5分。"""
-
-                    # 打印完整的代码块用于调试
-                    print(f"DEBUG: File name: {file_name}")
-                    print(f"DEBUG: Language: {language}")
-                    print(f"DEBUG: Code chunk length: {len(chunk)}")
-                    print(f"DEBUG: Code chunk first 100 chars: '{chunk[:100]}'")
-                    if len(chunk) < 10:
-                        print(f"DEBUG: EMPTY CODE CHUNK: '{chunk}'")
-                    elif len(chunk) < 100:
-                        print(f"DEBUG: FULL CODE CHUNK: '{chunk}'")
-
-                    # 如果代码块为空或太短，使用默认评分
-                    if len(chunk.strip()) < 10:
-                        print("DEBUG: Code chunk is too short, using default scores")
-                        default_scores = {
-                            "readability": 5,
-                            "efficiency": 5,
-                            "security": 5,
-                            "structure": 5,
-                            "error_handling": 5,
-                            "documentation": 5,
-                            "code_style": 5,
-                            "overall_score": 5.0,
-                            "estimated_hours": 0.25,  # Minimum 15 minutes for any change
-                            "comments": f"无法评估代码，因为代码块为空或太短: '{chunk}'"
-                        }
-                        return default_scores
-
-                    # 检查是否包含Base64编码的内容
-                    if chunk.strip().endswith('==') and all(c in 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=' for c in chunk.strip()):
-                        print(f"DEBUG: Detected possible Base64 encoded content in chunk")
-                        default_scores = {
-                            "readability": 5,
-                            "efficiency": 5,
-                            "security": 5,
-                            "structure": 5,
-                            "error_handling": 5,
-                            "documentation": 5,
-                            "code_style": 5,
-                            "overall_score": 5.0,
-                            "estimated_hours": 0.25,  # Minimum 15 minutes for any change
-                            "comments": f"无法评估代码，因为内容可能是Base64编码: '{chunk[:50]}...'"
-                        }
-                        return default_scores
-
-                    messages = [
-                        SystemMessage(content=self.system_prompt),
-                        HumanMessage(content=review_prompt)
-                    ]
-
-                    # 打印用户输入内容的前100个字符用于调试
-                    user_message = messages[1].content if len(messages) > 1 else "No user message"
-                    print(f"DEBUG: User input first 100 chars: '{user_message[:100]}...'")
-                    print(f"DEBUG: User input length: {len(user_message)}")
-
                     # 调用模型
-                    response = await self.model.agenerate(messages=[messages])
+                    generated_text = await self._agenerate_json(messages)
                     self._last_request_time = time.time()
-
-                    # 获取响应文本
-                    generated_text = response.generations[0][0].text
-
-                    # 打印原始响应用于调试
-                    print(f"\n==== RAW OPENAI RESPONSE ====\n{generated_text}\n==== END RESPONSE ====\n")
+                    logger.debug(f"Raw model response: {generated_text}")
 
                 # 解析响应
-                try:
-                    # 提取JSON
-                    json_str = self._extract_json(generated_text)
-                    if not json_str:
-                        logger.warning("Failed to extract JSON from response, attempting to fix")
-                        json_str = self._fix_malformed_json(generated_text)
-
-                    if not json_str:
-                        logger.error("Could not extract valid JSON from the response")
-                        return self._generate_default_scores("JSON解析错误。原始响应: " + str(generated_text)[:500])
-
-                    result = json.loads(json_str)
+                result = self._parse_json_response(generated_text)
+                if result is None:
+                    return self._generate_default_scores("JSON解析错误。原始响应: " + str(generated_text)[:500])
 
-                    # 验证分数
-                    scores = self._validate_scores(result)
+                # 验证分数
+                scores = self._validate_scores(result)
 
-                    # 请求成功，调整速率限制
-                    self._adjust_rate_limits(is_rate_limited=False)
+                # 请求成功，调整速率限制
+                self._adjust_rate_limits(is_rate_limited=False)
 
-                    return scores
-
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON parse error: {e}")
-                    logger.error(f"Raw response: {generated_text}")
-                    retry_count += 1
-                    if retry_count >= max_retries:
-                        return self._generate_default_scores("JSON解析错误。原始响应: " + str(generated_text)[:500])
-                    await asyncio.sleep(base_wait_time * (2 ** retry_count))  # 指数退避
+                return scores
 
             except Exception as e:
                 error_message = str(e)
@@ -1773,6 +1454,8 @@ class DiffEvaluator:
             merged_comments = "\n\n".join(comments)
 
         merged_scores["comments"] = merged_comments or "文件分块评估，无详细评价意见。"
+        if any(result.get(EVALUATION_FAILED) for result in chunk_results):
+            merged_scores[EVALUATION_FAILED] = True
 
         return merged_scores
 
@@ -1808,27 +1491,20 @@ class DiffEvaluator:
         logger.debug(f"Sanitized diff size: {len(sanitized_diff)} characters")
 
         # 检查文件大小，如果过大则分块处理
-        words = sanitized_diff.split()
-        estimated_tokens = len(words) * 1.2
+        estimated_tokens = self.tokenizer.count(sanitized_diff)
         logger.info(f"Estimated tokens for {file_path}: {estimated_tokens:.0f}")
 
         # 如果文件可能超过模型的上下文限制，则分块处理
         if estimated_tokens > 12000:  # 留出一些空间给系统提示和其他内容
             logger.info(f"File {file_path} is too large (estimated {estimated_tokens:.0f} tokens), will be processed in chunks")
-            chunks = self._split_diff_content(sanitized_diff)
+            chunks = self._split_diff_content(sanitized_diff, file_path)
             logger.info(f"Split file into {len(chunks)} chunks")
             print(f"ℹ️ File too large, will be processed in {len(chunks)} chunks")
 
-            # 分别评估每个块
-            chunk_results = []
-            for i, chunk in enumerate(chunks):
-                logger.info(f"Evaluating chunk {i+1}/{len(chunks)} of {file_path}")
-                logger.debug(f"Chunk {i+1} size: {len(chunk)} characters, ~{len(chunk.split())} words")
-                start_time = time.time()
-                chunk_result = await self._evaluate_diff_chunk(chunk)
-                end_time = time.time()
-                logger.info(f"Chunk {i+1} evaluation completed in {end_time - start_time:.2f} seconds")
-                chunk_results.append(chunk_result)
+            # 并发评估每个块，由令牌桶和并发上限控制请求速率
+            start_time = time.time()
+            chunk_results = list(await asyncio.gather(*(self._evaluate_diff_chunk(chunk) for chunk in chunks)))
+            logger.info(f"{len(chunks)} chunks of {file_path} evaluated in {time.time() - start_time:.2f} seconds")
 
             # 合并结果
             logger.info(f"Merging {len(chunk_results)} chunk results for {file_path}")
@@ -1871,48 +1547,24 @@ class DiffEvaluator:
                 HumanMessage(content=prompt)
             ]
 
-            # 打印用户输入内容的前20个字符用于调试
-            user_message = messages[0].content if len(messages) > 0 else "No user message"
-            logger.debug(f"User input first 20 chars: '{user_message[:20]}...'")
-            print(f"DEBUG: User input first 20 chars: '{user_message[:20]}...'")
-
             logger.info(f"Sending request to model for {file_path}")
             start_time = time.time()
-            response = await self.model.agenerate(messages=[messages])
+            generated_text = await self._agenerate_limited(messages)
             end_time = time.time()
             logger.info(f"Model response received in {end_time - start_time:.2f} seconds")
 
-            generated_text = response.generations[0][0].text
-            logger.debug(f"Response size: {len(generated_text)} characters")
-
-            # 打印原始响应用于调试
             logger.debug(f"Raw model response (first 200 chars): {generated_text[:200]}...")
-            print(f"\n==== RAW OPENAI RESPONSE ====\n{generated_text[:200]}...\n==== END RESPONSE ====\n")
-
-            # 尝试提取JSON部分
-            logger.info(f"Extracting JSON from response for {file_path}")
-            json_str = self._extract_json(generated_text)
-            if not json_str:
-                logger.warning(f"Failed to extract JSON from response for {file_path}, attempting to fix")
-                json_str = self._fix_malformed_json(generated_text)
-                if json_str:
-                    logger.info("Successfully fixed malformed JSON")
-                else:
-                    logger.warning("Failed to fix malformed JSON")
 
-            if not json_str:
-                logger.error(f"Could not extract valid JSON from the response for {file_path}")
+            # 解析评价结果（CODE_SUGGESTION 模板输出 Markdown，评分由文本回退路径提取）
+            eval_data = self._parse_json_response(generated_text)
+            if eval_data is None:
                 # 创建默认评价
                 logger.info("Generating default scores")
                 eval_data = self._generate_default_scores(f"解析错误。原始响应: {generated_text[:500]}...")
                 logger.debug(f"Default scores: {eval_data}")
             else:
-                # 解析JSON
                 try:
-                    logger.info(f"Parsing JSON for {file_path}")
-                    logger.debug(f"JSON string: {json_str[:200]}...")
-                    eval_data = json.loads(json_str)
-                    logger.info(f"Successfully parsed JSON for {file_path}")
+                    logger.info(f"Successfully parsed evaluation for {file_path}")
 
                     # 确保所有必要字段存在
                     required_fields = ["readability", "efficiency", "security", "structure",
@@ -1950,7 +1602,6 @@ class DiffEvaluator:
 
                 except Exception as e:
                     logger.error(f"Error parsing evaluation for {file_path}: {e}", exc_info=True)
-                    logger.debug(f"JSON string that caused the error: {json_str[:500]}...")
                     eval_data = self._generate_default_scores(f"解析错误。原始响应: {generated_text[:500]}...")
                     logger.debug(f"Default scores: {eval_data}")
         except Exception as e:
@@ -2107,14 +1758,11 @@ class DiffEvaluator:
             FileEvaluationResult: 文件评价结果
         """
         # 检查文件大小，如果过大则分块处理
-        words = file_diff.split()
-        estimated_tokens = len(words) * 1.2
+        estimated_tokens = self.tokenizer.count(file_diff)
 
         # 如果文件可能超过模型的上下文限制，则分块处理
         if estimated_tokens > 12000:  # 留出一些空间给系统提示和其他内容
             logger.info(f"文件 {file_path} 过大（估计 {estimated_tokens:.0f} 令牌），将进行分块处理")
-            print(f"ℹ️ File too large, will be processed in {len(chunks)} chunks")
-
             chunks = self._split_diff_content(file_diff, file_path)
 
             # 分别评估每个块
@@ -2134,7 +1782,8 @@ class DiffEvaluator:
                 commit_message=commit_info.message,
                 date=commit_info.date,
                 author=commit_info.author,
-                evaluation=CodeEvaluation(**merged_result)
+                evaluation=CodeEvaluation(**merged_result),
+                evaluation_failed=bool(merged_result.get(EVALUATION_FAILED)),
             )
 
         # 如果未设置语言，根据文件扩展名猜测语言
@@ -2160,24 +1809,12 @@ class DiffEvaluator:
                 HumanMessage(content=prompt)
             ]
 
-            # 打印用户输入内容的前20个字符用于调试
-            user_message = messages[0].content if len(messages) > 0 else "No user message"
-            print(f"DEBUG: User input first 20 chars: '{user_message[:20]}...'")
-
             response = await self.model.agenerate(messages=[messages])
             generated_text = response.generations[0][0].text
+            logger.debug(f"Raw model response (first 200 chars): {generated_text[:200]}...")
 
-            # 打印原始响应用于调试
-            print(f"\n==== RAW OPENAI RESPONSE ====\n{generated_text[:200]}...\n==== END RESPONSE ====\n")
-
-            # 尝试提取JSON部分
-            json_str = self._extract_json(generated_text)
-            if not json_str:
-                logger.warning("Failed to extract JSON from response, attempting to fix")
-                json_str = self._fix_malformed_json(generated_text)
-
-            if not json_str:
-                logger.error("Could not extract valid JSON from the response")
+            eval_data = self._parse_json_response(generated_text)
+            if eval_data is None:
                 # 创建默认评价
                 evaluation = CodeEvaluation(
                     readability=5,
@@ -2191,10 +1828,7 @@ class DiffEvaluator:
                     comments=f"解析错误。原始响应: {generated_text[:500]}..."
                 )
             else:
-                # 解析JSON
                 try:
-                    eval_data = json.loads(json_str)
-
                     # 确保所有必要字段存在
                     required_fields = ["readability", "efficiency", "security", "structure",
                                       "error_handling", "documentation", "code_style", "overall_score", "comments"]
@@ -2373,229 +2007,182 @@ class DiffEvaluator:
             evaluation=evaluation
         )
 
-    async def evaluate_commits(
+    def _build_file_evaluation_result(
+        self,
+        commit: CommitInfo,
+        file_path: str,
+        eval_result: Any,
+    ) -> FileEvaluationResult:
+        """将单个文件的评估结果（或异常）包装为 FileEvaluationResult"""
+        # 检查是否发生异常
+        if isinstance(eval_result, Exception):
+            logger.error(f"Error evaluating file {file_path}: {str(eval_result)}")
+            print(f"⚠️ Error evaluating file {file_path}: {str(eval_result)}")
+            evaluation = CodeEvaluation(**self._generate_default_scores(f"评估失败: {str(eval_result)}"))
+            failed = True
+        else:
+            try:
+                evaluation = CodeEvaluation(**eval_result)
+                failed = bool(eval_result.get(EVALUATION_FAILED))
+            except Exception as e:
+                logger.error(f"Error creating evaluation result object: {str(e)}\nEvaluation result: {eval_result}")
+                print(f"⚠️ 创建评估结果对象时出错: {str(e)}")
+                evaluation = CodeEvaluation(**self._generate_default_scores(f"处理评估结果时出错: {str(e)}"))
+                failed = True
+
+        return FileEvaluationResult(
+            file_path=file_path,
+            commit_hash=commit.hash,
+            commit_message=commit.message,
+            date=commit.date,
+            author=commit.author,
+            evaluation=evaluation,
+            evaluation_failed=failed,
+        )
+
+    async def iter_evaluate_commits(
         self,
         commits: List[CommitInfo],
         commit_file_diffs: Dict[str, Dict[str, str]],
         verbose: bool = False,
-    ) -> List[FileEvaluationResult]:
-        """Evaluate multiple commits with improved concurrency control."""
-        # 打印统计信息
-        total_files = sum(len(diffs) for diffs in commit_file_diffs.values())
-        print(f"\n开始评估 {len(commits)} 个提交中的 {total_files} 个文件...")
-        print(f"当前速率设置: {self.token_bucket.tokens_per_minute:.0f} tokens/min, 最大并发请求数: {self.MAX_CONCURRENT_REQUESTS}\n")
-
-        # 按文件大小排序任务，先处理小文件
-        evaluation_tasks = []
-        task_metadata = []  # 存储每个任务的提交和文件信息
-
-        # 收集所有任务
+    ) -> AsyncIterator[FileEvaluationResult]:
+        """Evaluate multiple commits with a continuous work-queue scheduler.
+
+        Files are pulled from a priority queue (smallest diff first) by a pool of
+        workers, so a slow chunked file only occupies its own slot. Pacing comes from
+        the token bucket, and the number of active workers follows
+        ``MAX_CONCURRENT_REQUESTS`` as ``_adjust_rate_limits`` lowers or restores it.
+        Results are yielded in completion order.
+        """
+        # 收集所有任务，按文件大小排序，先处理小文件
+        work_queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
         for commit in commits:
             if commit.hash not in commit_file_diffs:
                 continue
 
-            file_diffs = commit_file_diffs[commit.hash]
-            for file_path, file_diff in file_diffs.items():
-                # 将文件大小与任务一起存储
-                file_size = len(file_diff)
-                evaluation_tasks.append((file_size, file_diff))
-                task_metadata.append((commit, file_path))
-
-        # 按文件大小排序，小文件先处理
-        sorted_tasks = sorted(zip(evaluation_tasks, task_metadata), key=lambda x: x[0][0])
-        evaluation_tasks = [task[0][1] for task in sorted_tasks]  # 只保留diff内容
-        task_metadata = [task[1] for task in sorted_tasks]
-
-        # 动态调整批处理大小
-        # 根据文件数量和大小更智能地调整批大小
-        if total_files > 100:
-            batch_size = 1  # 很多文件时，使用串行处理
-        elif total_files > 50:
-            batch_size = 2  # 较多文件时，使用小批大小
-        elif total_files > 20:
-            batch_size = max(2, self.MAX_CONCURRENT_REQUESTS - 1)  # 中等数量文件
-        else:
-            batch_size = self.MAX_CONCURRENT_REQUESTS  # 少量文件时使用完整并发
+            for file_path, file_diff in commit_file_diffs[commit.hash].items():
+                # 序号保证同样大小的文件按提交顺序出队，且不会比较 CommitInfo
+                work_queue.put_nowait((len(file_diff), work_queue.qsize(), commit, file_path, file_diff))
 
-        # 检查文件大小，如果有大文件，进一步减小批大小
-        large_files = sum(1 for task in evaluation_tasks if len(task.split()) > 5000)
-        if large_files > 10 and batch_size > 1:
-            batch_size = max(1, batch_size - 1)
-            print(f"检测到 {large_files} 个大文件，减小批大小为 {batch_size}")
-
-        print(f"使用批大小: {batch_size}")
+        total_files = work_queue.qsize()
+        print(f"\n开始评估 {len(commits)} 个提交中的 {total_files} 个文件...")
+        print(f"当前速率设置: {self.token_bucket.tokens_per_minute:.0f} tokens/min, 最大并发请求数: {self.MAX_CONCURRENT_REQUESTS}\n")
 
-        results = []
-        start_time = time.time()
-        completed_tasks = 0
+        if total_files == 0:
+            return
 
-        for i in range(0, len(evaluation_tasks), batch_size):
-            # 创建批处理任务
-            batch_tasks = []
-            for diff in evaluation_tasks[i:i + batch_size]:
-                batch_tasks.append(self._evaluate_single_diff(diff))
+        result_queue: asyncio.Queue = asyncio.Queue()
 
-            # 使用 gather 并发执行任务，但设置 return_exceptions=True 以便在一个任务失败时继续处理其他任务
-            batch_results = await asyncio.gather(*batch_tasks, return_exceptions=True)
+        async def worker(worker_id: int):
+            while not work_queue.empty():
+                # 速率受限时并发上限会降低，超出上限的工作者暂停取任务，直到上限恢复
+                if worker_id >= self.MAX_CONCURRENT_REQUESTS:
+                    await asyncio.sleep(self.MIN_REQUEST_INTERVAL)
+                    continue
 
-            # 创建 FileEvaluationResult 对象
-            for j, eval_result in enumerate(batch_results):
-                task_idx = i + j
-                if task_idx >= len(task_metadata):
+                try:
+                    _, _, commit, file_path, file_diff = work_queue.get_nowait()
+                except asyncio.QueueEmpty:
                     break
 
-                commit, file_path = task_metadata[task_idx]
-
-                # 检查是否发生异常
-                if isinstance(eval_result, Exception):
-                    logger.error(f"Error evaluating file {file_path}: {str(eval_result)}")
-                    print(f"⚠️ Error evaluating file {file_path}: {str(eval_result)}")
-
-                    # 创建默认评估结果
-                    default_scores = self._generate_default_scores(f"评估失败: {str(eval_result)}")
-                    results.append(
-                        FileEvaluationResult(
-                            file_path=file_path,
-                            commit_hash=commit.hash,
-                            commit_message=commit.message,
-                            date=commit.date,
-                            author=commit.author,
-                            evaluation=CodeEvaluation(**default_scores)
-                        )
-                    )
-                else:
-                    # 正常处理评估结果
-                    try:
-                        results.append(
-                            FileEvaluationResult(
-                                file_path=file_path,
-                                commit_hash=commit.hash,
-                                commit_message=commit.message,
-                                date=commit.date,
-                                author=commit.author,
-                                evaluation=CodeEvaluation(**eval_result)
-                            )
-                        )
-                    except Exception as e:
-                        logger.error(f"Error creating evaluation result object: {str(e)}\nEvaluation result: {eval_result}")
-                        print(f"⚠️ 创建评估结果对象时出错: {str(e)}")
-
-                        # 创建默认评估结果
-                        default_scores = self._generate_default_scores(f"处理评估结果时出错: {str(e)}")
-                        results.append(
-                            FileEvaluationResult(
-                                file_path=file_path,
-                                commit_hash=commit.hash,
-                                commit_message=commit.message,
-                                date=commit.date,
-                                author=commit.author,
-                                evaluation=CodeEvaluation(**default_scores)
-                            )
-                        )
-
-                # 更新进度
-                completed_tasks += 1
-                elapsed_time = time.time() - start_time
-                estimated_total_time = (elapsed_time / completed_tasks) * total_files
-                remaining_time = estimated_total_time - elapsed_time
-
-                # 每完成 5 个任务或每个批次结束时显示进度
-                if completed_tasks % 5 == 0 or j == len(batch_results) - 1:
-                    print(f"进度: {completed_tasks}/{total_files} 文件 ({completed_tasks/total_files*100:.1f}%) - 预计剩余时间: {remaining_time/60:.1f} 分钟")
-
-            # 批次之间添加自适应延迟
-            if i + batch_size < len(evaluation_tasks):
-                # 根据文件大小、数量和当前令牌桶状态调整延迟
-
-                # 获取令牌桶统计信息
-                token_stats = self.token_bucket.get_stats()
-                tokens_available = token_stats.get("current_tokens", 0)
-                tokens_per_minute = token_stats.get("tokens_per_minute", 6000)
-
-                # 计算下一批文件的估计令牌数
-                next_batch_start = min(i + batch_size, len(evaluation_tasks))
-                next_batch_end = min(next_batch_start + batch_size, len(evaluation_tasks))
-                next_batch_tokens = sum(len(task.split()) * 1.2 for task in evaluation_tasks[next_batch_start:next_batch_end])
-
-                # 如果令牌桶中的令牌不足以处理下一批，计算需要等待的时间
-                if tokens_available < next_batch_tokens:
-                    tokens_needed = next_batch_tokens - tokens_available
-                    wait_time = (tokens_needed * 60.0 / tokens_per_minute) * 0.8  # 等待时间稍微减少一点，因为令牌桶会自动处理等待
-
-                    # 设置最小和最大等待时间
-                    delay = max(0.5, min(5.0, wait_time))
-
-                    if verbose:
-                        print(f"令牌桶状态: {tokens_available:.0f}/{tokens_per_minute:.0f} tokens, 下一批需要: {next_batch_tokens:.0f} tokens, 等待: {delay:.1f}s")
-                else:
-                    # 如果有足够的令牌，使用最小延迟
-                    delay = 0.5
+                try:
+                    eval_result = await self._evaluate_single_diff(file_diff, file_path)
+                except Exception as e:
+                    eval_result = e
 
-                # 根据文件数量调整基础延迟
-                if total_files > 100:
-                    delay = max(delay, 3.0)  # 大量文件时使用更长的延迟
-                elif total_files > 50:
-                    delay = max(delay, 2.0)
-                elif total_files > 20:
-                    delay = max(delay, 1.0)
+                await result_queue.put(self._build_file_evaluation_result(commit, file_path, eval_result))
 
-                # 如果最近有速率限制错误，增加延迟
-                if self.rate_limit_errors > 0:
-                    delay *= (1 + min(3, self.rate_limit_errors) * 0.5)  # 最多增加 3 倍
+        worker_count = min(self.MAX_CONCURRENT_REQUESTS, total_files)
+        workers = [asyncio.create_task(worker(i)) for i in range(worker_count)]
 
-                # 最终限制延迟范围
-                delay = min(10.0, max(0.5, delay))  # 确保延迟在 0.5-10 秒之间
+        start_time = time.time()
+        try:
+            for completed_tasks in range(1, total_files + 1):
+                result = await result_queue.get()
 
+                # 更新进度
+                elapsed_time = time.time() - start_time
+                remaining_time = (elapsed_time / completed_tasks) * (total_files - completed_tasks)
+                if completed_tasks % 5 == 0 or completed_tasks == total_files:
+                    print(f"进度: {completed_tasks}/{total_files} 文件 ({completed_tasks/total_files*100:.1f}%) - 预计剩余时间: {remaining_time/60:.1f} 分钟")
                 if verbose:
-                    print(f"批次间延迟: {delay:.1f}s")
+                    print(f"已完成 {result.file_path}，队列剩余: {work_queue.qsize()}，令牌桶状态: {self.token_bucket.get_stats()}")
 
-                await asyncio.sleep(delay)
+                yield result
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
 
         # 打印统计信息
         total_time = time.time() - start_time
         print(f"\n评估完成! 总耗时: {total_time/60:.1f} 分钟")
         print(f"缓存命中率: {self.cache_hits}/{len(self.cache) + self.cache_hits} ({self.cache_hits/(len(self.cache) + self.cache_hits)*100 if len(self.cache) + self.cache_hits > 0 else 0:.1f}%)")
         print(f"令牌桶统计: {self.token_bucket.get_stats()}")
+        print(f"JSON解析统计: {self.json_extractor.get_stats()}")
+        if self.stream_responses:
+            print(f"流式响应提前结束次数: {self.early_stops}")
+        if self.persistent_cache is not None:
+            print(f"持久化缓存统计: {self.persistent_cache.get_stats()}")
+        if self.near_duplicates is not None:
+            print(f"近似重复统计: {self.near_duplicates.get_stats()}")
+
+    async def evaluate_commits(
+        self,
+        commits: List[CommitInfo],
+        commit_file_diffs: Dict[str, Dict[str, str]],
+        verbose: bool = False,
+    ) -> List[FileEvaluationResult]:
+        """Evaluate multiple commits and collect all results (see ``iter_evaluate_commits``)."""
+        return [result async for result in self.iter_evaluate_commits(commits, commit_file_diffs, verbose)]
 
-        return results
+    def _combine_commit_diff(self, commit_diff: Dict[str, Dict[str, Any]]) -> str:
+        """Join all file diffs of a commit into one string with a header per file."""
+        parts = []
+        for file_path, diff_info in commit_diff.items():
+            parts.append(
+                f"\n\n### File: {file_path} (Status: {diff_info['status']}, "
+                f"+{diff_info.get('additions', 0)}, -{diff_info.get('deletions', 0)})\n\n"
+            )
+            parts.append(diff_info["diff"])
+        return "".join(parts)
+
+    def _whole_commit_fits(self, commit_diff: Dict[str, Dict[str, Any]]) -> bool:
+        """Whether the combined diff of a commit fits in a single whole-commit prompt."""
+        combined_diff = self._sanitize_content(self._combine_commit_diff(commit_diff))
+        return self.tokenizer.fits(combined_diff, self.whole_commit_max_tokens)
 
     async def evaluate_commit_as_whole(
         self,
         commit_hash: str,
         commit_diff: Dict[str, Dict[str, Any]],
+        file_evaluations: Optional[Dict[str, Dict[str, Any]]] = None,
     ) -> Dict[str, Any]:
         """Evaluate all diffs in a commit together as a whole.
 
         This method combines all file diffs into a single evaluation to get a holistic view
         of the commit and estimate the effective working hours needed.
 
+        When the combined diff exceeds ``whole_commit_max_tokens`` the commit is evaluated
+        map-reduce style instead: per-file assessments are computed in parallel and reduced
+        into the commit-level scores and estimated hours.
+
         Args:
             commit_hash: The hash of the commit being evaluated
             commit_diff: Dictionary mapping file paths to their diffs and statistics
+            file_evaluations: Per-file results of ``evaluate_commit_file`` keyed by path; reused
+                by the map-reduce mode instead of sending the same diffs again
 
         Returns:
             Dictionary containing evaluation results including estimated working hours
         """
         logger.info(f"Starting whole-commit evaluation for {commit_hash}")
 
-        # Combine all diffs into a single string with file headers
-        combined_diff = ""
-        total_additions = 0
-        total_deletions = 0
-
-        for file_path, diff_info in commit_diff.items():
-            file_diff = diff_info["diff"]
-            status = diff_info["status"]
-            additions = diff_info.get("additions", 0)
-            deletions = diff_info.get("deletions", 0)
-
-            total_additions += additions
-            total_deletions += deletions
-
-            # Add file header
-            combined_diff += f"\n\n### File: {file_path} (Status: {status}, +{additions}, -{deletions})\n\n"
-            combined_diff += file_diff
+        total_additions = sum(diff_info.get("additions", 0) for diff_info in commit_diff.values())
+        total_deletions = sum(diff_info.get("deletions", 0) for diff_info in commit_diff.values())
 
+        # Combine all diffs into a single string with file headers
+        combined_diff = self._combine_commit_diff(commit_diff)
         logger.info(f"Combined {len(commit_diff)} files into a single evaluation")
         logger.debug(f"Combined diff size: {len(combined_diff)} characters")
 
@@ -2603,12 +2190,12 @@ class DiffEvaluator:
         sanitized_diff = self._sanitize_content(combined_diff)
 
         # Check if the combined diff is too large
-        words = sanitized_diff.split()
-        estimated_tokens = len(words) * 1.2
-        logger.info(f"Estimated tokens for combined diff: {estimated_tokens:.0f}")
+        if not self.tokenizer.fits(sanitized_diff, self.whole_commit_max_tokens):
+            logger.info(f"Combined diff exceeds {self.whole_commit_max_tokens} tokens, using map-reduce evaluation")
+            return await self._evaluate_commit_map_reduce(commit_hash, commit_diff, file_evaluations or {})
 
-        # Create a prompt for evaluating the entire commit
-        language = "multiple"  # Since we're evaluating multiple files
+        fallback = self._generate_default_scores("Failed to parse response")
+        fallback["estimated_hours"] = self._estimate_default_hours(total_additions, total_deletions)
 
         # Create a prompt that specifically asks for working hours estimation
         prompt = f"""Act as a senior code reviewer with 10+ years of experience. I will provide you with a complete diff of a commit that includes multiple files.
@@ -2633,18 +2220,7 @@ Here's the complete diff for commit {commit_hash}:
 {sanitized_diff}
 ```
 
-Please format your response as JSON with the following fields:
-- readability: (score 1-10)
-- efficiency: (score 1-10)
-- security: (score 1-10)
-- structure: (score 1-10)
-- error_handling: (score 1-10)
-- documentation: (score 1-10)
-- code_style: (score 1-10)
-- overall_score: (score 1-10)
-- estimated_hours: (number of hours)
-- comments: (your detailed analysis)
-"""
+{_WHOLE_COMMIT_RESPONSE_FORMAT}"""
 
         logger.info("Preparing to evaluate combined diff")
         logger.debug(f"Prompt size: {len(prompt)} characters")
@@ -2655,74 +2231,160 @@ Please format your response as JSON with the following fields:
 
             logger.info("Sending request to model for combined diff evaluation")
             start_time = time.time()
-            response = await self.model.agenerate(messages=[messages])
+            generated_text = await self._agenerate_limited(messages, json_output=True)
             end_time = time.time()
             logger.info(f"Model response received in {end_time - start_time:.2f} seconds")
-
-            generated_text = response.generations[0][0].text
             logger.debug(f"Response size: {len(generated_text)} characters")
 
-            # Extract JSON from response
-            logger.info("Extracting JSON from response")
-            json_str = self._extract_json(generated_text)
-            if not json_str:
-                logger.warning("Failed to extract JSON from response, attempting to fix")
-                json_str = self._fix_malformed_json(generated_text)
-
-            if not json_str:
-                logger.error("Could not extract valid JSON from the response")
-                # Create default evaluation
-                eval_data = self._generate_default_scores("Failed to parse response")
-                eval_data["estimated_hours"] = self._estimate_default_hours(total_additions, total_deletions)
-            else:
-                # Parse JSON
-                try:
-                    eval_data = json.loads(json_str)
+            return self._finalize_whole_commit_evaluation(generated_text, fallback)
+        except Exception as e:
+            logger.error(f"Error during evaluation: {e}", exc_info=True)
+            eval_data = self._generate_default_scores(f"评价过程中出错: {str(e)}")
+            eval_data["estimated_hours"] = fallback["estimated_hours"]
+            return eval_data
 
-                    # Ensure all necessary fields exist
-                    required_fields = ["readability", "efficiency", "security", "structure",
-                                      "error_handling", "documentation", "code_style", "overall_score", "comments"]
-                    for field in required_fields:
-                        if field not in eval_data:
-                            if field != "overall_score":  # overall_score can be calculated
-                                logger.warning(f"Missing field {field} in evaluation, setting default value")
-                                eval_data[field] = 5
+    def _finalize_whole_commit_evaluation(self, generated_text: str, fallback: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse a whole-commit response, filling anything missing from ``fallback``."""
+        eval_data = self._parse_json_response(generated_text)
+        if eval_data is None:
+            return dict(fallback)
 
-                    # If overall_score is not provided, calculate it
-                    if "overall_score" not in eval_data or not eval_data["overall_score"]:
-                        score_fields = ["readability", "efficiency", "security", "structure",
-                                       "error_handling", "documentation", "code_style"]
-                        scores = [eval_data.get(field, 5) for field in score_fields]
-                        eval_data["overall_score"] = round(sum(scores) / len(scores), 1)
+        try:
+            # Ensure all necessary fields exist
+            required_fields = ["readability", "efficiency", "security", "structure",
+                               "error_handling", "documentation", "code_style", "overall_score", "comments"]
+            for field in required_fields:
+                if field not in eval_data:
+                    if field != "overall_score":  # overall_score can be calculated
+                        logger.warning(f"Missing field {field} in evaluation, setting default value")
+                        eval_data[field] = fallback.get(field, 5)
+
+            # If overall_score is not provided, calculate it
+            if "overall_score" not in eval_data or not eval_data["overall_score"]:
+                scores = [eval_data.get(field, 5) for field in SCORE_FIELDS]
+                eval_data["overall_score"] = round(sum(scores) / len(scores), 1)
+
+            # If estimated_hours is not provided, use the fallback estimate
+            if "estimated_hours" not in eval_data or not eval_data["estimated_hours"]:
+                logger.warning("Missing estimated_hours in evaluation, calculating default")
+                eval_data["estimated_hours"] = fallback["estimated_hours"]
+
+            # Log all scores
+            logger.info("Whole commit evaluation scores: "
+                        + ", ".join(f"{field}={eval_data.get(field, 'N/A')}"
+                                    for field in SCORE_FIELDS + ["overall_score", "estimated_hours"]))
+        except Exception as e:
+            logger.error(f"Error parsing evaluation: {e}", exc_info=True)
+            eval_data = self._generate_default_scores(f"解析错误。原始响应: {generated_text[:500]}...")
+            eval_data["estimated_hours"] = fallback["estimated_hours"]
 
-                    # If estimated_hours is not provided, calculate a default
-                    if "estimated_hours" not in eval_data or not eval_data["estimated_hours"]:
-                        logger.warning("Missing estimated_hours in evaluation, calculating default")
-                        eval_data["estimated_hours"] = self._estimate_default_hours(total_additions, total_deletions)
+        return eval_data
 
-                    # Log all scores
-                    logger.info(f"Whole commit evaluation scores: " +
-                               f"readability={eval_data.get('readability', 'N/A')}, " +
-                               f"efficiency={eval_data.get('efficiency', 'N/A')}, " +
-                               f"security={eval_data.get('security', 'N/A')}, " +
-                               f"structure={eval_data.get('structure', 'N/A')}, " +
-                               f"error_handling={eval_data.get('error_handling', 'N/A')}, " +
-                               f"documentation={eval_data.get('documentation', 'N/A')}, " +
-                               f"code_style={eval_data.get('code_style', 'N/A')}, " +
-                               f"overall_score={eval_data.get('overall_score', 'N/A')}, " +
-                               f"estimated_hours={eval_data.get('estimated_hours', 'N/A')}")
+    async def _evaluate_commit_map_reduce(
+        self,
+        commit_hash: str,
+        commit_diff: Dict[str, Dict[str, Any]],
+        file_evaluations: Dict[str, Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Map: assess every file in parallel, reusing ``file_evaluations``; reduce: combine them."""
+        missing = [file_path for file_path in commit_diff if file_path not in file_evaluations]
+        logger.info(f"Map-reduce evaluation of {commit_hash}: {len(commit_diff)} files, "
+                    f"{len(commit_diff) - len(missing)} reused from per-file evaluation")
 
-                except Exception as e:
-                    logger.error(f"Error parsing evaluation: {e}", exc_info=True)
-                    eval_data = self._generate_default_scores(f"解析错误。原始响应: {generated_text[:500]}...")
-                    eval_data["estimated_hours"] = self._estimate_default_hours(total_additions, total_deletions)
+        evaluated = await asyncio.gather(*(
+            self.evaluate_commit_file(
+                file_path,
+                commit_diff[file_path]["diff"],
+                commit_diff[file_path]["status"],
+                commit_diff[file_path].get("additions", 0),
+                commit_diff[file_path].get("deletions", 0),
+            )
+            for file_path in missing
+        ))
+        partials = {**file_evaluations, **dict(zip(missing, evaluated))}
+        return await self._reduce_assessments(commit_hash, [partials[file_path] for file_path in commit_diff])
+
+    @staticmethod
+    def _assessment_line(assessment: Dict[str, Any]) -> str:
+        scores = ", ".join(f"{field} {assessment.get(field, 5)}" for field in SCORE_FIELDS + ["overall_score"])
+        comments = " ".join(str(assessment.get("comments", "")).split())
+        if len(comments) > _ASSESSMENT_COMMENT_CHARS:
+            comments = comments[:_ASSESSMENT_COMMENT_CHARS] + "..."
+        return (f"- {assessment.get('path', '')} (Status: {assessment.get('status', 'M')}, "
+                f"+{assessment.get('additions', 0)}, -{assessment.get('deletions', 0)}): {scores}, "
+                f"estimated_hours {assessment.get('estimated_hours', 0)}. {comments}")
+
+    @staticmethod
+    def _aggregate_assessments(assessments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine assessments without the model: line-weighted scores and summed hours."""
+        weights = [max(1, a.get("additions", 0) + a.get("deletions", 0)) for a in assessments]
+        total_weight = sum(weights)
+        result = {
+            field: round(sum(a.get(field, 5) * w for a, w in zip(assessments, weights)) / total_weight, 1)
+            for field in SCORE_FIELDS + ["overall_score"]
+        }
+        result["estimated_hours"] = round(sum(a.get("estimated_hours", 0) or 0 for a in assessments), 1)
+        result["comments"] = (
+            assessments[0].get("comments", "") if len(assessments) == 1
+            else f"Aggregated from {len(assessments)} partial assessments."
+        )
+        return result
 
-        except Exception as e:
-            logger.error(f"Error during evaluation: {e}", exc_info=True)
-            eval_data = self._generate_default_scores(f"评价过程中出错: {str(e)}")
-            eval_data["estimated_hours"] = self._estimate_default_hours(total_additions, total_deletions)
+    async def _reduce_assessments(self, commit_hash: str, assessments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Reduce partial assessments into one, hierarchically when they do not fit one prompt."""
+        lines = [self._assessment_line(a) for a in assessments]
+        line_tokens = self.tokenizer.count_batch(lines)
+
+        # every group holds at least two assessments so each level shrinks the list
+        groups: List[List[int]] = []
+        group_tokens = 0
+        for index, tokens in enumerate(line_tokens):
+            if groups and (len(groups[-1]) < 2 or group_tokens + tokens <= self.whole_commit_max_tokens):
+                groups[-1].append(index)
+                group_tokens += tokens
+            else:
+                groups.append([index])
+                group_tokens = tokens
+
+        if len(groups) > 1:
+            logger.info(f"Reducing {len(assessments)} assessments of {commit_hash} in {len(groups)} groups")
+            reduced = await asyncio.gather(*(
+                self._reduce_assessments(commit_hash, [assessments[i] for i in group]) for group in groups
+            ))
+            for number, (group, result) in enumerate(zip(groups, reduced), 1):
+                result.update({
+                    "path": f"part {number} ({len(group)} files)",
+                    "status": "-",
+                    "additions": sum(assessments[i].get("additions", 0) for i in group),
+                    "deletions": sum(assessments[i].get("deletions", 0) for i in group),
+                })
+            return await self._reduce_assessments(commit_hash, list(reduced))
+
+        fallback = self._aggregate_assessments(assessments)
+        if len(assessments) == 1:
+            return fallback
+
+        additions = sum(a.get("additions", 0) for a in assessments)
+        deletions = sum(a.get("deletions", 0) for a in assessments)
+        partial_assessments = "\n".join(lines)
+        prompt = f"""Act as a senior code reviewer with 10+ years of experience. Commit {commit_hash} is too large to review as one diff, so its parts have already been assessed separately.
+
+Here are the partial assessments ({len(assessments)} parts, +{additions}, -{deletions} lines in total):
+
+{partial_assessments}
+
+Please combine them into an evaluation of the entire commit as a whole, weighting larger parts more.
+Estimate how many effective working hours an experienced programmer (5-10+ years) would need for the whole commit;
+this is not necessarily the sum of the partial estimates, since related changes share design and testing work.
+
+{_WHOLE_COMMIT_RESPONSE_FORMAT}"""
 
-        return eval_data
+        try:
+            generated_text = await self._agenerate_limited([HumanMessage(content=prompt)], json_output=True)
+            return self._finalize_whole_commit_evaluation(generated_text, fallback)
+        except Exception as e:
+            logger.error(f"Error reducing assessments of {commit_hash}: {e}", exc_info=True)
+            return fallback
 
     def _estimate_default_hours(self, additions: int, deletions: int) -> float:
         """Estimate default working hours based on additions and deletions.
@@ -2778,13 +2440,12 @@ Please format your response as JSON with the following fields:
         }
         logger.debug(f"Initialized evaluation results structure for commit {commit_hash}")
 
-        # Evaluate each file
-        logger.info(f"Starting file-by-file evaluation for commit {commit_hash}")
-        for i, (file_path, diff_info) in enumerate(commit_diff.items()):
-            logger.info(f"Evaluating file {i+1}/{len(commit_diff)}: {file_path}")
-            logger.debug(f"File info: status={diff_info['status']}, additions={diff_info.get('additions', 0)}, deletions={diff_info.get('deletions', 0)}")
+        # Evaluate every file and the commit as a whole concurrently; requests are
+        # paced by the evaluator's token bucket and concurrency limit. Commits too large
+        # for one prompt are reduced from the per-file results once they are ready.
+        logger.info(f"Starting concurrent evaluation of {len(commit_diff)} files and the whole commit {commit_hash}")
 
-            # Use the new method for commit file evaluation
+        async def evaluate_file(file_path: str, diff_info: Dict[str, Any]) -> Dict[str, Any]:
             start_time = time.time()
             file_evaluation = await self.evaluate_commit_file(
                 file_path,
@@ -2793,15 +2454,31 @@ Please format your response as JSON with the following fields:
                 diff_info.get("additions", 0),
                 diff_info.get("deletions", 0),
             )
-            end_time = time.time()
-            logger.info(f"File {file_path} evaluated in {end_time - start_time:.2f} seconds with score: {file_evaluation.get('overall_score', 'N/A')}")
-
-            evaluation_results["files"].append(file_evaluation)
-            logger.debug(f"Added evaluation for {file_path} to results")
+            logger.info(f"File {file_path} evaluated in {time.time() - start_time:.2f} seconds "
+                        f"with score: {file_evaluation.get('overall_score', 'N/A')}")
+            return file_evaluation
 
-        # Evaluate the entire commit as a whole to get estimated working hours
-        logger.info("Evaluating entire commit as a whole")
-        whole_commit_evaluation = await self.evaluate_commit_as_whole(commit_hash, commit_diff)
+        file_tasks = [
+            asyncio.ensure_future(evaluate_file(file_path, diff_info))
+            for file_path, diff_info in commit_diff.items()
+        ]
+        tasks = list(file_tasks)
+        if self._whole_commit_fits(commit_diff):
+            tasks.append(asyncio.ensure_future(self.evaluate_commit_as_whole(commit_hash, commit_diff)))
+        try:
+            evaluation_results["files"] = list(await asyncio.gather(*file_tasks))
+            if len(tasks) > len(file_tasks):
+                whole_commit_evaluation = await tasks[-1]
+            else:
+                whole_commit_evaluation = await self.evaluate_commit_as_whole(
+                    commit_hash,
+                    commit_diff,
+                    file_evaluations={file["path"]: file for file in evaluation_results["files"]},
+                )
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
 
         # Add the estimated working hours to the evaluation results
         evaluation_results["estimated_hours"] = whole_commit_evaluation.get("estimated_hours", 0)
@@ -2825,15 +2502,13 @@ Please format your response as JSON with the following fields:
         summary_prompt = self._create_summary_prompt(evaluation_results)
         logger.debug(f"Summary prompt size: {len(summary_prompt)} characters")
 
-        # Use agenerate instead of ainvoke
         messages = [HumanMessage(content=summary_prompt)]
         logger.info("Sending summary request to model")
         start_time = time.time()
-        summary_response = await self.model.agenerate(messages=[messages])
+        summary_text = await self._agenerate_limited(messages)
         end_time = time.time()
         logger.info(f"Summary response received in {end_time - start_time:.2f} seconds")
 
-        summary_text = summary_response.generations[0][0].text
         logger.debug(f"Summary text size: {len(summary_text)} characters")
         logger.debug(f"Summary text (first 100 chars): {summary_text[:100]}...")
 
@@ -2886,73 +2561,54 @@ Please provide a brief summary of the overall changes and their impact.
 If estimated working hours are provided, please comment on whether this estimate seems reasonable given the scope of changes."""
 
 
-def generate_evaluation_markdown(evaluation_results: List[FileEvaluationResult]) -> str:
+def _quality_level(overall_score: float) -> str:
+    if overall_score >= 9.0:
+        return "Exceptional"
+    if overall_score >= 7.0:
+        return "Excellent"
+    if overall_score >= 5.0:
+        return "Good"
+    if overall_score >= 3.0:
+        return "Needs Improvement"
+    return "Poor"
+
+
+def iter_evaluation_markdown(
+    summary: Dict[str, Any], sorted_results: Iterable[FileEvaluationResult]
+) -> Iterator[str]:
     """
-    生成评价结果的Markdown表格
+    流式生成评价报告的 Markdown 片段
 
     Args:
-        evaluation_results: 文件评价结果列表
+        summary: ``summarize_columns`` 计算的汇总统计
+        sorted_results: 按日期排序的文件评价结果，逐条输出，不需要全部放在内存中
 
-    Returns:
-        str: Markdown格式的评价表格
+    Yields:
+        str: Markdown 片段
     """
-    if not evaluation_results:
-        return "## 代码评价结果\n\n没有找到需要评价的代码提交。"
+    if not summary.get("count"):
+        yield "## 代码评价结果\n\n没有找到需要评价的代码提交。"
+        return
 
-    # 按日期排序结果
-    sorted_results = sorted(evaluation_results, key=lambda x: x.date)
+    avg_scores = summary["averages"]
+    total_hours = summary["total_hours"]
+    author = summary["first_author"]
+    start_date = summary["start_date"].strftime("%Y-%m-%d")
+    end_date = summary["end_date"].strftime("%Y-%m-%d")
 
     # Create Markdown header
     markdown = "# Code Evaluation Report\n\n"
-
-    # Add overview
-    author = sorted_results[0].author if sorted_results else "Unknown"
-    start_date = sorted_results[0].date.strftime("%Y-%m-%d") if sorted_results else "Unknown"
-    end_date = sorted_results[-1].date.strftime("%Y-%m-%d") if sorted_results else "Unknown"
-
-    markdown += f"## Overview\n\n"
-    markdown += f"- **Developer**: {author}\n"
-    markdown += f"- **Time Range**: {start_date} to {end_date}\n"
-    markdown += f"- **Files Evaluated**: {len(sorted_results)}\n\n"
-
-    # 计算平均分
-    total_scores = {
-        "readability": 0,
-        "efficiency": 0,
-        "security": 0,
-        "structure": 0,
-        "error_handling": 0,
-        "documentation": 0,
-        "code_style": 0,
-        "overall_score": 0,
-        "estimated_hours": 0,
-    }
-
-    for result in sorted_results:
-        eval = result.evaluation
-        total_scores["readability"] += eval.readability
-        total_scores["efficiency"] += eval.efficiency
-        total_scores["security"] += eval.security
-        total_scores["structure"] += eval.structure
-        total_scores["error_handling"] += eval.error_handling
-        total_scores["documentation"] += eval.documentation
-        total_scores["code_style"] += eval.code_style
-        total_scores["overall_score"] += eval.overall_score
-
-        # Add estimated hours if available
-        if hasattr(eval, 'estimated_hours') and eval.estimated_hours:
-            total_scores["estimated_hours"] += eval.estimated_hours
-
-    avg_scores = {k: v / len(sorted_results) for k, v in total_scores.items()}
-    # Add trend analysis
     markdown += "## Overview\n\n"
-    markdown += f"- **Developer**: {author}\n"
+    if len(summary["authors"]) > 1:
+        markdown += f"- **Developers**: {len(summary['authors'])}\n"
+    else:
+        markdown += f"- **Developer**: {author}\n"
     markdown += f"- **Time Range**: {start_date} to {end_date}\n"
-    markdown += f"- **Files Evaluated**: {len(sorted_results)}\n"
+    markdown += f"- **Files Evaluated**: {summary['count']}\n"
 
     # Add total estimated working hours if available
-    if total_scores["estimated_hours"] > 0:
-        markdown += f"- **Total Estimated Working Hours**: {total_scores['estimated_hours']:.1f} hours\n"
+    if total_hours > 0:
+        markdown += f"- **Total Estimated Working Hours**: {total_hours:.1f} hours\n"
         markdown += f"- **Average Estimated Hours per File**: {avg_scores['estimated_hours']:.1f} hours\n"
 
     markdown += "\n"
@@ -2977,29 +2633,41 @@ def generate_evaluation_markdown(evaluation_results: List[FileEvaluationResult])
     markdown += "\n"
 
     # Add quality assessment
-    overall_score = avg_scores["overall_score"]
-    quality_level = ""
-    if overall_score >= 9.0:
-        quality_level = "Exceptional"
-    elif overall_score >= 7.0:
-        quality_level = "Excellent"
-    elif overall_score >= 5.0:
-        quality_level = "Good"
-    elif overall_score >= 3.0:
-        quality_level = "Needs Improvement"
-    else:
-        quality_level = "Poor"
-
-    markdown += f"**Overall Code Quality**: {quality_level}\n\n"
+    markdown += f"**Overall Code Quality**: {_quality_level(avg_scores['overall_score'])}\n\n"
+
+    # 按天的评分趋势
+    if len(summary["daily"]) > 1:
+        markdown += "## Daily Trend\n\n"
+        markdown += "| Date | Files | Average Score | Estimated Hours |\n"
+        markdown += "|------|-------|---------------|-----------------|\n"
+        for day in summary["daily"]:
+            markdown += (
+                f"| {day['date'].strftime('%Y-%m-%d')} | {day['files']} | {day['overall_score']:.1f} "
+                f"| {day['estimated_hours']:.1f} |\n"
+            )
+        markdown += "\n"
+
+    # 多位作者时列出每位作者的统计
+    if len(summary["authors"]) > 1:
+        markdown += "## Authors\n\n"
+        markdown += "| Author | Files | Average Score | Estimated Hours |\n"
+        markdown += "|--------|-------|---------------|-----------------|\n"
+        for item in summary["authors"]:
+            markdown += (
+                f"| {item['author']} | {item['files']} | {item['overall_score']:.1f} "
+                f"| {item['estimated_hours']:.1f} |\n"
+            )
+        markdown += "\n"
 
     # 添加各文件评价详情
     markdown += "## 文件评价详情\n\n"
+    yield markdown
 
     for idx, result in enumerate(sorted_results, 1):
-        markdown += f"### {idx}. {result.file_path}\n\n"
+        markdown = f"### {idx}. {result.file_path}\n\n"
         markdown += f"- **Commit**: {result.commit_hash[:8]} - {result.commit_message}\n"
         markdown += f"- **Date**: {result.date.strftime('%Y-%m-%d %H:%M')}\n"
-        markdown += f"- **Scores**:\n\n"
+        markdown += "- **Scores**:\n\n"
         eval = result.evaluation
         markdown += "| Dimension | Score |\n"
         markdown += "|----------|------|\n"
@@ -3013,11 +2681,26 @@ def generate_evaluation_markdown(evaluation_results: List[FileEvaluationResult])
         markdown += f"| **Overall Score** | **{eval.overall_score:.1f}** |\n"
 
         # Add estimated working hours if available
-        if hasattr(eval, 'estimated_hours') and eval.estimated_hours:
+        if eval.estimated_hours:
             markdown += f"| **Estimated Working Hours** | **{eval.estimated_hours:.1f}** |\n"
 
         markdown += "\n**Comments**:\n\n"
         markdown += f"{eval.comments}\n\n"
         markdown += "---\n\n"
+        yield markdown
+
+
+def generate_evaluation_markdown(evaluation_results: List[FileEvaluationResult]) -> str:
+    """
+    生成评价结果的Markdown表格
+
+    Args:
+        evaluation_results: 文件评价结果列表
 
-    return markdown
\ No newline at end of file
+    Returns:
+        str: Markdown格式的评价表格
+    """
+    # 按日期排序结果
+    sorted_results = sorted(evaluation_results, key=lambda x: x.date)
+    summary = summarize_columns(columns_from_results(sorted_results))
+    return "".join(iter_evaluation_markdown(summary, sorted_results))
@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Mapping, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_FETCH_WORKERS = 8
+
+
+def _header(headers: Mapping[str, Any], *names: str) -> Optional[str]:
+    for name in names:
+        for key, value in headers.items():
+            if key.lower() == name.lower():
+                return value
+    return None
+
+
+class RateLimitBackoff:
+    """在线程间共享的 API 速率限制退避状态
+
+    根据 GitHub（``X-RateLimit-*``）和 GitLab（``RateLimit-*``）的响应头以及
+    ``Retry-After`` 决定暂停到何时，所有工作线程在发起请求前都会等待暂停结束。
+    """
+
+    def __init__(self, min_remaining: int = 10, max_wait: float = 900.0, base_delay: float = 1.0):
+        """
+        初始化退避状态
+
+        Args:
+            min_remaining: 剩余请求数不超过该值时暂停到配额重置
+            max_wait: 单次暂停的最长时间（秒）
+            base_delay: 没有响应头可参考时的指数退避基础间隔（秒）
+        """
+        self.min_remaining = min_remaining
+        self.max_wait = max_wait
+        self.base_delay = base_delay
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """阻塞直到暂停结束"""
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.time()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def pause_until(self, resume_at: float):
+        """暂停所有请求直到指定时间（epoch 秒）"""
+        resume_at = min(resume_at, time.time() + self.max_wait)
+        with self._lock:
+            if resume_at > self._resume_at:
+                self._resume_at = resume_at
+                logger.warning(f"API rate limit reached, pausing requests for {resume_at - time.time():.1f}s")
+
+    def observe(self, remaining: Optional[int], reset_at: Optional[float]):
+        """根据剩余配额和重置时间决定是否暂停"""
+        if remaining is not None and reset_at and remaining <= self.min_remaining:
+            self.pause_until(reset_at)
+
+    def observe_headers(self, headers: Mapping[str, Any]):
+        """根据响应头更新退避状态"""
+        retry_after = _header(headers, "Retry-After")
+        if retry_after is not None:
+            try:
+                self.pause_until(time.time() + float(retry_after))
+                return
+            except ValueError:
+                pass
+
+        remaining = _header(headers, "X-RateLimit-Remaining", "RateLimit-Remaining")
+        reset_at = _header(headers, "X-RateLimit-Reset", "RateLimit-Reset")
+        try:
+            self.observe(
+                int(remaining) if remaining is not None else None,
+                float(reset_at) if reset_at is not None else None,
+            )
+        except ValueError:
+            pass
+
+    def backoff(self, attempt: int, headers: Optional[Mapping[str, Any]] = None):
+        """请求被限流后暂停，优先使用响应头，否则按指数退避"""
+        before = self._resume_at
+        if headers:
+            self.observe_headers(headers)
+        if self._resume_at <= max(before, time.time()):
+            self.pause_until(time.time() + self.base_delay * (2 ** attempt))
+
+    def install_response_hook(self, session: Any):
+        """在 requests 会话上注册钩子，从每个响应头读取剩余配额"""
+        def hook(response, *args, **kwargs):
+            self.observe_headers(response.headers)
+
+        hooks = getattr(session, "hooks", None)
+        if hooks is not None:
+            hooks.setdefault("response", []).append(hook)
+
+
+def rate_limit_headers(error: Exception) -> Optional[Mapping[str, Any]]:
+    """如果异常表示请求被限流，返回其响应头（可能为空），否则返回 None"""
+    status = getattr(error, "status", None) or getattr(error, "response_code", None)
+    headers = getattr(error, "headers", None) or {}
+    if status == 429:
+        return headers
+    if status == 403 and (
+        _header(headers, "X-RateLimit-Remaining", "RateLimit-Remaining") == "0"
+        or _header(headers, "Retry-After") is not None
+        or "rate limit" in str(error).lower()
+    ):
+        return headers
+    return None
+
+
+def fetch_concurrently(
+    items: Iterable[T],
+    fetch: Callable[[T], R],
+    max_workers: int = DEFAULT_FETCH_WORKERS,
+    backoff: Optional[RateLimitBackoff] = None,
+    max_retries: int = 3,
+) -> List[R]:
+    """在线程池中并发执行 ``fetch``，结果顺序与 ``items`` 一致
+
+    被限流的请求会在退避后重试，最多 ``max_retries`` 次；其他异常直接抛出。
+    """
+    backoff = backoff or RateLimitBackoff()
+    items = list(items)
+    if not items:
+        return []
+
+    def run(item: T) -> R:
+        for attempt in range(max_retries + 1):
+            backoff.wait()
+            try:
+                return fetch(item)
+            except Exception as e:
+                headers = rate_limit_headers(e)
+                if headers is None or attempt == max_retries:
+                    raise
+                logger.warning(f"Rate limited while fetching, retrying (attempt {attempt + 1}/{max_retries})")
+                backoff.backoff(attempt, headers)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        return list(executor.map(run, items))
@@ -0,0 +1,185 @@
+from typing import List, Optional, Tuple
+
+from unidiff.constants import RE_HUNK_HEADER
+
+from codedog.models.diff import DiffContent
+from codedog.utils.tokenizer import Tokenizer, get_tokenizer
+
+
+def split_diff_hunks(diff: str) -> Tuple[str, List[str]]:
+    """split a single file diff into its file header and hunks
+
+    The header is everything before the first ``@@`` line (``diff --git``,
+    ``index``, ``---``/``+++``); each hunk starts with its ``@@`` line. Hunk
+    boundaries use the same header pattern as ``unidiff``.
+    """
+    header_lines: List[str] = []
+    hunks: List[List[str]] = []
+
+    for line in diff.split("\n"):
+        if RE_HUNK_HEADER.match(line):
+            hunks.append([line])
+        elif hunks:
+            hunks[-1].append(line)
+        else:
+            header_lines.append(line)
+
+    return "\n".join(header_lines), ["\n".join(hunk) for hunk in hunks]
+
+
+def _hunk_start(hunk_header: str) -> Tuple[int, int, str]:
+    match = RE_HUNK_HEADER.match(hunk_header)
+    return int(match.group(1)), int(match.group(3)), match.group(5)
+
+
+def _format_hunk_header(
+    source_start: int, source_length: int, target_start: int, target_length: int, section: str
+) -> str:
+    header = f"@@ -{source_start},{source_length} +{target_start},{target_length} @@"
+    if section:
+        header += f" {section}"
+    return header
+
+
+def _split_hunk(hunk: str, budget: int, tokenizer: Tokenizer) -> List[str]:
+    """split an oversized hunk into line groups, each with a recomputed ``@@`` header"""
+    hunk_lines = hunk.split("\n")
+    source_line, target_line, section = _hunk_start(hunk_lines[0])
+    body = hunk_lines[1:]
+    line_tokens = [count + 1 for count in tokenizer.count_batch(body)]
+    # the widest header any piece can get: last line numbers and full hunk length
+    widest = _format_hunk_header(source_line + len(body), len(body), target_line + len(body), len(body), section)
+    budget = max(1, budget - tokenizer.count(widest) - 1)
+
+    pieces = []
+    current: List[str] = []
+    current_tokens = 0
+    source_start, target_start = source_line, target_line
+    source_length = target_length = 0
+
+    def flush():
+        if current:
+            header = _format_hunk_header(source_start, source_length, target_start, target_length, section)
+            pieces.append("\n".join([header] + current))
+
+    for line, tokens in zip(body, line_tokens):
+        if current and current_tokens + tokens > budget:
+            flush()
+            current = []
+            current_tokens = 0
+            source_start, target_start = source_line, target_line
+            source_length = target_length = 0
+
+        current.append(line)
+        current_tokens += tokens
+
+        if line.startswith("-"):
+            source_line += 1
+            source_length += 1
+        elif line.startswith("+"):
+            target_line += 1
+            target_length += 1
+        elif not line.startswith("\\"):
+            source_line += 1
+            target_line += 1
+            source_length += 1
+            target_length += 1
+
+        if tokens > budget:
+            # a single line longer than the budget is split on token boundaries,
+            # every fragment keeps the line's +/- marker under the same header
+            marker = line[:1]
+            header = _format_hunk_header(source_start, source_length, target_start, target_length, section)
+            for fragment in tokenizer.split(line[1:], budget):
+                pieces.append(f"{header}\n{marker}{fragment}")
+            current = []
+            current_tokens = 0
+            source_start, target_start = source_line, target_line
+            source_length = target_length = 0
+
+    flush()
+    return pieces
+
+
+def chunk_hunks(
+    header: str,
+    hunks: List[str],
+    max_tokens: int,
+    tokenizer: Optional[Tokenizer] = None,
+) -> List[str]:
+    """pack whole hunks into chunks of at most ``max_tokens`` tokens
+
+    Every chunk starts with the file header so the model always knows which
+    file it is looking at. Hunks are only split when a single hunk does not
+    fit, and the split parts get their own ``@@`` headers.
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    header_tokens = tokenizer.count(header) + 1 if header else 0
+    budget = max(1, max_tokens - header_tokens)
+
+    pieces: List[str] = []
+    for hunk, tokens in zip(hunks, tokenizer.count_batch(hunks)):
+        if tokens + 1 > budget:
+            pieces.extend(_split_hunk(hunk, budget, tokenizer))
+        else:
+            pieces.append(hunk)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece, tokens in zip(pieces, tokenizer.count_batch(pieces)):
+        tokens += 1
+        if current and current_tokens + tokens > budget:
+            chunks.append("\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+
+    if header:
+        return [f"{header}\n{chunk}" for chunk in chunks] or [header]
+    return chunks
+
+
+def chunk_diff(
+    diff: str,
+    max_tokens: int,
+    tokenizer: Optional[Tokenizer] = None,
+    file_path: Optional[str] = None,
+) -> List[str]:
+    """chunk a single file diff text by hunks
+
+    If the diff has no file header (e.g. a GitHub ``patch``) and ``file_path``
+    is given, a ``diff --git`` header is synthesized for every chunk.
+    """
+    tokenizer = tokenizer or get_tokenizer()
+    if tokenizer.fits(diff, max_tokens):
+        return [diff]
+
+    header, hunks = split_diff_hunks(diff)
+    if not hunks:
+        # not a unified diff (e.g. raw file content), fall back to token slices
+        return tokenizer.split(diff, max_tokens)
+
+    if not header.strip() and file_path:
+        header = f"diff --git a/{file_path} b/{file_path}"
+
+    return chunk_hunks(header, hunks, max_tokens, tokenizer)
+
+
+def chunk_diff_content(
+    diff_content: DiffContent,
+    name: str,
+    max_tokens: int,
+    tokenizer: Optional[Tokenizer] = None,
+) -> List[str]:
+    """chunk a ``DiffContent`` using its parsed ``diff_segments``"""
+    tokenizer = tokenizer or get_tokenizer()
+    if not diff_content.diff_segments or tokenizer.fits(diff_content.content, max_tokens):
+        return chunk_diff(diff_content.content, max_tokens, tokenizer, file_path=name)
+
+    header = f"--- a/{name}\n+++ b/{name}"
+    hunks = [segment.content.rstrip("\n") for segment in diff_content.diff_segments]
+    return chunk_hunks(header, hunks, max_tokens, tokenizer)
@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluationCache:
+    """基于 SQLite 的持久化评价缓存
+
+    以 diff 哈希 + 模型名称 + prompt 版本为键保存评价结果，支持 TTL 过期和
+    按最近访问时间的 LRU 容量淘汰。数据库启用 WAL 模式，多个进程可以共享同一个
+    缓存文件，例如每晚运行的 ``run_codedog.py eval`` 任务。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: Optional[float] = 30 * 24 * 3600,
+        max_entries: Optional[int] = 100000,
+    ):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite 数据库文件路径
+            ttl_seconds: 缓存条目的存活时间（秒），None 表示永不过期
+            max_entries: 最大缓存条目数，超出后淘汰最久未访问的条目，None 表示不限制
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS evaluations (
+                diff_hash TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (diff_hash, model_name, prompt_version)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_evaluations_last_access ON evaluations (last_access)")
+        self._conn.commit()
+
+        self.purge_expired()
+
+    def get(self, diff_hash: str, model_name: str, prompt_version: str) -> Optional[Dict[str, Any]]:
+        """获取缓存的评价结果，未命中或已过期时返回 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM evaluations "
+                "WHERE diff_hash = ? AND model_name = ? AND prompt_version = ?",
+                (diff_hash, model_name, prompt_version),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            result, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute(
+                    "DELETE FROM evaluations WHERE diff_hash = ? AND model_name = ? AND prompt_version = ?",
+                    (diff_hash, model_name, prompt_version),
+                )
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE evaluations SET last_access = ? "
+                "WHERE diff_hash = ? AND model_name = ? AND prompt_version = ?",
+                (now, diff_hash, model_name, prompt_version),
+            )
+            self._conn.commit()
+
+        self.hits += 1
+        return json.loads(result)
+
+    def set(self, diff_hash: str, model_name: str, prompt_version: str, result: Dict[str, Any]):
+        """写入评价结果，并在超出容量时淘汰最久未访问的条目"""
+        now = time.time()
+        payload = json.dumps(result, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO evaluations "
+                "(diff_hash, model_name, prompt_version, result, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (diff_hash, model_name, prompt_version, payload, now, now),
+            )
+
+            if self.max_entries is not None:
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM evaluations WHERE rowid IN "
+                        "(SELECT rowid FROM evaluations ORDER BY last_access ASC LIMIT ?)",
+                        (overflow,),
+                    )
+                    logger.info(f"Evicted {overflow} least recently used entries from evaluation cache")
+
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """删除所有过期条目，返回删除的条目数"""
+        if self.ttl_seconds is None:
+            return 0
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM evaluations WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            self._conn.commit()
+
+        if cursor.rowcount:
+            logger.info(f"Purged {cursor.rowcount} expired entries from evaluation cache")
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {
+            "path": self.path,
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from langchain_core.callbacks.manager import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from codedog.utils.tokenizer import get_tokenizer
+
+
+class FakeRateLimitError(Exception):
+    """模拟服务端返回 429 的异常，消息格式与 OpenAI/DeepSeek 客户端一致"""
+
+    status = 429
+
+    def __init__(self, retry_after: float = 1.0):
+        self.headers = {"Retry-After": str(retry_after)}
+        super().__init__("Error code: 429 - Rate limit reached: too many requests, please retry later")
+
+
+class FakeModelError(Exception):
+    """模拟服务端内部错误"""
+
+    status = 500
+
+    def __init__(self):
+        super().__init__("Error code: 500 - The server had an error while processing your request")
+
+
+def _prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(str(message.content) for message in messages)
+
+
+def default_response(prompt: str, rng: random.Random) -> str:
+    """根据 prompt 的类型生成确定性的响应
+
+    - 代码评价 prompt（要求返回评分 JSON）返回 ``CodeEvaluation`` 格式的 JSON
+    - PR 总结 prompt（要求返回 ``pr_type``）返回 ``PRSummary`` 格式的 JSON
+    - 其他 prompt 返回一段纯文本
+    """
+    if '"readability"' in prompt and '"overall_score"' in prompt:
+        scores = {
+            field: rng.randint(5, 9)
+            for field in [
+                "readability", "efficiency", "security", "structure",
+                "error_handling", "documentation", "code_style",
+            ]
+        }
+        scores["overall_score"] = round(sum(scores.values()) / len(scores), 1)
+        scores["estimated_hours"] = round(rng.uniform(0.5, 4.0), 1)
+        scores["comments"] = "Fake evaluation: the change is consistent with the surrounding code."
+        return "```json\n" + json.dumps(scores, indent=2) + "\n```"
+
+    if "pr_type" in prompt:
+        summary = {
+            "overview": "Fake summary of the pull request.",
+            "pr_type": rng.choice(["feature", "fix", "refactor"]),
+            "major_files": [],
+        }
+        return "```json\n" + json.dumps(summary) + "\n```"
+
+    return "Fake review: no blocking issues found in this change."
+
+
+class FakeChatModel(BaseChatModel):
+    """用于基准测试和单元测试的确定性聊天模型，不发起任何网络请求
+
+    可配置响应延迟、响应长度以及错误和 429 限流的注入比例。随机数由 ``seed``、
+    prompt 内容和该 prompt 的第几次调用共同决定，因此并发调度顺序不同也会得到
+    相同的响应和相同的错误注入结果。
+    """
+
+    model_name: str = "fake-chat-model"
+    latency: float = 0.0  # 每次调用的基础延迟（秒）
+    latency_per_token: float = 0.0  # 每个输出 token 追加的延迟（秒）
+    jitter: float = 0.0  # 延迟的随机浮动比例，0.1 表示 ±10%
+    completion_tokens: Optional[int] = None  # 将响应填充到大约该 token 数，None 表示不填充
+    error_rate: float = 0.0  # 抛出服务端错误的概率
+    rate_limit_rate: float = 0.0  # 抛出 429 限流错误的概率
+    retry_after: float = 1.0  # 限流错误携带的 Retry-After（秒）
+    seed: int = 0
+    responder: Optional[Callable[[str, random.Random], str]] = None  # 自定义响应生成函数
+    stream_chunk_chars: int = 16  # 流式输出时每块的字符数
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _attempts: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _stats: Dict[str, Any] = PrivateAttr(default=None)
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.reset_stats()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def reset_stats(self):
+        """清空调用统计"""
+        with self._lock:
+            self._stats = {
+                "calls": 0,
+                "errors": 0,
+                "rate_limited": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "latencies": [],
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取调用统计，``latencies`` 为每次成功调用的延迟（秒）"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["latencies"] = list(self._stats["latencies"])
+        return stats
+
+    def _plan(self, messages: List[BaseMessage]):
+        """决定本次调用的响应、延迟和要抛出的错误"""
+        prompt = _prompt_text(messages)
+        key = hashlib.md5(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        rng = random.Random(f"{self.seed}:{key}:{attempt}")
+
+        roll = rng.random()
+        if roll < self.rate_limit_rate:
+            error = FakeRateLimitError(self.retry_after)
+        elif roll < self.rate_limit_rate + self.error_rate:
+            error = FakeModelError()
+        else:
+            error = None
+
+        responder = self.responder or default_response
+        text = responder(prompt, rng)
+        tokenizer = get_tokenizer()
+        completion_tokens = tokenizer.count(text)
+        if self.completion_tokens and completion_tokens < self.completion_tokens:
+            padding = " lorem" * (self.completion_tokens - completion_tokens)
+            text += "\n<!--" + padding + " -->"
+            completion_tokens = tokenizer.count(text)
+
+        delay = self.latency + self.latency_per_token * completion_tokens
+        if self.jitter:
+            delay *= 1 + rng.uniform(-self.jitter, self.jitter)
+
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["prompt_tokens"] += tokenizer.count(prompt)
+
+        return text, completion_tokens, max(delay, 0.0), error
+
+    def _finish(self, text: str, completion_tokens: int, started: float, error: Optional[Exception]) -> ChatResult:
+        with self._lock:
+            if isinstance(error, FakeRateLimitError):
+                self._stats["rate_limited"] += 1
+            elif error is not None:
+                self._stats["errors"] += 1
+            else:
+                self._stats["completion_tokens"] += completion_tokens
+                self._stats["latencies"].append(time.perf_counter() - started)
+        if error is not None:
+            raise error
+
+        generation = ChatGeneration(message=AIMessage(content=text))
+        return ChatResult(
+            generations=[generation],
+            llm_output={"token_usage": {"completion_tokens": completion_tokens}, "model_name": self.model_name},
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        started = time.perf_counter()
+        text, completion_tokens, delay, error = self._plan(messages)
+        time.sleep(delay)
+        return self._finish(text, completion_tokens, started, error)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        started = time.perf_counter()
+        text, completion_tokens, delay, error = self._plan(messages)
+        await asyncio.sleep(delay)
+        return self._finish(text, completion_tokens, started, error)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """分块输出响应：先等待 ``latency``，每块再按 ``latency_per_token`` 等待
+
+        调用方提前结束迭代时停止输出，``completion_tokens`` 只统计已输出的部分。
+        """
+        started = time.perf_counter()
+        text, _, delay, error = self._plan(messages)
+        tokenizer = get_tokenizer()
+        await asyncio.sleep(max(delay - self.latency_per_token * tokenizer.count(text), 0.0))
+        if error is not None:
+            self._finish(text, 0, started, error)
+
+        emitted = 0
+        try:
+            for i in range(0, len(text), max(1, self.stream_chunk_chars)):
+                piece = text[i:i + self.stream_chunk_chars]
+                tokens = tokenizer.count(piece)
+                await asyncio.sleep(self.latency_per_token * tokens)
+                emitted += tokens
+                yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+        finally:
+            self._finish(text, emitted, started, None)
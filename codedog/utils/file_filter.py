@@ -0,0 +1,224 @@
+import fnmatch
+import logging
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 默认跳过的路径，语义与 .gitattributes 相同：不含 "/" 的模式匹配任意目录下的文件名，
+# 以 "/" 结尾的模式匹配目录
+DEFAULT_SKIP_GLOBS: List[Tuple[str, str]] = [
+    # 依赖锁文件
+    *[(pattern, "lockfile") for pattern in [
+        "*.lock", "package-lock.json", "npm-shrinkwrap.json", "pnpm-lock.yaml", "go.sum",
+    ]],
+    # 压缩和构建产物
+    *[(pattern, "minified") for pattern in ["*.min.js", "*.min.css", "*.map", "*.bundle.js"]],
+    # 代码生成器的输出
+    *[(pattern, "generated") for pattern in [
+        "*_pb2.py", "*_pb2_grpc.py", "*.pb.go", "*.pb.cc", "*.pb.h", "*.pb.swift", "*.pb.ts",
+        "*.g.dart", "*.freezed.dart", "*.designer.cs", "*.generated.*", "*_generated.*",
+    ]],
+    # 测试快照
+    *[(pattern, "snapshot") for pattern in ["*.snap", "__snapshots__/"]],
+    # 第三方和打包目录
+    *[(pattern, "vendored") for pattern in [
+        "vendor/", "node_modules/", "third_party/", "bower_components/", "dist/", ".yarn/",
+    ]],
+]
+
+_GENERATED_HEADER = re.compile(
+    r"@generated|\bgenerated by\b|\bauto-?generated\b|\bdo not edit\b|\bdon't edit\b", re.IGNORECASE
+)
+_COMMENT_PREFIXES = ("#", "//", "/*", "*", "<!--", "--", ";", '"""', "'''")
+# 从文件第一行开始的 hunk（新文件或改动了文件头）
+_FIRST_HUNK_AT_TOP = re.compile(r"^@@ -\d+(?:,\d+)? \+1(?:,\d+)? @@")
+_BASE64_LINE = re.compile(r"^[A-Za-z0-9+/]{76,}={0,2}$")
+_DATA_URI = re.compile(r"data:[\w/+.-]+;base64,[A-Za-z0-9+/=]{200,}")
+
+# gitattributes 中表示生成或第三方文件的属性
+_LINGUIST_ATTRIBUTES = {"linguist-generated": "generated", "linguist-vendored": "vendored"}
+
+
+def _match_glob(path: str, pattern: str) -> bool:
+    """按 .gitattributes 的规则匹配路径
+
+    不含 "/" 的模式匹配任意一级的文件名（目录模式匹配任意一级目录名），以 "/" 开头或
+    中间含 "/" 的模式相对仓库根目录匹配，以 "**/" 开头的模式可以从任意一级开始匹配。
+    """
+    parts = path.replace("\\", "/").lstrip("/").split("/")
+    any_depth = pattern.startswith("**/")
+    pattern = pattern[3:] if any_depth else pattern
+    anchored = "/" in pattern.rstrip("/")
+    directory_only = pattern.endswith("/") or pattern.endswith("/**")
+    body = (pattern[:-3] if pattern.endswith("/**") else pattern.rstrip("/")).lstrip("/")
+
+    if directory_only:
+        parts = parts[:-1]
+    if not anchored:
+        return any(fnmatch.fnmatchcase(part, body) for part in (parts if directory_only else parts[-1:]))
+
+    starts = range(len(parts)) if any_depth else [0]
+    if directory_only:
+        candidates = ["/".join(parts[start:end]) for start in starts for end in range(start + 1, len(parts) + 1)]
+    else:
+        candidates = ["/".join(parts[start:]) for start in starts]
+    return any(fnmatch.fnmatchcase(candidate, body) for candidate in candidates)
+
+
+def parse_gitattributes(text: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    从 .gitattributes 内容中提取 linguist-generated / linguist-vendored 规则
+
+    Returns:
+        List[Tuple[str, Optional[str]]]: (模式, 跳过原因) 列表，原因为 None 表示显式取消
+            （``-linguist-generated`` 或 ``linguist-generated=false``）
+    """
+    rules = []
+    for line in text.splitlines():
+        fields = line.split()
+        if not fields or fields[0].startswith("#"):
+            continue
+        pattern, attributes = fields[0], fields[1:]
+        for attribute in attributes:
+            unset = attribute.startswith(("-", "!"))
+            name, _, value = attribute.lstrip("-!").partition("=")
+            if name not in _LINGUIST_ATTRIBUTES:
+                continue
+            skip = not unset and value.lower() not in ("false", "0")
+            rules.append((pattern, _LINGUIST_ATTRIBUTES[name] if skip else None))
+    return rules
+
+
+def _added_lines(diff: str) -> List[str]:
+    return [line[1:] for line in diff.split("\n") if line.startswith("+") and not line.startswith("+++")]
+
+
+class FileFilter:
+    """在调用模型之前跳过生成文件、第三方文件和锁文件的预过滤器
+
+    依次检查：
+
+    - 路径：默认规则（锁文件、压缩文件、protobuf 等生成代码、快照、vendor 目录）和
+      仓库 .gitattributes 中的 ``linguist-generated`` / ``linguist-vendored``，后出现的规则优先；
+    - 大小：diff 超过 ``max_diff_bytes``；
+    - 内容：压缩代码（超长行）、"generated by" / "@generated" 文件头、大段 base64 数据。
+
+    ``skipped`` 按原因统计被跳过的文件数。对象只包含普通属性，可以传给解析 diff 的子进程。
+    """
+
+    def __init__(
+        self,
+        rules: Optional[Iterable[Tuple[str, Optional[str]]]] = None,
+        max_diff_bytes: Optional[int] = 256 * 1024,
+        max_line_length: int = 1000,
+        header_lines: int = 20,
+        check_content: bool = True,
+    ):
+        """
+        初始化过滤器
+
+        Args:
+            rules: (路径模式, 跳过原因) 规则列表，原因为 None 的规则表示保留匹配的文件；默认 ``DEFAULT_SKIP_GLOBS``
+            max_diff_bytes: diff 大小上限（字节），None 表示不限制
+            max_line_length: 新增行超过该长度且平均行长超过其五分之一时视为压缩代码
+            header_lines: 检查生成文件标记的新增行数
+            check_content: 是否检查 diff 内容，False 时只按路径和大小过滤
+        """
+        self.rules: List[Tuple[str, Optional[str]]] = list(DEFAULT_SKIP_GLOBS if rules is None else rules)
+        self.max_diff_bytes = max_diff_bytes
+        self.max_line_length = max_line_length
+        self.header_lines = header_lines
+        self.check_content = check_content
+        self.skipped: Counter = Counter()
+
+    @classmethod
+    def from_repo(cls, repo_path: Optional[str] = None, **kwargs) -> "FileFilter":
+        """创建过滤器，并追加本地仓库根目录 .gitattributes 中的规则"""
+        file_filter = cls(**kwargs)
+        path = os.path.join(repo_path or os.getcwd(), ".gitattributes")
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                file_filter.rules.extend(parse_gitattributes(f.read()))
+        return file_filter
+
+    def path_skip_reason(self, path: str) -> Optional[str]:
+        """只根据路径判断是否跳过，返回原因；不跳过时返回 None"""
+        reason = None
+        for pattern, rule_reason in self.rules:
+            if _match_glob(path, pattern):
+                reason = rule_reason
+        return reason
+
+    def content_skip_reason(self, diff: str) -> Optional[str]:
+        """根据 diff 的大小和内容判断是否跳过，返回原因；不跳过时返回 None"""
+        if self.max_diff_bytes is not None and len(diff.encode("utf-8", errors="replace")) > self.max_diff_bytes:
+            return "too large"
+        if not self.check_content:
+            return None
+
+        added = _added_lines(diff)
+        if not added:
+            return None
+
+        lengths = [len(line) for line in added]
+        if max(lengths) > self.max_line_length and sum(lengths) / len(lengths) > self.max_line_length / 5:
+            return "minified"
+
+        if self._has_generated_header(diff, added):
+            return "generated"
+
+        base64_chars = sum(len(line) for line in added if _BASE64_LINE.match(line.strip()))
+        if (base64_chars and base64_chars * 2 > sum(lengths)) or _DATA_URI.search(diff):
+            return "base64"
+        return None
+
+    def _has_generated_header(self, diff: str, added: List[str]) -> bool:
+        """文件头（从第一行开始的 hunk 的前几行新增注释）中是否有生成文件标记"""
+        first_hunk = re.search(r"^@@.*$", diff, re.MULTILINE)
+        if first_hunk is None or not _FIRST_HUNK_AT_TOP.match(first_hunk.group(0)):
+            return False
+        return any(
+            line.strip().startswith(_COMMENT_PREFIXES) and _GENERATED_HEADER.search(line)
+            for line in added[:self.header_lines]
+        )
+
+    def skip_reason(self, path: str, diff: Optional[str] = None) -> Optional[str]:
+        """判断文件是否跳过，返回原因；不跳过时返回 None"""
+        reason = self.path_skip_reason(path)
+        if reason is None and diff:
+            reason = self.content_skip_reason(diff)
+        if reason is not None:
+            self.skipped[reason] += 1
+            logger.debug(f"Skipping {path}: {reason}")
+        return reason
+
+    def filter_file_diffs(self, file_diffs: Dict[str, T]) -> Dict[str, T]:
+        """
+        过滤 {file_path: diff} 映射
+
+        diff 可以是文本，也可以是带 ``diff`` 字段的字典（如 ``get_commit_diff`` 的结果）。
+        """
+        kept = {}
+        for path, value in file_diffs.items():
+            diff = value.get("diff", "") if isinstance(value, dict) else value
+            if self.skip_reason(path, diff) is None:
+                kept[path] = value
+        return kept
+
+    def filter_commit_file_diffs(self, commit_file_diffs: Dict[str, Dict[str, T]]) -> Dict[str, Dict[str, T]]:
+        """过滤 {commit_hash: {file_path: diff}} 映射，去掉过滤后没有文件的提交"""
+        filtered = {}
+        for commit_hash, file_diffs in commit_file_diffs.items():
+            kept = self.filter_file_diffs(file_diffs)
+            if kept:
+                filtered[commit_hash] = kept
+        return filtered
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取按原因统计的跳过文件数"""
+        return {"skipped": sum(self.skipped.values()), "by_reason": dict(self.skipped)}
@@ -0,0 +1,480 @@
+import os
+import re
+import stat
+import subprocess
+import tempfile
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# 流式 git log 中每个提交头部的前缀，NUL 字符不会出现在文本 diff 中
+# （命令行参数不能包含 NUL，因此格式串中使用 git 的 %x00 转义）
+COMMIT_HEADER_PREFIX = "\x00"
+COMMIT_HEADER_FORMAT = "%x00%H|%an|%ae|%aI|%s"
+
+# 一个未解析的提交：(头部 "hash|author|email|date|subject", numstat 文件列表, 补丁文本)
+CommitBlock = Tuple[str, List[str], str]
+
+AuthorFilter = Union[str, Sequence[str], None]
+
+DEFAULT_GIT_BACKEND = "subprocess"
+
+
+class GitBackendError(RuntimeError):
+    """git 查询失败（命令以非零状态退出、提交不存在等）"""
+
+    def __init__(self, message: str, stderr: str = ""):
+        super().__init__(message)
+        self.stderr = stderr
+
+
+class GitBackend(ABC):
+    """本地 git 仓库的查询接口
+
+    所有后端产出相同格式的 ``CommitBlock``，``git_log_analyzer`` 在此之上做统计、
+    过滤和按文件拆分 diff，因此切换后端不影响后续处理。
+    """
+
+    name = ""
+
+    def __init__(self, repo_path: Optional[str] = None):
+        self.repo_path = repo_path or os.getcwd()
+
+    @abstractmethod
+    def iter_commit_blocks(self, author: AuthorFilter, start_date: str, end_date: str) -> Iterator[CommitBlock]:
+        """
+        按提交时间从新到旧产出指定作者在指定时间段内的提交（合并提交不含 diff，与 ``git log -p`` 一致）
+
+        Args:
+            author: 作者名或邮箱；字符串按 ``git log --author`` 的正则匹配，列表按不区分大小写的
+                子串匹配任一作者，None 或空列表表示所有作者
+            start_date: 开始日期，格式：YYYY-MM-DD
+            end_date: 结束日期，格式：YYYY-MM-DD
+
+        Raises:
+            GitBackendError: 查询失败
+        """
+
+    @abstractmethod
+    def commit_block(self, commit_hash: str) -> CommitBlock:
+        """返回单个提交的 ``CommitBlock``，相当于 ``git log -1 -M --numstat -p``"""
+
+    @abstractmethod
+    def commit_files(self, commit_hash: str) -> List[str]:
+        """返回提交修改的文件列表，相当于 ``git diff-tree --root -r --name-only``"""
+
+    @abstractmethod
+    def commit_message(self, commit_hash: str) -> str:
+        """返回完整的提交信息"""
+
+    @abstractmethod
+    def commit_author(self, commit_hash: str) -> str:
+        """返回 ``"name <email>"`` 形式的作者"""
+
+
+_NUMSTAT_RENAME = re.compile(r"\{([^{}]*) => ([^{}]*)\}")
+
+
+def _numstat_path(path: str) -> str:
+    """重命名在 numstat 中写作 ``old => new`` 或 ``dir/{old => new}/file``，返回新路径"""
+    if " => " not in path:
+        return path
+    if _NUMSTAT_RENAME.search(path):
+        # 花括号的一侧为空时（移动到上级或子目录）会留下重复的 "/"
+        return _NUMSTAT_RENAME.sub(lambda m: m.group(2), path, count=1).replace("//", "/").lstrip("/")
+    return path.split(" => ", 1)[1]
+
+
+def _iter_log_blocks(cmd: List[str], cwd: str) -> Iterator[CommitBlock]:
+    """
+    运行以 ``COMMIT_HEADER_FORMAT`` 为格式、带 ``--numstat -p`` 的 git 命令，边读取 stdout 边按提交切分
+
+    内存中同一时刻只保留当前提交的补丁行，而不是整个输出。stderr 写入临时文件：
+    只在 stdout 读完后才读取，用管道时 git 的大量警告会写满管道缓冲区而互相等待。
+
+    Raises:
+        GitBackendError: git 以非零状态退出
+    """
+    stderr_file = tempfile.TemporaryFile()
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            cwd=cwd,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+    except OSError as e:
+        stderr_file.close()
+        raise GitBackendError(f"Failed to run {' '.join(cmd)}: {e}") from e
+
+    header = None
+    numstat_files: List[str] = []
+    diff_lines: List[str] = []
+    in_numstat = False
+
+    try:
+        for raw_line in process.stdout:
+            line = raw_line.rstrip("\n")
+
+            # 检测新提交的开始
+            if line.startswith(COMMIT_HEADER_PREFIX):
+                if header is not None:
+                    yield header, numstat_files, "\n".join(diff_lines)
+
+                header = line[len(COMMIT_HEADER_PREFIX):]
+                numstat_files = []
+                diff_lines = []
+                in_numstat = True
+                continue
+
+            if header is None:
+                continue
+
+            # 头部之后紧跟 numstat 行（added\tdeleted\tpath），以空行结束
+            if in_numstat:
+                if not line or line.startswith("diff --git"):
+                    in_numstat = False
+                else:
+                    parts = line.split("\t", 2)
+                    if len(parts) == 3:
+                        numstat_files.append(_numstat_path(parts[2]))
+                    continue
+
+            if line or diff_lines:
+                diff_lines.append(line)
+
+        if header is not None:
+            yield header, numstat_files, "\n".join(diff_lines)
+
+        returncode = process.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode("utf-8", "replace")
+        if returncode != 0:
+            raise GitBackendError(f"Command {' '.join(cmd)} returned non-zero exit status {returncode}", stderr)
+    finally:
+        # 调用方提前停止迭代时终止 git 进程
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        stderr_file.close()
+
+
+class SubprocessGitBackend(GitBackend):
+    """调用 ``git`` 命令行的后端（默认）"""
+
+    name = "subprocess"
+
+    def _run(self, *args: str) -> str:
+        try:
+            result = subprocess.run(
+                ["git", *args],
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                cwd=self.repo_path,
+                check=True,
+            )
+        except subprocess.CalledProcessError as e:
+            raise GitBackendError(str(e), e.stderr or "") from e
+        except OSError as e:
+            raise GitBackendError(f"Failed to run git: {e}") from e
+        return result.stdout
+
+    def iter_commit_blocks(self, author: AuthorFilter, start_date: str, end_date: str) -> Iterator[CommitBlock]:
+        if isinstance(author, str):
+            author_args = [f"--author={author}"]
+        elif author:
+            # 多个 --author 之间是"或"的关系，按固定字符串不区分大小写匹配，与 match_author 一致
+            author_args = ["--fixed-strings", "--regexp-ignore-case"] + [f"--author={a}" for a in author]
+        else:
+            author_args = []
+
+        cmd = [
+            "git", "log",
+            *author_args,
+            f"--after={start_date}",
+            f"--before={end_date}",
+            "-M",
+            "--numstat",
+            "-p",
+            f"--format=format:{COMMIT_HEADER_FORMAT}",
+        ]
+        return _iter_log_blocks(cmd, self.repo_path)
+
+    def commit_block(self, commit_hash: str) -> CommitBlock:
+        # git log -1 而不是 git show：合并提交不输出组合 diff，与 iter_commit_blocks 一致
+        cmd = [
+            "git", "log", "-1",
+            "-M",
+            "--numstat",
+            "-p",
+            f"--format=format:{COMMIT_HEADER_FORMAT}",
+            commit_hash,
+            "--",
+        ]
+        for block in _iter_log_blocks(cmd, self.repo_path):
+            return block
+        raise GitBackendError(f"Commit {commit_hash} not found")
+
+    def commit_files(self, commit_hash: str) -> List[str]:
+        output = self._run("diff-tree", "--root", "--no-commit-id", "--name-only", "-r", commit_hash)
+        return [f for f in output.split("\n") if f.strip()]
+
+    def commit_message(self, commit_hash: str) -> str:
+        return self._run("show", "-s", "--format=%B", commit_hash).strip()
+
+    def commit_author(self, commit_hash: str) -> str:
+        return self._run("show", "-s", "--format=%an <%ae>", commit_hash).strip()
+
+
+class DulwichGitBackend(GitBackend):
+    """用 dulwich 直接读取对象库的进程内后端
+
+    不再为每次查询启动 git 进程；解析过的树对象保存在 LRU 缓存中，
+    同一次运行中的多次查询（相邻提交共享的目录树）可以复用。
+    需要安装可选依赖 ``dulwich``（``pip install codedog[dulwich]``）。
+    """
+
+    name = "dulwich"
+
+    def __init__(self, repo_path: Optional[str] = None, tree_cache_size: int = 4096):
+        """
+        打开仓库
+
+        Args:
+            repo_path: Git仓库路径，默认为当前目录
+            tree_cache_size: 缓存的树对象数量上限
+        """
+        super().__init__(repo_path)
+        try:
+            from dulwich.errors import NotGitRepository
+            from dulwich.repo import Repo
+        except ImportError as e:
+            raise ImportError(
+                "The dulwich git backend requires the dulwich package, install it with `pip install codedog[dulwich]`"
+            ) from e
+
+        try:
+            self.repo = Repo(self.repo_path)
+        except NotGitRepository as e:
+            raise GitBackendError(f"Not a git repository: {self.repo_path}") from e
+        self.tree_cache_size = tree_cache_size
+        self._trees: "OrderedDict[bytes, Dict[bytes, Tuple[int, bytes]]]" = OrderedDict()
+
+    def _commit(self, commit_hash: Union[str, bytes]):
+        from dulwich.objects import Commit
+
+        sha = commit_hash.encode("ascii") if isinstance(commit_hash, str) else commit_hash
+        try:
+            if sha == b"HEAD":
+                sha = self.repo.head()
+            elif len(sha) < 40:
+                # 与 git 一样接受缩写的提交哈希
+                matches = [s for s in self.repo.object_store if s.startswith(sha)]
+                if len(matches) != 1:
+                    raise KeyError(commit_hash)
+                sha = matches[0]
+            commit = self.repo[sha]
+        except (KeyError, ValueError) as e:
+            raise GitBackendError(f"Commit {commit_hash} not found") from e
+        if not isinstance(commit, Commit):
+            raise GitBackendError(f"{commit_hash} is not a commit")
+        return commit
+
+    def _tree_entries(self, tree_id: Optional[bytes]) -> Dict[bytes, Tuple[int, bytes]]:
+        """返回树对象的 {name: (mode, sha)}，带 LRU 缓存"""
+        if tree_id is None:
+            return {}
+        entries = self._trees.get(tree_id)
+        if entries is not None:
+            self._trees.move_to_end(tree_id)
+            return entries
+
+        entries = {entry.path: (entry.mode, entry.sha) for entry in self.repo.object_store[tree_id].items()}
+        self._trees[tree_id] = entries
+        if len(self._trees) > self.tree_cache_size:
+            self._trees.popitem(last=False)
+        return entries
+
+    def _iter_tree_changes(
+        self,
+        old_tree: Optional[bytes],
+        new_tree: Optional[bytes],
+        prefix: bytes = b"",
+    ) -> Iterator[Tuple[bytes, Optional[Tuple[int, bytes]], Optional[Tuple[int, bytes]]]]:
+        """递归比较两棵树，按路径顺序产出 (path, 旧 (mode, sha), 新 (mode, sha))，不检测重命名"""
+        if old_tree == new_tree:
+            return
+        old = self._tree_entries(old_tree)
+        new = self._tree_entries(new_tree)
+
+        def sort_key(name: bytes) -> bytes:
+            # 与 git 的树排序一致，目录按 "name/" 比较
+            is_dir = any(entry is not None and stat.S_ISDIR(entry[0]) for entry in (old.get(name), new.get(name)))
+            return name + b"/" if is_dir else name
+
+        for name in sorted(old.keys() | new.keys(), key=sort_key):
+            old_entry = old.get(name)
+            new_entry = new.get(name)
+            if old_entry == new_entry:
+                continue
+
+            path = prefix + name
+            old_is_dir = old_entry is not None and stat.S_ISDIR(old_entry[0])
+            new_is_dir = new_entry is not None and stat.S_ISDIR(new_entry[0])
+            if old_is_dir or new_is_dir:
+                yield from self._iter_tree_changes(
+                    old_entry[1] if old_is_dir else None,
+                    new_entry[1] if new_is_dir else None,
+                    path + b"/",
+                )
+                # 文件和目录互相替换时，非目录的一侧单独作为删除或新增
+                if old_entry is not None and not old_is_dir:
+                    yield path, old_entry, None
+                if new_entry is not None and not new_is_dir:
+                    yield path, None, new_entry
+            else:
+                yield path, old_entry, new_entry
+
+    def _changes(self, commit):
+        if len(commit.parents) > 1:
+            # 与 git log -p / diff-tree 的默认行为一致，合并提交不输出 diff
+            return []
+        parent_tree = self._commit(commit.parents[0]).tree if commit.parents else None
+        return list(self._iter_tree_changes(parent_tree, commit.tree))
+
+    def _block(self, commit) -> CommitBlock:
+        from dulwich.patch import write_object_diff
+
+        changes = self._changes(commit)
+        renames = _exact_renames(changes)
+        renamed_from = set(renames.values())
+        buffer = BytesIO()
+        files = []
+        for path, old_entry, new_entry in changes:
+            if path in renamed_from:
+                continue
+            files.append(path.decode("utf-8", "replace"))
+            if path in renames:
+                # 内容未变的重命名与 git log -M 一样只输出文件头，不算作删除加新增
+                old_path = renames[path]
+                buffer.write(
+                    b"diff --git a/" + old_path + b" b/" + path + b"\nsimilarity index 100%\n"
+                    b"rename from " + old_path + b"\nrename to " + path + b"\n"
+                )
+                continue
+            old_file = (path, old_entry[0], old_entry[1]) if old_entry else (None, None, None)
+            new_file = (path, new_entry[0], new_entry[1]) if new_entry else (None, None, None)
+            write_object_diff(buffer, self.repo.object_store, old_file, new_file)
+
+        name, email = _split_identity(commit.author)
+        date = datetime.fromtimestamp(commit.author_time, timezone(timedelta(seconds=commit.author_timezone)))
+        subject = commit.message.decode("utf-8", "replace").split("\n", 1)[0]
+        header = f"{commit.id.decode('ascii')}|{name}|{email}|{date.isoformat()}|{subject}"
+        return header, files, buffer.getvalue().decode("utf-8", "replace").rstrip("\n")
+
+    def iter_commit_blocks(self, author: AuthorFilter, start_date: str, end_date: str) -> Iterator[CommitBlock]:
+        # 与 git log --after/--before 一样按提交者时间过滤；日期按本地时区的整天计算，包含 end_date 当天
+        since = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp())
+        until = int((datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).timestamp()) - 1
+        matches = _author_matcher(author)
+
+        try:
+            head = self.repo.head()
+        except KeyError:
+            # 空仓库没有提交
+            return
+        for entry in self.repo.get_walker(include=[head], since=since, until=until):
+            commit = entry.commit
+            if matches(commit.author.decode("utf-8", "replace")):
+                yield self._block(commit)
+
+    def commit_block(self, commit_hash: str) -> CommitBlock:
+        return self._block(self._commit(commit_hash))
+
+    def commit_files(self, commit_hash: str) -> List[str]:
+        return [path.decode("utf-8", "replace") for path, _, _ in self._changes(self._commit(commit_hash))]
+
+    def commit_message(self, commit_hash: str) -> str:
+        return self._commit(commit_hash).message.decode("utf-8", "replace").strip()
+
+    def commit_author(self, commit_hash: str) -> str:
+        name, email = _split_identity(self._commit(commit_hash).author)
+        return f"{name} <{email}>"
+
+
+def _exact_renames(
+    changes: List[Tuple[bytes, Optional[Tuple[int, bytes]], Optional[Tuple[int, bytes]]]],
+) -> Dict[bytes, bytes]:
+    """在删除和新增的文件之间配对内容和模式都相同的重命名，返回 {新路径: 旧路径}
+
+    只检测完全相同的内容；内容有修改的重命名仍作为删除加新增输出。
+    """
+    deleted: Dict[Tuple[int, bytes], List[bytes]] = {}
+    for path, old_entry, new_entry in changes:
+        if old_entry is not None and new_entry is None:
+            deleted.setdefault(old_entry, []).append(path)
+    renames = {}
+    for path, old_entry, new_entry in changes:
+        if old_entry is None and new_entry is not None and deleted.get(new_entry):
+            renames[path] = deleted[new_entry].pop(0)
+    return renames
+
+
+def _split_identity(identity: bytes) -> Tuple[str, str]:
+    """把 ``b"Name <email>"`` 拆分为 (name, email)"""
+    text = identity.decode("utf-8", "replace")
+    name, _, email = text.partition(" <")
+    return name, email.rstrip(">")
+
+
+def _author_matcher(author: AuthorFilter):
+    """返回与 ``git log --author`` 过滤语义一致的判断函数，参数为 ``"name <email>"``"""
+    if isinstance(author, str):
+        try:
+            pattern = re.compile(author)
+        except re.error:
+            pattern = re.compile(re.escape(author))
+        return lambda identity: pattern.search(identity) is not None
+    if author:
+        patterns = [a.lower() for a in author]
+        return lambda identity: any(p in identity.lower() for p in patterns)
+    return lambda identity: True
+
+
+GIT_BACKENDS = {
+    SubprocessGitBackend.name: SubprocessGitBackend,
+    DulwichGitBackend.name: DulwichGitBackend,
+}
+
+_backend_instances: Dict[Tuple[str, str], GitBackend] = {}
+
+
+def get_git_backend(repo_path: Optional[str] = None, backend: Optional[str] = None) -> GitBackend:
+    """
+    返回仓库的 git 后端，同一仓库和后端在进程内复用同一个实例（以便复用缓存）
+
+    Args:
+        repo_path: Git仓库路径，默认为当前目录
+        backend: 后端名称（``subprocess`` 或 ``dulwich``），默认为 CODEDOG_GIT_BACKEND 环境变量或 subprocess
+
+    Raises:
+        ValueError: 未知的后端名称
+        ImportError: 所选后端的可选依赖未安装
+    """
+    name = (backend or os.environ.get("CODEDOG_GIT_BACKEND") or DEFAULT_GIT_BACKEND).lower()
+    if name not in GIT_BACKENDS:
+        raise ValueError(f"Unknown git backend {name!r}, expected one of {', '.join(GIT_BACKENDS)}")
+
+    key = (name, os.path.abspath(repo_path or os.getcwd()))
+    instance = _backend_instances.get(key)
+    if instance is None:
+        instance = _backend_instances[key] = GIT_BACKENDS[name](key[1])
+    return instance
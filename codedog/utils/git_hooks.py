@@ -1,9 +1,10 @@
 import os
-import subprocess
 import sys
 from pathlib import Path
 from typing import List, Optional
 
+from codedog.utils.git_backend import GitBackendError, get_git_backend
+
 
 def install_git_hooks(repo_path: str) -> bool:
     """Install git hooks to trigger code reviews on commits.
@@ -50,80 +51,55 @@ python {codedog_path}/run_codedog_commit.py --commit $COMMIT_HASH --verbose
     return True
 
 
-def get_commit_files(commit_hash: str, repo_path: Optional[str] = None) -> List[str]:
+def get_commit_files(commit_hash: str, repo_path: Optional[str] = None, backend: Optional[str] = None) -> List[str]:
     """Get list of files changed in a specific commit.
 
     Args:
         commit_hash: The commit hash to check
         repo_path: Path to git repository (defaults to current directory)
+        backend: Git backend name (see ``get_git_backend``)
 
     Returns:
         List[str]: List of changed file paths
     """
-    cwd = repo_path or os.getcwd()
-
     try:
-        # Get list of files changed in the commit
-        result = subprocess.run(
-            ["git", "diff-tree", "--no-commit-id", "--name-only", "-r", commit_hash],
-            capture_output=True,
-            text=True,
-            cwd=cwd,
-            check=True,
-        )
-
-        # Return list of files (filtering empty lines)
-        files = [f for f in result.stdout.split("\n") if f.strip()]
-        return files
-
-    except subprocess.CalledProcessError as e:
+        return get_git_backend(repo_path, backend).commit_files(commit_hash)
+
+    except GitBackendError as e:
         print(f"Error getting files from commit {commit_hash}: {e}")
         print(f"Error output: {e.stderr}")
         return []
 
 
-def create_commit_pr_data(commit_hash: str, repo_path: Optional[str] = None) -> dict:
+def create_commit_pr_data(commit_hash: str, repo_path: Optional[str] = None, backend: Optional[str] = None) -> dict:
     """Create PR-like data structure from a commit for code review.
 
     Args:
         commit_hash: The commit hash to check
         repo_path: Path to git repository (defaults to current directory)
+        backend: Git backend name (see ``get_git_backend``)
 
     Returns:
         dict: PR-like data structure with commit info and files
     """
     cwd = repo_path or os.getcwd()
 
+    # Get repository name from path
+    repo_name = os.path.basename(os.path.abspath(cwd))
+
     try:
-        # Get commit info
-        commit_info = subprocess.run(
-            ["git", "show", "--pretty=format:%s%n%b", commit_hash],
-            capture_output=True,
-            text=True,
-            cwd=cwd,
-            check=True,
-        )
+        git = get_git_backend(cwd, backend)
 
         # Parse commit message
-        lines = commit_info.stdout.strip().split("\n")
-        title = lines[0] if lines else "Unknown commit"
-        body = "\n".join(lines[1:]) if len(lines) > 1 else ""
+        lines = git.commit_message(commit_hash).split("\n")
+        title = lines[0] if lines and lines[0] else "Unknown commit"
+        body = "\n".join(lines[1:]).strip() if len(lines) > 1 else ""
 
         # Get author information
-        author_info = subprocess.run(
-            ["git", "show", "--pretty=format:%an <%ae>", "-s", commit_hash],
-            capture_output=True,
-            text=True,
-            cwd=cwd,
-            check=True,
-        )
-        author = author_info.stdout.strip()
+        author = git.commit_author(commit_hash)
 
         # Get changed files
-        files = get_commit_files(commit_hash, repo_path)
-
-        # Get repository name from path
-        repo_name = os.path.basename(os.path.abspath(cwd))
+        files = git.commit_files(commit_hash)
 
         # Create PR-like structure
         pr_data = {
@@ -140,7 +116,7 @@ def create_commit_pr_data(commit_hash: str, repo_path: Optional[str] = None) ->
 
         return pr_data
 
-    except subprocess.CalledProcessError as e:
+    except GitBackendError as e:
         print(f"Error creating PR data from commit {commit_hash}: {e}")
         print(f"Error output: {e.stderr}")
         return {
@@ -153,4 +129,4 @@ def create_commit_pr_data(commit_hash: str, repo_path: Optional[str] = None) ->
             "commit_hash": commit_hash,
             "files": [],
             "is_commit_review": True,
-        }
\ No newline at end of file
+        }
@@ -1,9 +1,13 @@
 import os
 import re
-import subprocess
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Deque, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Any, Union
+
+from codedog.utils.file_filter import FileFilter
+from codedog.utils.git_backend import CommitBlock, GitBackendError, get_git_backend
 
 
 @dataclass
@@ -18,6 +22,135 @@ class CommitInfo:
     added_lines: int = 0  # 添加的代码行数
     deleted_lines: int = 0  # 删除的代码行数
     effective_lines: int = 0  # 有效代码行数（排除格式调整等）
+    author_email: str = ""  # 作者邮箱
+
+
+def _parse_commit_block(header: str, numstat_files: List[str], diff: str) -> CommitInfo:
+    """
+    将 git 后端产出的一个提交块解析为 CommitInfo
+
+    Args:
+        header: 提交头部（不含前缀），格式：hash|author|email|date|subject
+        numstat_files: --numstat 部分列出的文件路径
+        diff: 该提交的补丁文本
+
+    Returns:
+        CommitInfo: 提交信息
+    """
+    hash_val, author_name, author_email, date_str, message = header.split("|", 4)
+
+    # 计算代码量统计
+    added_lines, deleted_lines, effective_lines = calculate_code_stats(diff)
+
+    return CommitInfo(
+        hash=hash_val,
+        author=author_name,
+        date=datetime.fromisoformat(date_str),
+        message=message,
+        files=numstat_files,
+        diff=diff,
+        added_lines=added_lines,
+        deleted_lines=deleted_lines,
+        effective_lines=effective_lines,
+        author_email=author_email,
+    )
+
+
+def match_author(authors: Sequence[str], name: str, email: str = "") -> Optional[str]:
+    """
+    返回第一个与提交作者匹配的作者模式
+
+    匹配方式与远程仓库的作者过滤一致：作者名或邮箱中包含该模式（不区分大小写）。
+
+    Args:
+        authors: 作者名或邮箱模式列表，为空时不过滤
+        name: 提交作者名
+        email: 提交作者邮箱
+
+    Returns:
+        Optional[str]: 匹配的模式；authors 为空时返回作者名；都不匹配时返回None
+    """
+    if not authors:
+        return name
+    name = name.lower()
+    email = (email or "").lower()
+    for author in authors:
+        pattern = author.lower()
+        if pattern in name or (email and pattern in email):
+            return author
+    return None
+
+
+def partition_commits_by_author(
+    commits: Iterable[CommitInfo],
+    authors: Sequence[str] = (),
+) -> Dict[str, List[CommitInfo]]:
+    """
+    按作者模式对提交分组，每个提交只归入第一个匹配的模式
+
+    Args:
+        commits: 提交信息列表
+        authors: 作者名或邮箱模式列表，为空时按提交作者名分组
+
+    Returns:
+        Dict[str, List[CommitInfo]]: {作者: 提交列表}，按 authors 的顺序排列
+    """
+    partitions: Dict[str, List[CommitInfo]] = {author: [] for author in authors}
+    for commit in commits:
+        author = match_author(authors, commit.author, commit.author_email)
+        if author is not None:
+            partitions.setdefault(author, []).append(commit)
+    return partitions
+
+
+def iter_commits_by_author_and_timeframe(
+    author: Union[str, Sequence[str], None],
+    start_date: str,
+    end_date: str,
+    repo_path: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> Iterator[CommitInfo]:
+    """
+    以流式方式逐个产出指定作者在指定时间段内的提交
+
+    默认的 subprocess 后端只启动一个 ``git log -p --numstat`` 进程，边读取 stdout 边解析，
+    内存中同一时刻只保留当前提交的 diff，而不是整个历史。
+
+    Args:
+        author: 作者名或邮箱（部分匹配）；传入列表时返回任一作者的提交（不区分大小写），
+            None 或空列表表示所有作者
+        start_date: 开始日期，格式：YYYY-MM-DD
+        end_date: 结束日期，格式：YYYY-MM-DD
+        repo_path: Git仓库路径，默认为当前目录
+        backend: git 后端名称（见 ``get_git_backend``），默认为 CODEDOG_GIT_BACKEND 环境变量或 subprocess
+
+    Yields:
+        CommitInfo: 提交信息
+
+    Raises:
+        GitBackendError: git 查询失败
+    """
+    for header, numstat_files, diff in _iter_commit_blocks(author, start_date, end_date, repo_path, backend):
+        yield _parse_commit_block(header, numstat_files, diff)
+
+
+def _iter_commit_blocks(
+    author: Union[str, Sequence[str], None],
+    start_date: str,
+    end_date: str,
+    repo_path: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> Iterator[CommitBlock]:
+    """
+    从 git 后端流式读取提交，产出未解析的 (头部, numstat 文件列表, 补丁文本)
+
+    这里不做解析，diff 统计和按文件拆分留给 ``_parse_commit_block``，
+    以便在进程池中并行完成（见 ``get_file_diffs_by_timeframe``）。
+
+    Raises:
+        GitBackendError: git 查询失败
+    """
+    return get_git_backend(repo_path, backend).iter_commit_blocks(author, start_date, end_date)
 
 
 def get_commits_by_author_and_timeframe(
@@ -25,6 +158,7 @@ def get_commits_by_author_and_timeframe(
     start_date: str,
     end_date: str,
     repo_path: Optional[str] = None,
+    backend: Optional[str] = None,
 ) -> List[CommitInfo]:
     """
     获取指定作者在指定时间段内的所有提交
@@ -34,139 +168,99 @@ def get_commits_by_author_and_timeframe(
         start_date: 开始日期，格式：YYYY-MM-DD
         end_date: 结束日期，格式：YYYY-MM-DD
         repo_path: Git仓库路径，默认为当前目录
+        backend: git 后端名称（见 ``get_git_backend``）
 
     Returns:
         List[CommitInfo]: 提交信息列表
     """
-    cwd = repo_path or os.getcwd()
-
     try:
-        # 查询在指定时间段内指定作者的提交
-        cmd = [
-            "git", "log",
-            f"--author={author}",
-            f"--after={start_date}",
-            f"--before={end_date}",
-            "--format=%H|%an|%aI|%s"
-        ]
-
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=cwd,
-            check=True,
-        )
-
-        commits = []
-
-        # 解析结果
-        for line in result.stdout.strip().split("\n"):
-            if not line:
-                continue
-
-            hash_val, author_name, date_str, message = line.split("|", 3)
-
-            # 获取提交修改的文件列表
-            files_cmd = ["git", "diff-tree", "--no-commit-id", "--name-only", "-r", hash_val]
-            files_result = subprocess.run(
-                files_cmd,
-                capture_output=True,
-                text=True,
-                cwd=cwd,
-                check=True,
-            )
-            files = [f for f in files_result.stdout.strip().split("\n") if f]
-
-            # 获取完整diff
-            diff_cmd = ["git", "show", hash_val]
-            diff_result = subprocess.run(
-                diff_cmd,
-                capture_output=True,
-                text=True,
-                cwd=cwd,
-                check=True,
-            )
-            diff = diff_result.stdout
-
-            # 计算代码量统计
-            added_lines, deleted_lines, effective_lines = calculate_code_stats(diff)
-
-            commit_info = CommitInfo(
-                hash=hash_val,
-                author=author_name,
-                date=datetime.fromisoformat(date_str),
-                message=message,
-                files=files,
-                diff=diff,
-                added_lines=added_lines,
-                deleted_lines=deleted_lines,
-                effective_lines=effective_lines
-            )
-
-            commits.append(commit_info)
-
-        return commits
-
-    except subprocess.CalledProcessError as e:
+        return list(iter_commits_by_author_and_timeframe(author, start_date, end_date, repo_path, backend))
+    except GitBackendError as e:
         print(f"Error retrieving commits: {e}")
         print(f"Error output: {e.stderr}")
         return []
 
 
+def _filter_commit_files(
+    commit: CommitInfo,
+    include_extensions: Optional[List[str]] = None,
+    exclude_extensions: Optional[List[str]] = None,
+) -> Optional[CommitInfo]:
+    """
+    按扩展名过滤单个提交的文件
+
+    Args:
+        commit: 提交信息
+        include_extensions: 要包含的文件扩展名列表（例如['.py', '.js']）
+        exclude_extensions: 要排除的文件扩展名列表
+
+    Returns:
+        Optional[CommitInfo]: 只包含过滤后文件的提交；没有剩余文件时返回None
+    """
+    # 如果没有文件，跳过
+    if not commit.files:
+        return None
+
+    # 过滤文件
+    filtered_files = []
+    for file in commit.files:
+        _, ext = os.path.splitext(file)
+
+        if include_extensions and ext not in include_extensions:
+            continue
+
+        if exclude_extensions and ext in exclude_extensions:
+            continue
+
+        filtered_files.append(file)
+
+    # 如果过滤后还有文件，保留这个提交
+    if not filtered_files:
+        return None
+
+    # 创建一个新的CommitInfo对象，但只包含过滤后的文件
+    return CommitInfo(
+        hash=commit.hash,
+        author=commit.author,
+        date=commit.date,
+        message=commit.message,
+        files=filtered_files,
+        diff=commit.diff,  # 暂时保留完整diff，后续可能需要更精确地过滤
+        added_lines=commit.added_lines,
+        deleted_lines=commit.deleted_lines,
+        effective_lines=commit.effective_lines,
+        author_email=commit.author_email,
+    )
+
+
 def filter_code_files(
-    commits: List[CommitInfo],
+    commits: Iterable[CommitInfo],
     include_extensions: Optional[List[str]] = None,
     exclude_extensions: Optional[List[str]] = None,
+    file_filter: Optional[FileFilter] = None,
 ) -> List[CommitInfo]:
     """
     过滤提交，只保留修改了代码文件的提交
 
     Args:
-        commits: 提交信息列表
+        commits: 提交信息列表（或流式提交迭代器）
         include_extensions: 要包含的文件扩展名列表（例如['.py', '.js']）
         exclude_extensions: 要排除的文件扩展名列表
+        file_filter: 按路径跳过生成文件、第三方文件和锁文件的过滤器
 
     Returns:
         List[CommitInfo]: 过滤后的提交信息列表
     """
-    if not include_extensions and not exclude_extensions:
-        return commits
+    if not include_extensions and not exclude_extensions and file_filter is None:
+        return list(commits)
 
     filtered_commits = []
 
     for commit in commits:
-        # 如果没有文件，跳过
-        if not commit.files:
-            continue
-
-        # 过滤文件
-        filtered_files = []
-        for file in commit.files:
-            _, ext = os.path.splitext(file)
-
-            if include_extensions and ext not in include_extensions:
-                continue
-
-            if exclude_extensions and ext in exclude_extensions:
-                continue
-
-            filtered_files.append(file)
-
-        # 如果过滤后还有文件，保留这个提交
-        if filtered_files:
-            # 创建一个新的CommitInfo对象，但只包含过滤后的文件
-            filtered_commit = CommitInfo(
-                hash=commit.hash,
-                author=commit.author,
-                date=commit.date,
-                message=commit.message,
-                files=filtered_files,
-                diff=commit.diff,  # 暂时保留完整diff，后续可能需要更精确地过滤
-                added_lines=commit.added_lines,
-                deleted_lines=commit.deleted_lines,
-                effective_lines=commit.effective_lines
-            )
+        filtered_commit = _filter_commit_files(commit, include_extensions, exclude_extensions)
+        if filtered_commit and file_filter is not None:
+            filtered_commit.files = [f for f in filtered_commit.files if file_filter.skip_reason(f) is None]
+        if filtered_commit and filtered_commit.files:
             filtered_commits.append(filtered_commit)
 
     return filtered_commits
@@ -233,6 +327,7 @@ def extract_file_diffs(commit: CommitInfo) -> Dict[str, str]:
 
     current_file = None
     current_diff = []
+    rename_from = None
 
     for line in diff_lines:
         # 检测新文件的开始
@@ -244,6 +339,15 @@ def extract_file_diffs(commit: CommitInfo) -> Dict[str, str]:
             # 重置状态
             current_file = None
             current_diff = []
+            rename_from = None
+
+        # 重命名的文件以新路径为准，diff 从 "rename from" 行开始
+        elif current_file is None and line.startswith("rename from "):
+            rename_from = line
+        elif current_file is None and rename_from and line.startswith("rename to "):
+            if line[len("rename to "):] in commit.files:
+                current_file = line[len("rename to "):]
+                current_diff = [rename_from]
 
         # 找到文件名
         elif line.startswith("--- a/") or line.startswith("+++ b/"):
@@ -259,27 +363,113 @@ def extract_file_diffs(commit: CommitInfo) -> Dict[str, str]:
     if current_file and current_diff:
         file_diffs[current_file] = "\n".join(current_diff)
 
-    return file_diffs
+    # 内容未变的重命名没有需要评价的改动
+    return {
+        path: diff for path, diff in file_diffs.items()
+        if not diff.startswith("rename from ") or "\n+++ " in diff
+    }
+
+
+def _extract_commit_block(
+    block: Tuple[str, List[str], str],
+    include_extensions: Optional[List[str]] = None,
+    exclude_extensions: Optional[List[str]] = None,
+) -> Optional[Tuple[CommitInfo, Dict[str, str]]]:
+    """
+    解析一个提交块：统计代码量、按扩展名过滤并拆分为文件diff（可在子进程中运行）
+
+    Returns:
+        Optional[Tuple[CommitInfo, Dict[str, str]]]: 不含完整diff的提交信息和 {file_path: diff_content}；
+            过滤后没有剩余文件时返回None
+    """
+    commit = _parse_commit_block(*block)
+    if include_extensions or exclude_extensions:
+        commit = _filter_commit_files(commit, include_extensions, exclude_extensions)
+        if commit is None:
+            return None
+
+    file_diffs = extract_file_diffs(commit)
+    # 文件diff已单独保存，不再保留（也不回传）完整diff文本
+    commit.diff = ""
+    return commit, file_diffs
+
+
+def _iter_extracted_commits(
+    blocks: Iterator[Tuple[str, List[str], str]],
+    include_extensions: Optional[List[str]],
+    exclude_extensions: Optional[List[str]],
+    workers: int,
+) -> Iterator[Optional[Tuple[CommitInfo, Dict[str, str]]]]:
+    """
+    按 git log 的顺序产出 ``_extract_commit_block`` 的结果
+
+    workers 大于1时在进程池中并行解析，最多同时提交 workers * 4 个提交块，
+    按提交顺序取回结果，因此输出顺序与串行解析一致，内存占用也有上限。
+    """
+    if workers <= 1:
+        for block in blocks:
+            yield _extract_commit_block(block, include_extensions, exclude_extensions)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending: Deque[Future] = deque()
+    try:
+        for block in blocks:
+            pending.append(executor.submit(_extract_commit_block, block, include_extensions, exclude_extensions))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _apply_file_filter(
+    commit: CommitInfo,
+    file_diffs: Dict[str, str],
+    file_filter: FileFilter,
+) -> Optional[Tuple[CommitInfo, Dict[str, str]]]:
+    """
+    按路径和diff内容跳过生成文件、第三方文件和锁文件
+
+    Returns:
+        Optional[Tuple[CommitInfo, Dict[str, str]]]: 去掉被跳过文件后的提交和文件diff；没有剩余文件时返回None
+    """
+    kept = file_filter.filter_file_diffs(file_diffs)
+    # 没有文本diff的文件（如二进制文件）只按路径判断
+    commit.files = [
+        f for f in commit.files
+        if f in kept or (f not in file_diffs and file_filter.path_skip_reason(f) is None)
+    ]
+    if not commit.files:
+        return None
+    return commit, kept
 
 
 def get_file_diffs_by_timeframe(
-    author: str,
+    author: Union[str, Sequence[str], None],
     start_date: str,
     end_date: str,
     repo_path: Optional[str] = None,
     include_extensions: Optional[List[str]] = None,
     exclude_extensions: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    backend: Optional[str] = None,
+    file_filter: Optional[FileFilter] = None,
 ) -> Tuple[List[CommitInfo], Dict[str, Dict[str, str]], Dict[str, int]]:
     """
     获取指定作者在特定时间段内修改的所有文件的差异内容
 
     Args:
-        author: 作者名或邮箱（部分匹配）
+        author: 作者名或邮箱（部分匹配），也可以是作者列表或None（见 ``iter_commits_by_author_and_timeframe``）
         start_date: 开始日期，格式：YYYY-MM-DD
         end_date: 结束日期，格式：YYYY-MM-DD
         repo_path: Git仓库路径，默认为当前目录
         include_extensions: 要包含的文件扩展名列表（例如['.py', '.js']）
         exclude_extensions: 要排除的文件扩展名列表
+        workers: 并行解析diff的进程数，默认为CPU核数；1表示在当前进程中串行解析
+        backend: git 后端名称（见 ``get_git_backend``）
+        file_filter: 跳过生成文件、第三方文件和锁文件的过滤器，None 表示只按扩展名过滤
 
     Returns:
         Tuple[List[CommitInfo], Dict[str, Dict[str, str]], Dict[str, int]]:
@@ -287,35 +477,81 @@ def get_file_diffs_by_timeframe(
             2. 每个提交的每个文件的diff内容映射 {commit_hash: {file_path: diff_content}}
             3. 代码量统计信息
     """
-    # 获取提交
-    commits = get_commits_by_author_and_timeframe(
-        author, start_date, end_date, repo_path
-    )
+    if workers is None:
+        workers = os.cpu_count() or 1
 
-    if not commits:
-        return [], {}, {}
+    # 流式读取提交：当前进程只负责从 git 后端读取提交块，代码量统计、过滤和
+    # 按文件拆分diff在进程池中并行完成，结果按提交顺序收集
+    filtered_commits = []
+    commit_file_diffs = {}
 
-    # 过滤提交
-    filtered_commits = filter_code_files(
-        commits, include_extensions, exclude_extensions
-    )
+    try:
+        blocks = _iter_commit_blocks(author, start_date, end_date, repo_path, backend)
+        for extracted in _iter_extracted_commits(blocks, include_extensions, exclude_extensions, workers):
+            if extracted is not None and file_filter is not None:
+                extracted = _apply_file_filter(*extracted, file_filter)
+            if extracted is None:
+                continue
+            commit, file_diffs = extracted
+            commit_file_diffs[commit.hash] = file_diffs
+            filtered_commits.append(commit)
+    except GitBackendError as e:
+        print(f"Error retrieving commits: {e}")
+        print(f"Error output: {e.stderr}")
+        return [], {}, {}
 
     if not filtered_commits:
         return [], {}, {}
 
-    # 提取每个提交中每个文件的diff
-    commit_file_diffs = {}
-
-    for commit in filtered_commits:
-        file_diffs = extract_file_diffs(commit)
-        commit_file_diffs[commit.hash] = file_diffs
-
     # 计算代码量统计
     code_stats = calculate_total_code_stats(filtered_commits)
 
     return filtered_commits, commit_file_diffs, code_stats
 
 
+def get_file_diffs_by_authors(
+    authors: Sequence[str],
+    start_date: str,
+    end_date: str,
+    repo_path: Optional[str] = None,
+    include_extensions: Optional[List[str]] = None,
+    exclude_extensions: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    backend: Optional[str] = None,
+    file_filter: Optional[FileFilter] = None,
+) -> Tuple[Dict[str, List[CommitInfo]], Dict[str, Dict[str, str]], Dict[str, Dict[str, int]]]:
+    """
+    只扫描一次提交历史，获取多个作者在特定时间段内修改的文件差异，并按作者分组
+
+    Args:
+        authors: 作者名或邮箱模式列表（部分匹配），为空时包含所有作者并按作者名分组
+        start_date: 开始日期，格式：YYYY-MM-DD
+        end_date: 结束日期，格式：YYYY-MM-DD
+        repo_path: Git仓库路径，默认为当前目录
+        include_extensions: 要包含的文件扩展名列表（例如['.py', '.js']）
+        exclude_extensions: 要排除的文件扩展名列表
+        workers: 并行解析diff的进程数（见 ``get_file_diffs_by_timeframe``）
+        backend: git 后端名称（见 ``get_git_backend``）
+        file_filter: 跳过生成文件、第三方文件和锁文件的过滤器（见 ``get_file_diffs_by_timeframe``）
+
+    Returns:
+        Tuple[Dict[str, List[CommitInfo]], Dict[str, Dict[str, str]], Dict[str, Dict[str, int]]]:
+            1. 每个作者的提交列表 {author: [CommitInfo]}
+            2. 所有提交的每个文件的diff内容映射 {commit_hash: {file_path: diff_content}}
+            3. 每个作者的代码量统计 {author: code_stats}
+    """
+    commits, commit_file_diffs, _ = get_file_diffs_by_timeframe(
+        list(authors), start_date, end_date, repo_path, include_extensions, exclude_extensions, workers, backend,
+        file_filter,
+    )
+    commits_by_author = partition_commits_by_author(commits, authors)
+    code_stats = {
+        author: calculate_total_code_stats(author_commits)
+        for author, author_commits in commits_by_author.items()
+    }
+    return commits_by_author, commit_file_diffs, code_stats
+
+
 def calculate_total_code_stats(commits: List[CommitInfo]) -> Dict[str, int]:
     """
     计算多个提交的总代码量统计
@@ -355,6 +591,8 @@ def get_commit_diff(
     repo_path: Optional[str] = None,
     include_extensions: Optional[List[str]] = None,
     exclude_extensions: Optional[List[str]] = None,
+    backend: Optional[str] = None,
+    file_filter: Optional[FileFilter] = None,
 ) -> Dict[str, Dict[str, Any]]:
     """Get the diff for a specific commit.
 
@@ -363,6 +601,8 @@ def get_commit_diff(
         repo_path: Path to the git repository (defaults to current directory)
         include_extensions: List of file extensions to include (e.g. ['.py', '.js'])
         exclude_extensions: List of file extensions to exclude (e.g. ['.md', '.txt'])
+        backend: Git backend name (see ``get_git_backend``)
+        file_filter: Skips generated, vendored and lock files by path and diff content
 
     Returns:
         Dictionary mapping file paths to their diffs and statistics
@@ -380,69 +620,39 @@ def get_commit_diff(
         raise ValueError(f"Not a git repository: {repo_path}")
 
     # Get commit diff
-    cmd = ["git", "show", "--name-status", "--numstat", "--pretty=format:", commit_hash]
-    result = subprocess.run(cmd, cwd=repo_path, capture_output=True, text=True)
-
-    if result.returncode != 0:
-        raise ValueError(f"Failed to get commit diff: {result.stderr}")
+    try:
+        commit = _parse_commit_block(*get_git_backend(repo_path, backend).commit_block(commit_hash))
+    except GitBackendError as e:
+        raise ValueError(f"Failed to get commit diff: {e.stderr or e}") from e
 
-    # Parse the diff output
     file_diffs = {}
-    current_file = None
-    current_diff = []
-
-    for line in result.stdout.splitlines():
-        if not line.strip():
+    for file_path, diff in extract_file_diffs(commit).items():
+        # Filter by file extensions
+        file_ext = os.path.splitext(file_path)[1].lower()
+        if exclude_extensions and file_ext in exclude_extensions:
+            continue
+        if include_extensions and file_ext not in include_extensions:
+            continue
+        if file_filter is not None and file_filter.skip_reason(file_path, diff) is not None:
             continue
 
-        # Check if line starts with a file status (e.g., "M\tfile.py")
-        if line.startswith(("A\t", "M\t", "D\t")):
-            if current_file and current_diff:
-                file_diffs[current_file] = {
-                    "diff": "\n".join(current_diff),
-                    "status": current_status,
-                    "additions": current_additions,
-                    "deletions": current_deletions,
-                }
-            current_diff = []
-            current_status = line[0]
-            current_file = line[2:]
-            current_additions = 0
-            current_deletions = 0
-
-        # Parse numstat line (e.g., "3\t2\tfile.py")
-        elif line[0].isdigit():
-            additions, deletions, filename = line.split("\t")
-            current_additions = int(additions)
-            current_deletions = int(deletions)
-
-        # Add to current diff
+        # extract_file_diffs keeps the diff from the first a/ or b/ path line on, so an added
+        # file starts at "+++ b/..." (its "--- /dev/null" is dropped) and a deleted one has "+++ /dev/null";
+        # a renamed file starts at its "rename from" line
+        if diff.startswith("rename from "):
+            status = "R"
+        elif diff.startswith("+++ "):
+            status = "A"
+        elif "\n+++ /dev/null" in diff:
+            status = "D"
         else:
-            current_diff.append(line)
-
-    # Add the last file
-    if current_file and current_diff:
-        file_diffs[current_file] = {
-            "diff": "\n".join(current_diff),
-            "status": current_status,
-            "additions": current_additions,
-            "deletions": current_deletions,
+            status = "M"
+        additions, deletions, _ = calculate_code_stats(diff)
+        file_diffs[file_path] = {
+            "diff": diff,
+            "status": status,
+            "additions": additions,
+            "deletions": deletions,
         }
 
-    # Filter by file extensions
-    if include_extensions or exclude_extensions:
-        filtered_diffs = {}
-        for file_path, diff in file_diffs.items():
-            file_ext = os.path.splitext(file_path)[1].lower()
-            
-            # Skip if extension is in exclude list
-            if exclude_extensions and file_ext in exclude_extensions:
-                continue
-                
-            # Include if extension is in include list or no include list specified
-            if not include_extensions or file_ext in include_extensions:
-                filtered_diffs[file_path] = diff
-                
-        file_diffs = filtered_diffs
-
-    return file_diffs
\ No newline at end of file
+    return file_diffs
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+# 这些响应头描述的是原始传输编码，缓存的是已解码的内容，因此不保存
+_UNCACHED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class HTTPResponseCache:
+    """基于 SQLite 的 HTTP 条件请求缓存
+
+    保存带有 ``ETag`` 或 ``Last-Modified`` 的 GET 响应。再次请求同一资源时发送
+    ``If-None-Match``/``If-Modified-Since``，服务端返回 304 时直接使用磁盘上的内容。
+    GitHub 不会把带条件请求得到的 304 计入速率限制配额。
+    """
+
+    def __init__(self, path: str, max_entries: Optional[int] = 50000):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite 数据库文件路径
+            max_entries: 最大缓存条目数，超出后淘汰最久未访问的条目，None 表示不限制
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def request_key(request: requests.PreparedRequest) -> str:
+        """请求的缓存键：URL 加上会影响响应内容的请求头"""
+        authorization = request.headers.get("Authorization", "")
+        parts = [
+            request.method or "GET",
+            request.url or "",
+            request.headers.get("Accept", ""),
+            # 不同令牌可见的数据可能不同，只保存令牌的摘要
+            hashlib.sha256(authorization.encode("utf-8")).hexdigest(),
+        ]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[int, Dict[str, str], bytes, Optional[str], Optional[str]]]:
+        """获取缓存的响应 (status, headers, body, etag, last_modified)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, etag, last_modified FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+
+        if row is None:
+            return None
+        status, headers, body, etag, last_modified = row
+        return status, json.loads(headers), body, etag, last_modified
+
+    def set(self, key: str, response: requests.Response):
+        """保存带有校验器的响应"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _UNCACHED_HEADERS}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, status, headers, body, etag, last_modified, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.url, response.status_code, json.dumps(headers), response.content,
+                 etag, last_modified, time.time()),
+            )
+
+            if self.max_entries is not None:
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                        (overflow,),
+                    )
+
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {
+            "path": self.path,
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class ConditionalCacheAdapter(HTTPAdapter):
+    """为 GET 请求添加条件请求头，并在 304 时返回缓存内容的 requests 适配器"""
+
+    def __init__(self, cache: HTTPResponseCache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, **kwargs) -> requests.Response:
+        if request.method != "GET" or stream:
+            return super().send(request, stream=stream, **kwargs)
+
+        key = self.cache.request_key(request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            _, _, _, etag, last_modified = cached
+            if etag:
+                request.headers["If-None-Match"] = etag
+            if last_modified:
+                request.headers["If-Modified-Since"] = last_modified
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            self.cache.hits += 1
+            return self._build_cached_response(request, response, cached)
+
+        self.cache.misses += 1
+        if response.status_code == 200:
+            try:
+                self.cache.set(key, response)
+            except Exception as e:
+                logger.warning(f"Failed to write HTTP response cache for {request.url}: {e}")
+        return response
+
+    def _build_cached_response(self, request, not_modified: requests.Response, cached) -> requests.Response:
+        status, headers, body, _, _ = cached
+        response = requests.Response()
+        response.status_code = status
+        response.reason = "OK"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response._content = body
+        response.headers = CaseInsensitiveDict(headers)
+        # 304 携带最新的速率限制等响应头
+        response.headers.update(
+            {k: v for k, v in not_modified.headers.items() if k.lower() not in _UNCACHED_HEADERS}
+        )
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        not_modified.close()
+        return response
+
+
+def install_http_cache(session: requests.Session, cache: HTTPResponseCache, **adapter_kwargs):
+    """在 requests 会话上挂载条件请求缓存"""
+    adapter = ConditionalCacheAdapter(cache, **adapter_kwargs)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def install_github_cache(client: Any, cache: HTTPResponseCache):
+    """让 PyGithub 客户端后续创建的连接都使用条件请求缓存"""
+    requester = client.requester
+    connection_class = getattr(requester, "_Requester__connectionClass", None)
+    if connection_class is None:
+        logger.warning("Unsupported PyGithub version, HTTP response cache disabled")
+        return
+    if getattr(connection_class, "http_cache", None) is cache:
+        return
+
+    class CachedConnectionClass(connection_class):
+        http_cache = cache
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.adapter = ConditionalCacheAdapter(
+                cache,
+                max_retries=self.retry,
+                pool_connections=self.pool_size,
+                pool_maxsize=self.pool_size,
+            )
+            self.session.mount(f"{self.protocol}://", self.adapter)
+
+    requester._Requester__connectionClass = CachedConnectionClass
+    # 已建立的连接不带缓存，关闭后由请求方按新的连接类重建
+    connection = getattr(requester, "_Requester__connection", None)
+    if connection is not None:
+        connection.close()
+        requester._Requester__connection = None
+
+
+def install_gitlab_cache(client: Any, cache: HTTPResponseCache):
+    """让 python-gitlab 客户端的请求使用条件请求缓存"""
+    install_http_cache(client.session, cache)
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPConnectionPool:
+    """HTTP 模型共享的 keep-alive 连接池
+
+    同步请求复用一个 ``requests.Session``，异步请求在每个事件循环内复用一个
+    ``aiohttp.ClientSession``，避免每次调用都重新建立 TCP+TLS 连接。
+    ``max_connections`` 应不小于调用方的最大并发请求数。
+    """
+
+    def __init__(self, max_connections: int = 10, keepalive_timeout: float = 60.0):
+        """
+        初始化连接池
+
+        Args:
+            max_connections: 每个会话的最大连接数
+            keepalive_timeout: 空闲连接保持的时间（秒）
+        """
+        self.max_connections = max(1, max_connections)
+        self.keepalive_timeout = keepalive_timeout
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._async_session: Optional[aiohttp.ClientSession] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        # 连接数调整前创建的会话，可能仍有请求在使用，关闭连接池时一并关闭
+        self._retired_async_sessions: List[Tuple[aiohttp.ClientSession, asyncio.AbstractEventLoop]] = []
+
+    def configure(self, max_connections: int):
+        """调整最大连接数，已创建的会话在下次获取时按新的限制重建"""
+        max_connections = max(1, max_connections)
+        with self._lock:
+            if max_connections == self.max_connections:
+                return
+            logger.info(f"Resizing HTTP connection pool: {self.max_connections} -> {max_connections}")
+            self.max_connections = max_connections
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+            if self._async_session is not None:
+                self._retired_async_sessions.append((self._async_session, self._async_loop))
+                self._async_session = None
+
+    def get_session(self) -> requests.Session:
+        """获取共享的同步会话"""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.max_connections, pool_maxsize=self.max_connections)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def get_async_session(self) -> aiohttp.ClientSession:
+        """获取当前事件循环共享的异步会话，必须在事件循环中调用"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._async_session is not None and self._async_loop is not loop:
+                # 会话绑定在创建它的事件循环上（例如上一次 asyncio.run），无法跨循环复用
+                if not self._async_loop.is_closed():
+                    self._retired_async_sessions.append((self._async_session, self._async_loop))
+                self._async_session = None
+
+            if self._async_session is None or self._async_session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    limit_per_host=self.max_connections,
+                    keepalive_timeout=self.keepalive_timeout,
+                )
+                self._async_session = aiohttp.ClientSession(connector=connector)
+                self._async_loop = loop
+            return self._async_session
+
+    def close(self):
+        """关闭同步会话"""
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    async def aclose(self):
+        """关闭当前事件循环中的异步会话以及同步会话"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sessions = [session for session, session_loop in self._retired_async_sessions if session_loop is loop]
+            self._retired_async_sessions = [
+                (session, session_loop) for session, session_loop in self._retired_async_sessions
+                if session_loop is not loop and not session_loop.is_closed()
+            ]
+            if self._async_session is not None and self._async_loop is loop:
+                sessions.append(self._async_session)
+                self._async_session = None
+                self._async_loop = None
+
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+        self.close()
@@ -0,0 +1,324 @@
+import json
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 能结束一个 JSON 值的字符，其后紧跟新的字符串或值时说明缺少逗号
+_VALUE_END = set('"0123456789}]el')
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def scan_json_objects(text: str) -> List[Tuple[int, int, bool]]:
+    """单遍扫描文本，返回所有顶层 ``{...}`` 片段的 (起始, 结束, 是否闭合)
+
+    扫描时跟踪嵌套深度和字符串状态，字符串中的括号不计入深度。文本在对象内部结束
+    （响应被截断）时，最后一个片段的 ``是否闭合`` 为 False。
+    """
+    objects = []
+    depth = 0
+    start = -1
+    in_string = False
+    escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif depth > 0:
+            if char == '"':
+                in_string = True
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    objects.append((start, i + 1, True))
+    if depth > 0:
+        objects.append((start, len(text), False))
+    return objects
+
+
+def repair_json(snippet: str) -> str:
+    """单遍修复模型输出中常见的 JSON 格式问题
+
+    处理单引号字符串、未加引号的键、Python 字面量（True/False/None）、字符串中的原始
+    换行、缺失的逗号、多余的结尾逗号，以及被截断时未闭合的字符串和括号。
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    i = 0
+    n = len(snippet)
+
+    def last_significant() -> str:
+        for char in reversed(out):
+            if not char.isspace():
+                return char[-1]
+        return ""
+
+    def strip_trailing_comma():
+        while out and out[-1].isspace():
+            out.pop()
+        if out and out[-1] == ",":
+            out.pop()
+
+    def insert_missing_comma():
+        if stack and last_significant() in _VALUE_END:
+            out.append(",")
+
+    while i < n:
+        char = snippet[i]
+        if char in "\"'":
+            insert_missing_comma()
+            quote = char
+            out.append('"')
+            i += 1
+            while i < n:
+                char = snippet[i]
+                if char == "\\" and i + 1 < n:
+                    if quote == "'" and snippet[i + 1] == "'":
+                        out.append("'")
+                    else:
+                        out.append(snippet[i:i + 2])
+                    i += 2
+                    continue
+                if char == quote:
+                    break
+                if char == '"':
+                    out.append('\\"')
+                elif char == "\n":
+                    out.append("\\n")
+                elif char == "\r":
+                    out.append("\\r")
+                elif char == "\t":
+                    out.append("\\t")
+                else:
+                    out.append(char)
+                i += 1
+            out.append('"')
+            i += 1
+        elif char in "{[":
+            insert_missing_comma()
+            stack.append("}" if char == "{" else "]")
+            out.append(char)
+            i += 1
+        elif char in "}]":
+            strip_trailing_comma()
+            if stack:
+                out.append(stack.pop())
+            i += 1
+        elif char.isalpha() or char == "_":
+            j = i
+            while j < n and (snippet[j].isalnum() or snippet[j] == "_"):
+                j += 1
+            word = snippet[i:j]
+            insert_missing_comma()
+            k = j
+            while k < n and snippet[k] in " \t":
+                k += 1
+            if k < n and snippet[k] == ":":
+                out.append(f'"{word}"')
+            else:
+                out.append(_LITERALS.get(word, word))
+            i = j
+        elif char.isdigit() or (char == "-" and last_significant() in ":,["):
+            insert_missing_comma()
+            j = i + 1
+            while j < n and (snippet[j].isdigit() or snippet[j] in ".eE+-"):
+                j += 1
+            out.append(snippet[i:j])
+            i = j
+        else:
+            out.append(char)
+            i += 1
+
+    # 响应被截断：去掉悬空的键或逗号后补齐括号
+    if stack:
+        strip_trailing_comma()
+        if last_significant() == ":":
+            out.append("null")
+        while stack:
+            out.append(stack.pop())
+    return "".join(out)
+
+
+class JSONExtractor:
+    """从模型响应中提取 JSON 对象的容错解析器，并统计每条解析路径的使用次数
+
+    解析路径依次为：
+    - ``direct``：响应本身就是 JSON（如使用了 JSON 输出模式）
+    - ``scan``：从代码块或说明文字中扫描出完整的 JSON 对象
+    - ``repaired``：扫描出的片段经 ``repair_json`` 修复后解析成功
+    - 各个 ``fallbacks`` 的名称：JSON 解析失败后由回退函数从文本中提取
+    - ``failed``：所有路径都失败
+    """
+
+    def __init__(
+        self,
+        required_keys: Sequence[str] = (),
+        fallbacks: Sequence[Tuple[str, Callable[[str], Optional[Dict[str, Any]]]]] = (),
+    ):
+        """
+        初始化提取器
+
+        Args:
+            required_keys: 优先选择包含这些键的对象，响应中有多个 JSON 对象时用于挑选
+            fallbacks: (名称, 函数) 列表，JSON 解析失败后依次尝试，函数返回 None 表示不适用
+        """
+        self.required_keys = tuple(required_keys)
+        self.fallbacks = list(fallbacks)
+        self._stats: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def extract(self, text: str) -> Optional[Dict[str, Any]]:
+        """提取 JSON 对象，失败时返回 None"""
+        result, path = self._extract(text)
+        with self._lock:
+            self._stats[path] += 1
+        if path not in ("direct", "scan"):
+            logger.debug(f"JSON response parsed via '{path}' path")
+        return result
+
+    def _has_required_keys(self, obj: Dict[str, Any]) -> bool:
+        return all(key in obj for key in self.required_keys)
+
+    def _extract(self, text: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        if not text:
+            return None, "empty"
+
+        stripped = text.strip()
+        if stripped.startswith("{"):
+            try:
+                obj = json.loads(stripped)
+                if isinstance(obj, dict):
+                    return obj, "direct"
+            except ValueError:
+                pass
+
+        fallback_obj: Optional[Tuple[Dict[str, Any], str]] = None
+        for start, end, _ in scan_json_objects(text):
+            snippet = text[start:end]
+            try:
+                obj, path = json.loads(snippet), "scan"
+            except ValueError:
+                try:
+                    obj, path = json.loads(repair_json(snippet)), "repaired"
+                except ValueError:
+                    continue
+            if not isinstance(obj, dict):
+                continue
+            if self._has_required_keys(obj):
+                return obj, path
+            if fallback_obj is None:
+                fallback_obj = (obj, path)
+
+        if fallback_obj is not None:
+            return fallback_obj
+
+        for name, fallback in self.fallbacks:
+            obj = fallback(text)
+            if obj is not None:
+                return obj, name
+
+        return None, "failed"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各解析路径的使用次数"""
+        with self._lock:
+            paths = dict(self._stats)
+        total = sum(paths.values())
+        clean = paths.get("direct", 0) + paths.get("scan", 0)
+        return {
+            "responses": total,
+            "paths": paths,
+            "repair_rate": (total - clean) / total if total else 0.0,
+        }
+
+
+class StreamingJSONDetector:
+    """在流式响应中检测第一个完整的目标 JSON 对象，用于提前结束生成
+
+    逐块增量扫描（与 ``scan_json_objects`` 相同的括号和字符串状态），每当一个顶层
+    对象闭合时尝试解析；解析成功且包含 ``required_keys`` 的对象即为结果。R1 类模型
+    在 ``<think>...</think>`` 中输出的推理内容不参与检测，推理过程中起草的 JSON 不会
+    导致提前结束。
+    """
+
+    def __init__(self, required_keys: Sequence[str] = ()):
+        self.required_keys = tuple(required_keys)
+        self.text = ""
+        self.result: Optional[Dict[str, Any]] = None
+        self._pos = 0
+        self._depth = 0
+        self._start = -1
+        self._in_string = False
+        self._escaped = False
+        self._reasoning_checked = False
+
+    def _skip_reasoning(self) -> bool:
+        """跳过开头的推理内容，推理尚未结束时返回 True"""
+        if self._reasoning_checked:
+            return False
+        stripped = self.text.lstrip()
+        if not stripped or "<think>".startswith(stripped):
+            return True
+        if stripped.startswith("<think>"):
+            end = self.text.find("</think>")
+            if end < 0:
+                return True
+            self._pos = end + len("</think>")
+        self._reasoning_checked = True
+        return False
+
+    def _accept(self, snippet: str) -> Optional[Dict[str, Any]]:
+        for candidate in (snippet, repair_json(snippet)):
+            try:
+                obj = json.loads(candidate)
+            except ValueError:
+                continue
+            if isinstance(obj, dict) and all(key in obj for key in self.required_keys):
+                return obj
+            return None
+        return None
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """追加一块响应文本，检测到完整的目标对象时返回该对象，否则返回 None"""
+        if self.result is not None:
+            return self.result
+        self.text += chunk
+        if self._skip_reasoning():
+            return None
+
+        text = self.text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif self._depth > 0:
+                if char == '"':
+                    self._in_string = True
+                elif char == "}":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self.result = self._accept(text[self._start:i + 1])
+                        if self.result is not None:
+                            self._pos = i + 1
+                            return self.result
+        self._pos = len(text)
+        return None
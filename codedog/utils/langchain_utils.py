@@ -1,14 +1,14 @@
 from functools import lru_cache
 from os import environ as env
-from typing import Dict, Any, List, Optional
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple
 import inspect
 import os
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_openai.chat_models import AzureChatOpenAI, ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, BaseMessage
-from langchain_core.outputs import ChatGeneration, ChatResult
-from pydantic import Field, ConfigDict
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field, ConfigDict, PrivateAttr
 import requests
 import aiohttp
 import json
@@ -17,6 +17,9 @@ import logging
 import traceback
 import asyncio
 
+from codedog.utils.http_pool import HTTPConnectionPool
+from codedog.utils.model_router import ModelBackend, RoutedChatModel
+
 logger = logging.getLogger(__name__)
 
 
@@ -57,6 +60,31 @@ class DeepSeekChatModel(BaseChatModel):
     total_tokens: int = 0
     total_cost: float = 0.0
     failed_requests: int = 0  # 失败请求计数
+    max_connections: int = 10  # 连接池最大连接数，应不小于并发请求数
+
+    _http_pool: Optional[HTTPConnectionPool] = PrivateAttr(default=None)
+
+    @property
+    def http_pool(self) -> HTTPConnectionPool:
+        """复用连接的共享连接池，首次使用时创建"""
+        if self._http_pool is None:
+            self._http_pool = HTTPConnectionPool(max_connections=self.max_connections)
+        return self._http_pool
+
+    def configure_connection_pool(self, max_connections: int):
+        """按调用方的并发数调整连接池大小"""
+        self.max_connections = max_connections
+        self.http_pool.configure(max_connections)
+
+    def close(self):
+        """关闭同步请求使用的连接"""
+        if self._http_pool is not None:
+            self._http_pool.close()
+
+    async def aclose(self):
+        """关闭当前事件循环中的连接"""
+        if self._http_pool is not None:
+            await self._http_pool.aclose()
 
     def _calculate_cost(self, total_tokens: int) -> float:
         """Calculate cost based on token usage."""
@@ -67,6 +95,43 @@ class DeepSeekChatModel(BaseChatModel):
     def _llm_type(self) -> str:
         return "deepseek"
 
+    def _build_request(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any
+    ) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """Build the chat completions endpoint, headers and payload for a request."""
+        # Convert LangChain messages to DeepSeek format
+        deepseek_messages = []
+        for message in messages:
+            role = "user" if isinstance(message, HumanMessage) else "system" if isinstance(message, SystemMessage) else "assistant"
+            deepseek_messages.append({"role": role, "content": message.content})
+
+        # Prepare API request
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "model": self.model_name,
+            "messages": deepseek_messages,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "top_p": self.top_p,
+        }
+        if stop:
+            payload["stop"] = stop
+        if kwargs.get("response_format"):
+            # DeepSeek 支持 OpenAI 兼容的 JSON 输出模式
+            payload["response_format"] = kwargs["response_format"]
+
+        # Log request details for debugging
+        logger.debug(f"DeepSeek API request to {self.api_base}")
+        logger.debug(f"Model: {self.model_name}")
+        logger.debug(f"Payload: {json.dumps(payload, ensure_ascii=False)}")
+
+        # Ensure API base URL is properly formatted and construct endpoint
+        api_base = self.api_base.rstrip('/')
+        return f"{api_base}/v1/chat/completions", headers, payload
+
     def _generate(
         self,
         messages: List[BaseMessage],
@@ -76,39 +141,11 @@ class DeepSeekChatModel(BaseChatModel):
     ) -> ChatResult:
         """Generate a response from the DeepSeek API."""
         try:
-            # Convert LangChain messages to DeepSeek format
-            deepseek_messages = []
-            for message in messages:
-                role = "user" if isinstance(message, HumanMessage) else "system" if isinstance(message, SystemMessage) else "assistant"
-                deepseek_messages.append({"role": role, "content": message.content})
-
-            # Prepare API request
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            }
-            payload = {
-                "model": self.model_name,
-                "messages": deepseek_messages,
-                "temperature": self.temperature,
-                "max_tokens": self.max_tokens,
-                "top_p": self.top_p,
-            }
-            if stop:
-                payload["stop"] = stop
-
-            # Log request details for debugging
-            logger.debug(f"DeepSeek API request to {self.api_base}")
-            logger.debug(f"Model: {self.model_name}")
-            logger.debug(f"Payload: {json.dumps(payload, ensure_ascii=False)}")
-
-            # Ensure API base URL is properly formatted and construct endpoint
-            api_base = self.api_base.rstrip('/')
-            endpoint = f"{api_base}/v1/chat/completions"
+            endpoint, headers, payload = self._build_request(messages, stop, **kwargs)
 
             # Make API request with timeout
             try:
-                response = requests.post(endpoint, headers=headers, json=payload, timeout=self.timeout)
+                response = self.http_pool.get_session().post(endpoint, headers=headers, json=payload, timeout=self.timeout)
                 response_text = response.text
             except requests.exceptions.Timeout as e:
                 log_error(e, f"DeepSeek API request timed out after {self.timeout} seconds")
@@ -160,35 +197,7 @@ class DeepSeekChatModel(BaseChatModel):
     ) -> ChatResult:
         """Asynchronously generate a response from the DeepSeek API."""
         try:
-            # Convert LangChain messages to DeepSeek format
-            deepseek_messages = []
-            for message in messages:
-                role = "user" if isinstance(message, HumanMessage) else "system" if isinstance(message, SystemMessage) else "assistant"
-                deepseek_messages.append({"role": role, "content": message.content})
-
-            # Prepare API request
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            }
-            payload = {
-                "model": self.model_name,
-                "messages": deepseek_messages,
-                "temperature": self.temperature,
-                "max_tokens": self.max_tokens,
-                "top_p": self.top_p,
-            }
-            if stop:
-                payload["stop"] = stop
-
-            # Log request details for debugging
-            logger.debug(f"DeepSeek API request to {self.api_base}")
-            logger.debug(f"Model: {self.model_name}")
-            logger.debug(f"Payload: {json.dumps(payload, ensure_ascii=False)}")
-
-            # Ensure API base URL is properly formatted and construct endpoint
-            api_base = self.api_base.rstrip('/')
-            endpoint = f"{api_base}/v1/chat/completions"
+            endpoint, headers, payload = self._build_request(messages, stop, **kwargs)
 
             # 实现重试机制
             retries = 0
@@ -200,84 +209,84 @@ class DeepSeekChatModel(BaseChatModel):
                     current_timeout = self.timeout * (1 + 0.5 * retries)  # 每次重试增加 50% 的超时时间
                     logger.info(f"DeepSeek API request attempt {retries+1}/{self.max_retries} with timeout {current_timeout}s")
 
-                    async with aiohttp.ClientSession() as session:
-                        async with session.post(
-                            endpoint,
-                            headers=headers,
-                            json=payload,
-                            timeout=aiohttp.ClientTimeout(total=current_timeout)
-                        ) as response:
-                            response_text = await response.text()
-
-                            # 检查响应状态
-                            if response.status != 200:
-                                error_msg = f"DeepSeek API HTTP error (status {response.status}): {response_text}"
-                                logger.warning(error_msg)
-                                last_error = aiohttp.ClientResponseError(
-                                    request_info=response.request_info,
-                                    history=response.history,
-                                    status=response.status,
-                                    message=error_msg,
-                                    headers=response.headers
-                                )
-                                # 如果是服务器错误，重试
-                                if response.status >= 500:
-                                    retries += 1
-                                    if retries < self.max_retries:
-                                        wait_time = self.retry_delay * (2 ** retries)  # 指数退避
-                                        logger.info(f"Server error, retrying in {wait_time}s...")
-                                        await asyncio.sleep(wait_time)
-                                        continue
-                                # 如果是客户端错误，不重试
-                                raise last_error
-
-                            # 解析 JSON 响应
-                            try:
-                                response_data = json.loads(response_text)
-                            except json.JSONDecodeError as e:
-                                logger.warning(f"Failed to decode JSON response: {e}\nResponse: {response_text}")
-                                last_error = e
-                                retries += 1
-                                if retries < self.max_retries:
-                                    wait_time = self.retry_delay * (2 ** retries)
-                                    logger.info(f"JSON decode error, retrying in {wait_time}s...")
-                                    await asyncio.sleep(wait_time)
-                                    continue
-                                else:
-                                    raise last_error
-
-                            # 提取响应内容
-                            if not response_data.get("choices"):
-                                error_msg = f"No choices in response: {json.dumps(response_data, ensure_ascii=False)}"
-                                logger.warning(error_msg)
-                                last_error = ValueError(error_msg)
+                    session = self.http_pool.get_async_session()
+                    async with session.post(
+                        endpoint,
+                        headers=headers,
+                        json=payload,
+                        timeout=aiohttp.ClientTimeout(total=current_timeout)
+                    ) as response:
+                        response_text = await response.text()
+
+                        # 检查响应状态
+                        if response.status != 200:
+                            error_msg = f"DeepSeek API HTTP error (status {response.status}): {response_text}"
+                            logger.warning(error_msg)
+                            last_error = aiohttp.ClientResponseError(
+                                request_info=response.request_info,
+                                history=response.history,
+                                status=response.status,
+                                message=error_msg,
+                                headers=response.headers
+                            )
+                            # 如果是服务器错误，重试
+                            if response.status >= 500:
                                 retries += 1
                                 if retries < self.max_retries:
-                                    wait_time = self.retry_delay * (2 ** retries)
-                                    logger.info(f"Invalid response format, retrying in {wait_time}s...")
+                                    wait_time = self.retry_delay * (2 ** retries)  # 指数退避
+                                    logger.info(f"Server error, retrying in {wait_time}s...")
                                     await asyncio.sleep(wait_time)
                                     continue
-                                else:
-                                    raise last_error
+                            # 如果是客户端错误，不重试
+                            raise last_error
+
+                        # 解析 JSON 响应
+                        try:
+                            response_data = json.loads(response_text)
+                        except json.JSONDecodeError as e:
+                            logger.warning(f"Failed to decode JSON response: {e}\nResponse: {response_text}")
+                            last_error = e
+                            retries += 1
+                            if retries < self.max_retries:
+                                wait_time = self.retry_delay * (2 ** retries)
+                                logger.info(f"JSON decode error, retrying in {wait_time}s...")
+                                await asyncio.sleep(wait_time)
+                                continue
+                            else:
+                                raise last_error
 
-                            # 提取消息内容
-                            message = response_data["choices"][0]["message"]["content"]
+                        # 提取响应内容
+                        if not response_data.get("choices"):
+                            error_msg = f"No choices in response: {json.dumps(response_data, ensure_ascii=False)}"
+                            logger.warning(error_msg)
+                            last_error = ValueError(error_msg)
+                            retries += 1
+                            if retries < self.max_retries:
+                                wait_time = self.retry_delay * (2 ** retries)
+                                logger.info(f"Invalid response format, retrying in {wait_time}s...")
+                                await asyncio.sleep(wait_time)
+                                continue
+                            else:
+                                raise last_error
 
-                            # 记录完整的响应内容用于调试
-                            logger.info(f"DeepSeek API response received successfully")
-                            logger.debug(f"DeepSeek API complete response: {json.dumps(response_data, ensure_ascii=False)}")
-                            logger.debug(f"DeepSeek API message content: {message}")
+                        # 提取消息内容
+                        message = response_data["choices"][0]["message"]["content"]
 
-                            # 更新令牌使用和成本
-                            if "usage" in response_data:
-                                tokens = response_data["usage"].get("total_tokens", 0)
-                                self.total_tokens += tokens
-                                self.total_cost += self._calculate_cost(tokens)
-                                logger.info(f"DeepSeek API token usage: {tokens}, total cost: ${self.total_cost:.6f}")
+                        # 记录完整的响应内容用于调试
+                        logger.info(f"DeepSeek API response received successfully")
+                        logger.debug(f"DeepSeek API complete response: {json.dumps(response_data, ensure_ascii=False)}")
+                        logger.debug(f"DeepSeek API message content: {message}")
 
-                            # 创建并返回 ChatResult
-                            generation = ChatGeneration(message=AIMessage(content=message))
-                            return ChatResult(generations=[generation])
+                        # 更新令牌使用和成本
+                        if "usage" in response_data:
+                            tokens = response_data["usage"].get("total_tokens", 0)
+                            self.total_tokens += tokens
+                            self.total_cost += self._calculate_cost(tokens)
+                            logger.info(f"DeepSeek API token usage: {tokens}, total cost: ${self.total_cost:.6f}")
+
+                        # 创建并返回 ChatResult
+                        generation = ChatGeneration(message=AIMessage(content=message))
+                        return ChatResult(generations=[generation])
 
                 except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError) as e:
                     # 网络错误或超时错误，进行重试
@@ -304,6 +313,70 @@ class DeepSeekChatModel(BaseChatModel):
             generation = ChatGeneration(message=AIMessage(content=message))
             return ChatResult(generations=[generation])
 
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Stream the response from the DeepSeek API as server-sent events.
+
+        Only answer content is yielded; R1 reasoning (``reasoning_content``) is skipped. When the
+        caller stops iterating early, the connection is closed so the server stops generating.
+        """
+        endpoint, headers, payload = self._build_request(messages, stop, **kwargs)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+
+        session = self.http_pool.get_async_session()
+        async with session.post(
+            endpoint,
+            headers=headers,
+            json=payload,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        ) as response:
+            if response.status != 200:
+                response_text = await response.text()
+                raise aiohttp.ClientResponseError(
+                    request_info=response.request_info,
+                    history=response.history,
+                    status=response.status,
+                    message=f"DeepSeek API HTTP error (status {response.status}): {response_text}",
+                    headers=response.headers,
+                )
+
+            finished = False
+            try:
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    # 空行分隔事件，冒号开头的是注释（keep-alive）
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        finished = True
+                        break
+
+                    event = json.loads(data)
+                    if event.get("usage"):
+                        tokens = event["usage"].get("total_tokens", 0)
+                        self.total_tokens += tokens
+                        self.total_cost += self._calculate_cost(tokens)
+                    for choice in event.get("choices") or []:
+                        content = (choice.get("delta") or {}).get("content")
+                        if content:
+                            chunk = ChatGenerationChunk(message=AIMessageChunk(content=content))
+                            if run_manager:
+                                await run_manager.on_llm_new_token(content, chunk=chunk)
+                            yield chunk
+                else:
+                    finished = True
+            finally:
+                if not finished:
+                    # 调用方提前结束（已拿到完整结果）时断开连接，服务端随之停止生成
+                    response.close()
+
 
 # Define a custom class for DeepSeek R1 model
 class DeepSeekR1Model(DeepSeekChatModel):
@@ -412,6 +485,7 @@ def load_deepseek_llm():
         timeout=int(env.get("DEEPSEEK_TIMEOUT", "600")),  # 默认超时时间增加到10分钟
         max_retries=int(env.get("DEEPSEEK_MAX_RETRIES", "3")),  # 最大重试次数
         retry_delay=int(env.get("DEEPSEEK_RETRY_DELAY", "5")),  # 重试间隔（秒）
+        max_connections=int(env.get("DEEPSEEK_MAX_CONNECTIONS", "10")),  # 连接池最大连接数
     )
     return llm
 
@@ -429,10 +503,84 @@ def load_deepseek_r1_llm():
         timeout=int(env.get("DEEPSEEK_TIMEOUT", "600")),  # 默认超时时间增加到10分钟
         max_retries=int(env.get("DEEPSEEK_MAX_RETRIES", "3")),  # 最大重试次数
         retry_delay=int(env.get("DEEPSEEK_RETRY_DELAY", "5")),  # 重试间隔（秒）
+        max_connections=int(env.get("DEEPSEEK_MAX_CONNECTIONS", "10")),  # 连接池最大连接数
     )
     return llm
 
 
+@lru_cache(maxsize=None)
+def load_openai_llm(model: str) -> BaseChatModel:
+    """Load an OpenAI model by its API name, regardless of AZURE_OPENAI"""
+    return ChatOpenAI(
+        api_key=env.get("OPENAI_API_KEY"),
+        model=model,
+        temperature=0,
+    )
+
+
+@lru_cache(maxsize=None)
+def load_azure_llm(deployment_id: str) -> BaseChatModel:
+    """Load an Azure OpenAI deployment, regardless of AZURE_OPENAI"""
+    return AzureChatOpenAI(
+        openai_api_type="azure",
+        api_key=env.get("AZURE_OPENAI_API_KEY", ""),
+        azure_endpoint=env.get("AZURE_OPENAI_API_BASE", ""),
+        api_version="2024-05-01-preview",
+        azure_deployment=deployment_id,
+        model=deployment_id,
+        temperature=0,
+    )
+
+
+def _load_route_backend(route: Dict[str, Any]) -> ModelBackend:
+    """Build one routed backend from a route entry like {"model": "azure:gpt-4o", "weight": 2}"""
+    spec = route["model"]
+    provider, _, name = spec.partition(":")
+    if provider == "openai" and name:
+        model = load_openai_llm(name)
+    elif provider == "azure" and name:
+        model = load_azure_llm(name)
+    else:
+        model = load_model_by_name(spec)
+
+    return ModelBackend(
+        model,
+        name=route.get("name", spec),
+        weight=float(route.get("weight", 1.0)),
+        tokens_per_minute=route.get("tokens_per_minute"),
+        requests_per_minute=route.get("requests_per_minute"),
+    )
+
+
+@lru_cache(maxsize=None)
+def load_routed_llm(routes: Optional[str] = None) -> BaseChatModel:
+    """Load a model that load-balances and fails over across several backends
+
+    Args:
+        routes: Either a comma separated list of model names (e.g. "azure:gpt-4o,openai:gpt-4o,deepseek")
+            or a JSON list of route objects with "model" and optional "name", "weight",
+            "tokens_per_minute" and "requests_per_minute". Defaults to the MODEL_ROUTES env var.
+            "openai:<model>" and "azure:<deployment>" select the provider explicitly; any other
+            entry is loaded with load_model_by_name.
+
+    Returns:
+        BaseChatModel: A RoutedChatModel over the configured backends
+    """
+    routes = routes or env.get("MODEL_ROUTES", "")
+    if routes.strip().startswith("["):
+        entries = json.loads(routes)
+    else:
+        entries = [{"model": spec.strip()} for spec in routes.split(",") if spec.strip()]
+    if not entries:
+        raise ValueError("No model routes configured. Set MODEL_ROUTES, e.g. MODEL_ROUTES=\"gpt-4o,deepseek\"")
+
+    backends = [_load_route_backend(entry) for entry in entries]
+    return RoutedChatModel(
+        backends=backends,
+        model_name="routed(" + ",".join(backend.name for backend in backends) + ")",
+    )
+
+
 def load_model_by_name(model_name: str) -> BaseChatModel:
     """Load a model by name
 
@@ -443,6 +591,9 @@ def load_model_by_name(model_name: str) -> BaseChatModel:
             - "gpt-4o" or "4o" for GPT-4o models
             - "deepseek" for DeepSeek models
             - "deepseek-r1" for DeepSeek R1 models
+            - "routed" for a load-balanced model over the backends in MODEL_ROUTES
+            - A comma separated list of the names above (e.g. "gpt-4o,deepseek") for a load-balanced
+              model over those backends, see load_routed_llm
             - Any full OpenAI model name (e.g., "gpt-3.5-turbo-16k", "gpt-4-turbo", etc.)
 
     Returns:
@@ -465,6 +616,12 @@ def load_model_by_name(model_name: str) -> BaseChatModel:
     if model_name in model_loaders:
         return model_loaders[model_name]()
 
+    # Load-balanced model over several backends
+    if model_name == "routed":
+        return load_routed_llm()
+    if "," in model_name:
+        return load_routed_llm(model_name)
+
     # Handle OpenAI model names with pattern matching
     if model_name.startswith("gpt-"):
         # Handle GPT-4o models
@@ -0,0 +1,267 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks.manager import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+from codedog.utils.concurrent_fetch import rate_limit_headers
+from codedog.utils.rate_limiter import TokenBucket
+from codedog.utils.tokenizer import get_tokenizer
+
+logger = logging.getLogger(__name__)
+
+# DeepSeek 模型不抛出异常，而是把错误写进响应文本，以这些前缀开头的响应按失败处理
+ERROR_RESPONSE_PREFIXES = ("Error calling DeepSeek API",)
+
+
+class AllBackendsFailedError(Exception):
+    """所有后端都调用失败"""
+
+    def __init__(self, errors: Dict[str, Exception]):
+        self.errors = errors
+        details = "; ".join(f"{name}: {error}" for name, error in errors.items())
+        rate_limited = all(_is_rate_limit_error(error) for error in errors.values())
+        # 全部被限流时消息中包含 "rate limit"，让 DiffEvaluator 的自适应限流生效
+        prefix = "All model backends hit the rate limit" if rate_limited else "All model backends failed"
+        super().__init__(f"{prefix}: {details}")
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    if rate_limit_headers(error) is not None:
+        return True
+    message = str(error).lower()
+    return "rate limit" in message or "too many requests" in message or "429" in message
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(error, "headers", None) or {}
+    for key, value in headers.items():
+        if key.lower() == "retry-after":
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+class ModelBackend:
+    """路由模型中的一个后端：模型、权重、速率预算以及观测到的延迟和错误率"""
+
+    def __init__(
+        self,
+        model: BaseChatModel,
+        name: Optional[str] = None,
+        weight: float = 1.0,
+        tokens_per_minute: Optional[float] = None,
+        requests_per_minute: Optional[float] = None,
+    ):
+        """
+        初始化后端
+
+        Args:
+            model: 聊天模型
+            name: 后端名称，默认为模型名
+            weight: 路由权重，权重越大分到的请求越多
+            tokens_per_minute: 该后端每分钟令牌数上限，None 表示不限制
+            requests_per_minute: 该后端每分钟请求数上限，None 表示不限制
+        """
+        self.model = model
+        self.name = (
+            name or getattr(model, "model_name", None) or getattr(model, "deployment_name", None) or model._llm_type
+        )
+        self.weight = weight
+        self.rate_limiter = (
+            TokenBucket(tokens_per_minute=tokens_per_minute or float("inf"), requests_per_minute=requests_per_minute)
+            if tokens_per_minute or requests_per_minute
+            else None
+        )
+
+        self.latency: Optional[float] = None  # 成功调用延迟的指数移动平均（秒）
+        self.error_rate = 0.0  # 失败率的指数移动平均
+        self.cooldown_until = 0.0  # 在此时刻（monotonic）之前不再路由到该后端
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.rate_limited = 0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "latency": self.latency,
+            "error_rate": round(self.error_rate, 4),
+            "requests": self.requests,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "cooling_down": max(0.0, self.cooldown_until - time.monotonic()),
+        }
+
+
+class RoutedChatModel(BaseChatModel):
+    """在多个模型后端之间负载均衡并自动故障转移的聊天模型
+
+    每次调用按 ``权重 / 平均延迟 × (1 - 错误率)²`` 加权随机选择后端，优先选择速率预算
+    仍有余量的后端。某个后端被限流或出错时进入冷却期（限流时优先使用 ``Retry-After``），
+    本次请求立即转到下一个后端；只有所有后端都失败时才向调用方抛出异常。
+    """
+
+    backends: List[ModelBackend]
+    model_name: str = "routed"
+    ewma_alpha: float = 0.2  # 延迟和错误率移动平均的平滑系数
+    error_cooldown: float = 5.0  # 普通错误后的基础冷却时间（秒），连续失败时指数增长
+    rate_limit_cooldown: float = 30.0  # 限流且没有 Retry-After 时的冷却时间（秒）
+    max_cooldown: float = 300.0
+    seed: Optional[int] = None
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _rng: random.Random = PrivateAttr(default=None)
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        if not self.backends:
+            raise ValueError("RoutedChatModel needs at least one backend")
+        self._rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    def _score(self, backend: ModelBackend) -> float:
+        known = [b.latency for b in self.backends if b.latency is not None]
+        latency = backend.latency if backend.latency is not None else (sum(known) / len(known) if known else 1.0)
+        return backend.weight / max(latency, 1e-3) * (1 - min(backend.error_rate, 0.99)) ** 2
+
+    def _ranked_backends(self) -> List[ModelBackend]:
+        """按加权随机顺序排列可用后端，冷却中的后端按冷却结束时间排在最后"""
+        now = time.monotonic()
+        with self._lock:
+            available = [b for b in self.backends if b.is_available(now)]
+            cooling = sorted((b for b in self.backends if not b.is_available(now)), key=lambda b: b.cooldown_until)
+            ranked = []
+            weights = [self._score(b) for b in available]
+            while available:
+                index = self._rng.choices(range(len(available)), weights=weights)[0]
+                ranked.append(available.pop(index))
+                weights.pop(index)
+        return ranked + cooling
+
+    def _pick_order(self, estimated_tokens: int) -> List[Tuple[ModelBackend, bool]]:
+        """返回 (后端, 是否已申请到额度) 列表，第一个当前有速率预算的后端排在最前"""
+        ranked = self._ranked_backends()
+        for index, backend in enumerate(ranked):
+            if backend.rate_limiter is None or backend.rate_limiter.try_acquire(estimated_tokens):
+                ranked.pop(index)
+                return [(backend, True)] + [(b, False) for b in ranked]
+        return [(b, False) for b in ranked]
+
+    def _record_success(self, backend: ModelBackend, latency: float):
+        with self._lock:
+            alpha = self.ewma_alpha
+            backend.requests += 1
+            backend.latency = latency if backend.latency is None else (1 - alpha) * backend.latency + alpha * latency
+            backend.error_rate *= 1 - alpha
+            backend.consecutive_failures = 0
+
+    def _record_failure(self, backend: ModelBackend, error: Exception):
+        with self._lock:
+            alpha = self.ewma_alpha
+            backend.requests += 1
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            backend.error_rate = (1 - alpha) * backend.error_rate + alpha
+            if _is_rate_limit_error(error):
+                backend.rate_limited += 1
+                cooldown = _retry_after(error) or self.rate_limit_cooldown
+            else:
+                cooldown = self.error_cooldown * (2 ** (backend.consecutive_failures - 1))
+            cooldown = min(cooldown, self.max_cooldown)
+            backend.cooldown_until = time.monotonic() + cooldown
+        logger.warning(f"Model backend {backend.name} failed, cooling down for {cooldown:.1f}s: {error}")
+
+    @staticmethod
+    def _check_result(result: ChatResult) -> ChatResult:
+        """后端没有返回内容或返回的是错误文本时按失败处理"""
+        text = result.generations[0].text if result.generations else ""
+        if not result.generations or text.startswith(ERROR_RESPONSE_PREFIXES):
+            raise RuntimeError(text or "Empty response from model backend")
+        return result
+
+    def _estimate_tokens(self, messages: List[BaseMessage]) -> int:
+        return sum(get_tokenizer().count_batch(str(message.content) for message in messages))
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        estimated_tokens = self._estimate_tokens(messages)
+        errors: Dict[str, Exception] = {}
+        for backend, acquired in self._pick_order(estimated_tokens):
+            if not acquired and backend.rate_limiter is not None:
+                backend.rate_limiter.get_tokens_sync(estimated_tokens)
+            started = time.monotonic()
+            try:
+                # 直接调用后端的实现，用量随本模型的运行上报给回调，避免重复统计
+                result = self._check_result(backend.model._generate(messages, stop=stop, **kwargs))
+            except Exception as e:
+                self._record_failure(backend, e)
+                errors[backend.name] = e
+                continue
+            self._record_success(backend, time.monotonic() - started)
+            return result
+        raise AllBackendsFailedError(errors)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        estimated_tokens = self._estimate_tokens(messages)
+        errors: Dict[str, Exception] = {}
+        for backend, acquired in self._pick_order(estimated_tokens):
+            if not acquired and backend.rate_limiter is not None:
+                await backend.rate_limiter.get_tokens(estimated_tokens)
+            started = time.monotonic()
+            try:
+                result = self._check_result(await backend.model._agenerate(messages, stop=stop, **kwargs))
+            except Exception as e:
+                self._record_failure(backend, e)
+                errors[backend.name] = e
+                continue
+            self._record_success(backend, time.monotonic() - started)
+            return result
+        raise AllBackendsFailedError(errors)
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """获取每个后端的路由统计"""
+        with self._lock:
+            return [backend.get_stats() for backend in self.backends]
+
+    def configure_connection_pool(self, max_connections: int):
+        """按调用方的并发数调整各后端的连接池"""
+        for backend in self.backends:
+            configure = getattr(backend.model, "configure_connection_pool", None)
+            if callable(configure):
+                configure(max_connections)
+
+    async def aclose(self):
+        """关闭各后端在当前事件循环中的连接"""
+        for backend in self.backends:
+            aclose = getattr(backend.model, "aclose", None)
+            if callable(aclose):
+                await aclose()
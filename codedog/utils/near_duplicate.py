@@ -0,0 +1,208 @@
+import hashlib
+import os
+import random
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from unidiff.constants import RE_HUNK_HEADER
+
+# 比较时忽略的 git 文件头：路径、blob 哈希和文件模式在 cherry-pick、重命名之间都会变化
+_HEADER_PREFIXES = (
+    "diff --git ", "index ", "--- ", "+++ ", "old mode ", "new mode ", "deleted file mode ", "new file mode ",
+    "similarity index ", "dissimilarity index ", "rename from ", "rename to ", "copy from ", "copy to ",
+)
+_FILE_NAME = re.compile(r"^diff --git a/(.*?) b/", re.MULTILINE)
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+# 梅森素数 2^61-1，作为 MinHash 置换 (a * x + b) mod p 的模数
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def _file_extension(diff: str, file_path: Optional[str] = None) -> str:
+    """文件扩展名：优先使用调用方给出的路径，其次是 diff 中的 ``diff --git`` 行"""
+    if file_path is None:
+        match = _FILE_NAME.search(diff)
+        file_path = match.group(1) if match else ""
+    return os.path.splitext(file_path)[1].lower()
+
+
+def normalize_diff(diff: str) -> str:
+    """
+    规范化 diff，去掉与代码内容无关的差异
+
+    去掉 git 文件头（第一个 hunk 之前的行），hunk 头只保留函数上下文（不含行号），每行去掉
+    首尾空白并合并连续空白。同一改动 cherry-pick 到其他分支、rebase 后或文件改名后得到的
+    diff 规范化结果相同。hunk 中以 ``--- ``/``+++ `` 开头的内容行（如删除的 SQL 注释）保留。
+    """
+    lines = []
+    in_header = True
+    for line in diff.split("\n"):
+        match = RE_HUNK_HEADER.match(line)
+        if match:
+            in_header = False
+            lines.append(f"@@ {match.group(5).strip()}".rstrip())
+            continue
+        if line.startswith("diff --git "):
+            in_header = True
+        if (in_header and line.startswith(_HEADER_PREFIXES)) or line.startswith("\\ No newline"):
+            continue
+        if not line.strip():
+            continue
+        marker, body = (line[0], line[1:]) if line[0] in "+- " else (" ", line)
+        lines.append(marker + " ".join(body.split()))
+    return "\n".join(lines)
+
+
+def _changed_lines(normalized: str) -> List[str]:
+    return [line for line in normalized.split("\n") if line.startswith(("+", "-"))]
+
+
+def _shingles(normalized: str, size: int) -> Set[int]:
+    """改动行的词元 shingle 集合（64 位哈希），新增和删除的词元分别带上 +/- 前缀"""
+    tokens = [
+        f"{line[0]}{token}" for line in _changed_lines(normalized) for token in _TOKEN.findall(line[1:])
+    ]
+    if len(tokens) < size:
+        groups = [tokens] if tokens else []
+    else:
+        groups = [tokens[i:i + size] for i in range(len(tokens) - size + 1)]
+    return {
+        int.from_bytes(hashlib.blake2b("\0".join(group).encode("utf-8"), digest_size=8).digest(), "big")
+        for group in groups
+    }
+
+
+class NearDuplicateIndex:
+    """近似重复 diff 的索引，用于复用已有的评价结果
+
+    两级查找：
+
+    - 规范化 diff 的哈希完全相同（cherry-pick、rebase、改名），直接复用；
+    - 改动行词元 shingle 的 MinHash 签名，按 LSH 分段找候选，估计的 Jaccard 相似度
+      不低于 ``threshold`` 时复用（codemod 在大量文件中做的相同修改）。
+
+    只在扩展名相同的文件之间复用，评价 prompt 中的语言由扩展名决定。
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        min_shingles: int = 8,
+        seed: int = 1,
+    ):
+        """
+        初始化索引
+
+        Args:
+            threshold: 复用结果所需的最小 Jaccard 相似度（MinHash 估计值）
+            num_perm: MinHash 签名长度，必须能被 ``bands`` 整除
+            bands: LSH 分段数，分段越多召回率越高、候选越多
+            shingle_size: 每个 shingle 包含的词元数
+            min_shingles: 参与 MinHash 匹配的最少 shingle 数，太短的 diff 只做规范化哈希匹配
+            seed: 生成置换参数的随机种子，固定种子使签名在多次运行之间一致
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+        self._lock = threading.Lock()
+        self._exact: Dict[Tuple[str, str], Tuple[Dict[str, Any], int]] = {}
+        self._entries: List[Tuple[str, Tuple[int, ...], Dict[str, Any], int]] = []
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], List[int]] = defaultdict(list)
+        self.exact_hits = 0
+        self.similar_hits = 0
+
+    def signature(self, shingles: Set[int]) -> Tuple[int, ...]:
+        """计算 shingle 集合的 MinHash 签名"""
+        return tuple(
+            min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles) if shingles else _MERSENNE_PRIME
+            for a, b in self._permutations
+        )
+
+    def _band_keys(self, extension: str, signature: Tuple[int, ...]) -> List[Tuple[str, int, Tuple[int, ...]]]:
+        return [
+            (extension, band, signature[band * self.rows:(band + 1) * self.rows]) for band in range(self.bands)
+        ]
+
+    def _prepare(self, diff: str, file_path: Optional[str]) -> Tuple[str, str, int, Optional[Tuple[int, ...]]]:
+        normalized = normalize_diff(diff)
+        key = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        shingles = _shingles(normalized, self.shingle_size)
+        signature = self.signature(shingles) if len(shingles) >= self.min_shingles else None
+        return _file_extension(diff, file_path), key, len(_changed_lines(normalized)), signature
+
+    def add(self, diff: str, result: Dict[str, Any], file_path: Optional[str] = None):
+        """
+        登记一个已评价的 diff 及其结果
+
+        Args:
+            diff: 文件 diff
+            result: 评价结果
+            file_path: 文件路径，用于按扩展名分区；None 时从 diff 的 ``diff --git`` 行读取
+        """
+        extension, key, changed, signature = self._prepare(diff, file_path)
+        with self._lock:
+            if (extension, key) in self._exact:
+                return
+            self._exact[(extension, key)] = (result, changed)
+            if signature is None:
+                return
+            self._entries.append((extension, signature, result, changed))
+            for band_key in self._band_keys(extension, signature):
+                self._buckets[band_key].append(len(self._entries) - 1)
+
+    def find(self, diff: str, file_path: Optional[str] = None) -> Optional[Tuple[Dict[str, Any], float, float]]:
+        """
+        查找近似重复的已评价 diff
+
+        Args:
+            diff: 文件 diff
+            file_path: 文件路径（见 ``add``）
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], float, float]]: (已有结果, 相似度, 改动行数之比)，
+                未找到时返回 None；规范化后完全相同时相似度为 1.0
+        """
+        extension, key, changed, signature = self._prepare(diff, file_path)
+        with self._lock:
+            exact = self._exact.get((extension, key))
+            if exact is not None:
+                self.exact_hits += 1
+                result, matched_changed = exact
+                return result, 1.0, changed / matched_changed if matched_changed else 1.0
+            if signature is None:
+                return None
+
+            candidates = {index for band_key in self._band_keys(extension, signature)
+                          for index in self._buckets.get(band_key, ())}
+            best = None
+            for index in candidates:
+                _, candidate_signature, result, matched_changed = self._entries[index]
+                similarity = sum(x == y for x, y in zip(signature, candidate_signature)) / self.num_perm
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (result, similarity, changed / matched_changed if matched_changed else 1.0)
+            if best is not None:
+                self.similar_hits += 1
+            return best
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._exact)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取索引统计信息"""
+        return {"entries": len(self), "exact_hits": self.exact_hits, "similar_hits": self.similar_hits}
@@ -0,0 +1,299 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve(future: asyncio.Future, result: Any):
+    if not future.done():
+        future.set_result(result)
+
+
+class TokenBucket(BaseRateLimiter):
+    """同时限制每分钟令牌数（TPM）和每分钟请求数（RPM）的事件驱动令牌桶
+
+    余额不足的请求作为等待者放入按"单独等待即可满足的时间"排序的堆中，小请求优先，
+    大请求随排队时间推移也会轮到。整个令牌桶只维护一个定时器，在堆顶等待者的余额
+    足够时触发，唤醒此刻能够继续的全部等待者，不再为每个请求轮询。
+
+    可以直接调用 ``get_tokens`` 按实际令牌数申请额度，也可以作为 LangChain 的
+    ``rate_limiter`` 传给聊天模型（每次调用按 ``tokens_per_request`` 估算），
+    从而让审查链和评价器共享同一份速率预算。
+    """
+
+    def __init__(
+        self,
+        tokens_per_minute: float = 10000,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_request: int = 0,
+    ):
+        """
+        初始化令牌桶
+
+        Args:
+            tokens_per_minute: 每分钟令牌数上限，同时也是桶的容量
+            requests_per_minute: 每分钟请求数上限，None 表示不限制
+            tokens_per_request: 通过 ``acquire``/``aacquire`` 申请时每个请求估算的令牌数
+        """
+        self._tokens_per_minute = float(tokens_per_minute)
+        self._requests_per_minute = float(requests_per_minute) if requests_per_minute else None
+        self.tokens_per_request = tokens_per_request
+
+        self.tokens = self._tokens_per_minute
+        self.requests = self._requests_per_minute or 0.0
+        self.last_update = time.monotonic()
+        self.created_at = self.last_update
+
+        self.total_tokens_used = 0.0  # 统计总共使用的令牌数
+        self.total_requests = 0  # 统计总共放行的请求数
+        self.total_wait_time = 0.0  # 统计总共等待的时间
+
+        # 等待者堆：(单独等待即可满足的时刻, 序号, 令牌数, future)
+        self._waiters: List[Tuple[float, int, float, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = 0.0
+        self._timer_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def tokens_per_minute(self) -> float:
+        return self._tokens_per_minute
+
+    @tokens_per_minute.setter
+    def tokens_per_minute(self, value: float):
+        """调整令牌速率（自适应限流使用），已积累的令牌按旧速率结算"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens_per_minute = float(value)
+            self.tokens = min(self.tokens, self._tokens_per_minute)
+            self._dispatch()
+
+    @property
+    def requests_per_minute(self) -> Optional[float]:
+        return self._requests_per_minute
+
+    @requests_per_minute.setter
+    def requests_per_minute(self, value: Optional[float]):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._requests_per_minute = float(value) if value else None
+            self.requests = min(self.requests, self._requests_per_minute or 0.0)
+            self._dispatch()
+
+    @property
+    def pending_requests(self) -> int:
+        """当前排队等待的请求数"""
+        with self._lock:
+            return sum(1 for *_, future in self._waiters if not future.done())
+
+    def _refill(self, now: float):
+        elapsed = now - self.last_update
+        if elapsed > 0:
+            self.tokens = min(self._tokens_per_minute, self.tokens + elapsed * self._tokens_per_minute / 60.0)
+            if self._requests_per_minute:
+                self.requests = min(
+                    self._requests_per_minute, self.requests + elapsed * self._requests_per_minute / 60.0
+                )
+        self.last_update = now
+
+    def _shortfall(self, requested_tokens: float) -> float:
+        """余额还需多久（秒）才能满足请求，0 表示可以立即放行
+
+        超过桶容量的请求只需等到桶满，放行后余额记为负数，由后续请求偿还。
+        """
+        needed = min(requested_tokens, self._tokens_per_minute)
+        delay = 0.0
+        if self.tokens < needed:
+            if self._tokens_per_minute <= 0:
+                return float("inf")
+            delay = (needed - self.tokens) * 60.0 / self._tokens_per_minute
+        if self._requests_per_minute and self.requests < 1:
+            delay = max(delay, (1 - self.requests) * 60.0 / self._requests_per_minute)
+        return delay
+
+    def _consume(self, requested_tokens: float):
+        self.tokens -= requested_tokens
+        if self._requests_per_minute:
+            self.requests -= 1
+        self.total_tokens_used += requested_tokens
+        self.total_requests += 1
+
+    def _dispatch(self):
+        """放行堆顶所有已能满足的等待者，并为下一个等待者设置唯一的定时器（需持有锁）"""
+        while self._waiters:
+            _, _, requested_tokens, future = self._waiters[0]
+            if future.done():
+                # 已取消的等待者延迟删除
+                heapq.heappop(self._waiters)
+                continue
+            if self._shortfall(requested_tokens) > 0:
+                break
+            heapq.heappop(self._waiters)
+            self._consume(requested_tokens)
+            future.get_loop().call_soon_threadsafe(_resolve, future, True)
+
+        if not self._waiters:
+            self._cancel_timer()
+            return
+
+        _, _, requested_tokens, future = self._waiters[0]
+        delay = self._shortfall(requested_tokens)
+        if delay == float("inf"):
+            self._cancel_timer()
+            return
+        wake_at = self.last_update + delay
+        loop = future.get_loop()
+        if self._timer is not None and self._timer_loop is loop and abs(self._timer_at - wake_at) < 1e-3:
+            return
+
+        self._cancel_timer()
+        self._timer_at = wake_at
+        self._timer_loop = loop
+        if loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._timer = loop.call_later(delay, self._on_timer)
+        else:
+            # 从其他线程或事件循环调整速率时，在等待者所在的循环中设置定时器
+            loop.call_soon_threadsafe(self._schedule_from_loop)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _schedule_from_loop(self):
+        with self._lock:
+            self._timer = None
+            self._refill(time.monotonic())
+            self._dispatch()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._refill(time.monotonic())
+            self._dispatch()
+
+    def try_acquire(self, requested_tokens: float) -> bool:
+        """不等待地尝试申请额度，成功返回 True"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._waiters or self._shortfall(requested_tokens) > 0:
+                return False
+            self._consume(requested_tokens)
+            return True
+
+    async def get_tokens(self, requested_tokens: float) -> float:
+        """申请令牌，余额不足时等待。返回实际等待的时间（秒）"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # 已有等待者时排在后面，避免新请求插队饿死大请求
+            if not self._waiters and self._shortfall(requested_tokens) == 0:
+                self._consume(requested_tokens)
+                return 0.0
+
+            future = loop.create_future()
+            ready_at = now + self._shortfall(requested_tokens)
+            heapq.heappush(self._waiters, (ready_at, next(self._sequence), requested_tokens, future))
+            self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if future.done() and not future.cancelled():
+                    # 已放行但调用方被取消，归还额度
+                    self.tokens += requested_tokens
+                    if self._requests_per_minute:
+                        self.requests += 1
+                    self.total_tokens_used -= requested_tokens
+                    self.total_requests -= 1
+                self._dispatch()
+            raise
+
+        wait_time = time.monotonic() - now
+        with self._lock:
+            self.total_wait_time += wait_time
+        return wait_time
+
+    def get_tokens_sync(self, requested_tokens: float) -> float:
+        """同步版本的 ``get_tokens``，在当前线程中按需要的时间睡眠"""
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                delay = self._shortfall(requested_tokens)
+                if delay == 0 and not self._waiters:
+                    self._consume(requested_tokens)
+                    wait_time = time.monotonic() - started
+                    self.total_wait_time += wait_time
+                    return wait_time
+            # 有异步等待者排队时让出一小段时间
+            time.sleep(delay if delay > 0 else 0.01)
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        """LangChain ``BaseRateLimiter`` 接口：为一次模型调用申请额度"""
+        if not blocking:
+            return self.try_acquire(self.tokens_per_request)
+        self.get_tokens_sync(self.tokens_per_request)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        """LangChain ``BaseRateLimiter`` 接口：为一次模型调用申请额度"""
+        if not blocking:
+            return self.try_acquire(self.tokens_per_request)
+        await self.get_tokens(self.tokens_per_request)
+        return True
+
+    def get_stats(self) -> Dict[str, float]:
+        """获取令牌桶的使用统计信息"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            current_tokens = self.tokens
+            waiting_tokens = [tokens for *_, tokens, future in self._waiters if not future.done()]
+
+        # 实际使用率（令牌/分钟）
+        elapsed_time = now - self.created_at
+        usage_rate = self.total_tokens_used / (elapsed_time / 60.0) if elapsed_time > 0 else 0
+
+        # 估计的恢复时间：排队请求全部放行所需的时间
+        recovery_time = 0
+        if waiting_tokens and self._tokens_per_minute > 0:
+            recovery_time = max(0, (sum(waiting_tokens) - current_tokens) * 60.0 / self._tokens_per_minute)
+
+        return {
+            "tokens_per_minute": self._tokens_per_minute,
+            "requests_per_minute": self._requests_per_minute,
+            "current_tokens": current_tokens,
+            "total_tokens_used": self.total_tokens_used,
+            "total_requests": self.total_requests,
+            "total_wait_time": self.total_wait_time,
+            "average_wait_time": self.total_wait_time / max(1, self.total_tokens_used / 1000),  # 每1000个令牌的平均等待时间
+            "pending_requests": len(waiting_tokens),
+            "usage_rate": usage_rate,
+            "recovery_time": recovery_time,  # 估计的恢复时间（秒）
+        }
+
+
+def with_rate_limiter(llm: Any, rate_limiter: Optional[BaseRateLimiter]) -> Any:
+    """返回挂载了速率限制器的聊天模型副本，非聊天模型或未指定限制器时原样返回"""
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+    if rate_limiter is None or not isinstance(llm, BaseChatModel):
+        return llm
+    return llm.model_copy(update={"rate_limiter": rate_limiter})
@@ -6,6 +6,9 @@ from github import Github
 from gitlab import Gitlab
 from urllib.parse import urlparse
 
+from codedog.utils.concurrent_fetch import DEFAULT_FETCH_WORKERS, RateLimitBackoff, fetch_concurrently
+from codedog.utils.file_filter import FileFilter
+
 @dataclass
 class CommitInfo:
     """Store commit information"""
@@ -22,14 +25,25 @@ class CommitInfo:
 class RemoteRepositoryAnalyzer:
     """Analyzer for remote Git repositories (GitHub and GitLab)"""
     
-    def __init__(self, repo_url: str, access_token: Optional[str] = None):
+    def __init__(
+        self,
+        repo_url: str,
+        access_token: Optional[str] = None,
+        max_workers: int = DEFAULT_FETCH_WORKERS,
+        file_filter: Optional[FileFilter] = None,
+    ):
         """Initialize the analyzer with repository URL and optional access token.
         
         Args:
             repo_url: Full URL to the repository (e.g., https://github.com/owner/repo)
             access_token: GitHub/GitLab access token (can also be set via GITHUB_TOKEN/GITLAB_TOKEN env vars)
+            max_workers: Maximum number of commit details fetched in parallel
+            file_filter: Skips generated, vendored and lock files by path and patch content
         """
         self.repo_url = repo_url
+        self.max_workers = max_workers
+        self.file_filter = file_filter
+        self.backoff = RateLimitBackoff()
         parsed_url = urlparse(repo_url)
         
         # Extract platform, owner, and repo name from URL
@@ -55,6 +69,7 @@ class RemoteRepositoryAnalyzer:
             if not token:
                 raise ValueError("GitLab token required. Set via access_token or GITLAB_TOKEN env var")
             self.client = Gitlab('https://gitlab.com', private_token=token)
+            self.backoff.install_response_hook(self.client.session)
             self.repo = self.client.projects.get(f"{self.owner}/{self.repo_name}")
         else:
             raise ValueError(f"Unsupported Git platform: {parsed_url.netloc}")
@@ -79,48 +94,24 @@ class RemoteRepositoryAnalyzer:
         Returns:
             List of CommitInfo objects containing commit details
         """
-        commits = []
-        
         if self.platform == 'github':
             # GitHub API query
-            gh_commits = self.repo.get_commits(
+            listed_commits = self.repo.get_commits(
                 author=author,
                 since=start_date,
                 until=end_date
             )
-            
-            for commit in gh_commits:
-                files = []
-                diff = ""
-                added_lines = 0
-                deleted_lines = 0
-                
+
+            def fetch(commit):
                 # Get detailed commit info including diffs
                 detailed_commit = self.repo.get_commit(commit.sha)
-                for file in detailed_commit.files:
-                    if self._should_include_file(file.filename, include_extensions, exclude_extensions):
-                        files.append(file.filename)
-                        if file.patch:
-                            diff += f"diff --git a/{file.filename} b/{file.filename}\n{file.patch}\n"
-                        added_lines += file.additions
-                        deleted_lines += file.deletions
-                
-                if files:  # Only include commits that modified relevant files
-                    commits.append(CommitInfo(
-                        hash=commit.sha,
-                        author=commit.commit.author.name,
-                        date=commit.commit.author.date,
-                        message=commit.commit.message,
-                        files=files,
-                        diff=diff,
-                        added_lines=added_lines,
-                        deleted_lines=deleted_lines,
-                        effective_lines=added_lines - deleted_lines
-                    ))
-                    
+                remaining, _ = self.client.rate_limiting
+                self.backoff.observe(remaining, self.client.rate_limiting_resettime)
+                return self._build_github_commit(commit, detailed_commit, include_extensions, exclude_extensions)
+
         elif self.platform == 'gitlab':
             # GitLab API query
-            gl_commits = self.repo.commits.list(
+            listed_commits = self.repo.commits.list(
                 all=True,
                 query_parameters={
                     'author': author,
@@ -128,54 +119,110 @@ class RemoteRepositoryAnalyzer:
                     'until': end_date.isoformat()
                 }
             )
-            
-            for commit in gl_commits:
+
+            def fetch(commit):
                 # Get detailed commit info including diffs
                 detailed_commit = self.repo.commits.get(commit.id)
-                diff = detailed_commit.diff()
-                
-                files = []
-                added_lines = 0
-                deleted_lines = 0
-                
-                for change in diff:
-                    if self._should_include_file(change['new_path'], include_extensions, exclude_extensions):
-                        files.append(change['new_path'])
-                        # Parse diff to count lines
-                        if change.get('diff'):
-                            for line in change['diff'].splitlines():
-                                if line.startswith('+') and not line.startswith('+++'):
-                                    added_lines += 1
-                                elif line.startswith('-') and not line.startswith('---'):
-                                    deleted_lines += 1
-                
-                if files:  # Only include commits that modified relevant files
-                    commits.append(CommitInfo(
-                        hash=commit.id,
-                        author=commit.author_name,
-                        date=datetime.fromisoformat(commit.created_at),
-                        message=commit.message,
-                        files=files,
-                        diff='\n'.join(d['diff'] for d in diff if d.get('diff')),
-                        added_lines=added_lines,
-                        deleted_lines=deleted_lines,
-                        effective_lines=added_lines - deleted_lines
-                    ))
-        
-        return commits
+                return self._build_gitlab_commit(commit, detailed_commit.diff(), include_extensions, exclude_extensions)
+
+        # Fetch commit details concurrently, keeping the listing order
+        commits = fetch_concurrently(listed_commits, fetch, self.max_workers, self.backoff)
+
+        # Only include commits that modified relevant files
+        return [commit for commit in commits if commit is not None]
+
+    def _build_github_commit(
+        self,
+        commit: Any,
+        detailed_commit: Any,
+        include_extensions: Optional[List[str]] = None,
+        exclude_extensions: Optional[List[str]] = None
+    ) -> Optional[CommitInfo]:
+        """Build a CommitInfo from a GitHub commit, or None if no file matches the filters."""
+        files = []
+        diff = ""
+        added_lines = 0
+        deleted_lines = 0
+
+        for file in detailed_commit.files:
+            if self._should_include_file(file.filename, include_extensions, exclude_extensions, file.patch):
+                files.append(file.filename)
+                if file.patch:
+                    diff += f"diff --git a/{file.filename} b/{file.filename}\n{file.patch}\n"
+                added_lines += file.additions
+                deleted_lines += file.deletions
+
+        if not files:
+            return None
+
+        return CommitInfo(
+            hash=commit.sha,
+            author=commit.commit.author.name,
+            date=commit.commit.author.date,
+            message=commit.commit.message,
+            files=files,
+            diff=diff,
+            added_lines=added_lines,
+            deleted_lines=deleted_lines,
+            effective_lines=added_lines - deleted_lines
+        )
+
+    def _build_gitlab_commit(
+        self,
+        commit: Any,
+        diff: List[Dict[str, Any]],
+        include_extensions: Optional[List[str]] = None,
+        exclude_extensions: Optional[List[str]] = None
+    ) -> Optional[CommitInfo]:
+        """Build a CommitInfo from a GitLab commit diff, or None if no file matches the filters."""
+        files = []
+        patches = []
+        added_lines = 0
+        deleted_lines = 0
+
+        for change in diff:
+            patch = change.get('diff')
+            if self._should_include_file(change['new_path'], include_extensions, exclude_extensions, patch):
+                files.append(change['new_path'])
+                if patch:
+                    patches.append(patch)
+                # Parse diff to count lines
+                if change.get('diff'):
+                    for line in change['diff'].splitlines():
+                        if line.startswith('+') and not line.startswith('+++'):
+                            added_lines += 1
+                        elif line.startswith('-') and not line.startswith('---'):
+                            deleted_lines += 1
+
+        if not files:
+            return None
+
+        return CommitInfo(
+            hash=commit.id,
+            author=commit.author_name,
+            date=datetime.fromisoformat(commit.created_at),
+            message=commit.message,
+            files=files,
+            diff='\n'.join(patches),
+            added_lines=added_lines,
+            deleted_lines=deleted_lines,
+            effective_lines=added_lines - deleted_lines
+        )
 
     def _should_include_file(
         self,
         filename: str,
         include_extensions: Optional[List[str]] = None,
-        exclude_extensions: Optional[List[str]] = None
+        exclude_extensions: Optional[List[str]] = None,
+        patch: Optional[str] = None
     ) -> bool:
-        """Check if a file should be included based on its extension.
+        """Check if a file should be included based on its extension and the analyzer's file filter.
         
         Args:
             filename: Name of the file to check
             include_extensions: List of file extensions to include
             exclude_extensions: List of file extensions to exclude
+            patch: Diff of the file, checked for generated or minified content
             
         Returns:
             Boolean indicating whether the file should be included
@@ -188,8 +235,11 @@ class RemoteRepositoryAnalyzer:
         if exclude_extensions and ext in exclude_extensions:
             return False
             
-        if include_extensions:
-            return ext in include_extensions
+        if include_extensions and ext not in include_extensions:
+            return False
+
+        if self.file_filter is not None and self.file_filter.skip_reason(filename, patch) is not None:
+            return False
             
         return True
 
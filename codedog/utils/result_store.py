@@ -0,0 +1,461 @@
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import date, datetime
+from typing import IO, TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from codedog.utils.code_evaluator import FileEvaluationResult
+
+logger = logging.getLogger(__name__)
+
+SCORE_COLUMNS = ("readability", "efficiency", "security", "structure", "error_handling", "documentation", "code_style")
+
+# 每列一个定长二进制文件；文本（文件路径、提交信息、评论）按偏移量和长度引用
+COLUMNS = {
+    **{column: np.dtype("u1") for column in SCORE_COLUMNS},
+    "overall_score": np.dtype("<f4"),
+    "estimated_hours": np.dtype("<f4"),
+    "timestamp": np.dtype("<f8"),  # 提交时间（epoch 秒），用于排序
+    "day": np.dtype("<i4"),  # 提交日期的 ordinal，用于按天聚合
+    "author": np.dtype("<u4"),  # authors.json 中的下标
+    "meta_offset": np.dtype("<u8"),
+    "meta_length": np.dtype("<u4"),
+    "comment_offset": np.dtype("<u8"),
+    "comment_length": np.dtype("<u4"),
+}
+
+_FLUSH_ROWS = 256
+
+
+def _column_path(directory: str, column: str) -> str:
+    return os.path.join(directory, f"{column}.col")
+
+
+def columns_from_results(results: Iterable["FileEvaluationResult"]) -> Dict[str, Any]:
+    """把内存中的评价结果转换为与 ``ResultStore.columns`` 相同格式的列"""
+    rows = list(results)
+    authors: Dict[str, int] = {}
+    columns = {
+        column: np.array([getattr(result.evaluation, column) for result in rows], dtype=COLUMNS[column])
+        for column in SCORE_COLUMNS + ("overall_score",)
+    }
+    columns["estimated_hours"] = np.array(
+        [result.evaluation.estimated_hours or 0.0 for result in rows], dtype=COLUMNS["estimated_hours"]
+    )
+    columns["timestamp"] = np.array([result.date.timestamp() for result in rows], dtype=COLUMNS["timestamp"])
+    columns["day"] = np.array([result.date.toordinal() for result in rows], dtype=COLUMNS["day"])
+    columns["author"] = np.array(
+        [authors.setdefault(result.author, len(authors)) for result in rows], dtype=COLUMNS["author"]
+    )
+    columns["authors"] = list(authors)
+    return columns
+
+
+def summarize_columns(columns: Dict[str, Any]) -> Dict[str, Any]:
+    """对评分列做一次向量化汇总：平均分、总工时、按天趋势和按作者统计"""
+    authors: List[str] = columns["authors"]
+    count = len(columns["timestamp"])
+    if count == 0:
+        return {"count": 0}
+
+    overall = columns["overall_score"].astype(np.float64)
+    hours = columns["estimated_hours"].astype(np.float64)
+    averages = {column: float(columns[column].mean(dtype=np.float64)) for column in SCORE_COLUMNS}
+    averages["overall_score"] = float(overall.mean())
+    averages["estimated_hours"] = float(hours.mean())
+
+    days, day_index = np.unique(columns["day"], return_inverse=True)
+    day_files = np.bincount(day_index)
+    day_overall = np.bincount(day_index, weights=overall) / day_files
+    day_hours = np.bincount(day_index, weights=hours)
+
+    author_index = columns["author"].astype(np.int64)
+    author_files = np.bincount(author_index, minlength=len(authors))
+    author_overall = np.bincount(author_index, weights=overall, minlength=len(authors))
+    author_hours = np.bincount(author_index, weights=hours, minlength=len(authors))
+
+    first = int(np.argmin(columns["timestamp"]))
+    return {
+        "count": count,
+        "averages": averages,
+        "total_hours": float(hours.sum()),
+        "first_author": authors[int(author_index[first])],
+        "start_date": date.fromordinal(int(days[0])),
+        "end_date": date.fromordinal(int(days[-1])),
+        "daily": [
+            {
+                "date": date.fromordinal(int(day)),
+                "files": int(day_files[i]),
+                "overall_score": float(day_overall[i]),
+                "estimated_hours": float(day_hours[i]),
+            }
+            for i, day in enumerate(days)
+        ],
+        "authors": sorted(
+            (
+                {
+                    "author": author,
+                    "files": int(author_files[i]),
+                    "overall_score": float(author_overall[i] / author_files[i]),
+                    "estimated_hours": float(author_hours[i]),
+                }
+                for i, author in enumerate(authors)
+                if author_files[i]
+            ),
+            key=lambda item: (-item["files"], item["author"]),
+        ),
+    }
+
+
+class ResultStore:
+    """按列存储 ``FileEvaluationResult`` 的磁盘结果库
+
+    评分、工时、时间和作者等数值字段各自追加到一个定长二进制列文件中，读取时通过
+    ``numpy.memmap`` 映射，汇总统计是对整列的向量化计算；文件路径、提交信息和评论
+    等文本分别追加到 ``meta.jsonl`` 和 ``comments.txt``，只在逐条输出报告时按偏移量
+    读取。评价大量文件时内存占用保持平稳，之后也可以直接用结果库重新生成报告。
+
+    ``flush_rows=1`` 时每条结果追加后立即落盘，结果库即是已完成评价的预写日志：进程
+    被中断后重新打开，``completed_keys`` 给出已完成的 (commit_hash, file_path)，
+    配合 ``manifest`` 记录的运行参数即可跳过这些文件继续评价。
+    """
+
+    def __init__(self, directory: str, flush_rows: int = _FLUSH_ROWS):
+        """
+        打开（或创建）结果库
+
+        Args:
+            directory: 结果库目录
+            flush_rows: 缓冲多少行后落盘，默认为256；设为1时每条结果写入后立即落盘
+        """
+        self.directory = directory
+        self.flush_rows = max(1, flush_rows)
+        self._restore_swap()
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[Any]] = {column: [] for column in COLUMNS}
+        self._pending_text: List[bytes] = []
+        self._pending_comments: List[bytes] = []
+
+        self._authors_path = os.path.join(directory, "authors.json")
+        self._manifest_path = os.path.join(directory, "manifest.json")
+        self._meta_path = os.path.join(directory, "meta.jsonl")
+        self._comments_path = os.path.join(directory, "comments.txt")
+        self._load()
+
+    def _restore_swap(self):
+        """完成或回滚被中断的 ``discard_failed`` 目录替换"""
+        old_dir = self.directory.rstrip(os.sep) + ".old"
+        if os.path.isdir(old_dir):
+            if os.path.isdir(self.directory):
+                # 新目录已经换入，只差删除旧目录
+                shutil.rmtree(old_dir)
+            else:
+                logger.warning(f"Restoring result store {self.directory} after an interrupted rewrite")
+                os.rename(old_dir, self.directory)
+        shutil.rmtree(self.directory.rstrip(os.sep) + ".tmp", ignore_errors=True)
+
+    def _load(self):
+        """从磁盘读取作者列表、行数和文本文件大小"""
+        self.authors: List[str] = []
+        if os.path.exists(self._authors_path):
+            with open(self._authors_path, "r", encoding="utf-8") as f:
+                self.authors = json.load(f)
+        self._author_ids = {author: i for i, author in enumerate(self.authors)}
+        self._authors_dirty = False
+
+        self._rows = self._recover()
+        self._meta_size = os.path.getsize(self._meta_path) if os.path.exists(self._meta_path) else 0
+        self._comments_size = os.path.getsize(self._comments_path) if os.path.exists(self._comments_path) else 0
+
+    def _recover(self) -> int:
+        """截断进程在刷新途中退出时写到一半的行，返回有效行数
+
+        以最短的列为准截断各列；文本先于数值列写入，``meta.jsonl`` 和 ``comments.txt``
+        末尾可能有没有对应行的内容，截断到最后一个有效行的结尾。
+        """
+        lengths = []
+        for column, dtype in COLUMNS.items():
+            path = _column_path(self.directory, column)
+            lengths.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        rows = min(lengths)
+        if rows != max(lengths):
+            logger.warning(f"Result store {self.directory} has a partially written row, truncating to {rows} rows")
+            for column, dtype in COLUMNS.items():
+                path = _column_path(self.directory, column)
+                if os.path.exists(path):
+                    os.truncate(path, rows * dtype.itemsize)
+
+        meta_end = comments_end = 0
+        if rows:
+            last = self._read_columns(rows)
+            meta_end = int(last["meta_offset"][-1] + last["meta_length"][-1])
+            comments_end = int(last["comment_offset"][-1] + last["comment_length"][-1])
+        for path, end in ((self._meta_path, meta_end), (self._comments_path, comments_end)):
+            if os.path.exists(path) and os.path.getsize(path) > end:
+                logger.warning(f"Result store {self.directory} has text without a row, truncating {path}")
+                os.truncate(path, end)
+        return rows
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._rows
+
+    def append(self, result: "FileEvaluationResult"):
+        """追加一条评价结果（先写入缓冲区，每 ``flush_rows`` 行或调用 ``flush`` 时落盘）"""
+        evaluation = result.evaluation
+        meta = (
+            json.dumps(
+                {
+                    "file_path": result.file_path,
+                    "commit_hash": result.commit_hash,
+                    "commit_message": result.commit_message,
+                    "date": result.date.isoformat(),
+                    # 只给失败的行加标记，成功的行保持原有格式
+                    **({"evaluation_failed": True} if result.evaluation_failed else {}),
+                },
+                ensure_ascii=False,
+            )
+            + "\n"
+        ).encode("utf-8")
+        comment = (evaluation.comments or "").encode("utf-8")
+
+        with self._lock:
+            author_id = self._author_ids.get(result.author)
+            if author_id is None:
+                author_id = self._author_ids[result.author] = len(self.authors)
+                self.authors.append(result.author)
+                self._authors_dirty = True
+
+            pending = self._pending
+            for column in SCORE_COLUMNS:
+                pending[column].append(getattr(evaluation, column))
+            pending["overall_score"].append(evaluation.overall_score)
+            pending["estimated_hours"].append(evaluation.estimated_hours or 0.0)
+            pending["timestamp"].append(result.date.timestamp())
+            pending["day"].append(result.date.toordinal())
+            pending["author"].append(author_id)
+            pending["meta_offset"].append(self._meta_size)
+            pending["meta_length"].append(len(meta))
+            pending["comment_offset"].append(self._comments_size)
+            pending["comment_length"].append(len(comment))
+            self._pending_text.append(meta)
+            self._pending_comments.append(comment)
+            self._meta_size += len(meta)
+            self._comments_size += len(comment)
+            self._rows += 1
+
+            if len(self._pending_text) >= self.flush_rows:
+                self._flush()
+
+    def extend(self, results: Iterable["FileEvaluationResult"]):
+        for result in results:
+            self.append(result)
+
+    def flush(self):
+        """把缓冲区中的行写入磁盘"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._authors_dirty:
+            tmp_path = self._authors_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.authors, f, ensure_ascii=False)
+            os.replace(tmp_path, self._authors_path)
+            self._authors_dirty = False
+
+        if not self._pending_text:
+            return
+        # 先写文本再写数值列，数值列是行是否完整的依据
+        with open(self._meta_path, "ab") as f:
+            f.write(b"".join(self._pending_text))
+        with open(self._comments_path, "ab") as f:
+            f.write(b"".join(self._pending_comments))
+        for column, dtype in COLUMNS.items():
+            with open(_column_path(self.directory, column), "ab") as f:
+                f.write(np.asarray(self._pending[column], dtype=dtype).tobytes())
+            self._pending[column] = []
+        self._pending_text = []
+        self._pending_comments = []
+
+    def clear(self):
+        """删除结果库中的全部结果"""
+        with self._lock:
+            for column in COLUMNS:
+                self._pending[column] = []
+                path = _column_path(self.directory, column)
+                if os.path.exists(path):
+                    os.remove(path)
+            for path in (self._meta_path, self._comments_path, self._authors_path, self._manifest_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._pending_text = []
+            self._pending_comments = []
+            self.authors = []
+            self._author_ids = {}
+            self._authors_dirty = False
+            self._rows = self._meta_size = self._comments_size = 0
+
+    def close(self):
+        self.flush()
+
+    def get_manifest(self) -> Optional[Dict[str, Any]]:
+        """返回 ``set_manifest`` 记录的运行参数，没有记录时返回None"""
+        if not os.path.exists(self._manifest_path):
+            return None
+        with open(self._manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def set_manifest(self, manifest: Dict[str, Any]):
+        """记录产生这些结果的运行参数（作者、时间段、模型等），用于判断能否续跑"""
+        tmp_path = self._manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _iter_meta(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            self._flush()
+            meta_size = self._meta_size
+        if not meta_size:
+            return
+
+        with open(self._meta_path, "rb") as f:
+            for line in f.read(meta_size).splitlines():
+                yield json.loads(line)
+
+    def completed_keys(self) -> Set[Tuple[str, str]]:
+        """返回已成功评价的 (commit_hash, file_path) 集合，只读取 ``meta.jsonl``
+
+        评价失败（出错或速率限制时用默认分数代替）的行不算完成，续跑时会重新评价。
+        """
+        return {
+            (meta["commit_hash"], meta["file_path"]) for meta in self._iter_meta() if not meta.get("evaluation_failed")
+        }
+
+    def discard_failed(self) -> int:
+        """
+        删除评价失败的行，返回删除的行数
+
+        续跑前调用，重新评价的结果不会与失败的旧结果在报告中重复出现。保留的行先流式写入
+        临时目录，再整体替换结果库目录，不需要把全部结果读入内存；替换过程中进程退出
+        不会丢失已有结果。
+        """
+        failed = sum(1 for meta in self._iter_meta() if meta.get("evaluation_failed"))
+        if not failed:
+            return 0
+
+        tmp_dir = self.directory.rstrip(os.sep) + ".tmp"
+        old_dir = self.directory.rstrip(os.sep) + ".old"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        with ResultStore(tmp_dir) as kept:
+            kept.extend(result for result in self.iter_results(order="insertion") if not result.evaluation_failed)
+            manifest = self.get_manifest()
+            if manifest is not None:
+                kept.set_manifest(manifest)
+
+        # 先把原目录移开再换入新目录；中途退出时由 _restore_swap 在下次打开时恢复
+        with self._lock:
+            os.rename(self.directory, old_dir)
+            os.rename(tmp_dir, self.directory)
+            shutil.rmtree(old_dir)
+            self._load()
+        return failed
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_columns(self, rows: int) -> Dict[str, Any]:
+        columns: Dict[str, Any] = {}
+        for column, dtype in COLUMNS.items():
+            if rows == 0:
+                columns[column] = np.empty(0, dtype=dtype)
+            else:
+                columns[column] = np.memmap(_column_path(self.directory, column), dtype=dtype, mode="r", shape=(rows,))
+        return columns
+
+    def columns(self, author: Optional[str] = None) -> Dict[str, Any]:
+        """
+        刷新缓冲区并返回所有数值列，``authors`` 键为作者列表
+
+        Args:
+            author: 只返回该作者的行，默认为None（返回只读 memmap 形式的全部行）
+        """
+        with self._lock:
+            self._flush()
+            columns = self._read_columns(self._rows)
+            columns["authors"] = list(self.authors)
+            author_id = self._author_ids.get(author)
+        if author is not None:
+            mask = columns["author"] == author_id if author_id is not None else np.zeros(self._rows, dtype=bool)
+            for column in COLUMNS:
+                columns[column] = columns[column][mask]
+        return columns
+
+    def summary(self, author: Optional[str] = None) -> Dict[str, Any]:
+        """汇总统计（见 ``summarize_columns``），可以只统计某个作者"""
+        return summarize_columns(self.columns(author))
+
+    def iter_results(self, order: str = "date", author: Optional[str] = None) -> Iterator["FileEvaluationResult"]:
+        """逐条读取评价结果
+
+        Args:
+            order: ``"date"`` 按提交时间排序（时间相同的保持写入顺序），``"insertion"`` 按写入顺序
+            author: 只读取该作者的结果，默认为None（全部作者）
+        """
+        # 避免与 code_evaluator 循环导入
+        from codedog.utils.code_evaluator import CodeEvaluation, FileEvaluationResult
+
+        columns = self.columns(author)
+        authors = columns["authors"]
+        if order == "date":
+            indices = np.argsort(columns["timestamp"], kind="stable")
+        else:
+            indices = np.arange(len(columns["timestamp"]))
+
+        with open(self._meta_path, "rb") as meta_file, open(self._comments_path, "rb") as comments_file:
+            for i in indices:
+                meta_file.seek(int(columns["meta_offset"][i]))
+                meta = json.loads(meta_file.read(int(columns["meta_length"][i])))
+                comments_file.seek(int(columns["comment_offset"][i]))
+                comment = comments_file.read(int(columns["comment_length"][i])).decode("utf-8")
+
+                evaluation = CodeEvaluation.model_construct(
+                    **{column: int(columns[column][i]) for column in SCORE_COLUMNS},
+                    overall_score=float(columns["overall_score"][i]),
+                    estimated_hours=float(columns["estimated_hours"][i]),
+                    comments=comment,
+                )
+                yield FileEvaluationResult(
+                    file_path=meta["file_path"],
+                    commit_hash=meta["commit_hash"],
+                    commit_message=meta["commit_message"],
+                    date=datetime.fromisoformat(meta["date"]),
+                    author=authors[int(columns["author"][i])],
+                    evaluation=evaluation,
+                    evaluation_failed=meta.get("evaluation_failed", False),
+                )
+
+    def iter_markdown(self, author: Optional[str] = None) -> Iterator[str]:
+        """流式生成评价报告的 Markdown 片段，指定 author 时只包含该作者的结果"""
+        from codedog.utils.code_evaluator import iter_evaluation_markdown
+
+        return iter_evaluation_markdown(self.summary(author), self.iter_results(author=author))
+
+    def write_markdown(self, file: IO[str], author: Optional[str] = None) -> Dict[str, Any]:
+        """把评价报告逐段写入文件对象，返回汇总统计；指定 author 时只包含该作者的结果"""
+        from codedog.utils.code_evaluator import iter_evaluation_markdown
+
+        summary = self.summary(author)
+        for chunk in iter_evaluation_markdown(summary, self.iter_results(author=author)):
+            file.write(chunk)
+        return summary
@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import hmac
+import inspect
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, Union
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# 同一个 PR / MR 的唯一标识：(platform, repository_id, number)
+ReviewKey = Tuple[str, int, int]
+
+# 入队结果
+QUEUED = "queued"
+COALESCED = "coalesced"
+DUPLICATE = "duplicate"
+REJECTED = "rejected"
+
+
+@dataclass
+class ReviewRequest:
+    """一次 PR / MR 审查请求"""
+
+    platform: str  # github 或 gitlab
+    repository_id: int
+    number: int  # GitHub PR 编号或 GitLab MR iid
+    head_sha: str = ""
+    title: str = ""
+
+    @property
+    def key(self) -> ReviewKey:
+        return self.platform, self.repository_id, self.number
+
+
+def parse_github_event(payload: Dict[str, Any]) -> ReviewRequest:
+    """
+    把 GitHub ``pull_request`` webhook 转换为审查请求
+
+    打开、重新打开和推送新提交（synchronize）的非草稿 PR 需要审查。
+
+    Raises:
+        ValueError: 不需要审查的事件，异常信息为原因
+    """
+    pull_request = payload.get("pull_request")
+    if not pull_request:
+        raise ValueError("Not a pull request event.")
+    if payload.get("action") not in ("opened", "reopened", "synchronize"):
+        raise ValueError("Not a pull request open or push event.")
+    if pull_request.get("state", "") != "open":
+        raise ValueError("Pull request status is not open.")
+    if pull_request.get("draft", False):
+        raise ValueError("Pull request is a draft")
+
+    return ReviewRequest(
+        platform="github",
+        repository_id=int(payload.get("repository", {}).get("id", 0)),
+        number=int(payload.get("number") or pull_request.get("number", 0)),
+        head_sha=pull_request.get("head", {}).get("sha", ""),
+        title=pull_request.get("title", ""),
+    )
+
+
+def parse_gitlab_event(payload: Dict[str, Any]) -> ReviewRequest:
+    """
+    把 GitLab ``merge_request`` webhook 转换为审查请求
+
+    打开、重新打开和推送新提交（带 ``oldrev`` 的 update）的非草稿 MR 需要审查。
+
+    Raises:
+        ValueError: 不需要审查的事件，异常信息为原因
+    """
+    object_attributes = payload.get("object_attributes") or {}
+    if payload.get("object_kind") != "merge_request":
+        raise ValueError("Not a merge request event.")
+    action = object_attributes.get("action")
+    if action not in ("open", "reopen") and not (action == "update" and object_attributes.get("oldrev")):
+        raise ValueError("Not a merge request open or push event.")
+    if object_attributes.get("state", "") != "opened":
+        raise ValueError("Merge request status is not opened.")
+    if object_attributes.get("work_in_progress", False) or object_attributes.get("draft", False):
+        raise ValueError("Merge request is a draft")
+
+    return ReviewRequest(
+        platform="gitlab",
+        repository_id=int(payload.get("project", {}).get("id", 0)),
+        number=int(object_attributes.get("iid", 0)),
+        head_sha=(object_attributes.get("last_commit") or {}).get("id", ""),
+        title=object_attributes.get("title", ""),
+    )
+
+
+def _percentiles(samples: Deque[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    return {
+        "p50": ordered[(len(ordered) - 1) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+class ReviewService:
+    """带有限队列、按 PR 合并和工作者池的异步审查服务
+
+    webhook 只负责调用 ``submit`` 入队并立即返回，审查由固定数量的工作者执行：
+
+    - 每个 PR 最多一个等待中的任务：同一 PR 的连续推送合并为一个任务，只审查最新的 head；
+    - 同一 PR 同一时刻最多一个任务在执行，执行期间到来的推送在完成后再审查；
+    - 等待审查的 PR 数达到 ``max_pending`` 时拒绝新的 PR（调用方返回 503 让平台稍后重试）；
+    - ``metrics`` 给出队列深度、等待和执行耗时等指标。
+
+    ``submit`` 需要在服务所在的事件循环中调用。
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[ReviewRequest], Union[Awaitable[Any], Any]],
+        workers: int = 2,
+        max_pending: int = 100,
+        sample_size: int = 1000,
+    ):
+        """
+        初始化审查服务
+
+        Args:
+            handler: 执行一次审查的函数；同步函数在线程池中运行，不会阻塞事件循环
+            workers: 并发执行审查的工作者数量
+            max_pending: 等待审查的 PR 数上限
+            sample_size: 计算耗时分位数时保留的最近样本数
+        """
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self._is_async = inspect.iscoroutinefunction(handler)
+        self._queue: Optional[asyncio.Queue] = None
+        self._idle: Optional[asyncio.Condition] = None
+        self._tasks = []
+        self._stopping = False
+        # 等待中的请求：key -> (最新请求, 首次入队时间)
+        self._pending: Dict[ReviewKey, Tuple[ReviewRequest, float]] = {}
+        self._running: Dict[ReviewKey, ReviewRequest] = {}
+        self._counters = {
+            key: 0 for key in ("submitted", QUEUED, COALESCED, DUPLICATE, REJECTED, "completed", "failed")
+        }
+        self._wait_seconds: Deque[float] = deque(maxlen=sample_size)
+        self._run_seconds: Deque[float] = deque(maxlen=sample_size)
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        """启动工作者"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._idle = asyncio.Condition()
+        self._stopping = False
+        # stop 之后重新启动时，把仍在等待的 PR 重新放回队列
+        for key in self._pending:
+            self._queue.put_nowait(key)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain: bool = True):
+        """
+        停止工作者
+
+        Args:
+            drain: 为 True 时先等待已入队的审查全部完成；否则只等待正在执行的审查结束，
+                未开始的请求保留下来，重新 ``start`` 后继续执行
+        """
+        if not self._tasks:
+            return
+        if drain:
+            await self.join()
+        else:
+            self._stopping = True
+            async with self._idle:
+                await self._idle.wait_for(lambda: not self._running)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self):
+        """等待直到没有等待中或执行中的审查"""
+        async with self._idle:
+            await self._idle.wait_for(lambda: not self._pending and not self._running)
+
+    def submit(self, request: ReviewRequest) -> str:
+        """
+        提交审查请求
+
+        Returns:
+            str: ``queued``（新入队）、``coalesced``（替换了同一 PR 等待中的请求）、
+                ``duplicate``（同一 head 已在等待或执行）或 ``rejected``（队列已满）
+        """
+        if not self._tasks:
+            raise RuntimeError("ReviewService is not started")
+
+        key = request.key
+        self._counters["submitted"] += 1
+        pending = self._pending.get(key)
+        running = self._running.get(key)
+
+        if pending is not None:
+            if pending[0].head_sha == request.head_sha:
+                status = DUPLICATE
+            else:
+                # 保留首次入队时间，等待耗时从第一次推送算起
+                self._pending[key] = (request, pending[1])
+                status = COALESCED
+        elif running is not None and running.head_sha == request.head_sha:
+            status = DUPLICATE
+        elif len(self._pending) >= self.max_pending:
+            status = REJECTED
+        else:
+            self._pending[key] = (request, time.monotonic())
+            # 同一 PR 正在执行时不入队，执行完成后由工作者重新入队
+            if running is None:
+                self._queue.put_nowait(key)
+            status = QUEUED
+
+        self._counters[status] += 1
+        logger.info(f"Review request {request.platform}:{request.repository_id}#{request.number} "
+                    f"{request.head_sha[:8]} {status}")
+        return status
+
+    async def _worker(self):
+        while not self._stopping:
+            key = await self._queue.get()
+            if self._stopping:
+                break
+            request, enqueued_at = self._pending.pop(key)
+            self._running[key] = request
+            started_at = time.monotonic()
+            self._wait_seconds.append(started_at - enqueued_at)
+
+            try:
+                if self._is_async:
+                    await self.handler(request)
+                else:
+                    await asyncio.to_thread(self.handler, request)
+                self._counters["completed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._counters["failed"] += 1
+                logger.exception(f"Review of {request.platform}:{request.repository_id}#{request.number} failed")
+            finally:
+                self._run_seconds.append(time.monotonic() - started_at)
+                del self._running[key]
+                if key in self._pending:
+                    self._queue.put_nowait(key)
+                async with self._idle:
+                    self._idle.notify_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        """返回队列深度、计数和耗时分位数（秒）"""
+        now = time.monotonic()
+        return {
+            "workers": self.workers,
+            "queue_depth": len(self._pending),
+            "running": len(self._running),
+            "max_pending": self.max_pending,
+            "oldest_pending_seconds": max((now - t for _, t in self._pending.values()), default=0.0),
+            **self._counters,
+            "wait_seconds": _percentiles(self._wait_seconds),
+            "run_seconds": _percentiles(self._run_seconds),
+        }
+
+
+def _verify_github_signature(secret: str, body: bytes, signature: str) -> bool:
+    expected = "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature or "")
+
+
+def create_webhook_app(
+    service: ReviewService,
+    github_secret: Optional[str] = None,
+    gitlab_token: Optional[str] = None,
+) -> web.Application:
+    """
+    创建接收 webhook 的 aiohttp 应用
+
+    路由：``POST /github``、``POST /gitlab_event`` 接收事件并入队（202），不需要审查的事件返回 200，
+    队列已满返回 503；``GET /metrics`` 返回 ``ReviewService.metrics``。应用启动和关闭时
+    随之启动和停止审查服务。
+
+    Args:
+        service: 审查服务
+        github_secret: GitHub webhook secret，设置后校验 ``X-Hub-Signature-256``
+        gitlab_token: GitLab webhook secret token，设置后校验 ``X-Gitlab-Token``
+    """
+
+    async def receive(request: web.Request, parse: Callable[[Dict[str, Any]], ReviewRequest]) -> web.Response:
+        try:
+            payload = json.loads(await request.read())
+        except ValueError:
+            return web.Response(status=400, text="Invalid JSON payload.")
+        try:
+            review_request = parse(payload)
+        except (ValueError, TypeError, AttributeError) as e:
+            return web.Response(status=200, text=f"Ignored: {e}")
+
+        status = service.submit(review_request)
+        if status == REJECTED:
+            return web.Response(status=503, text="Review queue is full.", headers={"Retry-After": "60"})
+        return web.Response(status=202, text=f"Review {status}.")
+
+    async def github(request: web.Request) -> web.Response:
+        if github_secret:
+            body = await request.read()
+            if not _verify_github_signature(github_secret, body, request.headers.get("X-Hub-Signature-256", "")):
+                return web.Response(status=401, text="Invalid signature.")
+        return await receive(request, parse_github_event)
+
+    async def gitlab_event(request: web.Request) -> web.Response:
+        if gitlab_token and not hmac.compare_digest(gitlab_token, request.headers.get("X-Gitlab-Token", "")):
+            return web.Response(status=401, text="Invalid token.")
+        return await receive(request, parse_gitlab_event)
+
+    async def metrics(request: web.Request) -> web.Response:
+        return web.json_response(service.metrics())
+
+    async def on_startup(app: web.Application):
+        await service.start()
+
+    async def on_cleanup(app: web.Application):
+        await service.stop(drain=False)
+
+    app = web.Application()
+    app.router.add_post("/github", github)
+    app.router.add_post("/gitlab_event", gitlab_event)
+    app.router.add_get("/metrics", metrics)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
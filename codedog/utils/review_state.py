@@ -0,0 +1,90 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List
+
+from codedog.models import ChangeFile, PullRequest
+
+logger = logging.getLogger(__name__)
+
+
+def file_fingerprint(change_file: ChangeFile) -> str:
+    """变更文件的指纹：发送给模型的内容（路径、状态、diff）不变时指纹不变"""
+    content = change_file.diff_content.content if change_file.diff_content else ""
+    key = "\n".join([change_file.status.value, change_file.source_full_name, change_file.full_name, content])
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+class ReviewStateStore:
+    """记录每个 PR 上次审查结果的状态存储，用于增量审查
+
+    每个 PR 保存为目录下的一个 JSON 文件，包含上次审查的 ``end_commit_id`` 以及每个
+    文件的 blob SHA、diff 指纹和已生成的结果（如 ``review``、``summary``）。
+    新的推送到来时，指纹未变化的文件直接复用已有结果，只有变化的文件需要调用模型。
+    """
+
+    def __init__(self, directory: str):
+        """
+        初始化状态存储
+
+        Args:
+            directory: 保存状态文件的目录
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, pr: PullRequest) -> str:
+        return os.path.join(self.directory, f"{pr.repository_id}-{pr.pull_request_id}.json")
+
+    def load(self, pr: PullRequest) -> Dict[str, Any]:
+        """读取 PR 的审查状态，不存在或损坏时返回空状态"""
+        path = self._path(pr)
+        if not os.path.exists(path):
+            return {"end_commit_id": None, "files": {}}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Failed to read review state {path}, starting a full review: {e}")
+            return {"end_commit_id": None, "files": {}}
+
+    def get_results(self, pr: PullRequest, change_files: List[ChangeFile], field: str) -> Dict[str, str]:
+        """返回指纹未变化的文件已保存的结果 {full_name: result}"""
+        state = self.load(pr)
+        results = {}
+        for change_file in change_files:
+            entry = state["files"].get(change_file.full_name)
+            if entry and entry.get("fingerprint") == file_fingerprint(change_file) and field in entry:
+                results[change_file.full_name] = entry[field]
+        return results
+
+    def save_results(self, pr: PullRequest, change_files: List[ChangeFile], field: str, results: Dict[str, str]):
+        """保存本次审查的结果，并移除已不在 PR 中的文件"""
+        with self._lock:
+            state = self.load(pr)
+            current_names = {change_file.full_name for change_file in pr.change_files}
+            files = {name: entry for name, entry in state["files"].items() if name in current_names}
+
+            for change_file in change_files:
+                if change_file.full_name not in results:
+                    continue
+                fingerprint = file_fingerprint(change_file)
+                entry = files.get(change_file.full_name)
+                if not entry or entry.get("fingerprint") != fingerprint:
+                    # 文件有变化时，其他链保存的旧结果也随之失效
+                    entry = {"sha": change_file.sha, "fingerprint": fingerprint}
+                entry[field] = results[change_file.full_name]
+                files[change_file.full_name] = entry
+
+            if pr.change_files:
+                state["end_commit_id"] = pr.change_files[0].end_commit_id
+            state["files"] = files
+
+            path = self._path(pr)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
@@ -0,0 +1,96 @@
+import logging
+import math
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# tiktoken 无法加载编码（例如离线环境）时使用的保守估算：每个 token 约 3 个字节
+FALLBACK_BYTES_PER_TOKEN = 3
+
+
+@lru_cache(maxsize=None)
+def _load_encoding(model_name: str) -> Optional[tiktoken.Encoding]:
+    """加载模型对应的编码，每个模型只加载一次"""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        # 如果模型不在tiktoken的列表中，使用默认编码
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to load tiktoken encoding for {model_name}: {e}")
+        return None
+
+    try:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        logger.warning(f"Failed to load tiktoken encoding {DEFAULT_ENCODING}, falling back to byte estimates: {e}")
+        return None
+
+
+class Tokenizer:
+    """Token counting service with a shared, lazily loaded encoding per model.
+
+    Use ``get_tokenizer`` rather than constructing instances directly so the
+    encoding is only resolved once per process.
+    """
+
+    def __init__(self, model_name: str = "gpt-3.5-turbo"):
+        self.model_name = model_name
+        self.encoding = _load_encoding(model_name)
+
+    def count(self, text: str) -> int:
+        """计算文本的token数量"""
+        if not text:
+            return 0
+        if self.encoding is None:
+            return self._estimate(text)
+        return len(self.encoding.encode_ordinary(text))
+
+    def count_batch(self, texts: Iterable[str]) -> List[int]:
+        """批量计算多段文本的token数量"""
+        texts = list(texts)
+        if self.encoding is None:
+            return [self._estimate(text) for text in texts]
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+
+    def fits(self, text: str, budget: float) -> bool:
+        """判断文本是否在token预算之内
+
+        每个token至少对应一个UTF-8字节，因此字节数不超过预算时无需编码即可确定。
+        """
+        if len(text.encode("utf-8")) <= budget:
+            return True
+        return self.count(text) <= budget
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """将文本截断到最多 max_tokens 个token"""
+        if self.fits(text, max_tokens):
+            return text
+        if self.encoding is None:
+            return text.encode("utf-8")[:max_tokens * FALLBACK_BYTES_PER_TOKEN].decode("utf-8", errors="ignore")
+        return self.encoding.decode(self.encoding.encode_ordinary(text)[:max_tokens])
+
+    def split(self, text: str, max_tokens: int) -> List[str]:
+        """按token边界将文本切分为不超过 max_tokens 的片段"""
+        if self.encoding is None:
+            size = max_tokens * FALLBACK_BYTES_PER_TOKEN
+            data = text.encode("utf-8")
+            return [data[i:i + size].decode("utf-8", errors="ignore") for i in range(0, len(data), size)]
+
+        tokens = self.encoding.encode_ordinary(text)
+        return [self.encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+    @staticmethod
+    def _estimate(text: str) -> int:
+        return math.ceil(len(text.encode("utf-8")) / FALLBACK_BYTES_PER_TOKEN)
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model_name: str = "gpt-3.5-turbo") -> Tokenizer:
+    """获取模型对应的共享 Tokenizer 实例"""
+    return Tokenizer(model_name)
@@ -0,0 +1,286 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from langchain.chains import LLMChain
+from langchain_core.prompts import BasePromptTemplate
+
+logger = logging.getLogger(__name__)
+
+_MARKER = "<<<{}>>>"
+_MARKER_PATTERN = re.compile(r"^[ \t]*<<<(\d+)>>>[ \t]*$", re.MULTILINE)
+
+
+class TranslationCache:
+    """以原文哈希 + 目标语言为键的翻译缓存
+
+    默认只保存在内存中（LRU 淘汰）；指定 ``path`` 时保存到 SQLite 数据库，多次运行
+    和多个进程之间共享，重复出现的样板审查意见不会被重复翻译。
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = 10000):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite 数据库文件路径，None 表示只使用内存
+            max_entries: 最大缓存条目数，超出后淘汰最久未访问的条目，None 表示不限制
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._conn = None
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS translations (
+                    key TEXT PRIMARY KEY,
+                    translation TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_access ON translations (last_access)")
+            self._conn.commit()
+
+    @staticmethod
+    def key(text: str, language: str) -> str:
+        """缓存键：目标语言和原文的 SHA-256"""
+        return hashlib.sha256(f"{language}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text: str, language: str) -> Optional[str]:
+        """获取缓存的译文，未命中时返回 None"""
+        key = self.key(text, language)
+        with self._lock:
+            if self._conn is None:
+                translation = self._memory.get(key)
+                if translation is not None:
+                    self._memory.move_to_end(key)
+            else:
+                row = self._conn.execute("SELECT translation FROM translations WHERE key = ?", (key,)).fetchone()
+                translation = row[0] if row else None
+                if translation is not None:
+                    self._conn.execute("UPDATE translations SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+
+            if translation is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return translation
+
+    def set(self, text: str, language: str, translation: str):
+        """写入译文，并在超出容量时淘汰最久未访问的条目"""
+        key = self.key(text, language)
+        with self._lock:
+            if self._conn is None:
+                self._memory[key] = translation
+                self._memory.move_to_end(key)
+                while self.max_entries is not None and len(self._memory) > self.max_entries:
+                    self._memory.popitem(last=False)
+                return
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (key, translation, last_access) VALUES (?, ?, ?)",
+                (key, translation, time.time()),
+            )
+            if self.max_entries is not None:
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+                if count > self.max_entries:
+                    self._conn.execute(
+                        "DELETE FROM translations WHERE key IN "
+                        "(SELECT key FROM translations ORDER BY last_access ASC LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._conn is None:
+                return len(self._memory)
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        return {"path": self.path, "entries": len(self), "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _split_batch(text: str, count: int) -> Optional[List[str]]:
+    """按标记行拆分批量翻译的响应，标记缺失、重复或乱序时返回 None"""
+    parts = _MARKER_PATTERN.split(text)
+    indexes = [int(index) for index in parts[1::2]]
+    if indexes != list(range(1, count + 1)):
+        return None
+    return [segment.strip() for segment in parts[2::2]]
+
+
+class Translator:
+    """审查结果的翻译阶段：缓存、批量和有限并发
+
+    - 空文本原样返回，命中缓存的文本不再调用模型，同一次调用中重复的文本只翻译一次；
+    - 不超过 ``batch_chars`` 的短文本按描述分组，拼成带编号标记的批量 prompt 一次翻译，
+      响应中的标记对不上时退回逐条翻译；
+    - 每条长文本或每个批次是一个翻译任务，最多 ``max_concurrency`` 个任务同时进行。
+    """
+
+    def __init__(
+        self,
+        translate_chain: LLMChain,
+        language: str,
+        cache: Optional[TranslationCache] = None,
+        batch_prompt: Optional[BasePromptTemplate] = None,
+        max_concurrency: int = 4,
+        batch_chars: int = 2000,
+        max_batch_size: int = 10,
+    ):
+        """
+        初始化翻译阶段
+
+        Args:
+            translate_chain: 逐条翻译的 chain，prompt 变量为 language、description、content
+            language: 目标语言
+            cache: 翻译缓存，None 表示不缓存
+            batch_prompt: 批量翻译的 prompt，额外需要 count 变量；None 表示不批量翻译
+            max_concurrency: 同时进行的翻译任务数
+            batch_chars: 可以合并翻译的文本长度上限，也是一个批次的总长度上限
+            max_batch_size: 一个批次最多包含的文本数
+        """
+        self.translate_chain = translate_chain
+        self.language = language
+        self.cache = cache
+        self.batch_chain = (
+            LLMChain(llm=translate_chain.llm, prompt=batch_prompt) if batch_prompt is not None else None
+        )
+        self.max_concurrency = max(1, max_concurrency)
+        self.batch_chars = batch_chars
+        self.max_batch_size = max(1, max_batch_size)
+
+    def _plan(
+        self, texts: Sequence[str], description: Union[str, Sequence[str]]
+    ) -> Tuple[List[Optional[str]], List[Tuple[str, List[str]]]]:
+        """查询缓存，并把其余文本分成翻译任务 (description, texts)"""
+        descriptions = [description] * len(texts) if isinstance(description, str) else list(description)
+        results: List[Optional[str]] = []
+        pending: Dict[Tuple[str, str], None] = {}
+        for text, desc in zip(texts, descriptions):
+            if not text.strip():
+                cached = text
+            else:
+                cached = self.cache.get(text, self.language) if self.cache is not None else None
+            results.append(cached)
+            if cached is None:
+                pending[(desc, text)] = None
+
+        units: List[Tuple[str, List[str]]] = []
+        batches: Dict[str, List[str]] = {}
+        for desc, text in pending:
+            if self.batch_chain is None or len(text) > self.batch_chars:
+                units.append((desc, [text]))
+                continue
+            batch = batches.get(desc)
+            if batch is not None and (
+                len(batch) >= self.max_batch_size or sum(map(len, batch)) + len(text) > self.batch_chars
+            ):
+                batch = None
+            if batch is None:
+                batch = batches[desc] = []
+                units.append((desc, batch))
+            batch.append(text)
+        return results, units
+
+    def _batch_inputs(self, description: str, texts: List[str]) -> Dict[str, Any]:
+        content = "\n".join(f"{_MARKER.format(i)}\n{text}" for i, text in enumerate(texts, 1))
+        return {"language": self.language, "description": description, "count": len(texts), "content": content}
+
+    def _single_inputs(self, description: str, text: str) -> Dict[str, str]:
+        return {"language": self.language, "description": description, "content": text}
+
+    def _translate_unit(self, description: str, texts: List[str]) -> List[str]:
+        if len(texts) > 1:
+            response = self.batch_chain.invoke(self._batch_inputs(description, texts))["text"]
+            translations = _split_batch(response, len(texts))
+            if translations is not None:
+                return translations
+            logger.warning(f"Batch translation of {len(texts)} texts could not be split, translating one by one")
+        return [self.translate_chain.invoke(self._single_inputs(description, text))["text"] for text in texts]
+
+    async def _atranslate_unit(self, description: str, texts: List[str]) -> List[str]:
+        if len(texts) > 1:
+            response = (await self.batch_chain.ainvoke(self._batch_inputs(description, texts)))["text"]
+            translations = _split_batch(response, len(texts))
+            if translations is not None:
+                return translations
+            logger.warning(f"Batch translation of {len(texts)} texts could not be split, translating one by one")
+        return [(await self.translate_chain.ainvoke(self._single_inputs(description, text)))["text"] for text in texts]
+
+    def _merge(
+        self,
+        texts: Sequence[str],
+        description: Union[str, Sequence[str]],
+        results: List[Optional[str]],
+        units: List[Tuple[str, List[str]]],
+        outputs: List[List[str]],
+    ) -> List[str]:
+        translated: Dict[Tuple[str, str], str] = {}
+        for (desc, unit_texts), translations in zip(units, outputs):
+            for text, translation in zip(unit_texts, translations):
+                translated[(desc, text)] = translation
+                if self.cache is not None:
+                    self.cache.set(text, self.language, translation)
+
+        descriptions = [description] * len(texts) if isinstance(description, str) else list(description)
+        return [
+            result if result is not None else translated[(desc, text)]
+            for text, desc, result in zip(texts, descriptions, results)
+        ]
+
+    def translate(self, texts: Sequence[str], description: Union[str, Sequence[str]]) -> List[str]:
+        """
+        翻译一组文本，返回与 ``texts`` 一一对应的译文
+
+        Args:
+            texts: 待翻译的文本
+            description: 文本内容的说明，可以为每条文本分别指定
+        """
+        results, units = self._plan(texts, description)
+        if len(units) <= 1 or self.max_concurrency == 1:
+            outputs = [self._translate_unit(desc, unit_texts) for desc, unit_texts in units]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(units))) as executor:
+                outputs = list(executor.map(lambda unit: self._translate_unit(*unit), units))
+        return self._merge(texts, description, results, units, outputs)
+
+    async def atranslate(self, texts: Sequence[str], description: Union[str, Sequence[str]]) -> List[str]:
+        """``translate`` 的异步版本"""
+        results, units = self._plan(texts, description)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(desc: str, unit_texts: List[str]) -> List[str]:
+            async with semaphore:
+                return await self._atranslate_unit(desc, unit_texts)
+
+        outputs = await asyncio.gather(*(run(desc, unit_texts) for desc, unit_texts in units))
+        return self._merge(texts, description, results, units, outputs)
@@ -2,94 +2,57 @@
 demo github api server
 """
 
-import asyncio
 import logging
-import threading
 import time
 
-import uvicorn
-from fastapi import FastAPI
+from aiohttp import web
 from github import Github
 from langchain_community.callbacks.manager import get_openai_callback
-from pydantic import BaseModel
 
 from codedog.actors.reporters.pull_request import PullRequestReporter
 from codedog.chains.code_review.base import CodeReviewChain
 from codedog.chains.pr_summary.base import PRSummaryChain
 from codedog.retrievers.github_retriever import GithubRetriever
+from codedog.utils.http_cache import HTTPResponseCache
+from codedog.utils.review_service import ReviewRequest, ReviewService, create_webhook_app
+from codedog.utils.review_state import ReviewStateStore
 from codedog.utils.langchain_utils import load_gpt4_llm, load_gpt_llm
 from codedog.version import VERSION
 
 # config
 host = "127.0.0.1"
 port = 32167
-worker_num = 1
+review_workers = 2
+max_pending_reviews = 100
 github_token = "your github token here"
+github_webhook_secret = None
+http_cache_path = ".codedog/http_cache.sqlite"
+review_state_dir = ".codedog/review_state"
 
-# fastapi
-app = FastAPI()
+# re-reviews after each push revalidate unchanged resources instead of re-downloading them
+http_cache = HTTPResponseCache(http_cache_path)
+# only files changed since the last reviewed push are sent to the LLM again
+review_state = ReviewStateStore(review_state_dir)
 
 
-class GithubEvent(BaseModel):
-    action: str
-    number: int
-    pull_request: dict
-    repository: dict
-
-
-@app.post("/github")
-async def github(event: GithubEvent):
-    """Github webhook.
-
-    Args:
-        request (GithubEvent): Github event.
-    Returns:
-        Response: message.
-    """
-    try:
-        message = handle_github_event(event)
-    except Exception as e:
-        return str(e)
-    return message
-
-
-def handle_github_event(event: GithubEvent, **kwargs) -> str:
-    _github_event_filter(event)
-
-    repository_id: int = event.repository.get("id", 0)
-    pull_request_number: int = event.number
-
-    logging.info(
-        f"Retrive pull request from Github {repository_id} {pull_request_number}"
-    )
-
-    thread = threading.Thread(
-        target=asyncio.run,
-        args=(handle_pull_request(repository_id, pull_request_number, **kwargs),),
-    )
-    thread.start()
-
-    return "Review Submitted."
-
-
-async def handle_pull_request(
-    repository_id: int,
-    pull_request_number: int,
-    local=False,
-    language="en",
-    **kwargs,
-):
+def review_pull_request(request: ReviewRequest, local=False, language="en"):
+    """Review a pull request and comment the report, runs in a review service worker thread."""
     t = time.time()
+    logging.info(f"Retrive pull request from Github {request.repository_id} {request.number}")
+
     client = Github(github_token)
     retriever = GithubRetriever(
         client=client,
-        repository_name_or_id=repository_id,
-        pull_request_number=pull_request_number,
+        repository_name_or_id=request.repository_id,
+        pull_request_number=request.number,
+        http_cache=http_cache,
     )
     summary_chain = PRSummaryChain.from_llm(
-        code_summary_llm=load_gpt_llm(), pr_summary_llm=load_gpt4_llm()
+        code_summary_llm=load_gpt_llm(),
+        pr_summary_llm=load_gpt4_llm(),
+        review_state=review_state,
     )
-    review_chain = CodeReviewChain.from_llm(llm=load_gpt_llm())
+    review_chain = CodeReviewChain.from_llm(llm=load_gpt_llm(), review_state=review_state)
 
     with get_openai_callback() as cb:
         summary_result = summary_chain({"pull_request": retriever.pull_request})
@@ -115,30 +78,14 @@ async def handle_pull_request(
             retriever._git_pull_request.create_issue_comment(report)
 
 
-def _github_event_filter(event: GithubEvent):
-    """filter github event.
-
-    Args:
-        event (GithubEvent): github event.
-
-    Returns:
-        bool: True if the event is filtered.
-    """
-    pull_request = event.pull_request
-
-    if not pull_request:
-        raise RuntimeError("Not a pull request event.")
-    if event.action not in ("opened"):
-        raise RuntimeError("Not a pull request open event.")
-    if pull_request.get("state", "") != "open":
-        raise RuntimeError("Pull request status is not open.")
-    if pull_request.get("draft", False):
-        raise RuntimeError("Pull request is a draft")
+# webhooks are queued and coalesced per pull request, GET /metrics reports queue depth and latency
+service = ReviewService(review_pull_request, workers=review_workers, max_pending=max_pending_reviews)
+app = create_webhook_app(service, github_secret=github_webhook_secret)
 
 
 def start():
-    uvicorn.run("examples.github_server:app", host=host, port=port, workers=worker_num)
     logging.info(f"Codedog v{VERSION}: server start.")
+    web.run_app(app, host=host, port=port)
 
 
 if __name__ == "__main__":
@@ -2,113 +2,61 @@
 demo gitlab api server
 """
 
-import asyncio
 import logging
-import threading
 import time
-import traceback
 from typing import Callable
 
-import uvicorn
-from fastapi import FastAPI
-from fastapi.responses import PlainTextResponse
+from aiohttp import web
 from gitlab import Gitlab
 from gitlab.v4.objects import ProjectMergeRequest
 from langchain_community.callbacks.manager import get_openai_callback
-from pydantic import BaseModel
 
 from codedog.actors.reporters.pull_request import PullRequestReporter
 from codedog.chains.code_review.base import CodeReviewChain
 from codedog.chains.pr_summary.base import PRSummaryChain
 from codedog.retrievers.gitlab_retriever import GitlabRetriever
+from codedog.utils.http_cache import HTTPResponseCache
+from codedog.utils.review_service import ReviewRequest, ReviewService, create_webhook_app
+from codedog.utils.review_state import ReviewStateStore
 from codedog.utils.langchain_utils import load_gpt4_llm, load_gpt_llm
 from codedog.version import VERSION
 
 # config
 host = "127.0.0.1"
 port = 32167
-worker_num = 1
+review_workers = 2
+max_pending_reviews = 100
 gitlab_token = "your gitlab token here"
 gitlab_base_url = "your gitlab base url here"
+gitlab_webhook_token = None
+http_cache_path = ".codedog/http_cache.sqlite"
+review_state_dir = ".codedog/review_state"
 
-# fastapi
-app = FastAPI()
+# re-reviews after each push revalidate unchanged resources instead of re-downloading them
+http_cache = HTTPResponseCache(http_cache_path)
+# only files changed since the last reviewed push are sent to the LLM again
+review_state = ReviewStateStore(review_state_dir)
 
 
-class GitlabEvent(BaseModel):
-    object_kind: str
-    project: dict
-    object_attributes: dict
-
-
-@app.post("/gitlab_event", response_class=PlainTextResponse)
-async def gitlab_event(event: GitlabEvent) -> str:
-    """Gitlab webhook."""
+def review_merge_request(request: ReviewRequest):
+    """Review a merge request and comment the report, runs in a review service worker thread."""
     t = time.time()
-    status = "failed"
-
-    try:
-        message = handle_gitlab_event(event)
-        status = "success"
-    except Exception:
-        logging.warn(
-            "Fail to handle gitlab event: %s",
-            traceback.format_exc().replace("\n", "\\n"),
-        )
-        message = "failed"
-    finally:
-        logging.info(
-            "Submit github pull request review: %s:#%d-%s Start: %f Status: %s",
-            event.project.get("name"),
-            event.object_attributes.get("iid"),
-            event.object_attributes.get("title"),
-            t,
-            time.time() - t,
-            status,
-        )
-
-    return message
-
-
-def handle_gitlab_event(event: GitlabEvent) -> str:
-    """Trigger merge request review based on gitlab event."""
-    if not _validate_event(event):
-        raise ValueError("Invalid Event.")
-
-    project_id: int = event.project.get("id", 0)
-    merge_request_iid: int = event.object_attributes.get("iid", 0)
     client = Gitlab(url=gitlab_base_url, private_token=gitlab_token)
     retriever = GitlabRetriever(
         client=client,
-        project_name_or_id=project_id,
-        merge_request_iid=merge_request_iid,
+        project_name_or_id=request.repository_id,
+        merge_request_iid=request.number,
+        http_cache=http_cache,
     )
-    callback = _comment_callback(retriever._git_merge_request)
-
-    thread = threading.Thread(
-        target=asyncio.run, args=(handle_event(retriever, callback=callback),)
+    handle_event(retriever, callback=_comment_callback(retriever._git_merge_request))
+    logging.info(
+        "Submit gitlab merge request review: %d:#%d-%s Start: %f Time: %f",
+        request.repository_id,
+        request.number,
+        request.title,
+        t,
+        time.time() - t,
     )
-    thread.start()
-    return "Review Request Submitted."
-
-
-def _validate_event(event: GitlabEvent) -> bool:
-    """Merge request open/reopen event with no draft mark will return True, otherwise False."""
-    object_attributes = event.object_attributes
-
-    if event.object_kind != "merge_request":
-        return False
-
-    if object_attributes.get("action") not in ("open", "reopen"):
-        return False
-
-    if object_attributes.get("state", "") != "opened":
-        return False
-
-    if object_attributes.get("work_in_progress", False):
-        return False
-
-    return True
 
 
 def _comment_callback(merge_request: ProjectMergeRequest):
@@ -126,12 +74,14 @@ def _comment_callback(merge_request: ProjectMergeRequest):
     return callback
 
 
-async def handle_event(retriever: GitlabRetriever, callback: Callable):
+def handle_event(retriever: GitlabRetriever, callback: Callable):
     t = time.time()
     summary_chain = PRSummaryChain.from_llm(
-        code_summary_llm=load_gpt_llm(), pr_summary_llm=load_gpt4_llm()
+        code_summary_llm=load_gpt_llm(),
+        pr_summary_llm=load_gpt4_llm(),
+        review_state=review_state,
     )
-    review_chain = CodeReviewChain.from_llm(llm=load_gpt_llm())
+    review_chain = CodeReviewChain.from_llm(llm=load_gpt_llm(), review_state=review_state)
 
     with get_openai_callback() as cb:
         summary_result = summary_chain({"pull_request": retriever.pull_request})
@@ -152,9 +102,14 @@ async def handle_event(retriever: GitlabRetriever, callback: Callable):
         callback(report)
 
 
+# webhooks are queued and coalesced per merge request, GET /metrics reports queue depth and latency
+service = ReviewService(review_merge_request, workers=review_workers, max_pending=max_pending_reviews)
+app = create_webhook_app(service, gitlab_token=gitlab_webhook_token)
+
+
 def start():
-    uvicorn.run("examples.gitlab_server:app", host=host, port=port, workers=worker_num)
     logging.info(f"Codedog v{VERSION}: server start.")
+    web.run_app(app, host=host, port=port)
 
 
 if __name__ == "__main__":
@@ -1,12 +1,15 @@
 import argparse
 import asyncio
+import dataclasses
+import json
 import time
 import traceback
 from dotenv import load_dotenv
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 import os
 import re
 import sys
+import tempfile
 from datetime import datetime, timedelta
 
 # Load environment variables from .env file
@@ -22,8 +25,23 @@ from codedog.retrievers import GithubRetriever, GitlabRetriever
 from codedog.utils.langchain_utils import load_model_by_name
 from codedog.utils.email_utils import send_report_email
 from codedog.utils.git_hooks import install_git_hooks
-from codedog.utils.git_log_analyzer import get_file_diffs_by_timeframe, get_commit_diff, CommitInfo
+from codedog.utils.git_log_analyzer import (
+    calculate_total_code_stats,
+    get_file_diffs_by_authors,
+    get_file_diffs_by_timeframe,
+    get_commit_diff,
+    match_author,
+    partition_commits_by_author,
+    CommitInfo,
+)
 from codedog.utils.code_evaluator import DiffEvaluator, generate_evaluation_markdown
+from codedog.utils.evaluation_cache import EvaluationCache
+from codedog.utils.file_filter import FileFilter
+from codedog.utils.http_cache import HTTPResponseCache
+from codedog.utils.rate_limiter import TokenBucket
+from codedog.utils.result_store import ResultStore
+from codedog.utils.review_state import ReviewStateStore
+from codedog.utils.concurrent_fetch import DEFAULT_FETCH_WORKERS, RateLimitBackoff, fetch_concurrently
 
 
 def parse_args():
@@ -60,6 +78,57 @@ def parse_args():
     eval_parser.add_argument("--platform", choices=["github", "gitlab", "local"], default="local",
                          help="Platform to use (github, gitlab, or local, defaults to local)")
     eval_parser.add_argument("--gitlab-url", help="GitLab URL (defaults to https://gitlab.com or GITLAB_URL env var)")
+    eval_parser.add_argument("--cache", help="Persistent evaluation cache file (SQLite), defaults to DEV_EVAL_CACHE_PATH env var")
+    eval_parser.add_argument("--fetch-workers", type=int,
+                         help="Parallel commit fetches for github/gitlab, defaults to REMOTE_FETCH_WORKERS env var or 8")
+    eval_parser.add_argument("--diff-workers", type=int,
+                         help="Processes parsing local git diffs, defaults to GIT_DIFF_WORKERS env var or the CPU count")
+    eval_parser.add_argument("--results", help="Directory to keep the evaluation result store in, so reports can be "
+                         "regenerated with the report command, defaults to DEV_EVAL_RESULTS_DIR env var")
+    eval_parser.add_argument("--resume", action="store_true",
+                         help="Keep results from an interrupted run with the same parameters in the results "
+                         "directory and only evaluate the remaining files")
+    eval_parser.add_argument("--keep-generated", action="store_true",
+                         help="Also evaluate generated, vendored and lock files, which are skipped by default "
+                         "(see DEV_EVAL_SKIP_GENERATED)")
+
+    # Team evaluation command
+    team_parser = subparsers.add_parser("eval-team", help="Evaluate code commits of several developers in one pass")
+    team_parser.add_argument("authors", nargs="*",
+                             help="Developer names or emails (partial match), defaults to every author in the range")
+    team_parser.add_argument("--start-date", help="Start date (YYYY-MM-DD), defaults to 7 days ago")
+    team_parser.add_argument("--end-date", help="End date (YYYY-MM-DD), defaults to today")
+    team_parser.add_argument("--repo", help="Git repository path or name (e.g. owner/repo for remote repositories)")
+    team_parser.add_argument("--include", help="Included file extensions, comma separated, e.g. .py,.js")
+    team_parser.add_argument("--exclude", help="Excluded file extensions, comma separated, e.g. .md,.txt")
+    team_parser.add_argument("--model", help="Evaluation model, defaults to CODE_REVIEW_MODEL env var or gpt-3.5")
+    team_parser.add_argument("--email", help="Email addresses to send the team report to (comma-separated)")
+    team_parser.add_argument("--output-dir", help="Directory for the per-author and team reports, "
+                             "defaults to codedog_team_eval_<date>")
+    team_parser.add_argument("--platform", choices=["github", "gitlab", "local"], default="local",
+                             help="Platform to use (github, gitlab, or local, defaults to local)")
+    team_parser.add_argument("--gitlab-url", help="GitLab URL (defaults to https://gitlab.com or GITLAB_URL env var)")
+    team_parser.add_argument("--cache", help="Persistent evaluation cache file (SQLite), "
+                             "defaults to DEV_EVAL_CACHE_PATH env var")
+    team_parser.add_argument("--fetch-workers", type=int,
+                             help="Parallel commit fetches for github/gitlab, "
+                             "defaults to REMOTE_FETCH_WORKERS env var or 8")
+    team_parser.add_argument("--diff-workers", type=int,
+                             help="Processes parsing local git diffs, "
+                             "defaults to GIT_DIFF_WORKERS env var or the CPU count")
+    team_parser.add_argument("--results", help="Directory to keep the evaluation result store in, "
+                             "defaults to DEV_EVAL_RESULTS_DIR env var")
+    team_parser.add_argument("--resume", action="store_true",
+                             help="Keep results from an interrupted run with the same parameters in the results "
+                             "directory and only evaluate the remaining files")
+    team_parser.add_argument("--keep-generated", action="store_true",
+                             help="Also evaluate generated, vendored and lock files, which are skipped by default "
+                             "(see DEV_EVAL_SKIP_GENERATED)")
+
+    # Report regeneration command
+    report_parser = subparsers.add_parser("report", help="Regenerate an evaluation report from a result store")
+    report_parser.add_argument("results", help="Result store directory written by eval --results")
+    report_parser.add_argument("--output", help="Report output path, defaults to codedog_eval_report_<date>.md")
 
     # Commit review command
     commit_parser = subparsers.add_parser("commit", help="Review a specific commit")
@@ -73,6 +142,9 @@ def parse_args():
     commit_parser.add_argument("--platform", choices=["github", "gitlab", "local"], default="local",
                          help="Platform to use (github, gitlab, or local, defaults to local)")
     commit_parser.add_argument("--gitlab-url", help="GitLab URL (defaults to https://gitlab.com or GITLAB_URL env var)")
+    commit_parser.add_argument("--keep-generated", action="store_true",
+                         help="Also evaluate generated, vendored and lock files, which are skipped by default "
+                         "(see DEV_EVAL_SKIP_GENERATED)")
 
     return parser.parse_args()
 
@@ -85,6 +157,161 @@ def parse_emails(emails_str: Optional[str]) -> List[str]:
     return [email.strip() for email in emails_str.split(",") if email.strip()]
 
 
+def load_rate_limiter() -> Optional[TokenBucket]:
+    """Build the shared LLM rate limiter from LLM_TOKENS_PER_MINUTE / LLM_REQUESTS_PER_MINUTE, if set."""
+    tokens_per_minute = os.environ.get("LLM_TOKENS_PER_MINUTE")
+    requests_per_minute = os.environ.get("LLM_REQUESTS_PER_MINUTE")
+    if not tokens_per_minute and not requests_per_minute:
+        return None
+
+    return TokenBucket(
+        tokens_per_minute=float(tokens_per_minute or 9000),
+        requests_per_minute=float(requests_per_minute) if requests_per_minute else None,
+        tokens_per_request=int(os.environ.get("LLM_TOKENS_PER_REQUEST", "0")),
+    )
+
+
+def author_slug(author: str) -> str:
+    """Turn an author name or email into a file name fragment."""
+    return author.replace("@", "_at_").replace(" ", "_").replace("/", "_")
+
+
+def open_persistent_cache(cache_path: Optional[str]) -> Optional[EvaluationCache]:
+    """Open the persistent evaluation cache, if a path is configured."""
+    if not cache_path:
+        return None
+    ttl_days = float(os.environ.get("DEV_EVAL_CACHE_TTL_DAYS", "30"))
+    max_entries = int(os.environ.get("DEV_EVAL_CACHE_MAX_ENTRIES", "100000"))
+    persistent_cache = EvaluationCache(cache_path, ttl_seconds=ttl_days * 24 * 3600, max_entries=max_entries)
+    print(f"Using persistent evaluation cache {cache_path} ({len(persistent_cache)} entries)")
+    return persistent_cache
+
+
+def load_file_filter(repo_path: Optional[str], platform: str, keep_generated: bool = False) -> Optional[FileFilter]:
+    """Build the pre-evaluation filter for generated, vendored and lock files.
+
+    Returns None when keep_generated is set or DEV_EVAL_SKIP_GENERATED is false. Local repositories
+    also contribute the linguist-generated / linguist-vendored rules from their .gitattributes.
+    """
+    if keep_generated or os.environ.get("DEV_EVAL_SKIP_GENERATED", "true").lower() in ("false", "0", "no"):
+        return None
+    if platform.lower() == "local":
+        return FileFilter.from_repo(repo_path)
+    return FileFilter()
+
+
+def filter_remote_commits(
+    file_filter: FileFilter,
+    commits: List[Any],
+    commit_file_diffs: Dict[str, Dict[str, str]],
+) -> Tuple[List[Any], Dict[str, Dict[str, str]]]:
+    """Drop skipped files from remote results, and the commits left without any file."""
+    commit_file_diffs = file_filter.filter_commit_file_diffs(commit_file_diffs)
+    return [commit for commit in commits if commit.hash in commit_file_diffs], commit_file_diffs
+
+
+def print_skipped_files(file_filter: Optional[FileFilter]):
+    """Report how many files the pre-evaluation filter skipped, by reason."""
+    if file_filter is None:
+        return
+    stats = file_filter.get_stats()
+    if stats["skipped"]:
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in sorted(stats["by_reason"].items()))
+        print(f"Skipped {stats['skipped']} generated, vendored or lock files ({reasons})")
+
+
+def open_result_store(
+    results_dir: Optional[str],
+    resume: bool = False,
+    run_params: Optional[Dict[str, Any]] = None,
+) -> Tuple[ResultStore, Optional[tempfile.TemporaryDirectory]]:
+    """Open the result store in results_dir, or in a temporary directory when none is given.
+
+    Results are appended to the columnar store as they complete and reports are streamed from it,
+    so memory stays flat for large evaluations; keep the store with --results to regenerate reports later.
+    A kept store is written through row by row and doubles as a checkpoint journal: with resume=True its
+    results are kept when they were produced with the same run_params, otherwise the store is cleared.
+    Evaluations that failed (default scores after errors or rate limits) are dropped on resume and retried.
+    """
+    temp_dir = None
+    if not results_dir:
+        if resume:
+            print("--resume needs a results directory (--results or DEV_EVAL_RESULTS_DIR), starting a fresh run")
+        temp_dir = tempfile.TemporaryDirectory(prefix="codedog_results_")
+        results_dir = temp_dir.name
+    result_store = ResultStore(results_dir, flush_rows=1) if temp_dir is None else ResultStore(results_dir)
+    manifest = json.loads(json.dumps(run_params or {}))
+    if len(result_store):
+        if resume and result_store.get_manifest() == manifest:
+            failed = result_store.discard_failed()
+            if failed:
+                print(f"Retrying {failed} evaluations that failed in the previous run")
+            print(f"Resuming with {len(result_store)} results already in {results_dir}")
+        else:
+            if resume:
+                print(f"Results in {results_dir} were produced by a different run, starting over")
+            print(f"Replacing {len(result_store)} previous results in {results_dir}")
+            result_store.clear()
+    result_store.set_manifest(manifest)
+    return result_store, temp_dir
+
+
+def pending_file_diffs(
+    commit_file_diffs: Dict[str, Dict[str, str]],
+    result_store: ResultStore,
+) -> Dict[str, Dict[str, str]]:
+    """Drop the files whose results are already in the store, so a resumed run only evaluates the rest."""
+    completed = result_store.completed_keys()
+    if not completed:
+        return commit_file_diffs
+
+    pending = {
+        commit_hash: {path: diff for path, diff in file_diffs.items() if (commit_hash, path) not in completed}
+        for commit_hash, file_diffs in commit_file_diffs.items()
+    }
+    skipped = sum(len(diffs) for diffs in commit_file_diffs.values()) - sum(len(diffs) for diffs in pending.values())
+    print(f"Skipping {skipped} files already evaluated")
+    return pending
+
+
+def code_statistics_markdown(code_stats: Dict[str, int]) -> str:
+    """Format code statistics as a report section."""
+    return (
+        f"\n## Code Statistics\n\n"
+        f"- **Total Files Modified**: {code_stats.get('total_files', 0)}\n"
+        f"- **Lines Added**: {code_stats.get('total_added_lines', 0)}\n"
+        f"- **Lines Deleted**: {code_stats.get('total_deleted_lines', 0)}\n"
+        f"- **Effective Lines**: {code_stats.get('total_effective_lines', 0)}\n"
+    )
+
+
+def json_mode_enabled() -> bool:
+    """Whether evaluators should request the provider's JSON output mode (LLM_JSON_MODE)."""
+    return os.environ.get("LLM_JSON_MODE", "false").lower() in ("1", "true", "yes")
+
+
+def stream_responses_enabled() -> bool:
+    """Whether evaluators should stream responses and stop once the score JSON is complete (LLM_STREAM_RESPONSES)."""
+    return os.environ.get("LLM_STREAM_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+def near_duplicate_threshold() -> Optional[float]:
+    """Minimum similarity for reusing the evaluation of a near-duplicate diff (NEAR_DUPLICATE_THRESHOLD).
+
+    Defaults to 0.9; an empty value, "off" or "none" disables near-duplicate reuse.
+    """
+    value = os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.9").strip()
+    if value.lower() in ("", "off", "none", "false", "0"):
+        return None
+    try:
+        threshold = float(value)
+    except ValueError:
+        raise ValueError(f"NEAR_DUPLICATE_THRESHOLD must be a number between 0 and 1 or empty, got {value!r}")
+    if not 0 < threshold <= 1:
+        raise ValueError(f"NEAR_DUPLICATE_THRESHOLD must be between 0 and 1, got {threshold}")
+    return threshold
+
+
 def parse_extensions(extensions_str: Optional[str]) -> Optional[List[str]]:
     """Parse comma-separated file extensions."""
     if not extensions_str:
@@ -248,33 +475,45 @@ def get_remote_commit_diff(
 def get_remote_commits(
     platform: str,
     repository_name: str,
-    author: str,
+    author: Union[str, Sequence[str], None],
     start_date: str,
     end_date: str,
     include_extensions: Optional[List[str]] = None,
     exclude_extensions: Optional[List[str]] = None,
     gitlab_url: Optional[str] = None,
+    max_workers: Optional[int] = None,
 ) -> Tuple[List[Any], Dict[str, Dict[str, str]], Dict[str, int]]:
     """
     Get commits from remote repositories (GitHub or GitLab).
 
+    Commit details are fetched concurrently; all workers pause together when the
+    platform's rate-limit headers report an exhausted quota.
+
     Args:
         platform (str): Platform to use (github or gitlab)
         repository_name (str): Repository name (e.g. owner/repo)
-        author (str): Author name or email
+        author (Union[str, Sequence[str], None]): Author name or email (partial match), a list of them,
+            or None for all authors
         start_date (str): Start date (YYYY-MM-DD)
         end_date (str): End date (YYYY-MM-DD)
         include_extensions (Optional[List[str]], optional): File extensions to include. Defaults to None.
         exclude_extensions (Optional[List[str]], optional): File extensions to exclude. Defaults to None.
         gitlab_url (Optional[str], optional): GitLab URL. Defaults to None.
+        max_workers (Optional[int], optional): Parallel commit fetches. Defaults to REMOTE_FETCH_WORKERS env var or 8.
 
     Returns:
         Tuple[List[Any], Dict[str, Dict[str, str]], Dict[str, int]]: Commits, file diffs, and code stats
     """
+    if max_workers is None:
+        max_workers = int(os.environ.get("REMOTE_FETCH_WORKERS", DEFAULT_FETCH_WORKERS))
+    backoff = RateLimitBackoff()
+    authors = [author] if isinstance(author, str) else list(author or [])
+    author_label = ", ".join(authors) or "all authors"
+
     if platform.lower() == "github":
         # Initialize GitHub client
         github_client = Github()  # Will automatically load GITHUB_TOKEN from environment
-        print(f"Analyzing GitHub repository {repository_name} for commits by {author}")
+        print(f"Analyzing GitHub repository {repository_name} for commits by {author_label}")
 
         try:
             # Get repository
@@ -291,39 +530,49 @@ def get_remote_commits(
             # Get all commits in the repository within the date range
             all_commits = repo.get_commits(since=start_datetime, until=end_datetime)
 
-            # Filter by author
-            for commit in all_commits:
-                if author.lower() in commit.commit.author.name.lower() or (
-                    commit.commit.author.email and author.lower() in commit.commit.author.email.lower()
-                ):
-                    # Create CommitInfo object
-                    commit_info = CommitInfo(
-                        hash=commit.sha,
-                        author=commit.commit.author.name,
-                        date=commit.commit.author.date,
-                        message=commit.commit.message,
-                        files=[file.filename for file in commit.files],
-                        diff="\n".join([f"diff --git a/{file.filename} b/{file.filename}\n{file.patch}" for file in commit.files if file.patch]),
-                        added_lines=sum(file.additions for file in commit.files),
-                        deleted_lines=sum(file.deletions for file in commit.files),
-                        effective_lines=sum(file.additions - file.deletions for file in commit.files)
-                    )
-                    commits.append(commit_info)
-
-                    # Extract file diffs
-                    file_diffs = {}
-                    for file in commit.files:
-                        if file.patch:
-                            # Filter by file extensions
-                            _, ext = os.path.splitext(file.filename)
-                            if include_extensions and ext not in include_extensions:
-                                continue
-                            if exclude_extensions and ext in exclude_extensions:
-                                continue
-
-                            file_diffs[file.filename] = file.patch
-
-                    commit_file_diffs[commit.sha] = file_diffs
+            # Filter by author using the listing, then fetch commit details concurrently
+            author_commits = [
+                commit for commit in all_commits
+                if match_author(authors, commit.commit.author.name, commit.commit.author.email) is not None
+            ]
+
+            def process_commit(commit):
+                detailed_commit = repo.get_commit(commit.sha)
+                remaining, _ = github_client.rate_limiting
+                backoff.observe(remaining, github_client.rate_limiting_resettime)
+
+                # Create CommitInfo object
+                commit_info = CommitInfo(
+                    hash=commit.sha,
+                    author=commit.commit.author.name,
+                    date=commit.commit.author.date,
+                    message=commit.commit.message,
+                    files=[file.filename for file in detailed_commit.files],
+                    diff="\n".join([f"diff --git a/{file.filename} b/{file.filename}\n{file.patch}" for file in detailed_commit.files if file.patch]),
+                    added_lines=sum(file.additions for file in detailed_commit.files),
+                    deleted_lines=sum(file.deletions for file in detailed_commit.files),
+                    effective_lines=sum(file.additions - file.deletions for file in detailed_commit.files),
+                    author_email=commit.commit.author.email or "",
+                )
+
+                # Extract file diffs
+                file_diffs = {}
+                for file in detailed_commit.files:
+                    if file.patch:
+                        # Filter by file extensions
+                        _, ext = os.path.splitext(file.filename)
+                        if include_extensions and ext not in include_extensions:
+                            continue
+                        if exclude_extensions and ext in exclude_extensions:
+                            continue
+
+                        file_diffs[file.filename] = file.patch
+
+                return commit_info, file_diffs
+
+            for commit_info, file_diffs in fetch_concurrently(author_commits, process_commit, max_workers, backoff):
+                commits.append(commit_info)
+                commit_file_diffs[commit_info.hash] = file_diffs
 
             # Calculate code stats
             code_stats = {
@@ -352,7 +601,8 @@ def get_remote_commits(
         gitlab_url = gitlab_url or os.environ.get("GITLAB_URL", "https://gitlab.com")
 
         gitlab_client = Gitlab(url=gitlab_url, private_token=gitlab_token)
-        print(f"Analyzing GitLab repository {repository_name} for commits by {author}")
+        backoff.install_response_hook(gitlab_client.session)
+        print(f"Analyzing GitLab repository {repository_name} for commits by {author_label}")
 
         try:
             # Get repository
@@ -369,49 +619,150 @@ def get_remote_commits(
             # Get all commits in the repository within the date range
             all_commits = project.commits.list(all=True, since=start_iso, until=end_iso)
 
-            # Filter by author
-            for commit in all_commits:
-                if author.lower() in commit.author_name.lower() or (
-                    commit.author_email and author.lower() in commit.author_email.lower()
-                ):
-                    # Get commit details
-                    commit_detail = project.commits.get(commit.id)
+            # Filter by author using the listing, then fetch commit details concurrently
+            author_commits = [
+                commit for commit in all_commits
+                if match_author(authors, commit.author_name, commit.author_email) is not None
+            ]
 
-                    # Get commit diff
-                    diff = commit_detail.diff()
+            def process_commit(commit):
+                # Get commit details
+                commit_detail = project.commits.get(commit.id)
 
-                    # Filter files by extension
-                    filtered_diff = []
-                    for file_diff in diff:
-                        file_path = file_diff.get('new_path', '')
-                        _, ext = os.path.splitext(file_path)
+                # Get commit diff
+                diff = commit_detail.diff()
 
-                        if include_extensions and ext not in include_extensions:
-                            continue
-                        if exclude_extensions and ext in exclude_extensions:
-                            continue
+                # Filter files by extension
+                filtered_diff = []
+                for file_diff in diff:
+                    file_path = file_diff.get('new_path', '')
+                    _, ext = os.path.splitext(file_path)
 
-                        filtered_diff.append(file_diff)
-
-                    # Skip if no files match the filter
-                    if not filtered_diff:
+                    if include_extensions and ext not in include_extensions:
+                        continue
+                    if exclude_extensions and ext in exclude_extensions:
                         continue
 
-                    # Get file content for each modified file
-                    file_diffs = {}
-                    for file_diff in filtered_diff:
-                        file_path = file_diff.get('new_path', '')
-                        old_path = file_diff.get('old_path', '')
-                        diff_content = file_diff.get('diff', '')
+                    filtered_diff.append(file_diff)
 
-                        # Skip if no diff content
-                        if not diff_content:
-                            continue
+                # Skip if no files match the filter
+                if not filtered_diff:
+                    return None
+
+                # Get file content for each modified file
+                file_diffs = {}
+                for file_diff in filtered_diff:
+                    file_path = file_diff.get('new_path', '')
+                    old_path = file_diff.get('old_path', '')
+                    diff_content = file_diff.get('diff', '')
 
-                        # Try to get the file content
-                        try:
-                            # For new files, get the content from the current commit
-                            if file_diff.get('new_file', False):
+                    # Skip if no diff content
+                    if not diff_content:
+                        continue
+
+                    # Try to get the file content
+                    try:
+                        # For new files, get the content from the current commit
+                        if file_diff.get('new_file', False):
+                            try:
+                                # Get the file content and handle both string and bytes
+                                file_obj = project.files.get(file_path=file_path, ref=commit.id)
+                                if hasattr(file_obj, 'content'):
+                                    # Raw content from API
+                                    file_content = file_obj.content
+                                elif hasattr(file_obj, 'decode'):
+                                    # Decode if it's bytes
+                                    try:
+                                        file_content = file_obj.decode()
+                                    except TypeError:
+                                        # If decode fails, try to get content directly
+                                        file_content = file_obj.content if hasattr(file_obj, 'content') else str(file_obj)
+                                else:
+                                    # Fallback to string representation
+                                    file_content = str(file_obj)
+
+                                # Format as a proper diff with the entire file as added
+                                formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- /dev/null\n+++ b/{file_path}\n"
+                                formatted_diff += "\n".join([f"+{line}" for line in file_content.split('\n')])
+                                file_diffs[file_path] = formatted_diff
+                            except Exception as e:
+                                print(f"Warning: Could not get content for new file {file_path}: {str(e)}")
+                                # Try to get the raw file content directly from the API
+                                try:
+                                    import base64
+                                    raw_file = project.repository_files.get(file_path=file_path, ref=commit.id)
+                                    if raw_file and hasattr(raw_file, 'content'):
+                                        # Decode base64 content if available
+                                        try:
+                                            decoded_content = base64.b64decode(raw_file.content).decode('utf-8', errors='replace')
+                                            formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- /dev/null\n+++ b/{file_path}\n"
+                                            formatted_diff += "\n".join([f"+{line}" for line in decoded_content.split('\n')])
+                                            file_diffs[file_path] = formatted_diff
+                                            continue
+                                        except Exception as decode_err:
+                                            print(f"Warning: Could not decode content for {file_path}: {str(decode_err)}")
+                                except Exception as api_err:
+                                    print(f"Warning: Could not get raw file content for {file_path}: {str(api_err)}")
+
+                                # Use diff content as fallback
+                                file_diffs[file_path] = diff_content
+                        # For deleted files, get the content from the parent commit
+                        elif file_diff.get('deleted_file', False):
+                            try:
+                                # Get parent commit
+                                parent_commits = project.commits.get(commit.id).parent_ids
+                                if parent_commits:
+                                    # Get the file content and handle both string and bytes
+                                    try:
+                                        file_obj = project.files.get(file_path=old_path, ref=parent_commits[0])
+                                        if hasattr(file_obj, 'content'):
+                                            # Raw content from API
+                                            file_content = file_obj.content
+                                        elif hasattr(file_obj, 'decode'):
+                                            # Decode if it's bytes
+                                            try:
+                                                file_content = file_obj.decode()
+                                            except TypeError:
+                                                # If decode fails, try to get content directly
+                                                file_content = file_obj.content if hasattr(file_obj, 'content') else str(file_obj)
+                                        else:
+                                            # Fallback to string representation
+                                            file_content = str(file_obj)
+
+                                        # Format as a proper diff with the entire file as deleted
+                                        formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ /dev/null\n"
+                                        formatted_diff += "\n".join([f"-{line}" for line in file_content.split('\n')])
+                                        file_diffs[file_path] = formatted_diff
+                                    except Exception as file_err:
+                                        # Try to get the raw file content directly from the API
+                                        try:
+                                            import base64
+                                            raw_file = project.repository_files.get(file_path=old_path, ref=parent_commits[0])
+                                            if raw_file and hasattr(raw_file, 'content'):
+                                                # Decode base64 content if available
+                                                try:
+                                                    decoded_content = base64.b64decode(raw_file.content).decode('utf-8', errors='replace')
+                                                    formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ /dev/null\n"
+                                                    formatted_diff += "\n".join([f"-{line}" for line in decoded_content.split('\n')])
+                                                    file_diffs[file_path] = formatted_diff
+                                                except Exception as decode_err:
+                                                    print(f"Warning: Could not decode content for deleted file {old_path}: {str(decode_err)}")
+                                                    file_diffs[file_path] = diff_content
+                                            else:
+                                                file_diffs[file_path] = diff_content
+                                        except Exception as api_err:
+                                            print(f"Warning: Could not get raw file content for deleted file {old_path}: {str(api_err)}")
+                                            file_diffs[file_path] = diff_content
+                                else:
+                                    file_diffs[file_path] = diff_content
+                            except Exception as e:
+                                print(f"Warning: Could not get content for deleted file {old_path}: {str(e)}")
+                                file_diffs[file_path] = diff_content
+                        # For modified files, use the diff content
+                        else:
+                            # Check if diff_content is empty or minimal
+                            if not diff_content or len(diff_content.strip()) < 10:
+                                # Try to get the full file content for better context
                                 try:
                                     # Get the file content and handle both string and bytes
                                     file_obj = project.files.get(file_path=file_path, ref=commit.id)
@@ -429,12 +780,12 @@ def get_remote_commits(
                                         # Fallback to string representation
                                         file_content = str(file_obj)
 
-                                    # Format as a proper diff with the entire file as added
-                                    formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- /dev/null\n+++ b/{file_path}\n"
+                                    # Format as a proper diff with the entire file
+                                    formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ b/{file_path}\n"
                                     formatted_diff += "\n".join([f"+{line}" for line in file_content.split('\n')])
                                     file_diffs[file_path] = formatted_diff
                                 except Exception as e:
-                                    print(f"Warning: Could not get content for new file {file_path}: {str(e)}")
+                                    print(f"Warning: Could not get content for modified file {file_path}: {str(e)}")
                                     # Try to get the raw file content directly from the API
                                     try:
                                         import base64
@@ -443,150 +794,58 @@ def get_remote_commits(
                                             # Decode base64 content if available
                                             try:
                                                 decoded_content = base64.b64decode(raw_file.content).decode('utf-8', errors='replace')
-                                                formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- /dev/null\n+++ b/{file_path}\n"
+                                                formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ b/{file_path}\n"
                                                 formatted_diff += "\n".join([f"+{line}" for line in decoded_content.split('\n')])
                                                 file_diffs[file_path] = formatted_diff
-                                                continue
                                             except Exception as decode_err:
                                                 print(f"Warning: Could not decode content for {file_path}: {str(decode_err)}")
-                                    except Exception as api_err:
-                                        print(f"Warning: Could not get raw file content for {file_path}: {str(api_err)}")
-
-                                    # Use diff content as fallback
-                                    file_diffs[file_path] = diff_content
-                            # For deleted files, get the content from the parent commit
-                            elif file_diff.get('deleted_file', False):
-                                try:
-                                    # Get parent commit
-                                    parent_commits = project.commits.get(commit.id).parent_ids
-                                    if parent_commits:
-                                        # Get the file content and handle both string and bytes
-                                        try:
-                                            file_obj = project.files.get(file_path=old_path, ref=parent_commits[0])
-                                            if hasattr(file_obj, 'content'):
-                                                # Raw content from API
-                                                file_content = file_obj.content
-                                            elif hasattr(file_obj, 'decode'):
-                                                # Decode if it's bytes
-                                                try:
-                                                    file_content = file_obj.decode()
-                                                except TypeError:
-                                                    # If decode fails, try to get content directly
-                                                    file_content = file_obj.content if hasattr(file_obj, 'content') else str(file_obj)
-                                            else:
-                                                # Fallback to string representation
-                                                file_content = str(file_obj)
-
-                                            # Format as a proper diff with the entire file as deleted
-                                            formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ /dev/null\n"
-                                            formatted_diff += "\n".join([f"-{line}" for line in file_content.split('\n')])
-                                            file_diffs[file_path] = formatted_diff
-                                        except Exception as file_err:
-                                            # Try to get the raw file content directly from the API
-                                            try:
-                                                import base64
-                                                raw_file = project.repository_files.get(file_path=old_path, ref=parent_commits[0])
-                                                if raw_file and hasattr(raw_file, 'content'):
-                                                    # Decode base64 content if available
-                                                    try:
-                                                        decoded_content = base64.b64decode(raw_file.content).decode('utf-8', errors='replace')
-                                                        formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ /dev/null\n"
-                                                        formatted_diff += "\n".join([f"-{line}" for line in decoded_content.split('\n')])
-                                                        file_diffs[file_path] = formatted_diff
-                                                    except Exception as decode_err:
-                                                        print(f"Warning: Could not decode content for deleted file {old_path}: {str(decode_err)}")
-                                                        file_diffs[file_path] = diff_content
-                                                else:
-                                                    file_diffs[file_path] = diff_content
-                                            except Exception as api_err:
-                                                print(f"Warning: Could not get raw file content for deleted file {old_path}: {str(api_err)}")
-                                                file_diffs[file_path] = diff_content
-                                    else:
-                                        file_diffs[file_path] = diff_content
-                                except Exception as e:
-                                    print(f"Warning: Could not get content for deleted file {old_path}: {str(e)}")
-                                    file_diffs[file_path] = diff_content
-                            # For modified files, use the diff content
-                            else:
-                                # Check if diff_content is empty or minimal
-                                if not diff_content or len(diff_content.strip()) < 10:
-                                    # Try to get the full file content for better context
-                                    try:
-                                        # Get the file content and handle both string and bytes
-                                        file_obj = project.files.get(file_path=file_path, ref=commit.id)
-                                        if hasattr(file_obj, 'content'):
-                                            # Raw content from API
-                                            file_content = file_obj.content
-                                        elif hasattr(file_obj, 'decode'):
-                                            # Decode if it's bytes
-                                            try:
-                                                file_content = file_obj.decode()
-                                            except TypeError:
-                                                # If decode fails, try to get content directly
-                                                file_content = file_obj.content if hasattr(file_obj, 'content') else str(file_obj)
-                                        else:
-                                            # Fallback to string representation
-                                            file_content = str(file_obj)
-
-                                        # Format as a proper diff with the entire file
-                                        formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ b/{file_path}\n"
-                                        formatted_diff += "\n".join([f"+{line}" for line in file_content.split('\n')])
-                                        file_diffs[file_path] = formatted_diff
-                                    except Exception as e:
-                                        print(f"Warning: Could not get content for modified file {file_path}: {str(e)}")
-                                        # Try to get the raw file content directly from the API
-                                        try:
-                                            import base64
-                                            raw_file = project.repository_files.get(file_path=file_path, ref=commit.id)
-                                            if raw_file and hasattr(raw_file, 'content'):
-                                                # Decode base64 content if available
-                                                try:
-                                                    decoded_content = base64.b64decode(raw_file.content).decode('utf-8', errors='replace')
-                                                    formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ b/{file_path}\n"
-                                                    formatted_diff += "\n".join([f"+{line}" for line in decoded_content.split('\n')])
-                                                    file_diffs[file_path] = formatted_diff
-                                                except Exception as decode_err:
-                                                    print(f"Warning: Could not decode content for {file_path}: {str(decode_err)}")
-                                                    # Enhance the diff format with what we have
-                                                    formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ b/{file_path}\n{diff_content}"
-                                                    file_diffs[file_path] = formatted_diff
-                                            else:
                                                 # Enhance the diff format with what we have
                                                 formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ b/{file_path}\n{diff_content}"
                                                 file_diffs[file_path] = formatted_diff
-                                        except Exception as api_err:
-                                            print(f"Warning: Could not get raw file content for {file_path}: {str(api_err)}")
+                                        else:
                                             # Enhance the diff format with what we have
                                             formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ b/{file_path}\n{diff_content}"
                                             file_diffs[file_path] = formatted_diff
-                                else:
-                                    # Enhance the diff format
-                                    formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ b/{file_path}\n{diff_content}"
-                                    file_diffs[file_path] = formatted_diff
-                        except Exception as e:
-                            print(f"Warning: Error processing diff for {file_path}: {str(e)}")
-                            file_diffs[file_path] = diff_content
-
-                    # Skip if no valid diffs
-                    if not file_diffs:
-                        continue
+                                    except Exception as api_err:
+                                        print(f"Warning: Could not get raw file content for {file_path}: {str(api_err)}")
+                                        # Enhance the diff format with what we have
+                                        formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ b/{file_path}\n{diff_content}"
+                                        file_diffs[file_path] = formatted_diff
+                            else:
+                                # Enhance the diff format
+                                formatted_diff = f"diff --git a/{old_path} b/{file_path}\n--- a/{old_path}\n+++ b/{file_path}\n{diff_content}"
+                                file_diffs[file_path] = formatted_diff
+                    except Exception as e:
+                        print(f"Warning: Error processing diff for {file_path}: {str(e)}")
+                        file_diffs[file_path] = diff_content
+
+                # Skip if no valid diffs
+                if not file_diffs:
+                    return None
+
+                # Create CommitInfo object with enhanced diff content
+                commit_info = CommitInfo(
+                    hash=commit.id,
+                    author=commit.author_name,
+                    date=datetime.strptime(commit.created_at, "%Y-%m-%dT%H:%M:%S.%f%z"),
+                    message=commit.message,
+                    files=list(file_diffs.keys()),
+                    diff="\n\n".join(file_diffs.values()),
+                    added_lines=sum(diff.count('\n+') for diff in file_diffs.values()),
+                    deleted_lines=sum(diff.count('\n-') for diff in file_diffs.values()),
+                    effective_lines=sum(diff.count('\n+') - diff.count('\n-') for diff in file_diffs.values()),
+                    author_email=commit.author_email or "",
+                )
+                return commit_info, file_diffs
+
+            for result in fetch_concurrently(author_commits, process_commit, max_workers, backoff):
+                if result is None:
+                    continue
+                commit_info, file_diffs = result
+                commits.append(commit_info)
 
-                    # Create CommitInfo object with enhanced diff content
-                    commit_info = CommitInfo(
-                        hash=commit.id,
-                        author=commit.author_name,
-                        date=datetime.strptime(commit.created_at, "%Y-%m-%dT%H:%M:%S.%f%z"),
-                        message=commit.message,
-                        files=list(file_diffs.keys()),
-                        diff="\n\n".join(file_diffs.values()),
-                        added_lines=sum(diff.count('\n+') for diff in file_diffs.values()),
-                        deleted_lines=sum(diff.count('\n-') for diff in file_diffs.values()),
-                        effective_lines=sum(diff.count('\n+') - diff.count('\n-') for diff in file_diffs.values())
-                    )
-                    commits.append(commit_info)
-
-                    # Store file diffs for this commit
-                    commit_file_diffs[commit.id] = file_diffs
+                # Store file diffs for this commit
+                commit_file_diffs[commit_info.hash] = file_diffs
 
             # Calculate code stats
             code_stats = {
@@ -621,19 +880,31 @@ async def evaluate_developer_code(
     email_addresses: Optional[List[str]] = None,
     platform: str = "local",
     gitlab_url: Optional[str] = None,
+    cache_path: Optional[str] = None,
+    fetch_workers: Optional[int] = None,
+    results_dir: Optional[str] = None,
+    resume: bool = False,
+    diff_workers: Optional[int] = None,
+    keep_generated: bool = False,
 ):
-    """Evaluate a developer's code commits in a time period."""
+    """Evaluate a developer's code commits in a time period and return the report path.
+
+    With resume=True, files already recorded in results_dir by an interrupted run with the same
+    parameters are not evaluated again. Generated, vendored and lock files are skipped unless
+    keep_generated is set.
+    """
     # Generate default output file name if not provided
     if not output_file:
-        author_slug = author.replace("@", "_at_").replace(" ", "_").replace("/", "_")
         date_slug = datetime.now().strftime("%Y%m%d")
-        output_file = f"codedog_eval_{author_slug}_{date_slug}.md"
+        output_file = f"codedog_eval_{author_slug(author)}_{date_slug}.md"
 
     # Get model
     model = load_model_by_name(model_name)
 
     print(f"Evaluating {author}'s code commits from {start_date} to {end_date}...")
 
+    file_filter = load_file_filter(repo_path, platform, keep_generated)
+
     # Get commits and diffs based on platform
     if platform.lower() == "local":
         # Use local git repository
@@ -643,7 +914,9 @@ async def evaluate_developer_code(
             end_date,
             repo_path,
             include_extensions,
-            exclude_extensions
+            exclude_extensions,
+            diff_workers,
+            file_filter=file_filter,
         )
     else:
         # Use remote repository (GitHub or GitLab)
@@ -659,28 +932,65 @@ async def evaluate_developer_code(
             end_date,
             include_extensions,
             exclude_extensions,
-            gitlab_url
+            gitlab_url,
+            fetch_workers,
         )
+        if file_filter is not None:
+            commits, commit_file_diffs = filter_remote_commits(file_filter, commits, commit_file_diffs)
 
+    print_skipped_files(file_filter)
     if not commits:
         print(f"No commits found for {author} in the specified time period")
         return
 
     print(f"Found {len(commits)} commits with {sum(len(diffs) for diffs in commit_file_diffs.values())} modified files")
 
+    # Open persistent cache so overlapping runs only evaluate new diffs
+    persistent_cache = open_persistent_cache(cache_path)
+
     # Initialize evaluator
-    evaluator = DiffEvaluator(model)
+    evaluator = DiffEvaluator(
+        model, persistent_cache=persistent_cache, token_bucket=load_rate_limiter(), json_mode=json_mode_enabled(),
+        stream_responses=stream_responses_enabled(), near_duplicate_threshold=near_duplicate_threshold(),
+    )
 
     # Timing and statistics
     start_time = time.time()
 
+    run_params = {
+        "command": "eval",
+        "authors": [author],
+        "start_date": start_date,
+        "end_date": end_date,
+        "repo": repo_path,
+        "platform": platform,
+        "include": include_extensions,
+        "exclude": exclude_extensions,
+        "model": model_name,
+    }
+    result_store, temp_dir = open_result_store(results_dir, resume, run_params)
+
     with get_openai_callback() as cb:
         # Perform evaluation
         print("Evaluating code commits...")
-        evaluation_results = await evaluator.evaluate_commits(commits, commit_file_diffs)
+        try:
+            async for result in evaluator.iter_evaluate_commits(
+                commits, pending_file_diffs(commit_file_diffs, result_store)
+            ):
+                result_store.append(result)
+        finally:
+            await evaluator.aclose()
+            result_store.close()
+            if persistent_cache is not None:
+                persistent_cache.close()
 
         # Generate Markdown report
-        report = generate_evaluation_markdown(evaluation_results)
+        try:
+            with open(output_file, "w", encoding="utf-8") as f:
+                result_store.write_markdown(f)
+        finally:
+            if temp_dir is not None:
+                temp_dir.cleanup()
 
         # Calculate cost and tokens
         total_cost = cb.total_cost
@@ -694,23 +1004,19 @@ async def evaluate_developer_code(
         f"- **Evaluation Time**: {elapsed_time:.2f} seconds\n"
         f"- **Tokens Used**: {total_tokens}\n"
         f"- **Cost**: ${total_cost:.4f}\n"
-        f"\n## Code Statistics\n\n"
-        f"- **Total Files Modified**: {code_stats.get('total_files', 0)}\n"
-        f"- **Lines Added**: {code_stats.get('total_added_lines', 0)}\n"
-        f"- **Lines Deleted**: {code_stats.get('total_deleted_lines', 0)}\n"
-        f"- **Effective Lines**: {code_stats.get('total_effective_lines', 0)}\n"
     )
 
-    report += telemetry_info
-
     # Save report
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(report)
+    with open(output_file, "a", encoding="utf-8") as f:
+        f.write(telemetry_info)
+        f.write(code_statistics_markdown(code_stats))
     print(f"Report saved to {output_file}")
 
     # Send email report if addresses provided
     if email_addresses:
         subject = f"[CodeDog] Code Evaluation Report for {author} ({start_date} to {end_date})"
+        with open(output_file, "r", encoding="utf-8") as f:
+            report = f.read()
 
         sent = send_report_email(
             to_emails=email_addresses,
@@ -723,7 +1029,185 @@ async def evaluate_developer_code(
         else:
             print("Failed to send email notification")
 
-    return report
+    return output_file
+
+
+async def evaluate_team_code(
+    authors: List[str],
+    start_date: str,
+    end_date: str,
+    repo_path: Optional[str] = None,
+    include_extensions: Optional[List[str]] = None,
+    exclude_extensions: Optional[List[str]] = None,
+    model_name: str = "gpt-3.5",
+    output_dir: Optional[str] = None,
+    email_addresses: Optional[List[str]] = None,
+    platform: str = "local",
+    gitlab_url: Optional[str] = None,
+    cache_path: Optional[str] = None,
+    fetch_workers: Optional[int] = None,
+    results_dir: Optional[str] = None,
+    resume: bool = False,
+    diff_workers: Optional[int] = None,
+    keep_generated: bool = False,
+):
+    """Evaluate several developers' commits in a time period with a single history scan.
+
+    The commit range is scanned once and partitioned by author; all file evaluations go through one
+    DiffEvaluator, so they share its scheduler, rate limiter and caches. Writes one report per author
+    plus a team rollup (team.md) to output_dir and returns output_dir. resume and keep_generated
+    work as in evaluate_developer_code.
+    """
+    if not output_dir:
+        output_dir = f"codedog_team_eval_{datetime.now().strftime('%Y%m%d')}"
+
+    # Get model
+    model = load_model_by_name(model_name)
+
+    author_label = ", ".join(authors) or "all authors"
+    print(f"Evaluating code commits by {author_label} from {start_date} to {end_date}...")
+
+    file_filter = load_file_filter(repo_path, platform, keep_generated)
+
+    # Scan the commit range once for all authors
+    if platform.lower() == "local":
+        commits_by_author, commit_file_diffs, code_stats_by_author = get_file_diffs_by_authors(
+            authors,
+            start_date,
+            end_date,
+            repo_path,
+            include_extensions,
+            exclude_extensions,
+            diff_workers,
+            file_filter=file_filter,
+        )
+    else:
+        # Use remote repository (GitHub or GitLab)
+        if not repo_path:
+            print("Repository path/name is required for remote platforms")
+            return
+
+        commits, commit_file_diffs, _ = get_remote_commits(
+            platform,
+            repo_path,
+            authors,
+            start_date,
+            end_date,
+            include_extensions,
+            exclude_extensions,
+            gitlab_url,
+            fetch_workers,
+        )
+        if file_filter is not None:
+            commits, commit_file_diffs = filter_remote_commits(file_filter, commits, commit_file_diffs)
+        commits_by_author = partition_commits_by_author(commits, authors)
+        code_stats_by_author = {
+            author: calculate_total_code_stats(author_commits)
+            for author, author_commits in commits_by_author.items()
+        }
+
+    print_skipped_files(file_filter)
+    all_commits = [commit for author_commits in commits_by_author.values() for commit in author_commits]
+    if not all_commits:
+        print(f"No commits found for {author_label} in the specified time period")
+        return
+
+    commit_authors = {
+        commit.hash: author for author, author_commits in commits_by_author.items() for commit in author_commits
+    }
+    for author, author_commits in commits_by_author.items():
+        print(f"  {author}: {len(author_commits)} commits")
+    print(f"Found {len(all_commits)} commits with "
+          f"{sum(len(commit_file_diffs.get(commit.hash, {})) for commit in all_commits)} modified files")
+
+    # One evaluator for the whole team: shared scheduler, rate limiter, in-memory and persistent caches
+    persistent_cache = open_persistent_cache(cache_path)
+    evaluator = DiffEvaluator(
+        model, persistent_cache=persistent_cache, token_bucket=load_rate_limiter(), json_mode=json_mode_enabled(),
+        stream_responses=stream_responses_enabled(), near_duplicate_threshold=near_duplicate_threshold(),
+    )
+
+    start_time = time.time()
+    run_params = {
+        "command": "eval-team",
+        "authors": list(authors),
+        "start_date": start_date,
+        "end_date": end_date,
+        "repo": repo_path,
+        "platform": platform,
+        "include": include_extensions,
+        "exclude": exclude_extensions,
+        "model": model_name,
+    }
+    result_store, temp_dir = open_result_store(results_dir, resume, run_params)
+    os.makedirs(output_dir, exist_ok=True)
+    team_report = os.path.join(output_dir, "team.md")
+
+    with get_openai_callback() as cb:
+        print("Evaluating code commits...")
+        try:
+            async for result in evaluator.iter_evaluate_commits(
+                all_commits, pending_file_diffs(commit_file_diffs, result_store)
+            ):
+                # Attribute results to the requested author pattern rather than the raw git author name
+                result_store.append(dataclasses.replace(result, author=commit_authors[result.commit_hash]))
+        finally:
+            await evaluator.aclose()
+            result_store.close()
+            if persistent_cache is not None:
+                persistent_cache.close()
+
+        # Generate one report per author plus the team rollup
+        try:
+            for author, author_commits in commits_by_author.items():
+                if not author_commits:
+                    continue
+                author_report = os.path.join(output_dir, f"{author_slug(author)}.md")
+                with open(author_report, "w", encoding="utf-8") as f:
+                    result_store.write_markdown(f, author=author)
+                    f.write(code_statistics_markdown(code_stats_by_author[author]))
+                print(f"Report for {author} saved to {author_report}")
+
+            with open(team_report, "w", encoding="utf-8") as f:
+                result_store.write_markdown(f)
+        finally:
+            if temp_dir is not None:
+                temp_dir.cleanup()
+
+        total_cost = cb.total_cost
+        total_tokens = cb.total_tokens
+
+    elapsed_time = time.time() - start_time
+    telemetry_info = (
+        f"\n## Evaluation Statistics\n\n"
+        f"- **Evaluation Model**: {model_name}\n"
+        f"- **Evaluation Time**: {elapsed_time:.2f} seconds\n"
+        f"- **Tokens Used**: {total_tokens}\n"
+        f"- **Cost**: ${total_cost:.4f}\n"
+    )
+    with open(team_report, "a", encoding="utf-8") as f:
+        f.write(telemetry_info)
+        f.write(code_statistics_markdown(calculate_total_code_stats(all_commits)))
+    print(f"Team report saved to {team_report}")
+
+    # Send the team rollup if addresses provided
+    if email_addresses:
+        subject = f"[CodeDog] Team Code Evaluation Report ({start_date} to {end_date})"
+        with open(team_report, "r", encoding="utf-8") as f:
+            report = f.read()
+
+        sent = send_report_email(
+            to_emails=email_addresses,
+            subject=subject,
+            markdown_content=report,
+        )
+
+        if sent:
+            print(f"Report sent to {', '.join(email_addresses)}")
+        else:
+            print("Failed to send email notification")
+
+    return output_dir
 
 
 def generate_full_report(repository_name, pull_request_number, email_addresses=None, platform="github", gitlab_url=None):
@@ -738,6 +1222,10 @@ def generate_full_report(repository_name, pull_request_number, email_addresses=N
     """
     start_time = time.time()
 
+    # Reuse unchanged API responses across runs via ETag/Last-Modified revalidation
+    http_cache_path = os.environ.get("HTTP_CACHE_PATH")
+    http_cache = HTTPResponseCache(http_cache_path) if http_cache_path else None
+
     # Initialize client and retriever based on platform
     if platform.lower() == "github":
         # Initialize GitHub client and retriever
@@ -745,7 +1233,7 @@ def generate_full_report(repository_name, pull_request_number, email_addresses=N
         print(f"Analyzing GitHub repository {repository_name} PR #{pull_request_number}")
 
         try:
-            retriever = GithubRetriever(github_client, repository_name, pull_request_number)
+            retriever = GithubRetriever(github_client, repository_name, pull_request_number, http_cache=http_cache)
             print(f"Successfully retrieved PR: {retriever.pull_request.title}")
         except Exception as e:
             error_msg = f"Failed to retrieve GitHub PR: {str(e)}"
@@ -767,7 +1255,7 @@ def generate_full_report(repository_name, pull_request_number, email_addresses=N
         print(f"Analyzing GitLab repository {repository_name} MR #{pull_request_number}")
 
         try:
-            retriever = GitlabRetriever(gitlab_client, repository_name, pull_request_number)
+            retriever = GitlabRetriever(gitlab_client, repository_name, pull_request_number, http_cache=http_cache)
             print(f"Successfully retrieved MR: {retriever.pull_request.title}")
         except Exception as e:
             error_msg = f"Failed to retrieve GitLab MR: {str(e)}"
@@ -784,15 +1272,26 @@ def generate_full_report(repository_name, pull_request_number, email_addresses=N
     pr_summary_model = os.environ.get("PR_SUMMARY_MODEL", "gpt-4")
     code_review_model = os.environ.get("CODE_REVIEW_MODEL", "gpt-3.5")
 
+    # Reuse reviews of files unchanged since the last reviewed head of this PR
+    review_state_dir = os.environ.get("REVIEW_STATE_DIR")
+    review_state = ReviewStateStore(review_state_dir) if review_state_dir else None
+
+    # Summary and review chains share one rate budget
+    rate_limiter = load_rate_limiter()
+
     # Initialize chains with specified models
     summary_chain = PRSummaryChain.from_llm(
         code_summary_llm=load_model_by_name(code_summary_model),
         pr_summary_llm=load_model_by_name(pr_summary_model),
+        review_state=review_state,
+        rate_limiter=rate_limiter,
         verbose=True
     )
 
     review_chain = CodeReviewChain.from_llm(
         llm=load_model_by_name(code_review_model),
+        review_state=review_state,
+        rate_limiter=rate_limiter,
         verbose=True
     )
 
@@ -866,6 +1365,7 @@ async def review_commit(
     email_addresses: Optional[List[str]] = None,
     platform: str = "local",
     gitlab_url: Optional[str] = None,
+    keep_generated: bool = False,
 ):
     """Review a specific commit.
 
@@ -879,6 +1379,7 @@ async def review_commit(
         email_addresses: List of email addresses to send the report to
         platform: Platform to use (github, gitlab, or local)
         gitlab_url: GitLab URL (for GitLab platform only)
+        keep_generated: Also review generated, vendored and lock files
     """
     # Generate default output file name if not provided
     if not output_file:
@@ -890,13 +1391,17 @@ async def review_commit(
 
     print(f"Reviewing commit {commit_hash}...")
 
+    file_filter = load_file_filter(repo_path, platform, keep_generated)
+
     # Get commit diff based on platform
     commit_diff = {}
 
     if platform.lower() == "local":
         # Use local git repository
         try:
-            commit_diff = get_commit_diff(commit_hash, repo_path, include_extensions, exclude_extensions)
+            commit_diff = get_commit_diff(
+                commit_hash, repo_path, include_extensions, exclude_extensions, file_filter=file_filter
+            )
         except Exception as e:
             print(f"Error getting commit diff: {str(e)}")
             return
@@ -914,10 +1419,13 @@ async def review_commit(
             exclude_extensions=exclude_extensions,
             gitlab_url=gitlab_url,
         )
+        if file_filter is not None:
+            commit_diff = file_filter.filter_file_diffs(commit_diff)
     else:
         print(f"Error: Unsupported platform '{platform}'. Use 'local', 'github', or 'gitlab'.")
         return
 
+    print_skipped_files(file_filter)
     if not commit_diff:
         print(f"No changes found in commit {commit_hash}")
         return
@@ -925,7 +1433,13 @@ async def review_commit(
     print(f"Found {len(commit_diff)} modified files")
 
     # Initialize evaluator
-    evaluator = DiffEvaluator(model)
+    evaluator = DiffEvaluator(
+        model,
+        token_bucket=load_rate_limiter(),
+        json_mode=json_mode_enabled(),
+        stream_responses=stream_responses_enabled(),
+        near_duplicate_threshold=near_duplicate_threshold(),
+    )
 
     # Timing and statistics
     start_time = time.time()
@@ -933,7 +1447,10 @@ async def review_commit(
     with get_openai_callback() as cb:
         # Perform review
         print("Reviewing code changes...")
-        review_results = await evaluator.evaluate_commit(commit_hash, commit_diff)
+        try:
+            review_results = await evaluator.evaluate_commit(commit_hash, commit_diff)
+        finally:
+            await evaluator.aclose()
 
         # Generate Markdown report
         report = generate_evaluation_markdown(review_results)
@@ -1058,6 +1575,12 @@ def main():
             email_addresses=email_addresses,
             platform=args.platform,
             gitlab_url=args.gitlab_url,
+            cache_path=args.cache or os.environ.get("DEV_EVAL_CACHE_PATH"),
+            fetch_workers=args.fetch_workers,
+            results_dir=args.results or os.environ.get("DEV_EVAL_RESULTS_DIR"),
+            resume=args.resume,
+            diff_workers=args.diff_workers or int(os.environ.get("GIT_DIFF_WORKERS", "0")) or None,
+            keep_generated=args.keep_generated,
         ))
 
         if report:
@@ -1065,6 +1588,62 @@ def main():
             print("Report generated successfully. See output file for details.")
             print("\n===================== Report End =====================\n")
 
+    elif args.command == "eval-team":
+        # Evaluate several developers' code commits with one history scan
+        today = datetime.now().strftime("%Y-%m-%d")
+        week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+
+        start_date = args.start_date or week_ago
+        end_date = args.end_date or today
+
+        include_extensions = None
+        if args.include:
+            include_extensions = parse_extensions(args.include)
+        elif os.environ.get("DEV_EVAL_DEFAULT_INCLUDE"):
+            include_extensions = parse_extensions(os.environ.get("DEV_EVAL_DEFAULT_INCLUDE"))
+
+        exclude_extensions = None
+        if args.exclude:
+            exclude_extensions = parse_extensions(args.exclude)
+        elif os.environ.get("DEV_EVAL_DEFAULT_EXCLUDE"):
+            exclude_extensions = parse_extensions(os.environ.get("DEV_EVAL_DEFAULT_EXCLUDE"))
+
+        model_name = args.model or os.environ.get("CODE_REVIEW_MODEL", "gpt-3.5")
+        email_addresses = parse_emails(args.email or os.environ.get("NOTIFICATION_EMAILS", ""))
+
+        output_dir = asyncio.run(evaluate_team_code(
+            authors=args.authors,
+            start_date=start_date,
+            end_date=end_date,
+            repo_path=args.repo,
+            include_extensions=include_extensions,
+            exclude_extensions=exclude_extensions,
+            model_name=model_name,
+            output_dir=args.output_dir,
+            email_addresses=email_addresses,
+            platform=args.platform,
+            gitlab_url=args.gitlab_url,
+            cache_path=args.cache or os.environ.get("DEV_EVAL_CACHE_PATH"),
+            fetch_workers=args.fetch_workers,
+            results_dir=args.results or os.environ.get("DEV_EVAL_RESULTS_DIR"),
+            resume=args.resume,
+            diff_workers=args.diff_workers or int(os.environ.get("GIT_DIFF_WORKERS", "0")) or None,
+            keep_generated=args.keep_generated,
+        ))
+
+        if output_dir:
+            print(f"Team evaluation reports written to {output_dir}")
+
+    elif args.command == "report":
+        # Regenerate a report from a stored evaluation without re-evaluating
+        if not os.path.isdir(args.results):
+            print(f"Result store {args.results} not found")
+            return
+        output_file = args.output or f"codedog_eval_report_{datetime.now().strftime('%Y%m%d')}.md"
+        with ResultStore(args.results) as result_store, open(output_file, "w", encoding="utf-8") as f:
+            summary = result_store.write_markdown(f)
+        print(f"Report for {summary['count']} evaluated files saved to {output_file}")
+
     elif args.command == "commit":
         # Process file extension parameters
         include_extensions = None
@@ -1096,6 +1675,7 @@ def main():
             email_addresses=email_addresses,
             platform=args.platform,
             gitlab_url=args.gitlab_url,
+            keep_generated=args.keep_generated,
         ))
 
         if report:
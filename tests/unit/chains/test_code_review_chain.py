@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+import unittest
+
+from langchain_core.language_models.fake import FakeListLLM
+
+from codedog.chains.code_review.base import CodeReviewChain
+from codedog.models import ChangeFile, ChangeStatus, DiffContent, PullRequest
+from codedog.utils.diff_chunker import chunk_diff_content
+from codedog.utils.review_state import ReviewStateStore
+
+
+def _change_file(name, patch, end_commit_id=1):
+    return ChangeFile(
+        blob_id=1,
+        sha=f"{abs(hash(patch)):x}",
+        full_name=name,
+        source_full_name=name,
+        status=ChangeStatus.modified,
+        pull_request_id=10,
+        start_commit_id=0,
+        end_commit_id=end_commit_id,
+        name=name.split("/")[-1],
+        suffix=name.split(".")[-1],
+        diff_content=DiffContent(add_count=1, remove_count=1, content=patch),
+    )
+
+
+def _pull_request(change_files):
+    return PullRequest(pull_request_id=10, repository_id=20, change_files=change_files)
+
+
+class TestCodeReviewChainIncremental(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.review_state = ReviewStateStore(self.state_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+
+    def _review(self, pr, responses):
+        # trailing sentinel keeps FakeListLLM from wrapping its call counter
+        llm = FakeListLLM(responses=responses + ["unexpected call"])
+        chain = CodeReviewChain.from_llm(llm=llm, review_state=self.review_state)
+        result = chain({"pull_request": pr})
+        return {r.file.full_name: r.review for r in result["code_reviews"]}, llm.i
+
+    def test_only_changed_files_are_reviewed_again(self):
+        first_push = _pull_request([
+            _change_file("src/a.py", "@@ -1 +1 @@\n-a = 1\n+a = 2"),
+            _change_file("src/b.py", "@@ -1 +1 @@\n-b = 1\n+b = 2"),
+        ])
+        reviews, calls = self._review(first_push, ["review a", "review b"])
+        self.assertEqual(reviews, {"src/a.py": "review a", "src/b.py": "review b"})
+        self.assertEqual(calls, 2)
+
+        second_push = _pull_request([
+            _change_file("src/a.py", "@@ -1 +1 @@\n-a = 1\n+a = 2", end_commit_id=2),
+            _change_file("src/b.py", "@@ -1 +1 @@\n-b = 1\n+b = 3", end_commit_id=2),
+        ])
+        reviews, calls = self._review(second_push, ["review b v2"])
+        self.assertEqual(list(reviews), ["src/a.py", "src/b.py"])
+        self.assertEqual(reviews, {"src/a.py": "review a", "src/b.py": "review b v2"})
+        self.assertEqual(calls, 1)
+
+        state = self.review_state.load(second_push)
+        self.assertEqual(state["end_commit_id"], 2)
+        self.assertEqual(state["files"]["src/b.py"]["review"], "review b v2")
+
+    def test_files_removed_from_pr_are_dropped_from_state(self):
+        pr = _pull_request([
+            _change_file("src/a.py", "@@ -1 +1 @@\n-a = 1\n+a = 2"),
+            _change_file("src/b.py", "@@ -1 +1 @@\n-b = 1\n+b = 2"),
+        ])
+        self._review(pr, ["review a", "review b"])
+
+        pr = _pull_request([_change_file("src/a.py", "@@ -1 +1 @@\n-a = 1\n+a = 2")])
+        reviews, calls = self._review(pr, [])
+
+        self.assertEqual(reviews, {"src/a.py": "review a"})
+        self.assertEqual(calls, 0)
+        self.assertEqual(list(self.review_state.load(pr)["files"]), ["src/a.py"])
+
+
+class TestCodeReviewChainChunks(unittest.TestCase):
+    def test_chunks_per_file_are_capped(self):
+        hunks = "".join(
+            f"@@ -{n * 10},1 +{n * 10},1 @@\n-value_{n} = {n}\n+value_{n} = {n + 1}\n" for n in range(1, 11)
+        )
+        pr = _pull_request([
+            _change_file("src/big.py", hunks),
+            _change_file("src/small.py", "@@ -1 +1 @@\n-a = 1\n+a = 2"),
+        ])
+        llm = FakeListLLM(responses=["review 1", "review 2", "review 3", "review small", "unexpected call"])
+        chain = CodeReviewChain.from_llm(llm=llm)
+        chain.max_tokens_per_chunk = 40
+        chain.max_chunks_per_file = 3
+        chunks = chunk_diff_content(
+            pr.change_files[0].diff_content, "src/big.py", chain.max_tokens_per_chunk, chain._get_tokenizer()
+        )
+        self.assertGreater(len(chunks), 3)
+
+        result = chain({"pull_request": pr})
+        reviews = {r.file.full_name: r.review for r in result["code_reviews"]}
+
+        # only the first 3 chunks of the large file reach the model
+        self.assertEqual(llm.i, 4)
+        self.assertEqual(
+            reviews["src/big.py"],
+            "review 1\n\nreview 2\n\nreview 3\n\n"
+            f"_The rest of this diff ({len(chunks) - 3} more chunks) was too large to review._",
+        )
+        self.assertEqual(reviews["src/small.py"], "review small")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,16 @@
+import json
+import shutil
+import tempfile
 import unittest
+from typing import List
 from unittest.mock import MagicMock, patch
 from langchain.chains import LLMChain
 from langchain_core.language_models import BaseLanguageModel
+from langchain_core.language_models.fake import FakeListLLM
 from langchain_core.output_parsers import BaseOutputParser
 from codedog.chains.pr_summary.base import PRSummaryChain
-from codedog.models import PullRequest, PRSummary, ChangeSummary, PRType
+from codedog.models import ChangeFile, ChangeStatus, DiffContent, PullRequest, PRSummary, ChangeSummary, PRType
+from codedog.utils.review_state import ReviewStateStore
 
 
 class TestPRSummaryChain(unittest.TestCase):
@@ -119,5 +125,89 @@ class TestPRSummaryChain(unittest.TestCase):
             failing_parser.parse("Invalid output format")
 
 
+class RecordingFakeListLLM(FakeListLLM):
+    prompts: List[str] = []
+
+    def _call(self, prompt, *args, **kwargs):
+        self.prompts.append(prompt)
+        return super()._call(prompt, *args, **kwargs)
+
+
+def _change_file(name, patch, end_commit_id=1):
+    return ChangeFile(
+        blob_id=1,
+        sha=f"{abs(hash(patch)):x}",
+        full_name=name,
+        source_full_name=name,
+        status=ChangeStatus.modified,
+        pull_request_id=10,
+        start_commit_id=0,
+        end_commit_id=end_commit_id,
+        name=name.split("/")[-1],
+        suffix=name.split(".")[-1],
+        diff_content=DiffContent(add_count=1, remove_count=1, content=patch),
+    )
+
+
+def _pr_summary(overview):
+    return json.dumps({"overview": overview, "pr_type": "feature", "major_files": ["src/b.py"]})
+
+
+class TestPRSummaryChainIncremental(unittest.TestCase):
+    def setUp(self):
+        self.state_dir = tempfile.mkdtemp()
+        self.review_state = ReviewStateStore(self.state_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.state_dir, ignore_errors=True)
+
+    def _summarize(self, change_files, code_responses, pr_response):
+        pr = PullRequest(pull_request_id=10, repository_id=20, change_files=change_files)
+        # trailing sentinel keeps FakeListLLM from wrapping its call counter
+        code_llm = RecordingFakeListLLM(responses=code_responses + ["unexpected call"], prompts=[])
+        pr_llm = RecordingFakeListLLM(responses=[pr_response, "unexpected call"], prompts=[])
+        chain = PRSummaryChain.from_llm(
+            code_summary_llm=code_llm, pr_summary_llm=pr_llm, review_state=self.review_state
+        )
+        result = chain({"pull_request": pr})
+        return result, code_llm, pr_llm
+
+    def test_only_changed_files_are_summarized_again(self):
+        result, code_llm, pr_llm = self._summarize(
+            [
+                _change_file("src/a.py", "@@ -1 +1 @@\n-a = 1\n+a = 2"),
+                _change_file("src/b.py", "@@ -1 +1 @@\n-b = 1\n+b = 2"),
+            ],
+            ["summary a", "summary b"],
+            _pr_summary("first push"),
+        )
+        self.assertEqual([s.summary for s in result["code_summaries"]], ["summary a", "summary b"])
+        self.assertEqual(code_llm.i, 2)
+
+        result, code_llm, pr_llm = self._summarize(
+            [
+                _change_file("src/a.py", "@@ -1 +1 @@\n-a = 1\n+a = 2", end_commit_id=2),
+                _change_file("src/b.py", "@@ -1 +1 @@\n-b = 1\n+b = 3", end_commit_id=2),
+            ],
+            ["summary b v2"],
+            _pr_summary("second push"),
+        )
+
+        # only src/b.py changed; summaries stay in code_files order
+        self.assertEqual(code_llm.i, 1)
+        self.assertIn("b = 3", code_llm.prompts[0])
+        self.assertNotIn("a = 2", code_llm.prompts[0])
+        self.assertEqual(
+            [(s.full_name, s.summary) for s in result["code_summaries"]],
+            [("src/a.py", "summary a"), ("src/b.py", "summary b v2")],
+        )
+
+        # the PR-level summary is regenerated from the reused and the new file summaries
+        self.assertEqual(pr_llm.i, 1)
+        self.assertIn("summary a", pr_llm.prompts[0])
+        self.assertIn("summary b v2", pr_llm.prompts[0])
+        self.assertEqual(result["pr_summary"].overview, "second push")
+
+
 if __name__ == '__main__':
     unittest.main()
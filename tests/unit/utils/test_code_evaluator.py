@@ -0,0 +1,218 @@
+import asyncio
+import json
+import time
+import unittest
+from datetime import datetime
+
+from codedog.utils.code_evaluator import EVALUATION_FAILED, DiffEvaluator
+from codedog.utils.fake_llm import FakeChatModel, default_response
+from codedog.utils.git_log_analyzer import CommitInfo
+
+
+def _scores():
+    return {
+        "readability": 7, "efficiency": 7, "security": 7, "structure": 7, "error_handling": 7,
+        "documentation": 7, "code_style": 7, "overall_score": 7.0, "estimated_hours": 0.5, "comments": "ok",
+    }
+
+
+def _commit_diff(count, lines=1):
+    return {
+        f"src/module_{i}.py": {
+            "diff": "@@ -1 +1 @@\n" + "".join(f"-value_{i}_{n} = 1\n+value_{i}_{n} = 2\n" for n in range(lines)),
+            "status": "M",
+            "additions": 1,
+            "deletions": 1,
+        }
+        for i in range(count)
+    }
+
+
+class TestEvaluateCommit(unittest.TestCase):
+    def test_files_and_whole_commit_are_evaluated_concurrently(self):
+        model = FakeChatModel(latency=0.2)
+        evaluator = DiffEvaluator(model, tokens_per_minute=1000000, max_concurrent_requests=3)
+        commit_diff = _commit_diff(6)
+
+        start = time.monotonic()
+        results = asyncio.run(evaluator.evaluate_commit("abc", commit_diff))
+        elapsed = time.monotonic() - start
+
+        # 6 个文件 + 整体评价 + 总结，串行需要约 1.6 秒
+        self.assertEqual(model.get_stats()["calls"], 8)
+        self.assertLess(elapsed, 1.2)
+        self.assertEqual([f["path"] for f in results["files"]], list(commit_diff))
+        self.assertIn("estimated_hours", results)
+        self.assertTrue(results["summary"])
+
+    def test_large_commit_is_reduced_from_file_evaluations(self):
+        prompts = []
+
+        def responder(prompt, rng):
+            prompts.append(prompt)
+            if "partial assessments" in prompt:
+                scores = {field: 7 for field in ["readability", "efficiency", "security", "structure",
+                                                 "error_handling", "documentation", "code_style", "overall_score"]}
+                return json.dumps({**scores, "estimated_hours": 3.5, "comments": "Reduced."})
+            return default_response(prompt, rng)
+
+        evaluator = DiffEvaluator(
+            FakeChatModel(responder=responder), tokens_per_minute=1000000, whole_commit_max_tokens=400
+        )
+        commit_diff = _commit_diff(8, lines=20)
+        results = asyncio.run(evaluator.evaluate_commit("abc", commit_diff))
+
+        # 每个文件的 diff 只发送一次，整体评价由部分评价分组归约
+        for file_path in commit_diff:
+            self.assertEqual(sum(f"value_{file_path[11:-3]}_0 = 2" in p for p in prompts), 1)
+        self.assertFalse(any("### File:" in p for p in prompts))
+        self.assertGreater(sum("partial assessments" in p for p in prompts), 1)
+        self.assertEqual(results["estimated_hours"], 3.5)
+        self.assertEqual(results["whole_commit_evaluation"]["comments"], "Reduced.")
+
+    def test_reduce_falls_back_to_weighted_aggregate(self):
+        evaluator = DiffEvaluator(FakeChatModel(error_rate=1.0), tokens_per_minute=1000000)
+        assessments = [
+            {"path": "a.py", "additions": 30, "deletions": 0, "overall_score": 8, "estimated_hours": 1.0},
+            {"path": "b.py", "additions": 10, "deletions": 0, "overall_score": 4, "estimated_hours": 0.5},
+        ]
+        result = asyncio.run(evaluator._reduce_assessments("abc", assessments))
+        self.assertEqual((result["overall_score"], result["estimated_hours"]), (7.0, 1.5))
+
+
+def _large_diff(marker):
+    # 两个 hunk 各约 7000 个令牌，超过单次评价的上限，按 hunk 分成两块
+    hunks = [
+        f"@@ -{start},1 +{start},600 @@\n" + "".join(f"+{name}_{n} = compute({n}, 'value')\n" for n in range(600))
+        for start, name in ((1, "first"), (2000, marker))
+    ]
+    return "--- a/big.py\n+++ b/big.py\n" + "".join(hunks)
+
+
+class TestChunkedEvaluation(unittest.TestCase):
+    def test_failed_chunk_is_not_cached(self):
+        def responder(prompt, rng):
+            return "not json" if "broken_" in prompt else default_response(prompt, rng)
+
+        evaluator = DiffEvaluator(FakeChatModel(responder=responder), tokens_per_minute=10000000)
+        diff = _large_diff("broken")
+        result = asyncio.run(evaluator._evaluate_single_diff(diff, "big.py"))
+
+        self.assertTrue(result[EVALUATION_FAILED])
+        self.assertEqual(evaluator.cache, {})
+        self.assertEqual(len(evaluator.near_duplicates), 0)
+
+    def test_successful_chunks_are_cached(self):
+        model = FakeChatModel()
+        evaluator = DiffEvaluator(model, tokens_per_minute=10000000)
+        diff = _large_diff("second")
+        result = asyncio.run(evaluator._evaluate_single_diff(diff, "big.py"))
+        asyncio.run(evaluator._evaluate_single_diff(diff, "big.py"))
+
+        self.assertNotIn(EVALUATION_FAILED, result)
+        self.assertEqual(model.get_stats()["calls"], 2)
+        self.assertEqual(len(evaluator.cache), 1)
+
+
+class TestFailedEvaluations(unittest.TestCase):
+    def test_failed_files_are_flagged(self):
+        def responder(prompt, rng):
+            return "not json" if "broken = 2" in prompt else default_response(prompt, rng)
+
+        commit = CommitInfo(hash="abc", author="dev", date=datetime(2024, 1, 2), message="msg",
+                            files=["ok.py", "broken.py"], diff="")
+        diffs = {"abc": {
+            "ok.py": "@@ -1 +1 @@\n-ok = 1\n+ok = 2",
+            "broken.py": "@@ -1 +1 @@\n-broken = 1\n+broken = 2",
+        }}
+        evaluator = DiffEvaluator(FakeChatModel(responder=responder), tokens_per_minute=1000000)
+        results = asyncio.run(evaluator.evaluate_commits([commit], diffs))
+
+        self.assertEqual({r.file_path: r.evaluation_failed for r in results}, {"ok.py": False, "broken.py": True})
+
+
+def _file_commit(paths):
+    commit = CommitInfo(hash="abc", author="dev", date=datetime(2024, 1, 2), message="msg", files=list(paths), diff="")
+    return [commit], {"abc": dict(paths)}
+
+
+async def _collect(evaluator, commits, diffs):
+    return [result async for result in evaluator.iter_evaluate_commits(commits, diffs)]
+
+
+class TestIterEvaluateCommits(unittest.TestCase):
+    def test_slow_file_does_not_hold_back_other_results(self):
+        # 最小的文件最先出队，但评价最慢
+        commits, diffs = _file_commit({"slow.py": "@@ x", "a.py": "@@ -1 +1 @@ a", "b.py": "@@ -1 +1 @@ b"})
+        evaluator = DiffEvaluator(FakeChatModel(), tokens_per_minute=1000000, max_concurrent_requests=2)
+
+        async def evaluate(diff_content, file_path=None):
+            await asyncio.sleep(0.5 if file_path == "slow.py" else 0.01)
+            return _scores()
+
+        evaluator._evaluate_single_diff = evaluate
+        results = asyncio.run(_collect(evaluator, commits, diffs))
+
+        self.assertEqual([r.file_path for r in results], ["a.py", "b.py", "slow.py"])
+
+    def test_concurrency_follows_max_concurrent_requests(self):
+        commits, diffs = _file_commit({f"f{i}.py": f"@@ -1 +1 @@ {i}" for i in range(9)})
+        evaluator = DiffEvaluator(FakeChatModel(), tokens_per_minute=1000000, max_concurrent_requests=3)
+        evaluator.MIN_REQUEST_INTERVAL = 0.01
+        active = peak = 0
+        peaks = []
+
+        async def evaluate(diff_content, file_path=None):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            return _scores()
+
+        evaluator._evaluate_single_diff = evaluate
+        results = asyncio.run(_collect(evaluator, commits, diffs))
+        peaks.append(peak)
+        self.assertEqual(len(results), 9)
+
+        # 第一次评价就遇到速率限制，并发上限从 3 降到 1，其余工作者暂停取任务
+        peak = 0
+        rate_limited = False
+
+        async def rate_limited_evaluate(diff_content, file_path=None):
+            nonlocal rate_limited
+            if not rate_limited:
+                rate_limited = True
+                evaluator._adjust_rate_limits(is_rate_limited=True)
+                evaluator._adjust_rate_limits(is_rate_limited=True)
+            return await evaluate(diff_content, file_path)
+
+        evaluator.MAX_CONCURRENT_REQUESTS = 3
+        evaluator._evaluate_single_diff = rate_limited_evaluate
+        results = asyncio.run(_collect(evaluator, commits, diffs))
+        peaks.append(peak)
+
+        self.assertEqual(len(results), 9)
+        self.assertEqual(evaluator.MAX_CONCURRENT_REQUESTS, 1)
+        self.assertEqual(peaks, [3, 1])
+
+    def test_failed_evaluation_still_yields_a_result(self):
+        commits, diffs = _file_commit({"ok.py": "@@ -1 +1 @@ ok", "boom.py": "@@ -1 +1 @@ boom", "c.py": "@@ c"})
+        evaluator = DiffEvaluator(FakeChatModel(), tokens_per_minute=1000000, max_concurrent_requests=2)
+
+        async def evaluate(diff_content, file_path=None):
+            if file_path == "boom.py":
+                raise RuntimeError("connection reset")
+            return _scores()
+
+        evaluator._evaluate_single_diff = evaluate
+        results = asyncio.run(asyncio.wait_for(_collect(evaluator, commits, diffs), timeout=5))
+
+        self.assertEqual(sorted(r.file_path for r in results), ["boom.py", "c.py", "ok.py"])
+        failed = {r.file_path: r for r in results if r.evaluation_failed}
+        self.assertEqual(list(failed), ["boom.py"])
+        self.assertIn("connection reset", failed["boom.py"].evaluation.comments)
+
+
+if __name__ == "__main__":
+    unittest.main()
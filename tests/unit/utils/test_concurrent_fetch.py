@@ -0,0 +1,79 @@
+import threading
+import time
+import unittest
+
+from codedog.utils.concurrent_fetch import RateLimitBackoff, fetch_concurrently, rate_limit_headers
+
+
+class _RateLimited(Exception):
+    def __init__(self, status, headers):
+        super().__init__("API rate limit exceeded")
+        self.status = status
+        self.headers = headers
+
+
+class TestConcurrentFetch(unittest.TestCase):
+    def test_results_keep_input_order_and_respect_worker_limit(self):
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def fetch(item):
+            with lock:
+                active.append(item)
+                peak.append(len(active))
+            time.sleep(0.01 * (5 - item % 5))
+            with lock:
+                active.remove(item)
+            return item * 2
+
+        results = fetch_concurrently(range(20), fetch, max_workers=4)
+
+        self.assertEqual(results, [i * 2 for i in range(20)])
+        self.assertLessEqual(max(peak), 4)
+        self.assertGreater(max(peak), 1)
+
+    def test_rate_limited_requests_are_retried(self):
+        calls = []
+
+        def fetch(item):
+            calls.append(item)
+            if calls.count(item) == 1:
+                raise _RateLimited(429, {"Retry-After": "0.05"})
+            return item
+
+        start = time.time()
+        results = fetch_concurrently([1, 2], fetch, max_workers=2)
+
+        self.assertEqual(results, [1, 2])
+        self.assertEqual(sorted(calls), [1, 1, 2, 2])
+        self.assertGreaterEqual(time.time() - start, 0.05)
+
+    def test_other_errors_are_raised(self):
+        def fetch(item):
+            raise _RateLimited(404, {})
+
+        with self.assertRaises(_RateLimited):
+            fetch_concurrently([1], fetch)
+
+    def test_rate_limit_headers(self):
+        self.assertIsNotNone(rate_limit_headers(_RateLimited(403, {"X-RateLimit-Remaining": "0"})))
+        self.assertIsNotNone(rate_limit_headers(_RateLimited(429, {})))
+        self.assertIsNone(rate_limit_headers(ValueError("boom")))
+
+    def test_low_remaining_quota_pauses_until_reset(self):
+        backoff = RateLimitBackoff(min_remaining=5)
+
+        backoff.observe_headers({"RateLimit-Remaining": "100", "RateLimit-Reset": str(time.time() + 60)})
+        start = time.time()
+        backoff.wait()
+        self.assertLess(time.time() - start, 0.05)
+
+        backoff.observe_headers({"x-ratelimit-remaining": "3", "x-ratelimit-reset": str(time.time() + 0.1)})
+        start = time.time()
+        backoff.wait()
+        self.assertGreaterEqual(time.time() - start, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+from codedog.utils.diff_chunker import chunk_diff, split_diff_hunks
+from codedog.utils.tokenizer import Tokenizer
+
+
+class _WordTokenizer(Tokenizer):
+    """deterministic tokenizer for tests: one token per whitespace separated word"""
+
+    def __init__(self):
+        self.model_name = "test"
+        self.encoding = None
+
+    def count(self, text):
+        return len(text.split())
+
+    def count_batch(self, texts):
+        return [self.count(text) for text in texts]
+
+    def fits(self, text, budget):
+        return self.count(text) <= budget
+
+    def split(self, text, max_tokens):
+        words = text.split()
+        return [" ".join(words[i:i + max_tokens]) for i in range(0, len(words), max_tokens)]
+
+
+HEADER = "diff --git a/app.py b/app.py\n--- a/app.py\n+++ b/app.py"
+
+
+def _hunk(start, n):
+    lines = [f"@@ -{start},{n} +{start},{n} @@ def f():"]
+    lines += [f" line {i}" for i in range(n)]
+    return "\n".join(lines)
+
+
+class TestDiffChunker(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = _WordTokenizer()
+
+    def test_split_diff_hunks(self):
+        diff = "\n".join([HEADER, _hunk(1, 2), _hunk(10, 2)])
+        header, hunks = split_diff_hunks(diff)
+
+        self.assertEqual(header, HEADER)
+        self.assertEqual(hunks, [_hunk(1, 2), _hunk(10, 2)])
+
+    def test_small_diff_is_not_chunked(self):
+        diff = "\n".join([HEADER, _hunk(1, 2)])
+        self.assertEqual(chunk_diff(diff, 1000, self.tokenizer), [diff])
+
+    def test_chunks_keep_whole_hunks_and_repeat_header(self):
+        hunks = [_hunk(1, 3), _hunk(20, 3), _hunk(40, 3)]
+        diff = "\n".join([HEADER] + hunks)
+
+        chunks = chunk_diff(diff, 30, self.tokenizer)
+
+        self.assertGreater(len(chunks), 1)
+        rebuilt = []
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith(HEADER + "\n@@"))
+            self.assertLessEqual(self.tokenizer.count(chunk), 30)
+            rebuilt.extend(split_diff_hunks(chunk)[1])
+        self.assertEqual(rebuilt, hunks)
+
+    def test_oversized_hunk_gets_recomputed_headers(self):
+        lines = ["@@ -5,6 +5,7 @@ def f():", " a", "-b", "+c", "+d", " e", " f", " g"]
+        diff = "\n".join([HEADER] + lines)
+
+        chunks = chunk_diff(diff, 20, self.tokenizer)
+
+        self.assertGreater(len(chunks), 1)
+        source_line, target_line = 5, 5
+        body = []
+        for chunk in chunks:
+            self.assertLessEqual(self.tokenizer.count(chunk), 20)
+            for hunk in split_diff_hunks(chunk)[1]:
+                hunk_lines = hunk.split("\n")
+                removed = sum(1 for line in hunk_lines[1:] if line[0] in " -")
+                added = sum(1 for line in hunk_lines[1:] if line[0] in " +")
+                self.assertEqual(
+                    hunk_lines[0],
+                    f"@@ -{source_line},{removed} +{target_line},{added} @@ def f():",
+                )
+                source_line += removed
+                target_line += added
+                body.extend(hunk_lines[1:])
+        self.assertEqual(body, lines[1:])
+
+    def test_headerless_patch_gets_synthesized_header(self):
+        diff = "\n".join([_hunk(1, 5), _hunk(30, 5)])
+
+        chunks = chunk_diff(diff, 30, self.tokenizer, file_path="src/app.py")
+
+        self.assertEqual(len(chunks), 2)
+        for chunk in chunks:
+            self.assertTrue(chunk.startswith("diff --git a/src/app.py b/src/app.py\n@@"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from codedog.utils.evaluation_cache import EvaluationCache
+
+
+class TestEvaluationCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "cache.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_round_trip_is_keyed_by_model_and_prompt_version(self):
+        cache = EvaluationCache(self.path)
+        cache.set("abc", "gpt-4", "v1", {"overall_score": 7.5})
+
+        self.assertEqual(cache.get("abc", "gpt-4", "v1"), {"overall_score": 7.5})
+        self.assertIsNone(cache.get("abc", "gpt-4", "v2"))
+        self.assertIsNone(cache.get("abc", "deepseek", "v1"))
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        cache.close()
+
+    def test_shared_between_instances(self):
+        writer = EvaluationCache(self.path)
+        writer.set("abc", "gpt-4", "v1", {"overall_score": 6.0})
+        writer.close()
+
+        reader = EvaluationCache(self.path)
+        self.assertEqual(reader.get("abc", "gpt-4", "v1"), {"overall_score": 6.0})
+        reader.close()
+
+    def test_expired_entries_are_dropped(self):
+        cache = EvaluationCache(self.path, ttl_seconds=0.05)
+        cache.set("abc", "gpt-4", "v1", {"overall_score": 6.0})
+        time.sleep(0.1)
+
+        self.assertIsNone(cache.get("abc", "gpt-4", "v1"))
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = EvaluationCache(self.path, max_entries=2)
+        cache.set("a", "m", "v", {"n": 1})
+        time.sleep(0.01)
+        cache.set("b", "m", "v", {"n": 2})
+        time.sleep(0.01)
+        cache.get("a", "m", "v")
+        time.sleep(0.01)
+        cache.set("c", "m", "v", {"n": 3})
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b", "m", "v"))
+        self.assertEqual(cache.get("a", "m", "v"), {"n": 1})
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
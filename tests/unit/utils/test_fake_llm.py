@@ -0,0 +1,59 @@
+import asyncio
+import json
+import unittest
+
+from langchain_core.messages import HumanMessage
+
+from codedog.utils.code_evaluator import DiffEvaluator
+from codedog.utils.fake_llm import FakeChatModel, FakeModelError, FakeRateLimitError
+from codedog.utils.git_log_analyzer import CommitInfo
+
+_EVALUATION_PROMPT = 'Return {"readability": 1, "overall_score": 1} as JSON'
+
+
+class TestFakeChatModel(unittest.TestCase):
+    def test_responses_are_deterministic_per_prompt(self):
+        first = FakeChatModel(seed=3).invoke([HumanMessage(content=_EVALUATION_PROMPT)]).content
+        second = FakeChatModel(seed=3).invoke([HumanMessage(content=_EVALUATION_PROMPT)]).content
+
+        self.assertEqual(first, second)
+        scores = json.loads(first.strip("`").removeprefix("json"))
+        self.assertTrue(5 <= scores["readability"] <= 9)
+        self.assertIn("estimated_hours", scores)
+
+    def test_error_injection_and_stats(self):
+        model = FakeChatModel(rate_limit_rate=1.0, retry_after=2)
+        with self.assertRaises(FakeRateLimitError) as ctx:
+            model.invoke([HumanMessage(content="hello")])
+        self.assertEqual(ctx.exception.headers, {"Retry-After": "2.0"})
+        self.assertIn("rate limit", str(ctx.exception).lower())
+
+        model = FakeChatModel(error_rate=1.0)
+        with self.assertRaises(FakeModelError):
+            model.invoke([HumanMessage(content="hello")])
+
+        model = FakeChatModel(completion_tokens=200)
+        model.invoke([HumanMessage(content="hello")])
+        stats = model.get_stats()
+        self.assertEqual((stats["calls"], stats["errors"], stats["rate_limited"]), (1, 0, 0))
+        self.assertGreaterEqual(stats["completion_tokens"], 200)
+        self.assertEqual(len(stats["latencies"]), 1)
+
+    def test_latency_is_applied_to_async_calls(self):
+        model = FakeChatModel(latency=0.05)
+        asyncio.run(model.agenerate(messages=[[HumanMessage(content="hello")]]))
+        self.assertGreaterEqual(model.get_stats()["latencies"][0], 0.05)
+
+    def test_diff_evaluator_parses_fake_evaluations(self):
+        commit = CommitInfo(hash="abc", author="dev", date=None, message="msg", files=["a.py"], diff="")
+        diffs = {"abc": {"a.py": "diff --git a/a.py b/a.py\n@@ -1 +1 @@\n-a = 1\n+a = 2"}}
+        evaluator = DiffEvaluator(FakeChatModel(), tokens_per_minute=1000000)
+
+        results = asyncio.run(evaluator.evaluate_commits([commit], diffs))
+
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0].evaluation.comments.startswith("Fake evaluation"))
+
+
+if __name__ == "__main__":
+    unittest.main()
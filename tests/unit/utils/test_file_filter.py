@@ -0,0 +1,129 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from codedog.utils.file_filter import FileFilter, parse_gitattributes
+from codedog.utils.git_log_analyzer import get_commit_diff, get_file_diffs_by_timeframe
+
+
+def _diff(lines, start=1):
+    body = "\n".join(f"+{line}" for line in lines)
+    return f"@@ -0,0 +{start},{len(lines)} @@\n{body}\n"
+
+
+class TestFileFilter(unittest.TestCase):
+    def test_default_path_rules(self):
+        file_filter = FileFilter()
+        self.assertEqual(file_filter.path_skip_reason("web/package-lock.json"), "lockfile")
+        self.assertEqual(file_filter.path_skip_reason("static/app.min.js"), "minified")
+        self.assertEqual(file_filter.path_skip_reason("api/service_pb2.py"), "generated")
+        self.assertEqual(file_filter.path_skip_reason("src/vendor/lib/util.go"), "vendored")
+        self.assertEqual(file_filter.path_skip_reason("tests/__snapshots__/view.js.snap"), "snapshot")
+        self.assertIsNone(file_filter.path_skip_reason("src/vendors.py"))
+        self.assertIsNone(file_filter.path_skip_reason("src/app.py"))
+
+    def test_gitattributes_rules_override_defaults(self):
+        rules = parse_gitattributes(
+            "# comment\n"
+            "/gen/** linguist-generated\n"
+            "docs/api/ linguist-vendored=true\n"
+            "vendor/ours/ -linguist-vendored\n"
+            "*.py text eol=lf\n"
+        )
+        self.assertEqual(
+            rules, [("/gen/**", "generated"), ("docs/api/", "vendored"), ("vendor/ours/", None)]
+        )
+
+        file_filter = FileFilter()
+        file_filter.rules.extend(rules)
+        self.assertEqual(file_filter.path_skip_reason("gen/models.py"), "generated")
+        self.assertIsNone(file_filter.path_skip_reason("src/gen/models.py"))
+        self.assertEqual(file_filter.path_skip_reason("docs/api/index.py"), "vendored")
+        self.assertEqual(file_filter.path_skip_reason("vendor/lib.go"), "vendored")
+        self.assertIsNone(file_filter.path_skip_reason("vendor/ours/lib.go"))
+
+    def test_content_rules(self):
+        file_filter = FileFilter(max_diff_bytes=10000)
+        self.assertEqual(file_filter.content_skip_reason(_diff(["var a=1;" * 200])), "minified")
+        self.assertEqual(
+            file_filter.content_skip_reason(_diff(["# Code generated by protoc. DO NOT EDIT.", "x = 1"])),
+            "generated",
+        )
+        # 文件中间的 hunk 提到 "generated" 不算文件头
+        self.assertIsNone(
+            file_filter.content_skip_reason(_diff(["# values generated by the parser", "x = 1"], start=40))
+        )
+        self.assertEqual(file_filter.content_skip_reason(_diff(["QUJD" * 19] * 10)), "base64")
+        self.assertEqual(file_filter.content_skip_reason("x" * 10001), "too large")
+        self.assertIsNone(file_filter.content_skip_reason(_diff(["def f():", "    return 1"])))
+
+    def test_filter_file_diffs_counts_reasons(self):
+        file_filter = FileFilter()
+        kept = file_filter.filter_commit_file_diffs({
+            "a": {"app.py": _diff(["x = 1"]), "yarn.lock": _diff(["x"])},
+            "b": {"dist/app.js": {"diff": _diff(["x"])}},
+        })
+        self.assertEqual(kept, {"a": {"app.py": _diff(["x = 1"])}})
+        self.assertEqual(file_filter.get_stats(), {"skipped": 2, "by_reason": {"lockfile": 1, "vendored": 1}})
+
+
+def _git(repo, *args):
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME="Alice",
+        GIT_AUTHOR_EMAIL="alice@example.com",
+        GIT_COMMITTER_NAME="Alice",
+        GIT_COMMITTER_EMAIL="alice@example.com",
+        GIT_AUTHOR_DATE="2024-01-02T10:00:00+00:00",
+        GIT_COMMITTER_DATE="2024-01-02T10:00:00+00:00",
+    )
+    return subprocess.run(["git", *args], cwd=repo, env=env, check=True, capture_output=True, text=True).stdout
+
+
+@unittest.skipUnless(shutil.which("git"), "git not available")
+class TestGitLogAnalyzerFiltering(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        _git(self.repo, "init", "-q")
+        files = {
+            ".gitattributes": "schema/*.py linguist-generated\n",
+            "app.py": "print('hello')\n",
+            "schema/models.py": "class Model: pass\n",
+            "client.py": "# @generated by openapi-generator\nclass Client: pass\n",
+            "poetry.lock": "[[package]]\n",
+        }
+        for path, content in files.items():
+            os.makedirs(os.path.dirname(os.path.join(self.repo, path)), exist_ok=True)
+            with open(os.path.join(self.repo, path), "w") as f:
+                f.write(content)
+        _git(self.repo, "add", ".")
+        _git(self.repo, "commit", "-q", "-m", "initial")
+
+        with open(os.path.join(self.repo, "poetry.lock"), "a") as f:
+            f.write("name = 'x'\n")
+        _git(self.repo, "commit", "-q", "-am", "update lock")
+        self.head = _git(self.repo, "rev-parse", "HEAD").strip()
+
+    def tearDown(self):
+        shutil.rmtree(self.repo, ignore_errors=True)
+
+    def test_timeframe_skips_files_and_empty_commits(self):
+        file_filter = FileFilter.from_repo(self.repo)
+        commits, commit_file_diffs, _ = get_file_diffs_by_timeframe(
+            "Alice", "2024-01-01", "2024-01-03", self.repo, include_extensions=[".py", ".lock"], workers=1,
+            file_filter=file_filter,
+        )
+        self.assertEqual([commit.message for commit in commits], ["initial"])
+        self.assertEqual(commits[0].files, ["app.py"])
+        self.assertEqual(list(commit_file_diffs[commits[0].hash]), ["app.py"])
+        self.assertEqual(file_filter.get_stats()["by_reason"], {"generated": 2, "lockfile": 2})
+
+    def test_commit_diff_with_filter(self):
+        self.assertEqual(list(get_commit_diff(self.head, self.repo, file_filter=FileFilter())), [])
+        self.assertEqual(list(get_commit_diff(self.head, self.repo)), ["poetry.lock"])
+
+
+if __name__ == "__main__":
+    unittest.main()
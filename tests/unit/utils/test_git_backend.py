@@ -0,0 +1,232 @@
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+from codedog.utils.git_backend import (
+    GitBackend,
+    GitBackendError,
+    SubprocessGitBackend,
+    _iter_log_blocks,
+    _numstat_path,
+    get_git_backend,
+)
+from codedog.utils.git_hooks import create_commit_pr_data
+from codedog.utils.git_log_analyzer import _parse_commit_block, extract_file_diffs, get_commit_diff
+
+
+def _git(repo, *args, author="Alice", date="2024-01-02T10:00:00+00:00"):
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME=author,
+        GIT_AUTHOR_EMAIL=f"{author.lower()}@example.com",
+        GIT_COMMITTER_NAME=author,
+        GIT_COMMITTER_EMAIL=f"{author.lower()}@example.com",
+        GIT_AUTHOR_DATE=date,
+        GIT_COMMITTER_DATE=date,
+    )
+    return subprocess.run(["git", *args], cwd=repo, env=env, check=True, capture_output=True, text=True).stdout
+
+
+@unittest.skipUnless(shutil.which("git"), "git not available")
+class TestGitBackends(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        _git(self.repo, "init", "-q")
+
+        os.makedirs(os.path.join(self.repo, "pkg"))
+        with open(os.path.join(self.repo, "pkg", "app.py"), "w") as f:
+            f.write("print('hello')\n")
+        with open(os.path.join(self.repo, "notes.md"), "w") as f:
+            f.write("# notes\n")
+        _git(self.repo, "add", ".")
+        _git(self.repo, "commit", "-q", "-m", "add app\n\nwith notes")
+
+        with open(os.path.join(self.repo, "pkg", "app.py"), "a") as f:
+            f.write("print('world')\n")
+        os.remove(os.path.join(self.repo, "notes.md"))
+        _git(self.repo, "add", "-A")
+        _git(self.repo, "commit", "-q", "-m", "extend app", author="Bob", date="2024-01-03T10:00:00+00:00")
+
+        self.first, self.second = _git(self.repo, "log", "--reverse", "--format=%H").split()
+
+    def tearDown(self):
+        shutil.rmtree(self.repo, ignore_errors=True)
+
+    def _check_backend(self, backend):
+        blocks = list(backend.iter_commit_blocks(None, "2024-01-01", "2024-01-05"))
+        self.assertEqual([block[0].split("|")[0] for block in blocks], [self.second, self.first])
+
+        commit = _parse_commit_block(*blocks[0])
+        self.assertEqual((commit.author, commit.author_email, commit.message), ("Bob", "bob@example.com", "extend app"))
+        self.assertEqual(commit.files, ["notes.md", "pkg/app.py"])
+        self.assertEqual((commit.added_lines, commit.deleted_lines), (1, 1))
+        self.assertIn("+print('world')", extract_file_diffs(commit)["pkg/app.py"])
+
+        self.assertEqual([b[0] for b in backend.iter_commit_blocks("Ali", "2024-01-01", "2024-01-05")], [blocks[1][0]])
+        self.assertEqual(backend.commit_block(self.first)[1], ["notes.md", "pkg/app.py"])
+        self.assertEqual(backend.commit_files(self.first), ["notes.md", "pkg/app.py"])
+        self.assertEqual(backend.commit_message(self.first), "add app\n\nwith notes")
+        self.assertEqual(backend.commit_author(self.second), "Bob <bob@example.com>")
+        with self.assertRaises(GitBackendError):
+            backend.commit_files("0" * 40)
+
+    def _commit_renames(self):
+        with open(os.path.join(self.repo, "pkg", "util.py"), "w") as f:
+            f.write("".join(f"value_{n} = {n}\n" for n in range(20)))
+        _git(self.repo, "add", ".")
+        _git(self.repo, "commit", "-q", "-m", "add util", date="2024-01-10T10:00:00+00:00")
+
+        _git(self.repo, "mv", "pkg/app.py", "app.py")
+        _git(self.repo, "mv", "pkg/util.py", "util.py")
+        with open(os.path.join(self.repo, "util.py"), "a") as f:
+            f.write("value_20 = 20\n")
+        _git(self.repo, "add", "-A")
+        _git(self.repo, "commit", "-q", "-m", "move files", date="2024-01-11T10:00:00+00:00")
+        return _git(self.repo, "rev-parse", "HEAD").strip()
+
+    def _check_pure_rename(self, backend, commit_hash):
+        commit = _parse_commit_block(*backend.commit_block(commit_hash))
+        # 内容未变的重命名只记录新路径，没有需要评价的 diff
+        self.assertIn("app.py", commit.files)
+        self.assertNotIn("pkg/app.py", commit.files)
+        self.assertNotIn("app.py", extract_file_diffs(commit))
+        return commit
+
+    def test_subprocess_backend(self):
+        self._check_backend(SubprocessGitBackend(self.repo))
+
+    def test_subprocess_backend_detects_renames(self):
+        backend = SubprocessGitBackend(self.repo)
+        commit = self._check_pure_rename(backend, self._commit_renames())
+
+        self.assertEqual(sorted(commit.files), ["app.py", "util.py"])
+        self.assertEqual((commit.added_lines, commit.deleted_lines), (1, 0))
+        diffs = extract_file_diffs(commit)
+        self.assertEqual(list(diffs), ["util.py"])
+        self.assertTrue(diffs["util.py"].startswith("rename from pkg/util.py\nrename to util.py\n"))
+        self.assertIn("+value_20 = 20", diffs["util.py"])
+
+        diffs = get_commit_diff("HEAD", self.repo)
+        self.assertEqual({path: d["status"] for path, d in diffs.items()}, {"util.py": "R"})
+        self.assertEqual((diffs["util.py"]["additions"], diffs["util.py"]["deletions"]), (1, 0))
+
+        blocks = list(backend.iter_commit_blocks(None, "2024-01-10", "2024-01-12"))
+        self.assertEqual(sorted(blocks[0][1]), ["app.py", "util.py"])
+
+    @unittest.skipUnless(importlib.util.find_spec("dulwich"), "dulwich not installed")
+    def test_dulwich_backend_matches_subprocess(self):
+        from codedog.utils.git_backend import DulwichGitBackend
+
+        self._check_backend(DulwichGitBackend(self.repo))
+        self.assertEqual(
+            get_commit_diff(self.second, self.repo, backend="dulwich").keys(),
+            get_commit_diff(self.second, self.repo, backend="subprocess").keys(),
+        )
+
+    @unittest.skipUnless(importlib.util.find_spec("dulwich"), "dulwich not installed")
+    def test_dulwich_backend_detects_exact_renames(self):
+        from codedog.utils.git_backend import DulwichGitBackend
+
+        self._check_pure_rename(DulwichGitBackend(self.repo), self._commit_renames())
+
+    @unittest.skipUnless(importlib.util.find_spec("dulwich"), "dulwich not installed")
+    def test_dulwich_backend_resolves_commit_names(self):
+        from codedog.utils.git_backend import DulwichGitBackend
+
+        backend = DulwichGitBackend(self.repo)
+        self.assertEqual(backend.commit_block("HEAD")[0], backend.commit_block(self.second)[0])
+        self.assertEqual(backend.commit_block(self.second[:10])[0].split("|")[0], self.second)
+        with self.assertRaises(GitBackendError):
+            backend.commit_block("0" * 40)
+
+    @unittest.skipUnless(importlib.util.find_spec("dulwich"), "dulwich not installed")
+    def test_dulwich_backend_bounds_tree_cache(self):
+        from codedog.utils.git_backend import DulwichGitBackend
+
+        backend = DulwichGitBackend(self.repo, tree_cache_size=1)
+        self.assertEqual(len(list(backend.iter_commit_blocks(None, "2024-01-01", "2024-01-05"))), 2)
+        self.assertEqual(len(backend._trees), 1)
+
+    @unittest.skipUnless(importlib.util.find_spec("dulwich"), "dulwich not installed")
+    def test_dulwich_backend_rejects_non_repository(self):
+        from codedog.utils.git_backend import DulwichGitBackend
+
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        with self.assertRaises(GitBackendError):
+            DulwichGitBackend(path)
+
+    @unittest.skipIf(importlib.util.find_spec("dulwich"), "dulwich installed")
+    def test_dulwich_backend_requires_optional_dependency(self):
+        with self.assertRaises(ImportError):
+            get_git_backend(self.repo, "dulwich")
+
+    def test_git_backend_is_abstract(self):
+        with self.assertRaises(TypeError):
+            GitBackend(self.repo)
+
+    def test_get_commit_diff(self):
+        diffs = get_commit_diff(self.second, self.repo)
+        self.assertEqual({path: d["status"] for path, d in diffs.items()}, {"notes.md": "D", "pkg/app.py": "M"})
+        self.assertEqual((diffs["pkg/app.py"]["additions"], diffs["pkg/app.py"]["deletions"]), (1, 0))
+        diffs = get_commit_diff(self.first, self.repo, include_extensions=[".py"])
+        self.assertEqual({path: d["status"] for path, d in diffs.items()}, {"pkg/app.py": "A"})
+
+    def test_commit_pr_data(self):
+        pr_data = create_commit_pr_data(self.first, self.repo)
+        self.assertEqual((pr_data["title"], pr_data["body"]), ("add app", "with notes"))
+        self.assertEqual(pr_data["author"], "Alice <alice@example.com>")
+        self.assertEqual(pr_data["files"], ["notes.md", "pkg/app.py"])
+
+    def test_numstat_rename_paths(self):
+        self.assertEqual(_numstat_path("pkg/{ => sub}/a.py"), "pkg/sub/a.py")
+        self.assertEqual(_numstat_path("pkg/{sub => }/a.py"), "pkg/a.py")
+        self.assertEqual(_numstat_path("{pkg => lib}/a.py"), "lib/a.py")
+        self.assertEqual(_numstat_path("pkg/a.py => top.py"), "top.py")
+        self.assertEqual(_numstat_path("pkg/a.py"), "pkg/a.py")
+
+    def test_get_git_backend(self):
+        self.assertIs(get_git_backend(self.repo), get_git_backend(self.repo, "subprocess"))
+        with self.assertRaises(ValueError):
+            get_git_backend(self.repo, "svn")
+
+
+class TestIterLogBlocks(unittest.TestCase):
+    def _run(self, script):
+        blocks = []
+        thread = threading.Thread(
+            target=lambda: blocks.extend(_iter_log_blocks([sys.executable, "-c", script], os.getcwd())),
+            daemon=True,
+        )
+        thread.start()
+        thread.join(timeout=10)
+        self.assertFalse(thread.is_alive(), "reading git output deadlocked")
+        return blocks
+
+    def test_large_stderr_does_not_block(self):
+        # more warnings than a pipe buffer holds, written before any stdout
+        script = (
+            "import sys\n"
+            "sys.stderr.write('warning: noisy\\n' * 20000)\n"
+            "print('\\x00abc|Alice|alice@example.com|2024-01-02T10:00:00+00:00|msg')\n"
+            "print('1\\t0\\ta.py')\n"
+        )
+        blocks = self._run(script)
+        self.assertEqual([(header.split("|")[0], files) for header, files, _ in blocks], [("abc", ["a.py"])])
+
+    def test_stderr_is_reported_on_failure(self):
+        with self.assertRaises(GitBackendError) as ctx:
+            list(_iter_log_blocks(
+                [sys.executable, "-c", "import sys; sys.stderr.write('fatal: bad revision'); sys.exit(128)"],
+                os.getcwd(),
+            ))
+        self.assertEqual(ctx.exception.stderr, "fatal: bad revision")
+
+
+if __name__ == "__main__":
+    unittest.main()
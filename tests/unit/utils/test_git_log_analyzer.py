@@ -0,0 +1,116 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from codedog.utils.git_log_analyzer import (
+    get_commits_by_author_and_timeframe,
+    get_file_diffs_by_authors,
+    get_file_diffs_by_timeframe,
+    iter_commits_by_author_and_timeframe,
+    match_author,
+)
+
+
+def _git(repo, *args, author="Alice"):
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME=author,
+        GIT_AUTHOR_EMAIL=f"{author.lower()}@example.com",
+        GIT_COMMITTER_NAME=author,
+        GIT_COMMITTER_EMAIL=f"{author.lower()}@example.com",
+        GIT_AUTHOR_DATE="2024-01-02T10:00:00+00:00",
+        GIT_COMMITTER_DATE="2024-01-02T10:00:00+00:00",
+    )
+    subprocess.run(["git", *args], cwd=repo, env=env, check=True, capture_output=True)
+
+
+@unittest.skipUnless(shutil.which("git"), "git not available")
+class TestGitLogAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.repo = tempfile.mkdtemp()
+        _git(self.repo, "init", "-q")
+
+        with open(os.path.join(self.repo, "app.py"), "w") as f:
+            f.write("print('hello')\n")
+        with open(os.path.join(self.repo, "notes.md"), "w") as f:
+            f.write("# notes\n")
+        _git(self.repo, "add", ".")
+        _git(self.repo, "commit", "-q", "-m", "add app | notes")
+
+        with open(os.path.join(self.repo, "app.py"), "a") as f:
+            f.write("print('world')\n")
+        os.remove(os.path.join(self.repo, "notes.md"))
+        _git(self.repo, "add", "-A")
+        _git(self.repo, "commit", "-q", "-m", "extend app")
+
+        with open(os.path.join(self.repo, "other.py"), "w") as f:
+            f.write("x = 1\n")
+        _git(self.repo, "add", ".")
+        _git(self.repo, "commit", "-q", "-m", "bob change", author="Bob")
+
+    def tearDown(self):
+        shutil.rmtree(self.repo, ignore_errors=True)
+
+    def test_iter_commits_parses_single_log_stream(self):
+        commits = list(iter_commits_by_author_and_timeframe("Alice", "2024-01-01", "2024-01-03", self.repo))
+
+        self.assertEqual([c.message for c in commits], ["extend app", "add app | notes"])
+        self.assertEqual(commits[0].files, ["app.py", "notes.md"])
+        self.assertEqual((commits[0].added_lines, commits[0].deleted_lines), (1, 1))
+        self.assertIn("+print('world')", commits[0].diff)
+        self.assertEqual(commits[1].files, ["app.py", "notes.md"])
+
+    def test_get_commits_returns_empty_list_on_git_error(self):
+        not_a_repo = tempfile.mkdtemp()
+        try:
+            self.assertEqual(get_commits_by_author_and_timeframe("Alice", "2024-01-01", "2024-01-03", not_a_repo), [])
+        finally:
+            shutil.rmtree(not_a_repo, ignore_errors=True)
+
+    def test_get_file_diffs_by_timeframe_filters_while_streaming(self):
+        commits, file_diffs, stats = get_file_diffs_by_timeframe(
+            "Alice", "2024-01-01", "2024-01-03", self.repo, include_extensions=[".py"]
+        )
+
+        self.assertEqual(len(commits), 2)
+        for commit in commits:
+            self.assertEqual(commit.files, ["app.py"])
+            self.assertEqual(list(file_diffs[commit.hash]), ["app.py"])
+        self.assertIn("+print('world')", file_diffs[commits[0].hash]["app.py"])
+        self.assertEqual(stats["total_files"], 1)
+
+    def test_parallel_extraction_matches_serial(self):
+        serial = get_file_diffs_by_timeframe(None, "2024-01-01", "2024-01-03", self.repo, workers=1)
+        parallel = get_file_diffs_by_timeframe(None, "2024-01-01", "2024-01-03", self.repo, workers=2)
+
+        self.assertEqual([c.hash for c in parallel[0]], [c.hash for c in serial[0]])
+        self.assertEqual(parallel[0], serial[0])
+        self.assertEqual(list(parallel[1]), list(serial[1]))
+        self.assertEqual(parallel[1:], serial[1:])
+        self.assertTrue(all(commit.diff == "" for commit in parallel[0]))
+
+    def test_get_file_diffs_by_authors_partitions_one_scan(self):
+        commits_by_author, file_diffs, stats = get_file_diffs_by_authors(
+            ["alice", "BOB@example"], "2024-01-01", "2024-01-03", self.repo
+        )
+
+        self.assertEqual([c.message for c in commits_by_author["alice"]], ["extend app", "add app | notes"])
+        self.assertEqual([c.message for c in commits_by_author["BOB@example"]], ["bob change"])
+        self.assertEqual(commits_by_author["BOB@example"][0].author_email, "bob@example.com")
+        self.assertEqual(len(file_diffs), 3)
+        self.assertEqual(stats["BOB@example"]["total_files"], 1)
+
+        commits_by_author, _, _ = get_file_diffs_by_authors([], "2024-01-01", "2024-01-03", self.repo)
+        self.assertEqual({a: len(c) for a, c in commits_by_author.items()}, {"Alice": 2, "Bob": 1})
+
+    def test_match_author(self):
+        self.assertEqual(match_author(["bob", "ali"], "Alice", "alice@example.com"), "ali")
+        self.assertEqual(match_author(["example.org"], "Carol", "carol@example.org"), "example.org")
+        self.assertIsNone(match_author(["bob"], "Alice", "alice@example.com"))
+        self.assertEqual(match_author([], "Alice"), "Alice")
+
+
+if __name__ == "__main__":
+    unittest.main()
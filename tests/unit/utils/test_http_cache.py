@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import requests
+from github import Auth, Github
+
+from codedog.retrievers.github_retriever import GithubRetriever
+from codedog.utils.http_cache import HTTPResponseCache, install_http_cache
+
+
+def _repo(base_url):
+    return {
+        "id": 1,
+        "name": "repo",
+        "full_name": "owner/repo",
+        "html_url": "https://github.com/owner/repo",
+        "url": f"{base_url}/repos/owner/repo",
+    }
+
+
+def _routes(base_url):
+    repo = _repo(base_url)
+    return {
+        "/repos/owner/repo": repo,
+        "/repos/owner/repo/pulls/7": {
+            "id": 70,
+            "number": 7,
+            "title": "Fix parser",
+            "body": "closes #3",
+            "html_url": "https://github.com/owner/repo/pull/7",
+            "url": f"{base_url}/repos/owner/repo/pulls/7",
+            "head": {"sha": "a" * 40, "repo": repo},
+            "base": {"sha": "b" * 40, "repo": repo},
+        },
+        "/repos/owner/repo/pulls/7/files": [
+            {
+                "sha": "c" * 40,
+                "filename": "src/parser.py",
+                "status": "modified",
+                "additions": 1,
+                "deletions": 1,
+                "patch": "@@ -1,2 +1,2 @@\n def parse():\n-    return 1\n+    return 2",
+                "blob_url": "https://github.com/owner/repo/blob/a/src/parser.py",
+            }
+        ],
+        "/repos/owner/repo/issues/3": {
+            "number": 3,
+            "title": "Parser bug",
+            "body": "returns 1",
+            "html_url": "https://github.com/owner/repo/issues/3",
+        },
+    }
+
+
+class _FakeGithubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    routes = {}
+    requests = []
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        body = json.dumps(self.routes[path]).encode()
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.requests.append((path, 304))
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("X-RateLimit-Remaining", "4999")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.requests.append((path, 200))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHTTPResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeGithubHandler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        _FakeGithubHandler.routes = _routes(self.base_url)
+        _FakeGithubHandler.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.tmpdir, "http_cache.sqlite")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_not_modified_response_is_served_from_disk(self):
+        cache = HTTPResponseCache(self.cache_path)
+        session = requests.Session()
+        install_http_cache(session, cache)
+
+        first = session.get(f"{self.base_url}/repos/owner/repo")
+        second = session.get(f"{self.base_url}/repos/owner/repo")
+
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.from_cache)
+        self.assertEqual(second.headers["X-RateLimit-Remaining"], "4999")
+        self.assertEqual(_FakeGithubHandler.requests, [("/repos/owner/repo", 200), ("/repos/owner/repo", 304)])
+        self.assertEqual(cache.get_stats()["hits"], 1)
+        cache.close()
+
+    def test_github_retriever_revalidates_with_etags_across_runs(self):
+        def retrieve():
+            cache = HTTPResponseCache(self.cache_path)
+            try:
+                client = Github(auth=Auth.Token("token"), base_url=self.base_url)
+                return GithubRetriever(client, "owner/repo", 7, http_cache=cache)
+            finally:
+                cache.close()
+
+        first = retrieve()
+        fetched = [path for path, status in _FakeGithubHandler.requests if status == 200]
+        _FakeGithubHandler.requests = []
+        second = retrieve()
+
+        self.assertEqual(len(fetched), 4)
+        self.assertEqual(sorted(_FakeGithubHandler.requests), sorted((path, 304) for path in fetched))
+        self.assertEqual(second.pull_request.title, first.pull_request.title)
+        self.assertEqual(second.pull_request.related_issues[0].title, "Parser bug")
+        self.assertEqual(
+            second.changed_files[0].diff_content.content,
+            first.changed_files[0].diff_content.content,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.messages import HumanMessage
+
+from codedog.utils.http_pool import HTTPConnectionPool
+from codedog.utils.langchain_utils import DeepSeekChatModel
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_POST(self):
+        self.connections.add(self.client_address)
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"choices": [{"message": {"content": "ok"}}], "usage": {"total_tokens": 3}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHTTPConnectionPool(unittest.TestCase):
+    def setUp(self):
+        _ChatHandler.connections = set()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.model = DeepSeekChatModel(
+            api_key="test",
+            model_name="deepseek-chat",
+            api_base=f"http://127.0.0.1:{self.server.server_port}",
+            temperature=0,
+            max_tokens=16,
+            top_p=1,
+        )
+
+    def tearDown(self):
+        self.model.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_async_requests_reuse_connection(self):
+        async def run():
+            try:
+                results = [await self.model.ainvoke([HumanMessage(content="hi")]) for _ in range(3)]
+            finally:
+                await self.model.aclose()
+            return results
+
+        results = asyncio.run(run())
+
+        self.assertEqual([r.content for r in results], ["ok"] * 3)
+        self.assertEqual(len(_ChatHandler.connections), 1)
+        self.assertEqual(self.model.total_tokens, 9)
+
+    def test_sync_requests_reuse_connection(self):
+        results = [self.model.invoke([HumanMessage(content="hi")]) for _ in range(3)]
+
+        self.assertEqual([r.content for r in results], ["ok"] * 3)
+        self.assertEqual(len(_ChatHandler.connections), 1)
+
+    def test_session_is_recreated_per_event_loop_and_on_resize(self):
+        pool = HTTPConnectionPool(max_connections=2)
+
+        async def get_twice():
+            first, second = pool.get_async_session(), pool.get_async_session()
+            pool.configure(4)
+            resized = pool.get_async_session()
+            self.assertEqual(resized.connector.limit, 4)
+            await pool.aclose()
+            return first, second, resized
+
+        first, second, resized = asyncio.run(get_twice())
+        self.assertIs(first, second)
+        self.assertIsNot(first, resized)
+        self.assertTrue(first.closed and resized.closed)
+
+        other_loop_session = asyncio.run(get_twice())[0]
+        self.assertIsNot(other_loop_session, first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import unittest
+
+from codedog.utils.code_evaluator import DiffEvaluator
+from codedog.utils.fake_llm import FakeChatModel
+from codedog.utils.json_extractor import JSONExtractor, StreamingJSONDetector, repair_json, scan_json_objects
+
+SCORES = {
+    "readability": 8,
+    "efficiency": 7,
+    "security": 9,
+    "structure": 6,
+    "error_handling": 7,
+    "documentation": 5,
+    "code_style": 8,
+    "overall_score": 7.1,
+    "comments": "Looks good {overall}",
+}
+
+
+class TestJSONExtractor(unittest.TestCase):
+    def setUp(self):
+        self.extractor = JSONExtractor(required_keys=["readability", "overall_score"])
+
+    def test_direct_json(self):
+        self.assertEqual(self.extractor.extract(json.dumps(SCORES)), SCORES)
+        self.assertEqual(self.extractor.get_stats()["paths"], {"direct": 1})
+
+    def test_scan_prefers_object_with_required_keys(self):
+        text = 'Example: {"a": 1}\n```json\n' + json.dumps(SCORES, indent=2) + "\n```\nDone."
+        self.assertEqual(self.extractor.extract(text), SCORES)
+        self.assertEqual(self.extractor.get_stats()["paths"], {"scan": 1})
+
+    def test_braces_inside_strings_are_ignored(self):
+        text = 'prefix {"comments": "use } and { carefully", "readability": 7, "overall_score": 7}'
+        self.assertEqual(scan_json_objects(text), [(7, len(text), True)])
+
+    def test_repair(self):
+        broken = "{readability: 8, 'comments': 'it\\'s \"fine\"\nreally', ok: True \"overall_score\": 7,}"
+        self.assertEqual(
+            json.loads(repair_json(broken)),
+            {"readability": 8, "comments": 'it\'s "fine"\nreally', "ok": True, "overall_score": 7},
+        )
+        self.assertEqual(self.extractor.extract("Result: " + broken)["overall_score"], 7)
+        self.assertEqual(self.extractor.get_stats()["paths"], {"repaired": 1})
+
+    def test_truncated_response_is_closed(self):
+        text = '```json\n{"readability": 8, "overall_score": 7, "comments": "cut off here'
+        result = self.extractor.extract(text)
+        self.assertEqual(result, {"readability": 8, "overall_score": 7, "comments": "cut off here"})
+
+    def test_fallbacks_and_stats(self):
+        extractor = JSONExtractor(fallbacks=[("echo", lambda text: {"text": text} if "score" in text else None)])
+        self.assertEqual(extractor.extract("score 5"), {"text": "score 5"})
+        self.assertIsNone(extractor.extract("nothing here"))
+        self.assertIsNone(extractor.extract(""))
+        stats = extractor.get_stats()
+        self.assertEqual(stats["paths"], {"echo": 1, "failed": 1, "empty": 1})
+        self.assertEqual(stats["responses"], 3)
+        self.assertEqual(stats["repair_rate"], 1.0)
+
+
+class TestStreamingJSONDetector(unittest.TestCase):
+    def feed_all(self, detector, text, size=7):
+        for i in range(0, len(text), size):
+            result = detector.feed(text[i:i + size])
+            if result is not None:
+                return result, i + size
+        return None, len(text)
+
+    def test_detects_object_split_across_chunks(self):
+        text = "Here you go:\n```json\n" + json.dumps(SCORES) + "\n```\nLet me explain each score in detail..." * 5
+        result, consumed = self.feed_all(StreamingJSONDetector(["readability", "overall_score"]), text)
+        self.assertEqual(result, SCORES)
+        self.assertLess(consumed, text.index("Let me explain") + 7)
+
+    def test_reasoning_and_incomplete_objects_are_ignored(self):
+        detector = StreamingJSONDetector(["readability"])
+        draft = '<think>Draft: {"readability": 3} maybe higher</think>\n'
+        self.assertEqual(self.feed_all(detector, draft + '{"other": 1} ')[0], None)
+        self.assertEqual(detector.feed('{"readability": 8, "comments": "ok"'), None)
+        self.assertEqual(detector.feed("}"), {"readability": 8, "comments": "ok"})
+
+
+class TestDiffEvaluatorParsing(unittest.TestCase):
+    def setUp(self):
+        self.evaluator = DiffEvaluator(FakeChatModel())
+
+    def test_scores_section_text(self):
+        text = (
+            "### SCORES:\n- Readability: 8/10\n- Efficiency & Performance: 7/10\n- Security: 6/10\n"
+            "- Structure & Design: 9/10\n- Error Handling: 5/10\n- Documentation & Comments: 4/10\n"
+            "- Code Style: 8/10\n- Final Overall Score: 7.2/10\n\n## Detailed Code Analysis\nSolid change.\n"
+        )
+        result = self.evaluator._parse_json_response(text)
+        self.assertEqual(result["efficiency"], 7)
+        self.assertEqual(result["documentation"], 4)
+        self.assertEqual(result["overall_score"], 7.2)
+        self.assertEqual(result["comments"], "Solid change.")
+        self.assertEqual(self.evaluator.json_extractor.get_stats()["paths"], {"scores_text": 1})
+
+    def test_unevaluable_only_without_json(self):
+        # JSON 中的评论提到"无法理解"时仍使用模型给出的分数
+        with_json = json.dumps(dict(SCORES, comments="变量名无法理解"), ensure_ascii=False)
+        self.assertEqual(self.evaluator._parse_json_response(with_json)["readability"], 8)
+
+        result = self.evaluator._parse_json_response("I'm sorry, there is no code to review.")
+        self.assertEqual(result["overall_score"], 5.0)
+        self.assertTrue(result["comments"].startswith("无法评估代码"))
+
+    def test_json_mode_falls_back_when_unsupported(self):
+        def responder(prompt, rng):
+            return json.dumps(SCORES)
+
+        model = FakeChatModel(responder=responder)
+        calls = []
+        original = model.agenerate
+
+        async def agenerate(messages, **kwargs):
+            calls.append(kwargs)
+            if "response_format" in kwargs:
+                raise ValueError("Unrecognized request argument supplied: response_format")
+            return await original(messages)
+
+        object.__setattr__(model, "agenerate", agenerate)
+        evaluator = DiffEvaluator(model, json_mode=True)
+        result = asyncio.run(evaluator._evaluate_single_diff("+def add(a, b):\n+    return a + b\n"))
+        self.assertEqual(result["readability"], 8)
+        self.assertFalse(evaluator.json_mode)
+        self.assertEqual(calls, [{"response_format": {"type": "json_object"}}, {}])
+
+    def test_streaming_stops_after_score_json(self):
+        def responder(prompt, rng):
+            return json.dumps(SCORES) + "\n\nDetailed explanation of every score follows." * 40
+
+        model = FakeChatModel(responder=responder, latency_per_token=0.002, stream_chunk_chars=32)
+        evaluator = DiffEvaluator(model, tokens_per_minute=1000000, stream_responses=True)
+        result = asyncio.run(evaluator._evaluate_single_diff("+def add(a, b):\n+    return a + b\n"))
+
+        self.assertEqual(result["readability"], 8)
+        self.assertEqual(evaluator.early_stops, 1)
+        # 只输出了评分 JSON 所在的几块，剩余的说明文字没有生成
+        self.assertLess(model.get_stats()["completion_tokens"], 120)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,15 @@
+import asyncio
+import json
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch
 
+from langchain_core.messages import HumanMessage
+
+from codedog.utils.langchain_utils import DeepSeekChatModel
+
 # Skip these tests if the correct modules aren't available
 try:
     HAS_OPENAI = True
@@ -52,5 +61,87 @@ class TestLangchainUtils(unittest.TestCase):
         mock_env.get.assert_called_with("AZURE_OPENAI", None)
 
 
+class _StreamHandler(BaseHTTPRequestHandler):
+    """以 SSE 逐个事件返回响应，客户端断开后停止发送并记录已发送的事件数"""
+
+    protocol_version = "HTTP/1.1"
+    events = []
+    sent = None
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        assert payload["stream"] is True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        sent = 0
+        try:
+            for event in self.events:
+                # 冒号开头的是 SSE 注释行（keep-alive），原样发送
+                line = event if event.startswith(":") else f"data: {event}"
+                self.wfile.write(f"{line}\n\n".encode())
+                self.wfile.flush()
+                sent += 1
+                time.sleep(0.02)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            type(self).sent = sent
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _delta(content=None, reasoning=None):
+    return json.dumps({"choices": [{"delta": {"content": content, "reasoning_content": reasoning}}]})
+
+
+class TestDeepSeekStreaming(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StreamHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.model = DeepSeekChatModel(
+            api_key="test", model_name="deepseek-reasoner", api_base=f"http://127.0.0.1:{self.server.server_port}",
+            temperature=0, max_tokens=16, top_p=1,
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stream(self, limit=None):
+        async def run():
+            chunks = []
+            stream = self.model.astream([HumanMessage(content="hi")])
+            try:
+                async for chunk in stream:
+                    chunks.append(chunk.content)
+                    if len(chunks) == limit:
+                        break
+            finally:
+                await stream.aclose()
+                await self.model.aclose()
+            return chunks
+
+        return asyncio.run(run())
+
+    def test_reasoning_is_skipped_and_usage_is_counted(self):
+        _StreamHandler.events = [
+            _delta(reasoning="thinking"), ": keep-alive", _delta("Hel"), _delta("lo"),
+            json.dumps({"choices": [], "usage": {"total_tokens": 7}}), "[DONE]",
+        ]
+        self.assertEqual(self.stream(), ["Hel", "lo"])
+        self.assertEqual(self.model.total_tokens, 7)
+
+    def test_early_stop_closes_the_connection(self):
+        _StreamHandler.events = [_delta(str(i)) for i in range(50)] + ["[DONE]"]
+        self.assertEqual(self.stream(limit=2), ["0", "1"])
+        deadline = time.time() + 5
+        while _StreamHandler.sent is None and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertLess(_StreamHandler.sent, 50)
+
+
 if __name__ == '__main__':
     unittest.main()
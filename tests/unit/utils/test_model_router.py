@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+from langchain_core.messages import HumanMessage
+
+from codedog.utils.fake_llm import FakeChatModel
+from codedog.utils.model_router import AllBackendsFailedError, ModelBackend, RoutedChatModel
+
+
+def _backend(name, weight=1.0, tokens_per_minute=None, requests_per_minute=None, **model_kwargs):
+    model = FakeChatModel(responder=lambda prompt, rng: name, **model_kwargs)
+    return ModelBackend(
+        model,
+        name=name,
+        weight=weight,
+        tokens_per_minute=tokens_per_minute,
+        requests_per_minute=requests_per_minute,
+    )
+
+
+def _ask(model, n=1):
+    async def run():
+        return [(await model.ainvoke([HumanMessage(content=f"review {i}")])).content for i in range(n)]
+
+    return asyncio.run(run())
+
+
+class TestRoutedChatModel(unittest.TestCase):
+    def test_rate_limited_backend_fails_over_and_cools_down(self):
+        limited = _backend("limited", weight=1000, rate_limit_rate=1.0, retry_after=60)
+        healthy = _backend("healthy")
+        model = RoutedChatModel(backends=[limited, healthy], seed=1)
+
+        self.assertEqual(_ask(model, 5), ["healthy"] * 5)
+
+        stats = {s["name"]: s for s in model.get_stats()}
+        # 冷却期内不再把请求发给被限流的后端
+        self.assertEqual(stats["limited"]["rate_limited"], 1)
+        self.assertGreater(stats["limited"]["cooling_down"], 50)
+        self.assertEqual(stats["healthy"]["requests"], 5)
+
+    def test_error_when_all_backends_fail_mentions_rate_limit(self):
+        model = RoutedChatModel(backends=[
+            _backend("a", rate_limit_rate=1.0),
+            _backend("b", rate_limit_rate=1.0),
+        ])
+
+        with self.assertRaises(AllBackendsFailedError) as ctx:
+            model.invoke([HumanMessage(content="review")])
+        self.assertIn("rate limit", str(ctx.exception).lower())
+        self.assertEqual(set(ctx.exception.errors), {"a", "b"})
+
+    def test_routing_prefers_faster_backends(self):
+        fast = _backend("fast", latency=0.001)
+        slow = _backend("slow", latency=0.03)
+        model = RoutedChatModel(backends=[fast, slow], seed=0)
+
+        answers = _ask(model, 60)
+        self.assertGreater(answers.count("fast"), answers.count("slow") * 2)
+
+    def test_backends_with_spare_budget_are_preferred(self):
+        budgeted = _backend("budgeted", weight=1000, requests_per_minute=2)
+        spare = _backend("spare")
+        model = RoutedChatModel(backends=[budgeted, spare], seed=0)
+
+        answers = _ask(model, 6)
+        self.assertEqual(answers.count("budgeted"), 2)
+        self.assertEqual(answers.count("spare"), 4)
+
+    def test_deepseek_style_error_responses_trigger_failover(self):
+        broken = ModelBackend(
+            FakeChatModel(responder=lambda prompt, rng: "Error calling DeepSeek API: boom"), name="broken", weight=1000
+        )
+        model = RoutedChatModel(backends=[broken, _backend("ok")], seed=0)
+
+        self.assertEqual(_ask(model), ["ok"])
+        self.assertEqual(model.get_stats()[0]["failures"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import unittest
+from datetime import datetime
+
+from codedog.utils.code_evaluator import DiffEvaluator
+from codedog.utils.fake_llm import FakeChatModel
+from codedog.utils.git_log_analyzer import CommitInfo, extract_file_diffs
+from codedog.utils.near_duplicate import NearDuplicateIndex, normalize_diff
+
+
+def _file_diff(path, body, start=10, blob="1a2b3c"):
+    return (
+        f"diff --git a/{path} b/{path}\nindex {blob}..4d5e6f 100644\n--- a/{path}\n+++ b/{path}\n"
+        f"@@ -{start},3 +{start},3 @@ def handler():\n{body}"
+    )
+
+
+CODEMOD = (
+    " request = build()\n"
+    "-response = client.fetch(request, timeout=30, retries=3)\n"
+    "-log.info('fetched %s', response.status)\n"
+    "+response = await client.afetch(request, timeout=30, retries=3, backoff=2.0)\n"
+    "+logger.info('fetched %s', response.status_code)\n"
+)
+
+
+class TestNearDuplicateIndex(unittest.TestCase):
+    def test_cherry_pick_normalizes_to_the_same_diff(self):
+        original = _file_diff("src/api.py", CODEMOD)
+        # 另一个分支上行号、blob 和缩进空白不同
+        picked = _file_diff("src/api.py", CODEMOD.replace("= ", "=  "), start=120, blob="9f8e7d")
+        self.assertEqual(normalize_diff(original), normalize_diff(picked))
+
+        index = NearDuplicateIndex()
+        index.add(original, {"overall_score": 8})
+        self.assertEqual(index.find(picked), ({"overall_score": 8}, 1.0, 1.0))
+        self.assertEqual(index.find(_file_diff("src/api.js", CODEMOD)), None)
+
+    def test_similar_codemod_diffs_are_found(self):
+        index = NearDuplicateIndex(threshold=0.6)
+        index.add(_file_diff("src/a.py", CODEMOD), {"overall_score": 7})
+
+        similar = _file_diff("src/b.py", CODEMOD.replace("timeout=30", "timeout=60"))
+        result, similarity, _ = index.find(similar)
+        self.assertEqual(result, {"overall_score": 7})
+        self.assertTrue(0.6 <= similarity < 1.0)
+
+        unrelated = _file_diff("src/c.py", "-import os\n+import sys\n+from pathlib import Path\n+print(Path.cwd())\n")
+        self.assertIsNone(index.find(unrelated))
+        self.assertEqual(index.get_stats(), {"entries": 1, "exact_hits": 0, "similar_hits": 1})
+
+    def test_extracted_diffs_are_partitioned_by_file_path(self):
+        # extract_file_diffs 去掉了 "diff --git" 行，扩展名只能来自调用方给出的路径
+        diff = "\n".join(_file_diff(path, CODEMOD) for path in ("src/api.py", "lib/api.rb"))
+        commit = CommitInfo(hash="abc", author="Alice", date=datetime(2024, 1, 2), message="codemod",
+                            files=["src/api.py", "lib/api.rb"], diff=diff)
+        file_diffs = extract_file_diffs(commit)
+        self.assertFalse(any("diff --git" in d for d in file_diffs.values()))
+
+        index = NearDuplicateIndex()
+        index.add(file_diffs["src/api.py"], {"overall_score": 8}, "src/api.py")
+        self.assertIsNone(index.find(file_diffs["lib/api.rb"], "lib/api.rb"))
+        self.assertEqual(index.find(file_diffs["src/api.py"], "other/api.py")[0], {"overall_score": 8})
+
+    def test_hunk_lines_that_look_like_file_headers_are_kept(self):
+        sql = _file_diff("db/schema.sql", " SELECT 1;\n--- old comment\n+++ new comment\n")
+        self.assertEqual(
+            normalize_diff(sql).split("\n"), ["@@ def handler():", " SELECT 1;", "--- old comment", "+++ new comment"]
+        )
+        other = _file_diff("db/schema.sql", " SELECT 1;\n--- another comment\n+++ new comment\n")
+        self.assertNotEqual(normalize_diff(sql), normalize_diff(other))
+
+
+class TestDiffEvaluatorNearDuplicates(unittest.TestCase):
+    def test_rebased_duplicates_reuse_one_evaluation(self):
+        model = FakeChatModel()
+        evaluator = DiffEvaluator(model, tokens_per_minute=1000000)
+        diffs = [_file_diff("src/api.py", CODEMOD, start=start) for start in (10, 42, 97)]
+
+        async def evaluate():
+            return [await evaluator._evaluate_single_diff(diff) for diff in diffs]
+
+        results = asyncio.run(evaluate())
+        self.assertEqual(model.get_stats()["calls"], 1)
+        self.assertEqual(results[1]["overall_score"], results[0]["overall_score"])
+        self.assertEqual(evaluator.near_duplicates.exact_hits, 2)
+
+    def test_extracted_diffs_in_other_languages_are_evaluated_separately(self):
+        model = FakeChatModel()
+        evaluator = DiffEvaluator(model, tokens_per_minute=1000000)
+        paths = ["src/api.py", "lib/api.rb", "src/other.py"]
+        commit = CommitInfo(hash="abc", author="Alice", date=datetime(2024, 1, 2), message="codemod", files=paths,
+                            diff="\n".join(_file_diff(path, CODEMOD) for path in paths))
+        file_diffs = extract_file_diffs(commit)
+
+        async def evaluate():
+            return [await evaluator._evaluate_single_diff(file_diffs[path], path) for path in paths]
+
+        asyncio.run(evaluate())
+        # .rb 不复用 .py 的评价，第二个 .py 文件复用第一个
+        self.assertEqual(model.get_stats()["calls"], 2)
+
+    def test_disabled_index_only_reuses_identical_diffs(self):
+        model = FakeChatModel()
+        evaluator = DiffEvaluator(model, tokens_per_minute=1000000, near_duplicate_threshold=None)
+        diffs = [_file_diff("src/api.py", CODEMOD, start=start) for start in (10, 42, 42)]
+
+        async def evaluate():
+            return [await evaluator._evaluate_single_diff(diff) for diff in diffs]
+
+        asyncio.run(evaluate())
+        self.assertEqual(model.get_stats()["calls"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
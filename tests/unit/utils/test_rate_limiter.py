@@ -0,0 +1,110 @@
+import asyncio
+import time
+import unittest
+
+from langchain_core.messages import HumanMessage
+
+from codedog.utils.fake_llm import FakeChatModel
+from codedog.utils.rate_limiter import TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_requests_within_budget_do_not_wait(self):
+        async def run():
+            bucket = TokenBucket(tokens_per_minute=600)
+            return [await bucket.get_tokens(100) for _ in range(6)], bucket.get_stats()
+
+        waits, stats = asyncio.run(run())
+        self.assertEqual(waits, [0.0] * 6)
+        self.assertEqual(stats["total_tokens_used"], 600)
+        self.assertEqual(stats["pending_requests"], 0)
+
+    def test_waiters_are_woken_by_a_single_timer(self):
+        async def run():
+            # 每秒补充 100 个令牌
+            bucket = TokenBucket(tokens_per_minute=6000)
+            self.assertTrue(bucket.try_acquire(6000))
+            started = time.monotonic()
+            finished = {}
+
+            async def request(name, tokens):
+                await bucket.get_tokens(tokens)
+                finished[name] = time.monotonic() - started
+
+            tasks = [asyncio.create_task(request(i, 10)) for i in range(5)]
+            await asyncio.sleep(0.02)
+            # 等待期间不会为每个请求创建轮询任务
+            self.assertEqual(len(asyncio.all_tasks()), 1 + len(tasks))
+            self.assertEqual(bucket.get_stats()["pending_requests"], 5)
+            await asyncio.gather(*tasks)
+            return finished
+
+        finished = asyncio.run(run())
+        self.assertEqual(sorted(finished, key=finished.get), [0, 1, 2, 3, 4])
+        self.assertAlmostEqual(finished[4], 0.5, delta=0.15)
+
+    def test_smaller_requests_are_served_first(self):
+        async def run():
+            bucket = TokenBucket(tokens_per_minute=6000)
+            bucket.try_acquire(6000)
+            order = []
+
+            async def request(name, tokens):
+                await bucket.get_tokens(tokens)
+                order.append(name)
+
+            await asyncio.gather(request("large", 50), request("small", 10))
+            return order
+
+        self.assertEqual(asyncio.run(run()), ["small", "large"])
+
+    def test_requests_per_minute_budget(self):
+        async def run():
+            bucket = TokenBucket(tokens_per_minute=1000000, requests_per_minute=600)
+            for _ in range(600):
+                self.assertTrue(bucket.try_acquire(1))
+            self.assertFalse(bucket.try_acquire(1))
+            return await bucket.get_tokens(1)
+
+        self.assertAlmostEqual(asyncio.run(run()), 0.1, delta=0.08)
+
+    def test_raising_the_rate_wakes_waiters_early(self):
+        async def run():
+            bucket = TokenBucket(tokens_per_minute=60)
+            bucket.try_acquire(60)
+            waiter = asyncio.create_task(bucket.get_tokens(30))
+            await asyncio.sleep(0.02)
+            bucket.tokens_per_minute = 60000
+            return await asyncio.wait_for(waiter, timeout=1)
+
+        self.assertLess(asyncio.run(run()), 0.5)
+
+    def test_cancelled_waiter_does_not_block_the_queue(self):
+        async def run():
+            bucket = TokenBucket(tokens_per_minute=6000)
+            bucket.try_acquire(6000)
+            cancelled = asyncio.create_task(bucket.get_tokens(10))
+            waiter = asyncio.create_task(bucket.get_tokens(10))
+            await asyncio.sleep(0.01)
+            cancelled.cancel()
+            await asyncio.wait_for(waiter, timeout=1)
+            return bucket.get_stats()
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats["pending_requests"], 0)
+        self.assertEqual(stats["total_tokens_used"], 6010)
+
+    def test_usable_as_chat_model_rate_limiter(self):
+        bucket = TokenBucket(tokens_per_minute=1000000, requests_per_minute=600, tokens_per_request=100)
+        model = FakeChatModel(rate_limiter=bucket)
+        for _ in range(3):
+            model.invoke([HumanMessage(content="hello")])
+        asyncio.run(model.ainvoke([HumanMessage(content="hello")]))
+
+        stats = bucket.get_stats()
+        self.assertEqual(stats["total_requests"], 4)
+        self.assertEqual(stats["total_tokens_used"], 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
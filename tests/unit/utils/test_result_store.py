@@ -0,0 +1,181 @@
+import dataclasses
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from codedog.utils.code_evaluator import CodeEvaluation, FileEvaluationResult, generate_evaluation_markdown
+from codedog.utils.result_store import COLUMNS, ResultStore
+
+
+def make_result(file_path, day, author="alice", score=7, hours=1.5, comments="Looks fine"):
+    return FileEvaluationResult(
+        file_path=file_path,
+        commit_hash=f"{day:02d}abcdef0123",
+        commit_message=f"Change {file_path}",
+        date=datetime(2024, 3, day, 10, 30),
+        author=author,
+        evaluation=CodeEvaluation(
+            readability=score,
+            efficiency=score,
+            security=score,
+            structure=score,
+            error_handling=score,
+            documentation=score,
+            code_style=score,
+            overall_score=float(score),
+            estimated_hours=hours,
+            comments=comments,
+        ),
+    )
+
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.results = [
+            make_result("b.py", 3, score=6, comments="第二个文件"),
+            make_result("a.py", 1, author="bob", score=8, hours=2.0),
+            make_result("c.py", 3, score=4, hours=0.0),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_round_trip_in_date_order(self):
+        with ResultStore(self.tmpdir) as store:
+            store.extend(self.results)
+
+        store = ResultStore(self.tmpdir)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(list(store.iter_results()), sorted(self.results, key=lambda r: r.date))
+        self.assertEqual([r.file_path for r in store.iter_results(order="insertion")], ["b.py", "a.py", "c.py"])
+
+    def test_summary(self):
+        store = ResultStore(self.tmpdir)
+        store.extend(self.results)
+        summary = store.summary()
+
+        self.assertEqual(summary["count"], 3)
+        self.assertAlmostEqual(summary["averages"]["overall_score"], 6.0)
+        self.assertAlmostEqual(summary["total_hours"], 3.5)
+        self.assertEqual(summary["first_author"], "bob")
+        daily = [(day["date"].day, day["files"], day["overall_score"]) for day in summary["daily"]]
+        self.assertEqual(daily, [(1, 1, 8.0), (3, 2, 5.0)])
+        self.assertEqual([(a["author"], a["files"]) for a in summary["authors"]], [("alice", 2), ("bob", 1)])
+
+    def test_streamed_report_matches_in_memory_report(self):
+        store = ResultStore(self.tmpdir)
+        store.extend(self.results)
+        output = io.StringIO()
+        store.write_markdown(output)
+
+        report = generate_evaluation_markdown(self.results)
+        self.assertEqual(output.getvalue(), report)
+        self.assertIn("## Daily Trend", report)
+        self.assertIn("| alice | 2 | 5.0 | 1.5 |", report)
+        self.assertLess(report.index("### 1. a.py"), report.index("### 2. b.py"))
+
+    def test_author_filter(self):
+        store = ResultStore(self.tmpdir)
+        store.extend(self.results)
+
+        summary = store.summary(author="alice")
+        self.assertEqual(summary["count"], 2)
+        self.assertAlmostEqual(summary["averages"]["overall_score"], 5.0)
+        self.assertEqual([r.file_path for r in store.iter_results(author="alice")], ["b.py", "c.py"])
+        self.assertEqual(store.summary(author="nobody"), {"count": 0})
+
+        output = io.StringIO()
+        store.write_markdown(output, author="bob")
+        self.assertEqual(output.getvalue(), generate_evaluation_markdown([self.results[1]]))
+        self.assertIn("- **Developers**: 2", generate_evaluation_markdown(self.results))
+
+    def test_partially_written_row_is_truncated(self):
+        with ResultStore(self.tmpdir) as store:
+            store.extend(self.results[:2])
+        with open(os.path.join(self.tmpdir, "readability.col"), "ab") as f:
+            f.write(b"\x05")
+
+        store = ResultStore(self.tmpdir)
+        self.assertEqual(len(store), 2)
+        for column, dtype in COLUMNS.items():
+            self.assertEqual(os.path.getsize(os.path.join(self.tmpdir, f"{column}.col")), 2 * dtype.itemsize)
+        store.append(self.results[2])
+        self.assertEqual([r.comments for r in (x.evaluation for x in store.iter_results())],
+                         ["Looks fine", "第二个文件", "Looks fine"])
+
+    def test_text_written_before_the_columns_is_dropped(self):
+        # 进程在写完 meta/comments、写数值列之前退出：这些文本没有对应的行
+        with ResultStore(self.tmpdir) as store:
+            store.extend(self.results[:1])
+        with open(os.path.join(self.tmpdir, "meta.jsonl"), "ab") as f:
+            f.write(b'{"file_path": "lost.py", "commit_hash": "c1", "commit_message": "m", "date": "2024-03-01"}\n')
+        with open(os.path.join(self.tmpdir, "comments.txt"), "ab") as f:
+            f.write(b"orphan comment")
+
+        store = ResultStore(self.tmpdir)
+        self.assertEqual(store.completed_keys(), {("03abcdef0123", "b.py")})
+        store.append(self.results[1])
+        self.assertEqual([r.file_path for r in store.iter_results(order="insertion")], ["b.py", "a.py"])
+        self.assertEqual([r.evaluation.comments for r in store.iter_results(order="insertion")],
+                         ["第二个文件", "Looks fine"])
+
+    def test_interrupted_rewrite_is_recovered(self):
+        with ResultStore(self.tmpdir) as store:
+            store.extend(self.results)
+
+        # 原目录已移开、新目录还没换入
+        os.rename(self.tmpdir, self.tmpdir + ".old")
+        self.assertEqual(len(ResultStore(self.tmpdir)), 3)
+        self.assertFalse(os.path.exists(self.tmpdir + ".old"))
+
+        # 新目录已换入、旧目录还没删除
+        shutil.copytree(self.tmpdir, self.tmpdir + ".old")
+        self.assertEqual(len(ResultStore(self.tmpdir)), 3)
+        self.assertFalse(os.path.exists(self.tmpdir + ".old"))
+
+    def test_write_through_journal(self):
+        # flush_rows=1 时每行立即落盘，未关闭的结果库重新打开后仍能看到已完成的结果
+        store = ResultStore(self.tmpdir, flush_rows=1)
+        store.set_manifest({"authors": ["alice"], "model": "gpt-4o"})
+        store.extend(self.results[:2])
+
+        reopened = ResultStore(self.tmpdir)
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.completed_keys(), {("03abcdef0123", "b.py"), ("01abcdef0123", "a.py")})
+        self.assertEqual(reopened.get_manifest(), {"authors": ["alice"], "model": "gpt-4o"})
+
+        reopened.clear()
+        self.assertEqual(reopened.completed_keys(), set())
+        self.assertIsNone(reopened.get_manifest())
+
+    def test_failed_evaluations_are_retried(self):
+        store = ResultStore(self.tmpdir, flush_rows=1)
+        store.set_manifest({"authors": ["alice"]})
+        failed = dataclasses.replace(self.results[2], evaluation_failed=True)
+        store.extend([self.results[0], failed, self.results[1]])
+
+        # 失败的行不算完成，续跑前删除，重新评价的结果不会重复出现
+        self.assertEqual(store.completed_keys(), {("03abcdef0123", "b.py"), ("01abcdef0123", "a.py")})
+        self.assertEqual([r.evaluation_failed for r in store.iter_results(order="insertion")], [False, True, False])
+        self.assertEqual(store.discard_failed(), 1)
+        self.assertEqual(store.discard_failed(), 0)
+        self.assertFalse(os.path.exists(self.tmpdir + ".tmp"))
+
+        store.append(self.results[2])
+        reopened = ResultStore(self.tmpdir)
+        self.assertEqual(list(reopened.iter_results(order="insertion")), self.results)
+        self.assertEqual(reopened.summary()["count"], 3)
+        self.assertEqual(reopened.get_manifest(), {"authors": ["alice"]})
+
+    def test_empty_store(self):
+        store = ResultStore(self.tmpdir)
+        self.assertEqual(store.summary(), {"count": 0})
+        self.assertEqual("".join(store.iter_markdown()), generate_evaluation_markdown([]))
+
+
+if __name__ == "__main__":
+    unittest.main()
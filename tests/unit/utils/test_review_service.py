@@ -0,0 +1,162 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from github import Github
+
+from codedog.utils.review_service import (
+    ReviewRequest,
+    ReviewService,
+    create_webhook_app,
+    parse_github_event,
+    parse_gitlab_event,
+)
+
+
+def github_event(number, sha, action="synchronize", draft=False, repository_id=1):
+    return {
+        "action": action,
+        "number": number,
+        "pull_request": {"number": number, "state": "open", "draft": draft, "head": {"sha": sha}, "title": "PR"},
+        "repository": {"id": repository_id},
+    }
+
+
+class FakeGithubAPI:
+    """只实现审查回帖用到的几个接口的本地 GitHub API"""
+
+    def __init__(self):
+        self.heads = {}
+        self.comments = []
+        self.app = web.Application()
+        self.app.router.add_get("/repositories/{id}", self.get_repository)
+        self.app.router.add_get("/repos/octo/app/pulls/{number}", self.get_pull)
+        self.app.router.add_post("/repos/octo/app/issues/{number}/comments", self.create_comment)
+        self.server = TestServer(self.app)
+
+    def url(self, path):
+        return str(self.server.make_url(path))
+
+    async def get_repository(self, request):
+        return web.json_response(
+            {"id": int(request.match_info["id"]), "full_name": "octo/app", "url": self.url("/repos/octo/app")}
+        )
+
+    async def get_pull(self, request):
+        number = int(request.match_info["number"])
+        return web.json_response({
+            "number": number,
+            "url": self.url(f"/repos/octo/app/pulls/{number}"),
+            "issue_url": self.url(f"/repos/octo/app/issues/{number}"),
+            "head": {"sha": self.heads[number]},
+        })
+
+    async def create_comment(self, request):
+        body = await request.json()
+        self.comments.append((int(request.match_info["number"]), body["body"]))
+        return web.json_response({"id": len(self.comments), "body": body["body"]}, status=201)
+
+
+class TestReviewService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.api = FakeGithubAPI()
+        await self.api.server.start_server()
+        self.release = threading.Event()
+        self.reviewed = []
+
+        def review(request: ReviewRequest):
+            # 与示例服务器一样在工作线程中用 PyGithub 读取 PR 并回帖
+            self.release.wait(5)
+            client = Github(base_url=self.api.url(""), retry=0, seconds_between_requests=0, seconds_between_writes=0)
+            pull = client.get_repo(request.repository_id).get_pull(request.number)
+            self.reviewed.append((request.number, request.head_sha))
+            pull.create_issue_comment(f"Reviewed {pull.head.sha}")
+
+        self.service = ReviewService(review, workers=2, max_pending=2)
+        self.client = TestClient(TestServer(create_webhook_app(self.service, github_secret="s3cret")))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        self.release.set()
+        await self.client.close()
+        await self.api.server.close()
+
+    async def post(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        signature = "sha256=" + hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+        return await self.client.post("/github", data=body, headers={"X-Hub-Signature-256": signature})
+
+    async def test_bursts_are_coalesced_to_latest_head(self):
+        self.api.heads[7] = "a"
+        self.assertEqual((await self.post(github_event(7, "a", action="opened"))).status, 202)
+        while not self.service.metrics()["running"]:
+            await asyncio.sleep(0.01)
+
+        # 第一次审查执行期间连续推送 b、c，只有最新的 c 会被审查
+        statuses = []
+        for sha in ("b", "c", "c"):
+            self.api.heads[7] = sha
+            response = await self.post(github_event(7, sha))
+            statuses.append(await response.text())
+        self.assertEqual(statuses, ["Review queued.", "Review coalesced.", "Review duplicate."])
+        self.assertEqual(self.service.metrics()["queue_depth"], 1)
+
+        self.release.set()
+        await self.service.join()
+        self.assertEqual(self.reviewed, [(7, "a"), (7, "c")])
+        self.assertEqual(self.api.comments[-1], (7, "Reviewed c"))
+
+        metrics = await (await self.client.get("/metrics")).json()
+        self.assertEqual((metrics["completed"], metrics["coalesced"], metrics["duplicate"]), (2, 1, 1))
+        self.assertEqual((metrics["queue_depth"], metrics["running"]), (0, 0))
+        self.assertGreater(metrics["run_seconds"]["max"], 0)
+
+    async def test_backpressure_and_filtering(self):
+        for number in (1, 2, 3, 4):
+            self.api.heads[number] = "x"
+        statuses = [(await self.post(github_event(number, "x", action="opened"))).status for number in (1, 2)]
+        while self.service.metrics()["running"] < 2:
+            await asyncio.sleep(0.01)
+        # 两个工作者都在执行，再有两个 PR 等待时队列已满
+        statuses += [(await self.post(github_event(number, "x", action="opened"))).status for number in (3, 4)]
+        response = await self.post(github_event(5, "x", action="opened"))
+        self.assertEqual(statuses + [response.status], [202, 202, 202, 202, 503])
+        self.assertEqual(self.service.metrics()["rejected"], 1)
+
+        response = await self.post(github_event(6, "x", draft=True))
+        self.assertEqual((response.status, await response.text()), (200, "Ignored: Pull request is a draft"))
+        response = await self.client.post("/github", data=b"{}", headers={"X-Hub-Signature-256": "sha256=bad"})
+        self.assertEqual(response.status, 401)
+
+        self.release.set()
+        await self.service.join()
+        self.assertEqual(sorted(number for number, _ in self.api.comments), [1, 2, 3, 4])
+
+
+class TestParseEvents(unittest.TestCase):
+    def test_github(self):
+        request = parse_github_event(github_event(3, "abc", repository_id=9))
+        self.assertEqual((request.key, request.head_sha), (("github", 9, 3), "abc"))
+        with self.assertRaises(ValueError):
+            parse_github_event(github_event(3, "abc", action="closed"))
+
+    def test_gitlab(self):
+        payload = {
+            "object_kind": "merge_request",
+            "project": {"id": 4},
+            "object_attributes": {"iid": 2, "action": "update", "oldrev": "a", "state": "opened",
+                                  "last_commit": {"id": "b"}},
+        }
+        self.assertEqual(parse_gitlab_event(payload).key, ("gitlab", 4, 2))
+        del payload["object_attributes"]["oldrev"]
+        with self.assertRaises(ValueError):
+            parse_gitlab_event(payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
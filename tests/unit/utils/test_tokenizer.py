@@ -0,0 +1,43 @@
+import unittest
+from unittest.mock import patch
+
+from codedog.utils.tokenizer import Tokenizer, get_tokenizer
+
+
+class TestTokenizer(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = get_tokenizer("gpt-3.5-turbo")
+        self.text = "def add(a, b):\n    return a + b\n" * 50
+
+    def test_tokenizer_is_shared_per_model(self):
+        self.assertIs(get_tokenizer("gpt-3.5-turbo"), self.tokenizer)
+
+    def test_count_batch_matches_count(self):
+        texts = ["", "x = 1", self.text]
+        self.assertEqual(self.tokenizer.count_batch(texts), [self.tokenizer.count(t) for t in texts])
+
+    def test_fits(self):
+        total = self.tokenizer.count(self.text)
+        self.assertTrue(self.tokenizer.fits(self.text, total))
+        self.assertFalse(self.tokenizer.fits(self.text, total - 1))
+        self.assertTrue(self.tokenizer.fits("short", 5))
+
+    def test_split_and_truncate_respect_budget(self):
+        pieces = self.tokenizer.split(self.text, 40)
+        self.assertGreater(len(pieces), 1)
+        for piece in pieces:
+            self.assertTrue(self.tokenizer.fits(piece, 40))
+        self.assertTrue(self.tokenizer.fits(self.tokenizer.truncate(self.text, 40), 40))
+
+    def test_special_token_text_is_counted(self):
+        self.assertGreater(self.tokenizer.count("<|endoftext|>"), 0)
+
+    @patch("codedog.utils.tokenizer._load_encoding", return_value=None)
+    def test_fallback_estimate_without_encoding(self, _):
+        tokenizer = Tokenizer("offline-model")
+        self.assertEqual(tokenizer.count("abcdef"), 2)
+        self.assertEqual(tokenizer.split("abcdef", 1), ["abc", "def"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from langchain.chains import LLMChain
+
+from codedog.chains.code_review.translate_code_review_chain import TranslateCodeReviewChain
+from codedog.chains.prompts import TRANSLATE_BATCH_PROMPT, TRANSLATE_PROMPT
+from codedog.models import ChangeFile, ChangeStatus, CodeReview
+from codedog.utils.fake_llm import FakeChatModel
+from codedog.utils.translation import TranslationCache, Translator
+
+
+def translate_responder(prompt, rng):
+    """把每段内容加上 ``ZH:`` 前缀，批量 prompt 中的标记行原样保留"""
+    content = re.search(r"Content:\n---\n(.*)\n---\n", prompt, re.S).group(1)
+    return "\n".join(line if re.fullmatch(r"<<<\d+>>>", line) else f"ZH:{line}" for line in content.split("\n"))
+
+
+def _translator(llm, **kwargs):
+    return Translator(LLMChain(llm=llm, prompt=TRANSLATE_PROMPT), "Chinese", **kwargs)
+
+
+class TestTranslator(unittest.TestCase):
+    def test_short_texts_are_batched_and_cached(self):
+        llm = FakeChatModel(responder=translate_responder)
+        cache = TranslationCache()
+        translator = _translator(llm, cache=cache, batch_prompt=TRANSLATE_BATCH_PROMPT, max_batch_size=2)
+
+        texts = ["Looks good.", "", "Add a test.", "Looks good.", "Rename x."]
+        self.assertEqual(
+            translator.translate(texts, "review"),
+            ["ZH:Looks good.", "", "ZH:Add a test.", "ZH:Looks good.", "ZH:Rename x."],
+        )
+        # 三条不同的文本，每批最多两条
+        self.assertEqual(llm.get_stats()["calls"], 2)
+
+        self.assertEqual(translator.translate(["Rename x.", "Looks good."], "review"),
+                         ["ZH:Rename x.", "ZH:Looks good."])
+        self.assertEqual(llm.get_stats()["calls"], 2)
+        self.assertEqual(len(cache), 3)
+
+    def test_long_texts_and_unparsable_batches_are_translated_one_by_one(self):
+        def responder(prompt, rng):
+            # 批量响应丢失标记时退回逐条翻译
+            return "garbled" if "<<<1>>>" in prompt else translate_responder(prompt, rng)
+
+        llm = FakeChatModel(responder=responder)
+        translator = _translator(llm, batch_prompt=TRANSLATE_BATCH_PROMPT, batch_chars=20, max_concurrency=3)
+        long_text = "x" * 30
+
+        self.assertEqual(translator.translate(["a", "b", long_text], "review"), ["ZH:a", "ZH:b", f"ZH:{long_text}"])
+        self.assertEqual(llm.get_stats()["calls"], 4)
+
+    def test_async_translation_with_descriptions(self):
+        llm = FakeChatModel(responder=translate_responder, latency=0.05)
+        translator = _translator(llm, max_concurrency=4)
+
+        result = asyncio.run(translator.atranslate(["a", "b", "c", "d"], ["overview", "file", "file", "file"]))
+        self.assertEqual(result, ["ZH:a", "ZH:b", "ZH:c", "ZH:d"])
+        self.assertEqual(llm.get_stats()["calls"], 4)
+
+
+class TestTranslationCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_persistent_cache_is_keyed_by_language(self):
+        path = os.path.join(self.directory, "translations.sqlite")
+        cache = TranslationCache(path, max_entries=2)
+        cache.set("hello", "Chinese", "你好")
+        cache.set("hello", "Japanese", "こんにちは")
+        cache.close()
+
+        cache = TranslationCache(path, max_entries=2)
+        self.assertEqual((cache.get("hello", "Chinese"), cache.get("hello", "French")), ("你好", None))
+        cache.set("bye", "Chinese", "再见")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("hello", "Japanese"))
+        self.assertEqual(cache.get_stats()["hits"], 1)
+        cache.close()
+
+    def test_memory_cache_evicts_least_recently_used(self):
+        cache = TranslationCache(max_entries=2)
+        cache.set("a", "Chinese", "甲")
+        cache.set("b", "Chinese", "乙")
+        cache.get("a", "Chinese")
+        cache.set("c", "Chinese", "丙")
+        self.assertEqual([cache.get(text, "Chinese") for text in "abc"], ["甲", None, "丙"])
+
+
+class TestTranslateCodeReviewChain(unittest.TestCase):
+    def test_empty_reviews_keep_their_position(self):
+        llm = FakeChatModel(responder=translate_responder)
+        chain = TranslateCodeReviewChain.from_llm(language="Chinese", llm=llm, translate_llm=llm)
+        files = [
+            ChangeFile(blob_id=i, sha=str(i), full_name=name, source_full_name=name, status=ChangeStatus.modified,
+                       pull_request_id=1, start_commit_id=0, end_commit_id=1, name=name, suffix="py")
+            for i, name in enumerate(["a.py", "b.py", "c.py"])
+        ]
+        reviews = [CodeReview(file=f, review=text) for f, text in zip(files, ["Fix a.", "", "Fix c."])]
+
+        translated = chain._translate(reviews)
+        self.assertEqual([r.review for r in translated], ["ZH:Fix a.", "", "ZH:Fix c."])
+        self.assertEqual(llm.get_stats()["calls"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()